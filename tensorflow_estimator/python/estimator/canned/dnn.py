@@ -18,20 +18,27 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import collections
+
 import six
 
 from tensorflow.python.feature_column import dense_features
 from tensorflow.python.feature_column import dense_features_v2
 from tensorflow.python.feature_column import feature_column
 from tensorflow.python.feature_column import feature_column_lib
+from tensorflow.python.feature_column import feature_column_v2
+from tensorflow.python.framework import dtypes
 from tensorflow.python.framework import ops
+from tensorflow.python.framework import tensor_shape
 from tensorflow.python.keras.engine import training
 from tensorflow.python.keras.layers import core as keras_core
 from tensorflow.python.keras.layers import normalization as keras_norm
 from tensorflow.python.keras.utils import losses_utils
 from tensorflow.python.layers import core as core_layers
 from tensorflow.python.layers import normalization
+from tensorflow.python.ops import array_ops
 from tensorflow.python.ops import init_ops
+from tensorflow.python.ops import math_ops
 from tensorflow.python.ops import nn
 from tensorflow.python.ops import partitioned_variables
 from tensorflow.python.ops import variable_scope
@@ -40,7 +47,9 @@ from tensorflow.python.summary import summary
 from tensorflow.python.training import training_util
 from tensorflow.python.util.tf_export import estimator_export
 from tensorflow_estimator.python.estimator import estimator
+from tensorflow_estimator.python.estimator.canned import embedding_cache
 from tensorflow_estimator.python.estimator.canned import head as head_lib
+from tensorflow_estimator.python.estimator.canned import mixed_precision
 from tensorflow_estimator.python.estimator.canned import optimizers
 from tensorflow_estimator.python.estimator.head import head_utils
 from tensorflow_estimator.python.estimator.head import regression_head
@@ -52,13 +61,144 @@ _LEARNING_RATE = 0.05
 
 
 def _add_hidden_layer_summary(value, tag):
+  value = math_ops.cast(value, dtypes.float32)
   summary.scalar('%s/fraction_of_zero_values' % tag, nn.zero_fraction(value))
   summary.histogram('%s/activation' % tag, value)
 
 
+def _embedding_table_name(column):
+  """Returns the name of the embedding table `column` looks up, or `None`."""
+  if isinstance(column, feature_column_v2.SharedEmbeddingColumn):
+    return column.shared_embedding_column_creator._name  # pylint: disable=protected-access
+  if isinstance(column, feature_column._SharedEmbeddingColumn):  # pylint: disable=protected-access
+    return column.shared_embedding_collection_name
+  if isinstance(column, (feature_column_v2.EmbeddingColumn,
+                         feature_column._EmbeddingColumn)):  # pylint: disable=protected-access
+    return column.name
+  return None
+
+
+class _EmbeddingLookupSummaryColumn(
+    feature_column_v2.DenseColumn,
+    feature_column._DenseColumn,  # pylint: disable=protected-access
+    collections.namedtuple('_EmbeddingLookupSummaryColumn',
+                           ('embedding_columns',))):
+  """Adds the fraction of unique ids looked up in each embedding table.
+
+  `embedding_lookup_sparse` already gathers every id once per column and batch
+  and aggregates its gradient per unique id. Columns sharing an embedding table
+  look it up separately, so the ids of all columns of a table are pooled here.
+
+  The column is added to the input layer, which hands every column the same
+  transformation cache, so it reads the sparse ids built for the embedding
+  lookups instead of transforming the features again. Its dense tensor has no
+  elements. Deserializing the input layer needs the column in `custom_objects`.
+  """
+
+  @property
+  def _is_v2_column(self):
+    return feature_column_lib.is_feature_column_v2(self.embedding_columns)
+
+  @property
+  def name(self):
+    return 'embedding_lookup_summary'
+
+  @property
+  def parse_example_spec(self):
+    return {}
+
+  @property
+  def _parse_example_spec(self):
+    return {}
+
+  @property
+  def parents(self):
+    return list(self.embedding_columns)
+
+  def _get_config(self):
+    return {
+        'embedding_columns': feature_column_lib.serialize_feature_columns(
+            self.embedding_columns)
+    }
+
+  @classmethod
+  def _from_config(cls, config, custom_objects=None, columns_by_name=None):
+    return cls(embedding_columns=tuple(
+        feature_column_lib.deserialize_feature_column(
+            column_config, custom_objects, columns_by_name)
+        for column_config in config['embedding_columns']))
+
+  def transform_feature(self, transformation_cache, state_manager):
+    return None
+
+  def _transform_feature(self, inputs):
+    return None
+
+  @property
+  def variable_shape(self):
+    return tensor_shape.TensorShape([0])
+
+  @property
+  def _variable_shape(self):
+    return self.variable_shape
+
+  def get_dense_tensor(self, transformation_cache, state_manager):
+    return self._add_summaries(
+        lambda column: column.get_sparse_tensors(  # pylint: disable=g-long-lambda
+            transformation_cache, state_manager))
+
+  def _get_dense_tensor(self, inputs, weight_collections=None, trainable=None):
+    return self._add_summaries(
+        lambda column: column._get_sparse_tensors(inputs))  # pylint: disable=protected-access
+
+  def _add_summaries(self, get_sparse_tensors):
+    """Adds the summaries and returns an empty `[batch_size, 0]` tensor."""
+    ids_by_table = collections.OrderedDict()
+    for column in sorted(self.embedding_columns, key=lambda c: c.name):
+      id_tensor = get_sparse_tensors(column.categorical_column).id_tensor
+      ids_by_table.setdefault(_embedding_table_name(column), []).append(
+          id_tensor.values)
+
+    for table_name, ids in six.iteritems(ids_by_table):
+      ids = array_ops.concat(ids, axis=0)
+      # Negative ids are pruned before the lookup.
+      ids = array_ops.boolean_mask(ids, math_ops.greater_equal(ids, 0))
+      unique_ids, _ = array_ops.unique(ids)
+      summary.scalar(
+          '%s/fraction_of_unique_ids' % table_name,
+          math_ops.div_no_nan(
+              math_ops.cast(array_ops.size(unique_ids), dtypes.float32),
+              math_ops.cast(array_ops.size(ids), dtypes.float32)))
+    return array_ops.zeros(
+        array_ops.stack([id_tensor.dense_shape[0], 0]), dtype=dtypes.float32)
+
+
+def _input_layer_columns(feature_columns, embedding_lookup_summary):
+  """Returns the columns of the input layer.
+
+  Args:
+    feature_columns: Iterable of the feature columns of the model.
+    embedding_lookup_summary: Whether to add an `_EmbeddingLookupSummaryColumn`
+      for the embedding columns among `feature_columns`.
+
+  Returns:
+    A list of feature columns.
+  """
+  feature_columns = list(feature_columns)
+  if not embedding_lookup_summary:
+    return feature_columns
+  embedding_columns = tuple(
+      column for column in feature_columns
+      if _embedding_table_name(column) is not None)
+  if not embedding_columns:
+    return feature_columns
+  return feature_columns + [_EmbeddingLookupSummaryColumn(embedding_columns)]
+
+
 @estimator_export(v1=['estimator.experimental.dnn_logit_fn_builder'])
 def dnn_logit_fn_builder(units, hidden_units, feature_columns, activation_fn,
-                         dropout, input_layer_partitioner, batch_norm):
+                         dropout, input_layer_partitioner, batch_norm,
+                         embedding_lookup_summary=False):
   """Function builder for a dnn logit_fn.
 
   Args:
@@ -72,6 +212,8 @@ def dnn_logit_fn_builder(units, hidden_units, feature_columns, activation_fn,
       coordinate.
     input_layer_partitioner: Partitioner for input layer.
     batch_norm: Whether to use batch normalization after each hidden layer.
+    embedding_lookup_summary: Whether to add a summary of the fraction of
+      unique ids looked up in each embedding table.
 
   Returns:
     A logit_fn (see below).
@@ -105,6 +247,7 @@ def dnn_logit_fn_builder(units, hidden_units, feature_columns, activation_fn,
         dropout,
         input_layer_partitioner,
         batch_norm,
+        embedding_lookup_summary=embedding_lookup_summary,
         name='dnn')
     return dnn_model(features, mode)
 
@@ -112,7 +255,8 @@ def dnn_logit_fn_builder(units, hidden_units, feature_columns, activation_fn,
 
 
 def dnn_logit_fn_builder_v2(units, hidden_units, feature_columns, activation_fn,
-                            dropout, batch_norm):
+                            dropout, batch_norm, embedding_lookup_summary=False,
+                            compute_dtype=None):
   """Function builder for a dnn logit_fn.
 
   Args:
@@ -124,6 +268,11 @@ def dnn_logit_fn_builder_v2(units, hidden_units, feature_columns, activation_fn,
     dropout: When not `None`, the probability we will drop out a given
       coordinate.
     batch_norm: Whether to use batch normalization after each hidden layer.
+    embedding_lookup_summary: Whether to add a summary of the fraction of
+      unique ids looked up in each embedding table.
+    compute_dtype: The dtype hidden layers compute in, one of `tf.float32`,
+      `tf.bfloat16` or `tf.float16`. Variables and checkpoints stay in float32.
+      float16 training uses dynamic loss scaling. Defaults to float32.
 
   Returns:
     A logit_fn (see below).
@@ -156,6 +305,8 @@ def dnn_logit_fn_builder_v2(units, hidden_units, feature_columns, activation_fn,
         activation_fn,
         dropout,
         batch_norm,
+        embedding_lookup_summary=embedding_lookup_summary,
+        compute_dtype=compute_dtype,
         name='dnn')
     return dnn_model(features, mode)
 
@@ -178,15 +329,19 @@ class _DNNModel(training.Model):
                dropout,
                input_layer_partitioner,
                batch_norm,
+               embedding_lookup_summary=False,
                name=None,
                **kwargs):
     super(_DNNModel, self).__init__(name=name, **kwargs)
     if feature_column_lib.is_feature_column_v2(feature_columns):
       self._input_layer = dense_features.DenseFeatures(
-          feature_columns=feature_columns, name='input_layer')
+          feature_columns=_input_layer_columns(feature_columns,
+                                               embedding_lookup_summary),
+          name='input_layer')
     else:
       self._input_layer = feature_column.InputLayer(
-          feature_columns=feature_columns,
+          feature_columns=_input_layer_columns(feature_columns,
+                                               embedding_lookup_summary),
           name='input_layer',
           create_scope_now=False)
 
@@ -291,6 +446,8 @@ class _DNNModelV2(training.Model):
                activation_fn,
                dropout,
                batch_norm,
+               embedding_lookup_summary=False,
+               compute_dtype=None,
                name=None,
                **kwargs):
     super(_DNNModelV2, self).__init__(name=name, **kwargs)
@@ -299,7 +456,9 @@ class _DNNModelV2(training.Model):
       layer_name = input_feature_column_scope + 'input_layer'
       if feature_column_lib.is_feature_column_v2(feature_columns):
         self._input_layer = dense_features_v2.DenseFeatures(
-            feature_columns=feature_columns, name=layer_name)
+            feature_columns=_input_layer_columns(feature_columns,
+                                                 embedding_lookup_summary),
+            name=layer_name)
       else:
         raise ValueError(
             'Received a feature column from TensorFlow v1, but this is a '
@@ -309,6 +468,8 @@ class _DNNModelV2(training.Model):
             'columns (accessible via tf.compat.v1.estimator.* and '
             'tf.compat.v1.feature_column.*, respectively.')
 
+    self._compute_dtype = mixed_precision.get_compute_dtype(compute_dtype)
+    layer_dtype = mixed_precision.layer_dtype(self._compute_dtype)
     self._dropout = dropout
     self._batch_norm = batch_norm
 
@@ -324,11 +485,13 @@ class _DNNModelV2(training.Model):
             units=num_hidden_units,
             activation=activation_fn,
             kernel_initializer=init_ops.glorot_uniform_initializer(),
-            name=hidden_shared_name)
+            name=hidden_shared_name,
+            dtype=layer_dtype)
         self._hidden_layer_scope_names.append(hidden_shared_name)
         self._hidden_layers.append(hidden_layer)
         if self._dropout is not None:
-          dropout_layer = keras_core.Dropout(rate=self._dropout)
+          dropout_layer = keras_core.Dropout(
+              rate=self._dropout, dtype=layer_dtype)
           self._dropout_layers.append(dropout_layer)
         if self._batch_norm:
           batch_norm_name = hidden_shared_name + '/batchnorm_%d' % layer_id
@@ -340,7 +503,8 @@ class _DNNModelV2(training.Model):
               # tf.contrib.layers.batch_norm.
               momentum=0.999,
               trainable=True,
-              name=batch_norm_name)
+              name=batch_norm_name,
+              dtype=layer_dtype)
           self._batch_norm_layers.append(batch_norm_layer)
 
     with ops.name_scope('logits') as logits_scope:
@@ -355,6 +519,7 @@ class _DNNModelV2(training.Model):
   def call(self, features, mode):
     is_training = mode == ModeKeys.TRAIN
     net = self._input_layer(features)
+    net = math_ops.cast(net, self._compute_dtype)
     for i in range(len(self._hidden_layers)):
       net = self._hidden_layers[i](net)
       if self._dropout is not None and is_training:
@@ -363,7 +528,8 @@ class _DNNModelV2(training.Model):
         net = self._batch_norm_layers[i](net, training=is_training)
       _add_hidden_layer_summary(net, self._hidden_layer_scope_names[i])
 
-    logits = self._logits_layer(net)
+    # The logits layer computes in float32, which the heads expect.
+    logits = self._logits_layer(math_ops.cast(net, dtypes.float32))
     _add_hidden_layer_summary(logits, self._logits_scope_name)
     return logits
 
@@ -405,7 +571,9 @@ def _dnn_model_fn(features,
                   input_layer_partitioner=None,
                   config=None,
                   use_tpu=False,
-                  batch_norm=False):
+                  batch_norm=False,
+                  embedding_lookup_summary=False,
+                  embedding_cache_config=None):
   """Deep Neural Net model_fn v1.
 
   Args:
@@ -429,12 +597,19 @@ def _dnn_model_fn(features,
     use_tpu: Whether to make a DNN model able to run on TPU. Will make function
       return a `_TPUEstimatorSpec` instance and disable variable partitioning.
     batch_norm: Whether to use batch normalization after each hidden layer.
+    embedding_lookup_summary: Whether to add a summary of the fraction of
+      unique ids looked up in each embedding table.
+    embedding_cache_config: An `embedding_cache.EmbeddingCacheConfig`. If set,
+      training keeps the hot rows of `embedding_column`s in a worker-local
+      cache and exports its hit rate and saved bytes as summaries. Shared
+      embedding columns are not cached. Ignored when `use_tpu` is set.
 
   Returns:
     An `EstimatorSpec` instance.
 
   Raises:
-    ValueError: If features has the wrong type.
+    ValueError: If features has the wrong type, or if `embedding_cache_config`
+      is set and none of `feature_columns` is an embedding column.
   """
 
   optimizer = optimizers.get_optimizer_instance(
@@ -444,6 +619,13 @@ def _dnn_model_fn(features,
 
   num_ps_replicas = config.num_ps_replicas if config else 0
 
+  cache_embeddings = (
+      embedding_cache_config is not None and mode == ModeKeys.TRAIN and
+      not use_tpu)
+  if cache_embeddings:
+    feature_columns = embedding_cache.cached_embedding_columns(
+        feature_columns, embedding_cache_config)
+
   partitioner = (None if use_tpu else
                  partitioned_variables.min_max_variable_partitioner(
                      max_partitions=num_ps_replicas))
@@ -460,16 +642,26 @@ def _dnn_model_fn(features,
         activation_fn=activation_fn,
         dropout=dropout,
         input_layer_partitioner=input_layer_partitioner,
-        batch_norm=batch_norm)
+        batch_norm=batch_norm,
+        embedding_lookup_summary=embedding_lookup_summary)
     logits = logit_fn(features=features, mode=mode)
 
+    if cache_embeddings:
+      return head.create_estimator_spec(
+          features=features,
+          mode=mode,
+          labels=labels,
+          train_op_fn=embedding_cache.train_op_fn_with_embedding_caches(
+              optimizer, embedding_cache.embedding_caches(feature_columns)),
+          logits=logits)
     return _get_dnn_estimator_spec(use_tpu, head, features, labels, mode,
                                    logits, optimizer)
 
 
 def _dnn_model_fn_builder_v2(units, hidden_units, feature_columns,
                              activation_fn, dropout, batch_norm,
-                             features, mode):
+                             features, mode, embedding_lookup_summary=False,
+                             compute_dtype=None):
   """Function builder for dnn logits, trainable variables and update ops.
 
   Args:
@@ -486,6 +678,11 @@ def _dnn_model_fn_builder_v2(units, hidden_units, feature_columns,
       `dict` of same.
     mode: Optional. Specifies if this training, evaluation or prediction. See
       `ModeKeys`.
+    embedding_lookup_summary: Whether to add a summary of the fraction of
+      unique ids looked up in each embedding table.
+    compute_dtype: The dtype hidden layers compute in, one of `tf.float32`,
+      `tf.bfloat16` or `tf.float16`. Variables and checkpoints stay in float32.
+      float16 training uses dynamic loss scaling. Defaults to float32.
 
   Returns:
     A `Tensor` representing the logits, or a list of `Tensor`'s representing
@@ -506,6 +703,8 @@ def _dnn_model_fn_builder_v2(units, hidden_units, feature_columns,
       activation_fn,
       dropout,
       batch_norm,
+      embedding_lookup_summary=embedding_lookup_summary,
+      compute_dtype=compute_dtype,
       name='dnn')
   logits = dnn_model(features, mode)
   trainable_variables = dnn_model.trainable_variables
@@ -525,7 +724,9 @@ def dnn_model_fn_v2(features,
                     dropout=None,
                     config=None,
                     use_tpu=False,
-                    batch_norm=False):
+                    batch_norm=False,
+                    embedding_lookup_summary=False,
+                    compute_dtype=None):
   """Deep Neural Net model_fn v2.
 
   This function is different than _dnn_model_fn_v1 in the way it handles the
@@ -552,6 +753,11 @@ def dnn_model_fn_v2(features,
     use_tpu: Whether to make a DNN model able to run on TPU. Will make function
       return a `_TPUEstimatorSpec` instance and disable variable partitioning.
     batch_norm: Whether to use batch normalization after each hidden layer.
+    embedding_lookup_summary: Whether to add a summary of the fraction of
+      unique ids looked up in each embedding table.
+    compute_dtype: The dtype hidden layers compute in, one of `tf.float32`,
+      `tf.bfloat16` or `tf.float16`. Variables and checkpoints stay in float32.
+      float16 training uses dynamic loss scaling. Defaults to float32.
 
   Returns:
     An `EstimatorSpec` instance.
@@ -570,6 +776,8 @@ def dnn_model_fn_v2(features,
       activation_fn=activation_fn,
       dropout=dropout,
       batch_norm=batch_norm,
+      embedding_lookup_summary=embedding_lookup_summary,
+      compute_dtype=compute_dtype,
       features=features,
       mode=mode)
 
@@ -579,6 +787,8 @@ def dnn_model_fn_v2(features,
   if mode == ModeKeys.TRAIN:
     optimizer = optimizers.get_optimizer_instance_v2(optimizer)
     optimizer.iterations = training_util.get_or_create_global_step()
+    optimizer = mixed_precision.scale_loss(
+        optimizer, mixed_precision.get_compute_dtype(compute_dtype))
 
   # Create EstimatorSpec.
   if use_tpu:
@@ -698,6 +908,8 @@ class DNNClassifierV2(estimator.EstimatorV2):
       warm_start_from=None,
       loss_reduction=losses_utils.ReductionV2.SUM_OVER_BATCH_SIZE,
       batch_norm=False,
+      embedding_lookup_summary=False,
+      compute_dtype=None,
   ):
     """Initializes a `DNNClassifier` instance.
 
@@ -743,6 +955,11 @@ class DNNClassifierV2(estimator.EstimatorV2):
       loss_reduction: One of `tf.losses.Reduction` except `NONE`. Describes how
         to reduce training loss over batch. Defaults to `SUM_OVER_BATCH_SIZE`.
       batch_norm: Whether to use batch normalization after each hidden layer.
+      embedding_lookup_summary: Whether to add a summary of the fraction of
+        unique ids looked up in each embedding table.
+      compute_dtype: The dtype hidden layers compute in, one of `tf.float32`,
+        `tf.bfloat16` or `tf.float16`. Variables and checkpoints stay in float32.
+        float16 training uses dynamic loss scaling. Defaults to float32.
     """
     head = head_utils.binary_or_multi_class_head(
         n_classes, weight_column=weight_column,
@@ -763,7 +980,9 @@ class DNNClassifierV2(estimator.EstimatorV2):
           activation_fn=activation_fn,
           dropout=dropout,
           config=config,
-          batch_norm=batch_norm)
+          batch_norm=batch_norm,
+          embedding_lookup_summary=embedding_lookup_summary,
+          compute_dtype=compute_dtype)
 
     super(DNNClassifierV2, self).__init__(
         model_fn=_model_fn,
@@ -792,6 +1011,8 @@ class DNNClassifier(estimator.Estimator):
       warm_start_from=None,
       loss_reduction=losses.Reduction.SUM,
       batch_norm=False,
+      embedding_lookup_summary=False,
+      embedding_cache_config=None,
   ):
     head = head_lib._binary_logistic_or_multi_class_head(  # pylint: disable=protected-access
         n_classes, weight_column, label_vocabulary, loss_reduction)
@@ -811,7 +1032,9 @@ class DNNClassifier(estimator.Estimator):
           dropout=dropout,
           input_layer_partitioner=input_layer_partitioner,
           config=config,
-          batch_norm=batch_norm)
+          batch_norm=batch_norm,
+          embedding_lookup_summary=embedding_lookup_summary,
+          embedding_cache_config=embedding_cache_config)
 
     super(DNNClassifier, self).__init__(
         model_fn=_model_fn,
@@ -921,7 +1144,9 @@ class DNNEstimatorV2(estimator.EstimatorV2):
                dropout=None,
                config=None,
                warm_start_from=None,
-               batch_norm=False):
+               batch_norm=False,
+               embedding_lookup_summary=False,
+               compute_dtype=None):
     """Initializes a `DNNEstimator` instance.
 
     Args:
@@ -950,6 +1175,11 @@ class DNNEstimatorV2(estimator.EstimatorV2):
         weights are warm-started, and it is assumed that vocabularies and Tensor
         names are unchanged.
       batch_norm: Whether to use batch normalization after each hidden layer.
+      embedding_lookup_summary: Whether to add a summary of the fraction of
+        unique ids looked up in each embedding table.
+      compute_dtype: The dtype hidden layers compute in, one of `tf.float32`,
+        `tf.bfloat16` or `tf.float16`. Variables and checkpoints stay in float32.
+        float16 training uses dynamic loss scaling. Defaults to float32.
     """
     def _model_fn(features, labels, mode, config):
       """Call the defined shared dnn_model_fn_v2."""
@@ -964,7 +1194,9 @@ class DNNEstimatorV2(estimator.EstimatorV2):
           activation_fn=activation_fn,
           dropout=dropout,
           config=config,
-          batch_norm=batch_norm)
+          batch_norm=batch_norm,
+          embedding_lookup_summary=embedding_lookup_summary,
+          compute_dtype=compute_dtype)
 
     estimator._canned_estimator_api_gauge.get_cell('Estimator').set('DNN')  # pylint: disable=protected-access
     super(DNNEstimatorV2, self).__init__(
@@ -987,7 +1219,9 @@ class DNNEstimator(estimator.Estimator):
                input_layer_partitioner=None,
                config=None,
                warm_start_from=None,
-               batch_norm=False):
+               batch_norm=False,
+               embedding_lookup_summary=False,
+               embedding_cache_config=None):
     def _model_fn(features, labels, mode, config):
       """Call the defined shared _dnn_model_fn."""
       return _dnn_model_fn(
@@ -1002,7 +1236,9 @@ class DNNEstimator(estimator.Estimator):
           dropout=dropout,
           input_layer_partitioner=input_layer_partitioner,
           config=config,
-          batch_norm=batch_norm)
+          batch_norm=batch_norm,
+          embedding_lookup_summary=embedding_lookup_summary,
+          embedding_cache_config=embedding_cache_config)
 
     estimator._canned_estimator_api_gauge.get_cell('Estimator').set('DNN')  # pylint: disable=protected-access
     super(DNNEstimator, self).__init__(
@@ -1111,6 +1347,8 @@ class DNNRegressorV2(estimator.EstimatorV2):
       warm_start_from=None,
       loss_reduction=losses_utils.ReductionV2.SUM_OVER_BATCH_SIZE,
       batch_norm=False,
+      embedding_lookup_summary=False,
+      compute_dtype=None,
   ):
     """Initializes a `DNNRegressor` instance.
 
@@ -1150,6 +1388,11 @@ class DNNRegressorV2(estimator.EstimatorV2):
       loss_reduction: One of `tf.losses.Reduction` except `NONE`. Describes how
         to reduce training loss over batch. Defaults to `SUM_OVER_BATCH_SIZE`.
       batch_norm: Whether to use batch normalization after each hidden layer.
+      embedding_lookup_summary: Whether to add a summary of the fraction of
+        unique ids looked up in each embedding table.
+      compute_dtype: The dtype hidden layers compute in, one of `tf.float32`,
+        `tf.bfloat16` or `tf.float16`. Variables and checkpoints stay in float32.
+        float16 training uses dynamic loss scaling. Defaults to float32.
     """
     head = regression_head.RegressionHead(
         label_dimension=label_dimension,
@@ -1170,7 +1413,9 @@ class DNNRegressorV2(estimator.EstimatorV2):
           activation_fn=activation_fn,
           dropout=dropout,
           config=config,
-          batch_norm=batch_norm)
+          batch_norm=batch_norm,
+          embedding_lookup_summary=embedding_lookup_summary,
+          compute_dtype=compute_dtype)
 
     super(DNNRegressorV2, self).__init__(
         model_fn=_model_fn,
@@ -1198,6 +1443,8 @@ class DNNRegressor(estimator.Estimator):
       warm_start_from=None,
       loss_reduction=losses.Reduction.SUM,
       batch_norm=False,
+      embedding_lookup_summary=False,
+      embedding_cache_config=None,
   ):
     head = head_lib._regression_head(  # pylint: disable=protected-access
         label_dimension=label_dimension,
@@ -1219,7 +1466,9 @@ class DNNRegressor(estimator.Estimator):
           dropout=dropout,
           input_layer_partitioner=input_layer_partitioner,
           config=config,
-          batch_norm=batch_norm)
+          batch_norm=batch_norm,
+          embedding_lookup_summary=embedding_lookup_summary,
+          embedding_cache_config=embedding_cache_config)
 
     super(DNNRegressor, self).__init__(
         model_fn=_model_fn,
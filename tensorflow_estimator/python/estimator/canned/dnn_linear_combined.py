@@ -22,9 +22,13 @@ import math
 
 import six
 
+from tensorflow.python.feature_column import feature_column_lib
+from tensorflow.python.framework import dtypes
 from tensorflow.python.framework import ops
 from tensorflow.python.keras.utils import losses_utils
+from tensorflow.python.ops import clip_ops
 from tensorflow.python.ops import control_flow_ops
+from tensorflow.python.ops import gradients_impl
 from tensorflow.python.ops import nn
 from tensorflow.python.ops import partitioned_variables
 from tensorflow.python.ops import state_ops
@@ -38,6 +42,7 @@ from tensorflow_estimator.python.estimator import estimator
 from tensorflow_estimator.python.estimator.canned import dnn
 from tensorflow_estimator.python.estimator.canned import head as head_lib
 from tensorflow_estimator.python.estimator.canned import linear
+from tensorflow_estimator.python.estimator.canned import mixed_precision
 from tensorflow_estimator.python.estimator.canned import optimizers
 from tensorflow_estimator.python.estimator.head import head_utils
 from tensorflow_estimator.python.estimator.head import regression_head
@@ -48,6 +53,9 @@ from tensorflow_estimator.python.estimator.mode_keys import ModeKeys
 _DNN_LEARNING_RATE = 0.001
 _LINEAR_LEARNING_RATE = 0.005
 
+# Prefix of the feature keys of the transformations shared by both models.
+_SHARED_TRANSFORMATION_PREFIX = '_shared_transformation/'
+
 
 def _check_no_sync_replicas_optimizer(optimizer):
   if isinstance(optimizer, sync_replicas_optimizer.SyncReplicasOptimizer):
@@ -92,6 +100,150 @@ def _validate_feature_columns(linear_feature_columns, dnn_feature_columns):
   return feature_columns
 
 
+class _PretransformedCategoricalColumn(feature_column_lib.CategoricalColumn):
+  """Stands in for a categorical column whose sparse tensors are precomputed.
+
+  The ids and weights of the wrapped column are read from the features
+  dictionary instead of being computed from the raw feature again. The column
+  keeps the name of the wrapped column, so variable names are unchanged.
+  """
+
+  def __init__(self, column, ids_key, weights_key=None):
+    self._column = column
+    self._ids_key = ids_key
+    self._weights_key = weights_key
+
+  @property
+  def _is_v2_column(self):
+    return True
+
+  @property
+  def name(self):
+    return self._column.name
+
+  @property
+  def parse_example_spec(self):
+    return self._column.parse_example_spec
+
+  @property
+  def num_buckets(self):
+    return self._column.num_buckets
+
+  @property
+  def parents(self):
+    return [self._column]
+
+  def transform_feature(self, transformation_cache, state_manager):
+    return transformation_cache.get(self._ids_key, state_manager)
+
+  def get_sparse_tensors(self, transformation_cache, state_manager):
+    weight_tensor = None
+    if self._weights_key is not None:
+      weight_tensor = transformation_cache.get(self._weights_key, state_manager)
+    return feature_column_lib.CategoricalColumn.IdWeightPair(
+        transformation_cache.get(self, state_manager), weight_tensor)
+
+
+def _share_categorical_transformations(
+    features, linear_feature_columns, dnn_feature_columns):
+  """Transforms the categorical columns used by both models once.
+
+  A categorical column used directly by the linear model and through an
+  embedding or indicator column by the DNN model would otherwise be transformed
+  (e.g. hashed or looked up in a vocabulary) by each model. Its sparse tensors
+  are computed once here, added to a copy of `features`, and both models are
+  given a column reading them from there.
+
+  Args:
+    features: dict of `Tensor` and `SparseTensor` objects.
+    linear_feature_columns: Feature columns of the linear model.
+    dnn_feature_columns: Feature columns of the DNN model.
+
+  Returns:
+    A tuple of the features and of the linear and DNN feature columns to use.
+  """
+  linear_feature_columns = list(linear_feature_columns)
+  dnn_feature_columns = list(dnn_feature_columns)
+  if not feature_column_lib.is_feature_column_v2(
+      linear_feature_columns + dnn_feature_columns):
+    return features, linear_feature_columns, dnn_feature_columns
+  embedded_columns = (feature_column_lib.EmbeddingColumn,
+                      feature_column_lib.IndicatorColumn)
+  linear_columns = set(linear_feature_columns)
+  shared_columns = set(
+      column.categorical_column for column in dnn_feature_columns
+      if isinstance(column, embedded_columns) and
+      column.categorical_column in linear_columns)
+  if not shared_columns:
+    return features, linear_feature_columns, dnn_feature_columns
+
+  features = dict(features)
+  transformation_cache = feature_column_lib.FeatureTransformationCache(features)
+  pretransformed_columns = {}
+  with ops.name_scope('shared_transformations'):
+    for column in sorted(shared_columns, key=lambda column: column.name):
+      id_weight_pair = column.get_sparse_tensors(transformation_cache, None)
+      ids_key = '{}{}/ids'.format(_SHARED_TRANSFORMATION_PREFIX, column.name)
+      features[ids_key] = id_weight_pair.id_tensor
+      weights_key = None
+      if id_weight_pair.weight_tensor is not None:
+        weights_key = '{}{}/weights'.format(
+            _SHARED_TRANSFORMATION_PREFIX, column.name)
+        features[weights_key] = id_weight_pair.weight_tensor
+      pretransformed_columns[column] = _PretransformedCategoricalColumn(
+          column, ids_key, weights_key)
+
+  linear_feature_columns = [
+      pretransformed_columns.get(column, column)
+      for column in linear_feature_columns]
+  dnn_feature_columns = [
+      column._replace(  # pylint: disable=protected-access
+          categorical_column=pretransformed_columns[column.categorical_column])
+      if (isinstance(column, embedded_columns) and
+          column.categorical_column in pretransformed_columns) else column
+      for column in dnn_feature_columns]
+  return features, linear_feature_columns, dnn_feature_columns
+
+
+def _clip_gradients(optimizer, gradients):
+  """Clips `gradients` like `optimizer.get_gradients` does."""
+  clipnorm = getattr(optimizer, 'clipnorm', None)
+  clipvalue = getattr(optimizer, 'clipvalue', None)
+  clipped_gradients = []
+  for gradient in gradients:
+    if gradient is not None and clipnorm is not None:
+      gradient = clip_ops.clip_by_norm(gradient, clipnorm)
+    if gradient is not None and clipvalue is not None:
+      gradient = clip_ops.clip_by_value(gradient, -clipvalue, clipvalue)
+    clipped_gradients.append(gradient)
+  return clipped_gradients
+
+
+def _grouped_updates_v2(loss, optimizers_and_variables):
+  """Returns the updates of several Keras optimizers sharing one backprop.
+
+  Args:
+    loss: A scalar `Tensor` to minimize.
+    optimizers_and_variables: List of `(optimizer, variables)` pairs, where each
+      optimizer updates its own variables.
+
+  Returns:
+    A list of update ops.
+  """
+  all_variables = []
+  for _, variables in optimizers_and_variables:
+    all_variables.extend(variables)
+  all_gradients = gradients_impl.gradients(loss, all_variables)
+  updates = []
+  start = 0
+  for optimizer, variables in optimizers_and_variables:
+    gradients = _clip_gradients(
+        optimizer, all_gradients[start:start + len(variables)])
+    start += len(variables)
+    updates.append(optimizer.apply_gradients(zip(gradients, variables)))
+  return updates
+
+
 def _dnn_linear_combined_model_fn_v2(
     features,
     labels,
@@ -107,7 +259,9 @@ def _dnn_linear_combined_model_fn_v2(
     config=None,
     batch_norm=False,
     linear_sparse_combiner='sum',
-    loss_reduction=losses_utils.ReductionV2.SUM_OVER_BATCH_SIZE):
+    loss_reduction=losses_utils.ReductionV2.SUM_OVER_BATCH_SIZE,
+    share_input_transformations=False,
+    dnn_compute_dtype=None):
   """Deep Neural Net and Linear combined model_fn.
 
   Args:
@@ -139,6 +293,11 @@ def _dnn_linear_combined_model_fn_v2(
       "sum".
     loss_reduction: One of `tf.keras.losses.Reduction` except `NONE`. Describes
       how to reduce training loss over batch. Defaults to `SUM_OVER_BATCH_SIZE`.
+    share_input_transformations: Whether to transform the categorical columns
+      used by both models once, and to compute the gradients of both models
+      together.
+    dnn_compute_dtype: The dtype the DNN hidden layers compute in, one of
+      `tf.float32`, `tf.bfloat16` or `tf.float16`. Defaults to float32.
 
   Returns:
     An `EstimatorSpec` instance.
@@ -146,7 +305,8 @@ def _dnn_linear_combined_model_fn_v2(
   Raises:
     ValueError: If both `linear_feature_columns` and `dnn_features_columns`
       are empty at the same time, or `input_layer_partitioner` is missing,
-      or features has the wrong type.
+      or features has the wrong type, or float16 is used with
+      `share_input_transformations`.
   """
   if not isinstance(features, dict):
     raise ValueError('features should be a dictionary of `Tensor`s. '
@@ -154,9 +314,23 @@ def _dnn_linear_combined_model_fn_v2(
   if not linear_feature_columns and not dnn_feature_columns:
     raise ValueError(
         'Either linear_feature_columns or dnn_feature_columns must be defined.')
+  dnn_compute_dtype = mixed_precision.get_compute_dtype(dnn_compute_dtype)
+  # Gradients shared by both models are computed without loss scaling.
+  if share_input_transformations and dnn_compute_dtype == dtypes.float16:
+    raise ValueError(
+        'share_input_transformations does not support a float16 '
+        'dnn_compute_dtype.')
 
   del config
 
+  # The head still gets the original features.
+  model_features = features
+  if (share_input_transformations and linear_feature_columns and
+      dnn_feature_columns):
+    model_features, linear_feature_columns, dnn_feature_columns = (
+        _share_categorical_transformations(
+            features, linear_feature_columns, dnn_feature_columns))
+
   # Build DNN Logits.
   if not dnn_feature_columns:
     dnn_logits = None
@@ -178,8 +352,9 @@ def _dnn_linear_combined_model_fn_v2(
             activation_fn=dnn_activation_fn,
             dropout=dnn_dropout,
             batch_norm=batch_norm,
-            features=features,
-            mode=mode))
+            features=model_features,
+            mode=mode,
+            compute_dtype=dnn_compute_dtype))
 
   if not linear_feature_columns:
     linear_logits = None
@@ -195,7 +370,7 @@ def _dnn_linear_combined_model_fn_v2(
             units=head.logits_dimension,
             feature_columns=linear_feature_columns,
             sparse_combiner=linear_sparse_combiner,
-            features=features))
+            features=model_features))
     _add_layer_summary(linear_logits, 'linear')
 
   # Combine logits and build full model.
@@ -213,6 +388,15 @@ def _dnn_linear_combined_model_fn_v2(
     if loss_reduction == losses_utils.ReductionV2.SUM_OVER_BATCH_SIZE:
       loss = losses_utils.scale_loss_for_distribution(loss)
 
+    if (share_input_transformations and dnn_logits is not None and
+        linear_logits is not None):
+      train_ops.extend(_grouped_updates_v2(
+          loss, [(dnn_optimizer, dnn_trainable_variables),
+                 (linear_optimizer, linear_trainable_variables)]))
+      if dnn_update_ops is not None:
+        train_ops.extend(dnn_update_ops)
+      return control_flow_ops.group(*train_ops)
+
     if dnn_logits is not None:
       train_ops.extend(
           dnn_optimizer.get_updates(
@@ -234,6 +418,8 @@ def _dnn_linear_combined_model_fn_v2(
   if mode == ModeKeys.TRAIN:
     if dnn_logits is not None:
       dnn_optimizer.iterations = training_util.get_or_create_global_step()
+      dnn_optimizer = mixed_precision.scale_loss(
+          dnn_optimizer, dnn_compute_dtype)
     else:
       linear_optimizer.iterations = training_util.get_or_create_global_step()
 
@@ -259,7 +445,8 @@ def _dnn_linear_combined_model_fn(features,
                                   input_layer_partitioner=None,
                                   config=None,
                                   batch_norm=False,
-                                  linear_sparse_combiner='sum'):
+                                  linear_sparse_combiner='sum',
+                                  share_input_transformations=False):
   """Deep Neural Net and Linear combined model_fn.
 
   Args:
@@ -290,6 +477,9 @@ def _dnn_linear_combined_model_fn(features,
     linear_sparse_combiner: A string specifying how to reduce the linear model
       if a categorical column is multivalent.  One of "mean", "sqrtn", and
       "sum".
+    share_input_transformations: Whether to transform the categorical columns
+      used by both models once, and to compute the gradients of both models
+      together.
   Returns:
     An `EstimatorSpec` instance.
 
@@ -305,6 +495,14 @@ def _dnn_linear_combined_model_fn(features,
     raise ValueError(
         'Either linear_feature_columns or dnn_feature_columns must be defined.')
 
+  # The head still gets the original features.
+  model_features = features
+  if (share_input_transformations and linear_feature_columns and
+      dnn_feature_columns):
+    model_features, linear_feature_columns, dnn_feature_columns = (
+        _share_categorical_transformations(
+            features, linear_feature_columns, dnn_feature_columns))
+
   num_ps_replicas = config.num_ps_replicas if config else 0
   input_layer_partitioner = input_layer_partitioner or (
       partitioned_variables.min_max_variable_partitioner(
@@ -340,7 +538,7 @@ def _dnn_linear_combined_model_fn(features,
           dropout=dnn_dropout,
           batch_norm=batch_norm,
           input_layer_partitioner=input_layer_partitioner)
-      dnn_logits = dnn_logit_fn(features=features, mode=mode)
+      dnn_logits = dnn_logit_fn(features=model_features, mode=mode)
 
   linear_parent_scope = 'linear'
 
@@ -360,7 +558,7 @@ def _dnn_linear_combined_model_fn(features,
           units=head.logits_dimension,
           feature_columns=linear_feature_columns,
           sparse_combiner=linear_sparse_combiner)
-      linear_logits = logit_fn(features=features)
+      linear_logits = logit_fn(features=model_features)
       _add_layer_summary(linear_logits, scope.name)
 
   # Combine logits and build full model.
@@ -375,14 +573,29 @@ def _dnn_linear_combined_model_fn(features,
     """Returns the op to optimize the loss."""
     train_ops = []
     global_step = training_util.get_global_step()
-    if dnn_logits is not None:
+    if (share_input_transformations and dnn_logits is not None and
+        linear_logits is not None):
+      # Backpropagate once through both models, and let each optimizer apply
+      # the gradients of its own variables.
+      dnn_variables = ops.get_collection(
+          ops.GraphKeys.TRAINABLE_VARIABLES, scope=dnn_absolute_scope)
+      linear_variables = ops.get_collection(
+          ops.GraphKeys.TRAINABLE_VARIABLES, scope=linear_absolute_scope)
+      gradients = gradients_impl.gradients(
+          loss, dnn_variables + linear_variables)
+      train_ops.append(dnn_optimizer.apply_gradients(
+          list(zip(gradients[:len(dnn_variables)], dnn_variables))))
+      train_ops.append(linear_optimizer.apply_gradients(
+          list(zip(gradients[len(dnn_variables):], linear_variables))))
+    elif dnn_logits is not None:
       train_ops.append(
           dnn_optimizer.minimize(
               loss,
               var_list=ops.get_collection(
                   ops.GraphKeys.TRAINABLE_VARIABLES,
                   scope=dnn_absolute_scope)))
-    if linear_logits is not None:
+    if linear_logits is not None and not (
+        share_input_transformations and dnn_logits is not None):
       train_ops.append(
           linear_optimizer.minimize(
               loss,
@@ -503,7 +716,9 @@ class DNNLinearCombinedClassifierV2(estimator.EstimatorV2):
                warm_start_from=None,
                loss_reduction=losses_utils.ReductionV2.SUM_OVER_BATCH_SIZE,
                batch_norm=False,
-               linear_sparse_combiner='sum'):
+               linear_sparse_combiner='sum',
+               share_input_transformations=False,
+               dnn_compute_dtype=None):
     """Initializes a DNNLinearCombinedClassifier instance.
 
     Args:
@@ -560,6 +775,16 @@ class DNNLinearCombinedClassifierV2(estimator.EstimatorV2):
         "sum" -- these are effectively different ways to do example-level
         normalization, which can be useful for bag-of-words features.  For more
         details, see `tf.feature_column.linear_model`.
+      share_input_transformations: If `True`, the categorical columns used both
+        by the linear model and, through an embedding or indicator column, by
+        the DNN model are transformed once and shared by both models. The
+        gradients of both models are also computed once, before each optimizer
+        applies its own update. Sharing transformations requires `FeatureColumn`
+        objects from `tf.feature_column` v2.
+      dnn_compute_dtype: The dtype the DNN hidden layers compute in, one of
+        `tf.float32`, `tf.bfloat16` or `tf.float16`. Variables and checkpoints
+        stay in float32, and float16 training of the DNN uses dynamic loss
+        scaling. Defaults to float32.
 
     Raises:
       ValueError: If both linear_feature_columns and dnn_features_columns are
@@ -593,7 +818,9 @@ class DNNLinearCombinedClassifierV2(estimator.EstimatorV2):
           config=config,
           batch_norm=batch_norm,
           linear_sparse_combiner=linear_sparse_combiner,
-          loss_reduction=loss_reduction)
+          loss_reduction=loss_reduction,
+          share_input_transformations=share_input_transformations,
+          dnn_compute_dtype=dnn_compute_dtype)
 
     super(DNNLinearCombinedClassifierV2, self).__init__(
         model_fn=_model_fn,
@@ -624,7 +851,8 @@ class DNNLinearCombinedClassifier(estimator.Estimator):
                warm_start_from=None,
                loss_reduction=losses.Reduction.SUM,
                batch_norm=False,
-               linear_sparse_combiner='sum'):
+               linear_sparse_combiner='sum',
+               share_input_transformations=False):
     self._feature_columns = _validate_feature_columns(
         linear_feature_columns=linear_feature_columns,
         dnn_feature_columns=dnn_feature_columns)
@@ -651,7 +879,8 @@ class DNNLinearCombinedClassifier(estimator.Estimator):
           input_layer_partitioner=input_layer_partitioner,
           config=config,
           batch_norm=batch_norm,
-          linear_sparse_combiner=linear_sparse_combiner)
+          linear_sparse_combiner=linear_sparse_combiner,
+          share_input_transformations=share_input_transformations)
 
     super(DNNLinearCombinedClassifier, self).__init__(
         model_fn=_model_fn,
@@ -670,7 +899,8 @@ def _init_dnn_linear_combined_estimator(
     dnn_activation_fn,
     dnn_dropout,
     input_layer_partitioner,
-    linear_sparse_combiner):
+    linear_sparse_combiner,
+    share_input_transformations=False):
   """Helper function for the initialization of DNNLinearCombinedEstimator."""
   linear_feature_columns = linear_feature_columns or []
   dnn_feature_columns = dnn_feature_columns or []
@@ -696,7 +926,8 @@ def _init_dnn_linear_combined_estimator(
         dnn_dropout=dnn_dropout,
         input_layer_partitioner=input_layer_partitioner,
         config=config,
-        linear_sparse_combiner=linear_sparse_combiner)
+        linear_sparse_combiner=linear_sparse_combiner,
+        share_input_transformations=share_input_transformations)
   return feature_columns, _model_fn
 
 
@@ -795,7 +1026,9 @@ class DNNLinearCombinedEstimatorV2(estimator.EstimatorV2):
                dnn_activation_fn=nn.relu,
                dnn_dropout=None,
                config=None,
-               linear_sparse_combiner='sum'):
+               linear_sparse_combiner='sum',
+               share_input_transformations=False,
+               dnn_compute_dtype=None):
     """Initializes a DNNLinearCombinedEstimator instance.
 
     Args:
@@ -830,6 +1063,16 @@ class DNNLinearCombinedEstimatorV2(estimator.EstimatorV2):
         "sum" -- these are effectively different ways to do example-level
         normalization, which can be useful for bag-of-words features.  For more
         details, see `tf.feature_column.linear_model`.
+      share_input_transformations: If `True`, the categorical columns used both
+        by the linear model and, through an embedding or indicator column, by
+        the DNN model are transformed once and shared by both models. The
+        gradients of both models are also computed once, before each optimizer
+        applies its own update. Sharing transformations requires `FeatureColumn`
+        objects from `tf.feature_column` v2.
+      dnn_compute_dtype: The dtype the DNN hidden layers compute in, one of
+        `tf.float32`, `tf.bfloat16` or `tf.float16`. Variables and checkpoints
+        stay in float32, and float16 training of the DNN uses dynamic loss
+        scaling. Defaults to float32.
 
     Raises:
       ValueError: If both linear_feature_columns and dnn_features_columns are
@@ -856,7 +1099,9 @@ class DNNLinearCombinedEstimatorV2(estimator.EstimatorV2):
           dnn_activation_fn=dnn_activation_fn,
           dnn_dropout=dnn_dropout,
           config=config,
-          linear_sparse_combiner=linear_sparse_combiner)
+          linear_sparse_combiner=linear_sparse_combiner,
+          share_input_transformations=share_input_transformations,
+          dnn_compute_dtype=dnn_compute_dtype)
 
     super(DNNLinearCombinedEstimatorV2, self).__init__(
         model_fn=_model_fn,
@@ -880,7 +1125,8 @@ class DNNLinearCombinedEstimator(estimator.Estimator):
                dnn_dropout=None,
                input_layer_partitioner=None,
                config=None,
-               linear_sparse_combiner='sum'):
+               linear_sparse_combiner='sum',
+               share_input_transformations=False):
     self._feature_columns = _validate_feature_columns(
         linear_feature_columns=linear_feature_columns,
         dnn_feature_columns=dnn_feature_columns)
@@ -903,7 +1149,8 @@ class DNNLinearCombinedEstimator(estimator.Estimator):
           dnn_dropout=dnn_dropout,
           input_layer_partitioner=input_layer_partitioner,
           config=config,
-          linear_sparse_combiner=linear_sparse_combiner)
+          linear_sparse_combiner=linear_sparse_combiner,
+          share_input_transformations=share_input_transformations)
 
     super(DNNLinearCombinedEstimator, self).__init__(
         model_fn=_model_fn,
@@ -1011,7 +1258,9 @@ class DNNLinearCombinedRegressorV2(estimator.EstimatorV2):
                warm_start_from=None,
                loss_reduction=losses_utils.ReductionV2.SUM_OVER_BATCH_SIZE,
                batch_norm=False,
-               linear_sparse_combiner='sum'):
+               linear_sparse_combiner='sum',
+               share_input_transformations=False,
+               dnn_compute_dtype=None):
     """Initializes a DNNLinearCombinedRegressor instance.
 
     Args:
@@ -1062,6 +1311,16 @@ class DNNLinearCombinedRegressorV2(estimator.EstimatorV2):
         "sum" -- these are effectively different ways to do example-level
         normalization, which can be useful for bag-of-words features.  For more
         details, see `tf.feature_column.linear_model`.
+      share_input_transformations: If `True`, the categorical columns used both
+        by the linear model and, through an embedding or indicator column, by
+        the DNN model are transformed once and shared by both models. The
+        gradients of both models are also computed once, before each optimizer
+        applies its own update. Sharing transformations requires `FeatureColumn`
+        objects from `tf.feature_column` v2.
+      dnn_compute_dtype: The dtype the DNN hidden layers compute in, one of
+        `tf.float32`, `tf.bfloat16` or `tf.float16`. Variables and checkpoints
+        stay in float32, and float16 training of the DNN uses dynamic loss
+        scaling. Defaults to float32.
 
     Raises:
       ValueError: If both linear_feature_columns and dnn_features_columns are
@@ -1094,7 +1353,9 @@ class DNNLinearCombinedRegressorV2(estimator.EstimatorV2):
           dnn_dropout=dnn_dropout,
           config=config,
           batch_norm=batch_norm,
-          linear_sparse_combiner=linear_sparse_combiner)
+          linear_sparse_combiner=linear_sparse_combiner,
+          share_input_transformations=share_input_transformations,
+          dnn_compute_dtype=dnn_compute_dtype)
 
     super(DNNLinearCombinedRegressorV2, self).__init__(
         model_fn=_model_fn,
@@ -1124,7 +1385,8 @@ class DNNLinearCombinedRegressor(estimator.Estimator):
                warm_start_from=None,
                loss_reduction=losses.Reduction.SUM,
                batch_norm=False,
-               linear_sparse_combiner='sum'):
+               linear_sparse_combiner='sum',
+               share_input_transformations=False):
     self._feature_columns = _validate_feature_columns(
         linear_feature_columns=linear_feature_columns,
         dnn_feature_columns=dnn_feature_columns)
@@ -1153,7 +1415,8 @@ class DNNLinearCombinedRegressor(estimator.Estimator):
           input_layer_partitioner=input_layer_partitioner,
           config=config,
           batch_norm=batch_norm,
-          linear_sparse_combiner=linear_sparse_combiner)
+          linear_sparse_combiner=linear_sparse_combiner,
+          share_input_transformations=share_input_transformations)
 
     super(DNNLinearCombinedRegressor, self).__init__(
         model_fn=_model_fn,
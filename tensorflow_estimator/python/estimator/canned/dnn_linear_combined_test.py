@@ -29,6 +29,7 @@ from tensorflow.core.example import example_pb2
 from tensorflow.core.example import feature_pb2
 from tensorflow.python.feature_column import feature_column
 from tensorflow.python.feature_column import feature_column_v2
+from tensorflow.python.framework import constant_op
 from tensorflow.python.framework import dtypes
 from tensorflow.python.framework import ops
 from tensorflow.python.keras.optimizer_v2 import gradient_descent as gradient_descent_v2
@@ -45,8 +46,10 @@ from tensorflow_estimator.python.estimator.canned import dnn_testing_utils
 from tensorflow_estimator.python.estimator.canned import linear_testing_utils
 from tensorflow_estimator.python.estimator.canned import prediction_keys
 from tensorflow_estimator.python.estimator.export import export
+from tensorflow_estimator.python.estimator.head import regression_head
 from tensorflow_estimator.python.estimator.inputs import numpy_io
 from tensorflow_estimator.python.estimator.inputs import pandas_io
+from tensorflow_estimator.python.estimator.mode_keys import ModeKeys
 
 
 try:
@@ -775,6 +778,59 @@ class DNNLinearCombinedTests(test.TestCase):
     # verifies train_op fires dnn optmizer
     self.assertEqual(num_steps, est.get_variable_value(dnn_opt.iterations.name))
 
+  def test_train_op_with_shared_input_transformations(self, fc_impl):
+    dnn_opt = gradient_descent_v2.SGD(1.)
+    linear_opt = gradient_descent_v2.SGD(1.)
+    tokens_column = fc_impl.categorical_column_with_hash_bucket(
+        'tokens', hash_bucket_size=10)
+    input_fn = numpy_io.numpy_input_fn(
+        x={'tokens': np.array([['a'], ['b']])},
+        y=np.array([[0.], [1.]]),
+        batch_size=1,
+        shuffle=False)
+    est = dnn_linear_combined.DNNLinearCombinedClassifierV2(
+        linear_feature_columns=[tokens_column],
+        linear_optimizer=linear_opt,
+        dnn_hidden_units=(2, 2),
+        dnn_feature_columns=[
+            fc_impl.embedding_column(tokens_column, dimension=2)],
+        dnn_optimizer=dnn_opt,
+        model_dir=self._model_dir,
+        share_input_transformations=True)
+    num_steps = 1
+    est.train(input_fn, steps=num_steps)
+    self.assertEqual(num_steps, est.get_variable_value(
+        linear_opt.iterations.name))
+    self.assertEqual(num_steps, est.get_variable_value(dnn_opt.iterations.name))
+    # Variable names do not depend on the shared transformations.
+    self.assertIn('linear/linear_model/tokens/weights',
+                  est.get_variable_names())
+    self.assertIn(
+        'dnn/input_from_feature_columns/input_layer/tokens_embedding/'
+        'embedding_weights', est.get_variable_names())
+
+  def test_shared_input_transformations_hash_once(self, fc_impl):
+    tokens_column = fc_impl.categorical_column_with_hash_bucket(
+        'tokens', hash_bucket_size=10)
+
+    def _num_hash_ops(share_input_transformations):
+      with ops.Graph().as_default() as g:
+        dnn_linear_combined._dnn_linear_combined_model_fn_v2(
+            features={'tokens': constant_op.constant([['a'], ['b']])},
+            labels=None,
+            mode=ModeKeys.PREDICT,
+            head=regression_head.RegressionHead(),
+            linear_feature_columns=[tokens_column],
+            dnn_feature_columns=[
+                fc_impl.embedding_column(tokens_column, dimension=2)],
+            dnn_hidden_units=[2],
+            share_input_transformations=share_input_transformations)
+        return [op.type for op in g.get_operations()].count(
+            'StringToHashBucketFast')
+
+    self.assertEqual(2, _num_hash_ops(share_input_transformations=False))
+    self.assertEqual(1, _num_hash_ops(share_input_transformations=True))
+
   def test_dnn_and_linear_logits_are_added(self, fc_impl):
     with ops.Graph().as_default():
       variables_lib.Variable([[1.0]], name='linear/linear_model/x/weights')
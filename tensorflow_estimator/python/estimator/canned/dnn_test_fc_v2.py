@@ -27,13 +27,18 @@ import six
 
 from tensorflow.core.example import example_pb2
 from tensorflow.core.example import feature_pb2
+from tensorflow.core.framework import summary_pb2
+from tensorflow.python.feature_column import dense_features_v2
 from tensorflow.python.feature_column import feature_column_v2
 from tensorflow.python.framework import dtypes
 from tensorflow.python.framework import ops
+from tensorflow.python.framework import sparse_tensor
 from tensorflow.python.ops import data_flow_ops
+from tensorflow.python.ops import nn
 from tensorflow.python.ops import parsing_ops
 from tensorflow.python.platform import gfile
 from tensorflow.python.platform import test
+from tensorflow.python.summary import summary as summary_lib
 from tensorflow.python.summary.writer import writer_cache
 from tensorflow.python.training import input as input_lib
 from tensorflow.python.training import queue_runner
@@ -43,6 +48,7 @@ from tensorflow_estimator.python.estimator.canned import prediction_keys
 from tensorflow_estimator.python.estimator.export import export
 from tensorflow_estimator.python.estimator.inputs import numpy_io
 from tensorflow_estimator.python.estimator.inputs import pandas_io
+from tensorflow_estimator.python.estimator.mode_keys import ModeKeys
 
 try:
   # pylint: disable=g-import-not-at-top
@@ -489,5 +495,88 @@ class DNNClassifierIntegrationTest(test.TestCase):
         batch_size=batch_size)
 
 
+class DNNEmbeddingLookupSummaryTest(test.TestCase):
+
+  def test_fraction_of_unique_ids(self):
+    with ops.Graph().as_default():
+      features = {
+          'query': sparse_tensor.SparseTensor(
+              indices=[[0, 0], [0, 1], [1, 0]], values=[1, 1, 2],
+              dense_shape=[2, 2]),
+          'title': sparse_tensor.SparseTensor(
+              indices=[[0, 0], [1, 0]], values=[2, 3], dense_shape=[2, 1]),
+          'tags': sparse_tensor.SparseTensor(
+              indices=[[0, 0], [1, 0]], values=[4, 4], dense_shape=[2, 1]),
+      }
+      query, title, tags = [
+          feature_column_v2.categorical_column_with_identity(key, 5)
+          for key in ('query', 'title', 'tags')]
+      feature_columns = feature_column_v2.shared_embedding_columns_v2(
+          [query, title], dimension=2) + [
+              feature_column_v2.embedding_column(tags, dimension=2)]
+      dnn._dnn_model_fn_builder_v2(  # pylint: disable=protected-access
+          units=1,
+          hidden_units=(2,),
+          feature_columns=feature_columns,
+          activation_fn=nn.relu,
+          dropout=None,
+          batch_norm=False,
+          features=features,
+          mode=ModeKeys.TRAIN,
+          embedding_lookup_summary=True)
+      with self.cached_session() as sess:
+        summary = summary_pb2.Summary()
+        summary.ParseFromString(sess.run(summary_lib.merge_all()))
+      fractions = {
+          value.tag.split('/')[-2]: value.simple_value
+          for value in summary.value
+          if value.tag.endswith('fraction_of_unique_ids')}
+      # The shared table sees ids [1, 1, 2, 2, 3].
+      self.assertAllClose({
+          'query_title_shared_embedding': 3. / 5.,
+          'tags_embedding': 1. / 2.,
+      }, fractions)
+
+  def test_reuses_input_layer_transformations(self):
+    with ops.Graph().as_default():
+      features = {
+          'query': sparse_tensor.SparseTensor(
+              indices=[[0, 0], [1, 0]], values=['a', 'b'], dense_shape=[2, 1]),
+      }
+      query = feature_column_v2.categorical_column_with_hash_bucket('query', 5)
+      dnn._dnn_model_fn_builder_v2(  # pylint: disable=protected-access
+          units=1,
+          hidden_units=(2,),
+          feature_columns=[
+              feature_column_v2.embedding_column(query, dimension=2)],
+          activation_fn=nn.relu,
+          dropout=None,
+          batch_norm=False,
+          features=features,
+          mode=ModeKeys.TRAIN,
+          embedding_lookup_summary=True)
+      hash_ops = [
+          op for op in ops.get_default_graph().get_operations()
+          if op.type == 'StringToHashBucketFast']
+      self.assertEqual(1, len(hash_ops))
+
+  def test_input_layer_config_round_trip(self):
+    query = feature_column_v2.categorical_column_with_identity('query', 5)
+    feature_columns = dnn._input_layer_columns(  # pylint: disable=protected-access
+        [feature_column_v2.embedding_column(query, dimension=2)],
+        embedding_lookup_summary=True)
+    input_layer = dense_features_v2.DenseFeatures(feature_columns)
+    config = input_layer.get_config()
+    new_input_layer = dense_features_v2.DenseFeatures.from_config(
+        config,
+        custom_objects={
+            '_EmbeddingLookupSummaryColumn':
+                dnn._EmbeddingLookupSummaryColumn  # pylint: disable=protected-access
+        })
+    self.assertEqual(
+        sorted(column.name for column in feature_columns),
+        sorted(column.name for column in new_input_layer._feature_columns))  # pylint: disable=protected-access
+
+
 if __name__ == '__main__':
   test.main()
@@ -0,0 +1,484 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Worker-local cache of hot embedding rows for canned estimators.
+
+Embedding variables of canned estimators usually live on parameter servers,
+partitioned by `input_layer_partitioner`, and every training step fetches the
+rows it looks up. With skewed id distributions most of those rows are the same
+few hot rows, step after step. An `EmbeddingCacheConfig` keeps the most
+frequently looked up rows in a local variable colocated with the input ids:
+
+* Lookups of cached ids read the local copy; only the remaining ids are
+  gathered from the parameter servers.
+* Gradients of cached rows are written back to the partitioned embedding
+  variable, so the optimizer and its slots only ever see the original variable.
+* Once `max_staleness_steps` global steps have passed since the last refresh,
+  the cache is refilled with the current values of the most frequently looked
+  up ids, so cached rows lag the parameter servers by at most that many steps.
+  The steps are counted from the global step rather than from its multiples,
+  since with asynchronous workers the global step also advances with the
+  updates of the other workers.
+
+Frequencies are tracked with decaying counts for the cached ids and a bounded
+buffer of heavy-hitter candidates for the other ids, so memory stays
+proportional to the cache size.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+from tensorflow.python.feature_column import feature_column
+from tensorflow.python.feature_column import feature_column_v2
+from tensorflow.python.framework import constant_op
+from tensorflow.python.framework import dtypes
+from tensorflow.python.framework import ops
+from tensorflow.python.framework import sparse_tensor
+from tensorflow.python.ops import array_ops
+from tensorflow.python.ops import control_flow_ops
+from tensorflow.python.ops import data_flow_ops
+from tensorflow.python.ops import embedding_ops
+from tensorflow.python.ops import math_ops
+from tensorflow.python.ops import nn
+from tensorflow.python.ops import sparse_ops
+from tensorflow.python.ops import state_ops
+from tensorflow.python.ops import variable_scope
+from tensorflow.python.ops import variables
+from tensorflow.python.platform import tf_logging as logging
+from tensorflow.python.summary import summary
+from tensorflow.python.training import checkpoint_utils
+from tensorflow.python.training import training_util
+
+# Id of empty cache and candidate slots. Sorts after every valid id.
+_EMPTY_ID = dtypes.int64.max
+# Decay of the counts of cached ids at every refresh, so that ids which are no
+# longer hot eventually leave the cache.
+_COUNT_DECAY = 0.5
+
+
+class EmbeddingCacheConfig(
+    collections.namedtuple('EmbeddingCacheConfig',
+                           ['size', 'max_staleness_steps'])):
+  """Configures a worker-local cache of hot embedding rows.
+
+  Attributes:
+    size: Number of rows cached for each embedding column.
+    max_staleness_steps: Number of global steps after which the cached rows
+      are refreshed from the embedding variable.
+  """
+
+  def __new__(cls, size, max_staleness_steps=100):
+    if size < 1:
+      raise ValueError('size must be positive. Given: {}'.format(size))
+    if max_staleness_steps < 1:
+      raise ValueError('max_staleness_steps must be positive. Given: {}'.format(
+          max_staleness_steps))
+    return super(EmbeddingCacheConfig, cls).__new__(cls, size,
+                                                    max_staleness_steps)
+
+
+def cached_embedding_columns(feature_columns, config):
+  """Returns `feature_columns` with embedding columns reading through a cache.
+
+  Args:
+    feature_columns: Iterable of feature columns.
+    config: An `EmbeddingCacheConfig`.
+
+  Returns:
+    A tuple of feature columns. Embedding columns, created with either
+    `tf.feature_column.embedding_column` or its v1 counterpart, are replaced by
+    columns with the same name and variables which look up hot rows in a cache.
+    Other columns, including shared embedding columns, are returned unchanged.
+
+  Raises:
+    ValueError: If none of `feature_columns` is an embedding column.
+  """
+  feature_columns = list(feature_columns)
+  cached_columns = []
+  for column in feature_columns:
+    # Exact type checks, so that subclasses with their own lookup are kept.
+    if type(column) is feature_column_v2.EmbeddingColumn:  # pylint: disable=unidiomatic-typecheck
+      column = _CachedEmbeddingColumn(*column, cache_config=config)
+    elif type(column) is feature_column._EmbeddingColumn:  # pylint: disable=protected-access,unidiomatic-typecheck
+      column = _CachedEmbeddingColumnV1(*column, cache_config=config)
+    elif isinstance(column, (feature_column_v2.SharedEmbeddingColumn,
+                             feature_column._SharedEmbeddingColumn)):  # pylint: disable=protected-access
+      logging.warning(
+          'Shared embedding column %s is not cached by '
+          'embedding_cache_config.', column.name)
+    cached_columns.append(column)
+  if not any(isinstance(column, _CACHED_COLUMN_TYPES)
+             for column in cached_columns):
+    raise ValueError(
+        'embedding_cache_config is set, but none of the feature_columns is an '
+        'embedding_column which can be cached. Given: {}'.format(
+            feature_columns))
+  return tuple(cached_columns)
+
+
+def embedding_caches(feature_columns):
+  """Returns the caches created by the lookups of `feature_columns`."""
+  return [
+      column.cache for column in feature_columns
+      if isinstance(column, _CACHED_COLUMN_TYPES) and column.cache is not None
+  ]
+
+
+def train_op_fn_with_embedding_caches(optimizer, caches):
+  """Returns a `train_op_fn` applying gradients of cached rows.
+
+  The gradients of cached rows are moved to the rows of the embedding variables
+  they were copied from, and the caches are maintained after the update.
+
+  Args:
+    optimizer: A `tf.compat.v1.train.Optimizer` instance.
+    caches: A list of `_EmbeddingCache`s returned by `embedding_caches`.
+
+  Returns:
+    A function taking a scalar loss `Tensor` and returning the train op.
+  """
+
+  def _train_op_fn(loss):
+    """Returns the op to optimize the loss."""
+    var_list = (
+        variables.trainable_variables() +
+        ops.get_collection(ops.GraphKeys.TRAINABLE_RESOURCE_VARIABLES))
+    var_list += [cache.rows for cache in caches]
+    grads_and_vars = optimizer.compute_gradients(loss, var_list=var_list)
+    for cache in caches:
+      grads_and_vars = cache.write_back_gradients(grads_and_vars)
+    train_op = optimizer.apply_gradients(
+        grads_and_vars, global_step=training_util.get_global_step())
+    with ops.control_dependencies([train_op]):
+      return control_flow_ops.group(*[cache.update_op() for cache in caches])
+
+  return _train_op_fn
+
+
+class _CachedEmbeddingColumn(feature_column_v2.EmbeddingColumn):
+  """An `EmbeddingColumn` looking up hot rows in an `_EmbeddingCache`."""
+
+  def __new__(cls, *args, **kwargs):
+    cache_config = kwargs.pop('cache_config')
+    column = super(_CachedEmbeddingColumn, cls).__new__(cls, *args, **kwargs)
+    column.cache_config = cache_config
+    column.cache = None
+    return column
+
+  def _get_dense_tensor_internal_helper(self, sparse_tensors,
+                                        embedding_weights):
+    return _cached_lookup(self, sparse_tensors, embedding_weights)
+
+
+class _CachedEmbeddingColumnV1(feature_column._EmbeddingColumn):  # pylint: disable=protected-access
+  """An `_EmbeddingColumn` looking up hot rows in an `_EmbeddingCache`."""
+
+  def __new__(cls, *args, **kwargs):
+    cache_config = kwargs.pop('cache_config')
+    column = super(_CachedEmbeddingColumnV1, cls).__new__(cls, *args, **kwargs)
+    column.cache_config = cache_config
+    column.cache = None
+    return column
+
+  def _get_dense_tensor_internal(self,
+                                 inputs,
+                                 weight_collections=None,
+                                 trainable=None):
+    sparse_tensors = self.categorical_column._get_sparse_tensors(  # pylint: disable=protected-access
+        inputs, weight_collections=weight_collections, trainable=trainable)
+    embedding_weights = self.layer_creator(
+        weight_collections=weight_collections,
+        scope=variable_scope.get_variable_scope())
+    return _cached_lookup(self, sparse_tensors, embedding_weights)
+
+
+def _cached_lookup(column, sparse_tensors, embedding_weights):
+  """Looks up `sparse_tensors` of `column` through a new `_EmbeddingCache`."""
+  if column.ckpt_to_load_from is not None:
+    to_restore = embedding_weights
+    if isinstance(to_restore, variables.PartitionedVariable):
+      to_restore = to_restore._get_variable_list()  # pylint: disable=protected-access
+    checkpoint_utils.init_from_checkpoint(column.ckpt_to_load_from, {
+        column.tensor_name_in_ckpt: to_restore
+    })
+  column.cache = _EmbeddingCache(column.name, embedding_weights,
+                                 column.dimension, column.cache_config,
+                                 sparse_tensors.id_tensor.values.op)
+  return column.cache.lookup(
+      sparse_tensors.id_tensor,
+      sparse_tensors.weight_tensor,
+      combiner=column.combiner,
+      max_norm=column.max_norm)
+
+
+_CACHED_COLUMN_TYPES = (_CachedEmbeddingColumn, _CachedEmbeddingColumnV1)
+
+
+def _div_partition(ids, partitions):
+  """Splits `ids` like the 'div' strategy of `embedding_lookup`.
+
+  Args:
+    ids: 1-D int64 `Tensor` of ids in the full embedding variable.
+    partitions: List of the variables partitioning the embedding variable.
+
+  Returns:
+    The partition of each id as an int32 `Tensor`, and the ids within their
+    partitions.
+  """
+  num_partitions = len(partitions)
+  num_total_ids = sum(
+      partition.get_shape().as_list()[0] for partition in partitions)
+  ids_per_partition = num_total_ids // num_partitions
+  extras = num_total_ids % num_partitions
+  partition_assignments = math_ops.maximum(
+      ids // (ids_per_partition + 1), (ids - extras) // ids_per_partition)
+  partition_ids = array_ops.where(
+      math_ops.less(partition_assignments, extras),
+      ids % (ids_per_partition + 1), (ids - extras) % ids_per_partition)
+  return math_ops.cast(partition_assignments, dtypes.int32), partition_ids
+
+
+def _top_ids(ids, counts, k):
+  """Returns the `k` most frequent of `ids`, padded with `_EMPTY_ID`.
+
+  Args:
+    ids: 1-D int64 `Tensor` of ids, possibly repeated.
+    counts: 1-D float32 `Tensor` with the count of each entry of `ids`.
+    k: Number of ids to return.
+
+  Returns:
+    The most frequent ids in ascending order and their summed counts.
+  """
+  unique_ids, idx = array_ops.unique(ids)
+  unique_counts = math_ops.unsorted_segment_sum(counts, idx,
+                                                array_ops.size(unique_ids))
+  num_ids = math_ops.minimum(array_ops.size(unique_ids), k)
+  top_counts, top_indices = nn.top_k(unique_counts, k=num_ids, sorted=False)
+  top_ids = array_ops.gather(unique_ids, top_indices)
+  padding = [[0, k - num_ids]]
+  top_ids = array_ops.pad(top_ids, padding, constant_values=_EMPTY_ID)
+  top_counts = array_ops.pad(top_counts, padding)
+  # Keep the cache sorted for `searchsorted` in `_EmbeddingCache.lookup`.
+  _, order = nn.top_k(-top_ids, k=k)
+  return array_ops.gather(top_ids, order), array_ops.gather(top_counts, order)
+
+
+class _EmbeddingCache(object):
+  """Local copy of the hot rows of one embedding variable.
+
+  The cache holds `config.size` rows in local variables colocated with the
+  input ids, which keeps them off the parameter servers:
+
+  * `ids`: the cached ids in ascending order, `_EMPTY_ID` for empty slots.
+  * `rows`: the values of the cached ids as of the last refresh.
+  * `counts`: the decaying lookup counts of the cached ids.
+  * `candidate_ids` and `candidate_counts`: the most frequently missed ids.
+  * `last_refresh_step`: the global step of the last refresh.
+  """
+
+  def __init__(self, name, embedding_weights, dimension, config, colocate_op):
+    if isinstance(embedding_weights, variables.PartitionedVariable):
+      embedding_weights = list(embedding_weights)
+    if not isinstance(embedding_weights, list):
+      embedding_weights = [embedding_weights]
+    self._name = name
+    self._embedding_weights = embedding_weights
+    self._dimension = dimension
+    self._config = config
+    size = config.size
+
+    def _local_variable(initial_value, var_name):
+      return variable_scope.variable(
+          initial_value,
+          trainable=False,
+          collections=[ops.GraphKeys.LOCAL_VARIABLES],
+          name=var_name,
+          use_resource=True)
+
+    with ops.colocate_with(colocate_op), ops.name_scope('embedding_cache'):
+      self._ids = _local_variable(
+          array_ops.fill([size], _EMPTY_ID), 'ids')
+      self.rows = _local_variable(
+          array_ops.zeros([size, dimension], dtypes.float32), 'rows')
+      self._counts = _local_variable(
+          array_ops.zeros([size], dtypes.float32), 'counts')
+      self._candidate_ids = _local_variable(
+          array_ops.fill([size], _EMPTY_ID), 'candidate_ids')
+      self._candidate_counts = _local_variable(
+          array_ops.zeros([size], dtypes.float32), 'candidate_counts')
+      # The first step refreshes the empty cache.
+      self._last_refresh_step = _local_variable(
+          constant_op.constant(-config.max_staleness_steps, dtypes.int64),
+          'last_refresh_step')
+
+  def lookup(self, sparse_ids, sparse_weights, combiner, max_norm):
+    """Looks up embeddings like `safe_embedding_lookup_sparse`.
+
+    Args:
+      sparse_ids: `SparseTensor` of ids.
+      sparse_weights: `SparseTensor` of weights of `sparse_ids`, or `None`.
+      combiner: A string specifying how to combine the embeddings of a row.
+      max_norm: If not `None`, embeddings are l2-normalized to this value.
+
+    Returns:
+      Dense `Tensor` of combined embeddings.
+    """
+    with ops.name_scope('embedding_cache'):
+      # Invalid ids would be pruned by `safe_embedding_lookup_sparse`, prune
+      # them first so they don't count as lookups.
+      is_valid = math_ops.greater_equal(sparse_ids.values, 0)
+      sparse_ids = sparse_ops.sparse_retain(sparse_ids, is_valid)
+      if sparse_weights is not None:
+        sparse_weights = sparse_ops.sparse_retain(sparse_weights, is_valid)
+      unique_ids, idx, counts = array_ops.unique_with_counts(
+          sparse_ids.values, out_idx=dtypes.int64)
+      counts = math_ops.cast(counts, dtypes.float32)
+
+      self._cached_ids = self._ids.read_value()
+      positions = math_ops.minimum(
+          array_ops.searchsorted(self._cached_ids, unique_ids),
+          self._config.size - 1)
+      is_hit = math_ops.equal(
+          array_ops.gather(self._cached_ids, positions), unique_ids)
+      hit_indices = math_ops.cast(array_ops.where(is_hit)[:, 0], dtypes.int32)
+      miss_indices = math_ops.cast(
+          array_ops.where(math_ops.logical_not(is_hit))[:, 0], dtypes.int32)
+      self._hit_positions = array_ops.gather(positions, hit_indices)
+      self._hit_counts = array_ops.gather(counts, hit_indices)
+      self._miss_ids = array_ops.gather(unique_ids, miss_indices)
+      self._miss_counts = array_ops.gather(counts, miss_indices)
+
+      unique_rows = data_flow_ops.dynamic_stitch(
+          [hit_indices, miss_indices],
+          [array_ops.gather(self.rows, self._hit_positions),
+           embedding_ops.embedding_lookup(
+               self._embedding_weights, self._miss_ids,
+               partition_strategy='div')])
+
+      num_hits = math_ops.cast(array_ops.size(hit_indices), dtypes.float32)
+      summary.scalar('%s/cache_hit_rate' % self._name,
+                     math_ops.div_no_nan(
+                         num_hits,
+                         math_ops.cast(array_ops.size(unique_ids),
+                                       dtypes.float32)))
+      summary.scalar('%s/cache_bytes_saved' % self._name,
+                     num_hits * self._dimension * dtypes.float32.size)
+
+    return embedding_ops.safe_embedding_lookup_sparse(
+        [unique_rows],
+        sparse_tensor.SparseTensor(sparse_ids.indices, idx,
+                                   sparse_ids.dense_shape),
+        sparse_weights,
+        combiner=combiner,
+        name='%s_weights' % self._name,
+        max_norm=max_norm)
+
+  def write_back_gradients(self, grads_and_vars):
+    """Moves the gradient of `rows` to the embedding variable.
+
+    Args:
+      grads_and_vars: List of (gradient, variable) pairs.
+
+    Returns:
+      `grads_and_vars` without `rows`, with the gradients of cached rows added
+      to the gradients of the partitions they were copied from.
+    """
+    grads_by_var = collections.OrderedDict(
+        (var, grad) for grad, var in grads_and_vars if var is not self.rows)
+    rows_grad = [grad for grad, var in grads_and_vars if var is self.rows][0]
+    if rows_grad is None or not all(
+        var in grads_by_var for var in self._embedding_weights):
+      return [(grad, var) for var, grad in grads_by_var.items()]
+
+    rows_grad = ops.convert_to_tensor_or_indexed_slices(rows_grad)
+    if isinstance(rows_grad, ops.IndexedSlices):
+      positions, values = rows_grad.indices, rows_grad.values
+    else:
+      positions = math_ops.range(self._config.size)
+      values = rows_grad
+    ids = array_ops.gather(self._cached_ids, positions)
+    # Empty slots are never looked up, but keep their ids in range.
+    is_cached = math_ops.not_equal(ids, _EMPTY_ID)
+    ids = array_ops.boolean_mask(ids, is_cached)
+    values = array_ops.boolean_mask(values, is_cached)
+
+    num_partitions = len(self._embedding_weights)
+    partition_assignments, partition_ids = _div_partition(
+        ids, self._embedding_weights)
+    partition_ids = data_flow_ops.dynamic_partition(
+        partition_ids, partition_assignments, num_partitions)
+    partition_values = data_flow_ops.dynamic_partition(
+        values, partition_assignments, num_partitions)
+    for var, var_ids, var_values in zip(self._embedding_weights, partition_ids,
+                                        partition_values):
+      grad = grads_by_var[var]
+      if grad is None:
+        grads_by_var[var] = ops.IndexedSlices(var_values, var_ids)
+      elif isinstance(grad, ops.IndexedSlices):
+        grads_by_var[var] = ops.IndexedSlices(
+            array_ops.concat([grad.values, var_values], axis=0),
+            array_ops.concat(
+                [math_ops.cast(grad.indices, dtypes.int64), var_ids], axis=0),
+            grad.dense_shape)
+      else:
+        grads_by_var[var] = grad + ops.convert_to_tensor(
+            ops.IndexedSlices(var_values, var_ids,
+                              array_ops.shape(grad, out_type=dtypes.int64)))
+    return [(grad, var) for var, grad in grads_by_var.items()]
+
+  def update_op(self):
+    """Returns the op updating the counts, candidates and cached rows."""
+    with ops.name_scope('embedding_cache'):
+      update_counts = state_ops.scatter_add(self._counts, self._hit_positions,
+                                            self._hit_counts)
+      candidate_ids, candidate_counts = _top_ids(
+          array_ops.concat([self._candidate_ids, self._miss_ids], axis=0),
+          array_ops.concat([self._candidate_counts, self._miss_counts],
+                           axis=0), self._config.size)
+      update_candidates = control_flow_ops.group(
+          self._candidate_ids.assign(candidate_ids),
+          self._candidate_counts.assign(candidate_counts))
+
+      global_step = training_util.get_global_step()
+
+      def _refresh():
+        """Refills the cache with the most frequent ids."""
+        ids, counts = _top_ids(
+            array_ops.concat([self._ids, self._candidate_ids], axis=0),
+            array_ops.concat([self._counts, self._candidate_counts], axis=0),
+            self._config.size)
+        is_cached = math_ops.not_equal(ids, _EMPTY_ID)
+        rows = embedding_ops.embedding_lookup(
+            self._embedding_weights,
+            array_ops.where(is_cached, ids, array_ops.zeros_like(ids)),
+            partition_strategy='div')
+        rows = array_ops.where(is_cached, rows, array_ops.zeros_like(rows))
+        return control_flow_ops.group(
+            self._ids.assign(ids), self.rows.assign(rows),
+            self._counts.assign(counts * _COUNT_DECAY),
+            self._candidate_ids.assign(
+                array_ops.fill([self._config.size], _EMPTY_ID)),
+            self._candidate_counts.assign(
+                array_ops.zeros([self._config.size], dtypes.float32)),
+            self._last_refresh_step.assign(global_step))
+
+      with ops.control_dependencies([update_counts, update_candidates]):
+        return control_flow_ops.cond(
+            math_ops.greater_equal(
+                math_ops.cast(global_step, dtypes.int64) -
+                self._last_refresh_step, self._config.max_staleness_steps),
+            _refresh, control_flow_ops.no_op)
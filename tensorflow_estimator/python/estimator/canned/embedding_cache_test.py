@@ -0,0 +1,201 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for embedding_cache.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from tensorflow.core.framework import summary_pb2
+from tensorflow.python.feature_column import dense_features
+from tensorflow.python.feature_column import feature_column
+from tensorflow.python.feature_column import feature_column_v2
+from tensorflow.python.framework import ops
+from tensorflow.python.framework import sparse_tensor
+from tensorflow.python.ops import init_ops
+from tensorflow.python.ops import math_ops
+from tensorflow.python.ops import partitioned_variables
+from tensorflow.python.ops import variable_scope
+from tensorflow.python.ops import variables
+from tensorflow.python.platform import test
+from tensorflow.python.summary import summary as summary_lib
+from tensorflow.python.training import gradient_descent
+from tensorflow.python.training import training_util
+from tensorflow_estimator.python.estimator.canned import embedding_cache
+
+
+def _features():
+  return {
+      'ids': sparse_tensor.SparseTensor(
+          indices=[[0, 0], [0, 1], [1, 0], [1, 1]],
+          values=[0, 1, 1, 3],
+          dense_shape=[2, 2])
+  }
+
+
+class EmbeddingCacheTest(test.TestCase):
+
+  def _train(self, cache_config, num_steps, use_v1_columns=False):
+    """Trains an embedding and returns its values and the last summary."""
+    with ops.Graph().as_default():
+      training_util.get_or_create_global_step()
+      if use_v1_columns:
+        columns = [
+            feature_column._embedding_column(  # pylint: disable=protected-access
+                feature_column._categorical_column_with_identity('ids', 5),  # pylint: disable=protected-access
+                dimension=2,
+                initializer=init_ops.random_uniform_initializer(seed=1))
+        ]
+      else:
+        columns = [
+            feature_column_v2.embedding_column(
+                feature_column_v2.categorical_column_with_identity('ids', 5),
+                dimension=2,
+                initializer=init_ops.random_uniform_initializer(seed=1))
+        ]
+      if cache_config is not None:
+        columns = embedding_cache.cached_embedding_columns(
+            columns, cache_config)
+      with variable_scope.variable_scope(
+          'dnn', partitioner=partitioned_variables.fixed_size_partitioner(2)):
+        if use_v1_columns:
+          net = feature_column.input_layer(_features(), columns)
+        else:
+          net = dense_features.DenseFeatures(columns)(_features())
+      loss = math_ops.reduce_sum(
+          math_ops.square(math_ops.reduce_sum(net, axis=1) - 1.))
+      optimizer = gradient_descent.GradientDescentOptimizer(0.1)
+      if cache_config is not None:
+        train_op = embedding_cache.train_op_fn_with_embedding_caches(
+            optimizer, embedding_cache.embedding_caches(columns))(loss)
+      else:
+        train_op = optimizer.minimize(
+            loss, global_step=training_util.get_global_step())
+      summary_op = summary_lib.merge_all()
+      with self.cached_session() as sess:
+        sess.run(variables.global_variables_initializer())
+        sess.run(variables.local_variables_initializer())
+        for _ in range(num_steps):
+          _, serialized_summary = sess.run(
+              (train_op, summary_op if summary_op is not None else train_op))
+        summary = summary_pb2.Summary()
+        if summary_op is not None:
+          summary.ParseFromString(serialized_summary)
+        return sess.run(variables.trainable_variables()), summary
+
+  def test_matches_uncached_training(self):
+    expected, _ = self._train(None, num_steps=3)
+    actual, _ = self._train(
+        embedding_cache.EmbeddingCacheConfig(size=2, max_staleness_steps=1),
+        num_steps=3)
+    self.assertAllClose(expected, actual)
+
+  def test_matches_uncached_training_with_v1_columns(self):
+    expected, _ = self._train(None, num_steps=3, use_v1_columns=True)
+    actual, _ = self._train(
+        embedding_cache.EmbeddingCacheConfig(size=2, max_staleness_steps=1),
+        num_steps=3,
+        use_v1_columns=True)
+    self.assertAllClose(expected, actual)
+
+  def test_summaries(self):
+    config = embedding_cache.EmbeddingCacheConfig(
+        size=2, max_staleness_steps=1)
+    _, summary = self._train(config, num_steps=1)
+    values = {value.tag.split('/')[-1]: value.simple_value
+              for value in summary.value}
+    self.assertAllClose({'cache_hit_rate': 0., 'cache_bytes_saved': 0.},
+                        values)
+    # After the first refresh, id 1 and one of the ids 0 and 3 are cached.
+    _, summary = self._train(config, num_steps=2)
+    values = {value.tag.split('/')[-1]: value.simple_value
+              for value in summary.value}
+    self.assertAllClose({'cache_hit_rate': 2. / 3., 'cache_bytes_saved': 16.},
+                        values)
+
+  def test_refreshes_after_max_staleness_steps(self):
+    with ops.Graph().as_default():
+      global_step = training_util.get_or_create_global_step()
+      embedding_weights = variables.Variable(
+          [[float(i), float(i)] for i in range(5)])
+      sparse_ids = _features()['ids']
+      cache = embedding_cache._EmbeddingCache(  # pylint: disable=protected-access
+          'ids', embedding_weights, 2,
+          embedding_cache.EmbeddingCacheConfig(size=2, max_staleness_steps=2),
+          sparse_ids.values.op)
+      cache.lookup(sparse_ids, None, combiner='sum', max_norm=None)
+      update_op = cache.update_op()
+      with self.cached_session() as sess:
+        sess.run(variables.global_variables_initializer())
+        sess.run(variables.local_variables_initializer())
+        # Other workers may advance the global step past the multiples of
+        # max_staleness_steps; the cache is still refreshed.
+        for step, last_refresh_step in [(0, 0), (1, 0), (3, 3), (4, 3), (7, 7)]:
+          sess.run(global_step.assign(step))
+          sess.run(update_op)
+          self.assertEqual(
+              last_refresh_step,
+              sess.run(cache._last_refresh_step))  # pylint: disable=protected-access
+
+  def test_invalid_config(self):
+    with self.assertRaisesRegexp(ValueError, 'size must be positive'):
+      embedding_cache.EmbeddingCacheConfig(size=0)
+    with self.assertRaisesRegexp(ValueError,
+                                 'max_staleness_steps must be positive'):
+      embedding_cache.EmbeddingCacheConfig(size=1, max_staleness_steps=0)
+
+  def test_only_embedding_columns_are_cached(self):
+    ids = feature_column_v2.categorical_column_with_identity('ids', 5)
+    columns = embedding_cache.cached_embedding_columns(
+        [feature_column_v2.embedding_column(ids, dimension=2),
+         feature_column_v2.indicator_column(ids)],
+        embedding_cache.EmbeddingCacheConfig(size=2))
+    self.assertIsInstance(columns[0], embedding_cache._CachedEmbeddingColumn)  # pylint: disable=protected-access
+    self.assertEqual('ids_embedding', columns[0].name)
+    self.assertIsInstance(columns[1], feature_column_v2.IndicatorColumn)
+
+  def test_v1_embedding_columns_are_cached(self):
+    ids = feature_column._categorical_column_with_identity('ids', 5)  # pylint: disable=protected-access
+    columns = embedding_cache.cached_embedding_columns(
+        [feature_column._embedding_column(ids, dimension=2)],  # pylint: disable=protected-access
+        embedding_cache.EmbeddingCacheConfig(size=2))
+    self.assertIsInstance(columns[0], embedding_cache._CachedEmbeddingColumnV1)  # pylint: disable=protected-access
+    self.assertEqual('ids_embedding', columns[0].name)
+
+  def test_shared_embedding_columns_are_not_cached(self):
+    ids = feature_column_v2.categorical_column_with_identity('ids', 5)
+    other_ids = feature_column_v2.categorical_column_with_identity(
+        'other_ids', 5)
+    shared_columns = feature_column_v2.shared_embedding_columns_v2(
+        [ids, other_ids], dimension=2)
+    columns = embedding_cache.cached_embedding_columns(
+        [feature_column_v2.embedding_column(ids, dimension=2)] + shared_columns,
+        embedding_cache.EmbeddingCacheConfig(size=2))
+    self.assertIsInstance(columns[0], embedding_cache._CachedEmbeddingColumn)  # pylint: disable=protected-access
+    self.assertIs(shared_columns[0], columns[1])
+    self.assertIs(shared_columns[1], columns[2])
+
+  def test_no_embedding_columns(self):
+    ids = feature_column_v2.categorical_column_with_identity('ids', 5)
+    with self.assertRaisesRegexp(ValueError,
+                                 'none of the feature_columns is an '
+                                 'embedding_column'):
+      embedding_cache.cached_embedding_columns(
+          [feature_column_v2.indicator_column(ids)],
+          embedding_cache.EmbeddingCacheConfig(size=2))
+
+
+if __name__ == '__main__':
+  test.main()
@@ -29,6 +29,7 @@ from tensorflow.python.framework import ops
 from tensorflow.python.ops import array_ops
 from tensorflow.python.ops import clustering_ops
 from tensorflow.python.ops import control_flow_ops
+from tensorflow.python.ops import data_flow_ops
 from tensorflow.python.ops import math_ops
 from tensorflow.python.ops import metrics
 from tensorflow.python.ops import state_ops
@@ -137,13 +138,171 @@ def _parse_features_if_necessary(features, feature_columns):
     return array_ops.concat([features[k] for k in keys], axis=1)
 
 
+def _shard_input_points(input_points, devices):
+  """Splits the input points into one contiguous block of rows per device.
+
+  Args:
+    input_points: A `Tensor` of shape `(n, d)`.
+    devices: A list of device names.
+
+  Returns:
+    A pair `(shards, shard_indices)`. `shards` is a list of tensors of shape
+    `(n_i, d)`, the `i`-th of which is placed on `devices[i]`, and
+    `shard_indices` is a list of the original row indices of each shard,
+    suitable for `dynamic_stitch`.
+  """
+  num_shards = len(devices)
+  num_points = array_ops.shape(input_points)[0]
+  row_ids = math_ops.range(num_points)
+  partitions = math_ops.floordiv(row_ids * num_shards,
+                                 math_ops.maximum(num_points, 1))
+  shards = data_flow_ops.dynamic_partition(input_points, partitions,
+                                           num_shards)
+  shard_indices = data_flow_ops.dynamic_partition(row_ids, partitions,
+                                                  num_shards)
+  # clustering_ops colocates the work on each input with that input, so each
+  # shard is copied to its device before being handed over.
+  placed_shards = []
+  for shard, device in zip(shards, devices):
+    with ops.device(device):
+      placed_shards.append(array_ops.identity(shard))
+  return placed_shards, shard_indices
+
+
+def _pairwise_squared_distances(points, centers):
+  """Returns the `(n, k)` squared Euclidean distances between numpy arrays."""
+  return np.maximum(
+      np.sum(np.square(points), axis=1, keepdims=True) -
+      2 * np.dot(points, centers.T) + np.sum(np.square(centers), axis=1), 0.)
+
+
+class _CenterIndex(object):
+  """A coarse quantizer over cluster centers for nearest-center queries.
+
+  The centers are grouped into `num_cells` cells by running a few Lloyd
+  iterations over the centers themselves. A query point is compared against the
+  cell centroids and then only against the centers of its `num_probes` closest
+  cells, which costs about `O((num_cells + k * num_probes / num_cells) * d)`
+  instead of `O(k * d)`.
+
+  With `exact_rerank=True`, the triangle inequality is used to bound the
+  distance from a point to every center of an unprobed cell. Cells whose bound
+  is smaller than the best distance found so far are scanned as well, so the
+  returned index is always the exact nearest center; `num_probes` then only
+  trades off speed.
+  """
+
+  def __init__(self, centers, distance_metric, num_cells=None, seed=0,
+               num_iterations=10):
+    """Creates a _CenterIndex.
+
+    Args:
+      centers: A numpy array of shape `(k, d)`, the cluster centers.
+      distance_metric: One of the `KMeansClustering` distance metrics.
+      num_cells: Number of cells of the coarse quantizer. Defaults to
+        `sqrt(k)`.
+      seed: Seed used to choose the initial cell centroids.
+      num_iterations: Number of Lloyd iterations used to build the cells.
+    """
+    self._normalize = distance_metric == clustering_ops.COSINE_DISTANCE
+    centers = self._maybe_normalize(np.asarray(centers, dtype=np.float64))
+    num_centers = centers.shape[0]
+    if num_cells is None:
+      num_cells = int(round(np.sqrt(num_centers)))
+    num_cells = max(1, min(num_cells, num_centers))
+
+    rng = np.random.RandomState(seed)
+    centroids = centers[rng.choice(num_centers, num_cells, replace=False)]
+    for _ in range(num_iterations):
+      assignments = np.argmin(
+          _pairwise_squared_distances(centers, centroids), axis=1)
+      for cell in range(num_cells):
+        members = centers[assignments == cell]
+        if members.shape[0]:
+          centroids[cell] = np.mean(members, axis=0)
+    assignments = np.argmin(
+        _pairwise_squared_distances(centers, centroids), axis=1)
+
+    self._centers = centers
+    self._centroids = centroids
+    self._cell_members = [
+        np.flatnonzero(assignments == cell) for cell in range(num_cells)
+    ]
+    self._cell_radii = np.array([
+        np.sqrt(np.max(np.sum(
+            np.square(centers[members] - centroids[cell]), axis=1)))
+        if members.size else 0. for cell, members in enumerate(
+            self._cell_members)
+    ])
+
+  @property
+  def num_cells(self):
+    return len(self._cell_members)
+
+  def _maybe_normalize(self, points):
+    # Cosine distance is monotonic in the Euclidean distance between normalized
+    # vectors, so the same index serves both metrics.
+    if not self._normalize:
+      return points
+    norms = np.sqrt(np.sum(np.square(points), axis=1, keepdims=True))
+    return points / np.maximum(norms, 1e-12)
+
+  def _scan(self, points, cell, mask, best_index, best_distance):
+    """Updates the best match of `points[mask]` with the centers of `cell`."""
+    members = self._cell_members[cell]
+    rows = np.flatnonzero(mask)
+    if not members.size or not rows.size:
+      return
+    distances = np.sqrt(
+        _pairwise_squared_distances(points[rows], self._centers[members]))
+    closest = np.argmin(distances, axis=1)
+    closest_distance = distances[np.arange(rows.size), closest]
+    improved = closest_distance < best_distance[rows]
+    best_index[rows[improved]] = members[closest[improved]]
+    best_distance[rows[improved]] = closest_distance[improved]
+
+  def query(self, points, num_probes=1, exact_rerank=True):
+    """Returns the index of the closest center for each point.
+
+    Args:
+      points: A numpy array of shape `(n, d)`.
+      num_probes: Number of closest cells scanned for each point.
+      exact_rerank: Whether to also scan every cell that may still contain a
+        closer center, making the result exact.
+
+    Returns:
+      An int64 numpy array of shape `(n,)`.
+    """
+    points = self._maybe_normalize(np.asarray(points, dtype=np.float64))
+    num_points = points.shape[0]
+    num_probes = max(1, min(num_probes, self.num_cells))
+    cell_distances = np.sqrt(
+        _pairwise_squared_distances(points, self._centroids))
+    probed_cells = np.argsort(cell_distances, axis=1)[:, :num_probes]
+
+    best_index = np.full(num_points, -1, dtype=np.int64)
+    best_distance = np.full(num_points, np.inf)
+    probed = np.zeros([num_points, self.num_cells], dtype=bool)
+    probed[np.arange(num_points)[:, np.newaxis], probed_cells] = True
+    for cell in range(self.num_cells):
+      self._scan(points, cell, probed[:, cell], best_index, best_distance)
+
+    if exact_rerank:
+      lower_bounds = cell_distances - self._cell_radii
+      for cell in np.argsort(self._cell_radii)[::-1]:
+        mask = (~probed[:, cell]) & (lower_bounds[:, cell] < best_distance)
+        self._scan(points, cell, mask, best_index, best_distance)
+    return best_index
+
+
 class _ModelFn(object):
   """Model function for the estimator."""
 
   def __init__(self, num_clusters, initial_clusters, distance_metric, seed,
                use_mini_batch, mini_batch_steps_per_iteration,
                kmeans_plus_plus_num_retries, relative_tolerance,
-               feature_columns):
+               feature_columns, input_shard_devices=None,
+               include_input_points=False):
     self._num_clusters = num_clusters
     self._initial_clusters = initial_clusters
     self._distance_metric = distance_metric
@@ -153,6 +312,8 @@ class _ModelFn(object):
     self._kmeans_plus_plus_num_retries = kmeans_plus_plus_num_retries
     self._relative_tolerance = relative_tolerance
     self._feature_columns = feature_columns
+    self._input_shard_devices = input_shard_devices
+    self._include_input_points = include_input_points
 
   def model_fn(self, features, mode, config):
     """Model function for the estimator.
@@ -175,17 +336,25 @@ class _ModelFn(object):
         * `eval_metric_ops`: Maps `SCORE` to `loss`.
         * `predictions`: Maps `ALL_DISTANCES` to the distance from each input
              point to each cluster center; maps `CLUSTER_INDEX` to the index of
-             the closest cluster center for each input point.
+             the closest cluster center for each input point; maps
+             `INPUT_POINTS` to the parsed input points if
+             `include_input_points` was set.
     """
-    # input_points is a single Tensor. Therefore, the sharding functionality
-    # in clustering_ops is unused, and some of the values below are lists of a
-    # single item.
+    # input_points is a single Tensor. When input_shard_devices is set it is
+    # split into one block of rows per device, and clustering_ops computes the
+    # distances, assignments and center updates of each block on its device;
+    # otherwise the values below are lists of a single item.
     input_points = _parse_features_if_necessary(features, self._feature_columns)
-
-    # Let N = the number of input_points.
-    # all_distances: A list of one matrix of shape (N, num_clusters). Each value
+    if self._input_shard_devices:
+      inputs, shard_indices = _shard_input_points(input_points,
+                                                  self._input_shard_devices)
+    else:
+      inputs, shard_indices = [input_points], None
+
+    # Let N_i = the number of input points in shard i.
+    # all_distances: A list of matrices of shape (N_i, num_clusters). Each value
     #   is the distance from an input point to a cluster center.
-    # model_predictions: A list of one vector of shape (N). Each value is the
+    # model_predictions: A list of vectors of shape (N_i). Each value is the
     #   cluster id of an input point.
     # losses: Similar to cluster_idx but provides the distance to the cluster
     #   center.
@@ -198,7 +367,7 @@ class _ModelFn(object):
     #   may execute this op, but only after is_initialized becomes True.
     (all_distances, model_predictions, losses, is_initialized, init_op,
      training_op) = clustering_ops.KMeans(
-         inputs=input_points,
+         inputs=inputs,
          num_clusters=self._num_clusters,
          initial_clusters=self._initial_clusters,
          distance_metric=self._distance_metric,
@@ -208,7 +377,16 @@ class _ModelFn(object):
          kmeans_plus_plus_num_retries=self._kmeans_plus_plus_num_retries
      ).training_graph()
 
-    loss = math_ops.reduce_sum(losses)
+    if shard_indices is None:
+      all_distances = all_distances[0]
+      model_predictions = model_predictions[0]
+    else:
+      all_distances = data_flow_ops.dynamic_stitch(shard_indices,
+                                                   list(all_distances))
+      model_predictions = data_flow_ops.dynamic_stitch(
+          shard_indices, list(model_predictions))
+
+    loss = math_ops.add_n([math_ops.reduce_sum(l) for l in losses])
     summary.scalar('loss/raw', loss)
 
     incr_step = state_ops.assign_add(training_util.get_global_step(), 1)
@@ -224,19 +402,23 @@ class _ModelFn(object):
 
     export_outputs = {
         KMeansClustering.ALL_DISTANCES:
-            export_output.PredictOutput(all_distances[0]),
+            export_output.PredictOutput(all_distances),
         KMeansClustering.CLUSTER_INDEX:
-            export_output.PredictOutput(model_predictions[0]),
+            export_output.PredictOutput(model_predictions),
         signature_constants.DEFAULT_SERVING_SIGNATURE_DEF_KEY:
-            export_output.PredictOutput(model_predictions[0])
+            export_output.PredictOutput(model_predictions)
+    }
+
+    predictions = {
+        KMeansClustering.ALL_DISTANCES: all_distances,
+        KMeansClustering.CLUSTER_INDEX: model_predictions,
     }
+    if self._include_input_points:
+      predictions[KMeansClustering.INPUT_POINTS] = input_points
 
     return model_fn_lib.EstimatorSpec(
         mode=mode,
-        predictions={
-            KMeansClustering.ALL_DISTANCES: all_distances[0],
-            KMeansClustering.CLUSTER_INDEX: model_predictions[0],
-        },
+        predictions=predictions,
         loss=loss,
         train_op=training_op,
         eval_metric_ops={KMeansClustering.SCORE: metrics.mean(loss)},
@@ -244,7 +426,6 @@ class _ModelFn(object):
         export_outputs=export_outputs)
 
 
-# TODO(agarwal,ands): support sharded input.
 @estimator_export(v1=['estimator.experimental.KMeans'])
 class KMeansClustering(estimator.Estimator):
   """An Estimator for K-Means clustering.
@@ -314,8 +495,11 @@ class KMeansClustering(estimator.Estimator):
   # Keys returned by predict().
   # ALL_DISTANCES: The distance from each input point to each cluster center.
   # CLUSTER_INDEX: The index of the closest cluster center for each input point.
+  # INPUT_POINTS: The parsed input point, as seen by the model. Only returned
+  #   to predict_cluster_index() when it queries the center index.
   CLUSTER_INDEX = 'cluster_index'
   ALL_DISTANCES = 'all_distances'
+  INPUT_POINTS = 'input_points'
 
   # Variable name used by cluster_centers().
   CLUSTER_CENTERS_VAR_NAME = clustering_ops.CLUSTERS_VAR_NAME
@@ -331,7 +515,8 @@ class KMeansClustering(estimator.Estimator):
                kmeans_plus_plus_num_retries=2,
                relative_tolerance=None,
                config=None,
-               feature_columns=None):
+               feature_columns=None,
+               input_shard_devices=None):
     r"""Creates an Estimator for running KMeans training and inference.
 
     This Estimator implements the following variants of the K-means algorithm:
@@ -404,6 +589,12 @@ class KMeansClustering(estimator.Estimator):
         used by the model. All items in the set should be feature column
         instances that can be passed to `tf.feature_column.input_layer`. If this
         is None, all features will be used.
+      input_shard_devices: An optional list of device names, e.g. the local
+        GPUs. Each batch of input points is split into one contiguous block of
+        rows per device, and the nearest-center assignment of each block, along
+        with its contribution to the center update, runs on that device in
+        parallel with the others. Combined with a multi-worker `config`, each
+        worker shards its own batches this way.
 
     Raises:
       ValueError: An invalid argument was passed to `initial_clusters` or
@@ -420,30 +611,86 @@ class KMeansClustering(estimator.Estimator):
     ]:
       raise ValueError("Unsupported distance metric '%s'" % distance_metric)
     self._distance_metric = distance_metric
+    self._center_index = None
+    self._center_index_checkpoint = None
+    model_fn_args = (num_clusters, initial_clusters, distance_metric, seed,
+                     use_mini_batch, mini_batch_steps_per_iteration,
+                     kmeans_plus_plus_num_retries, relative_tolerance,
+                     feature_columns, input_shard_devices)
     super(KMeansClustering, self).__init__(
-        model_fn=_ModelFn(num_clusters, initial_clusters, distance_metric, seed,
-                          use_mini_batch, mini_batch_steps_per_iteration,
-                          kmeans_plus_plus_num_retries, relative_tolerance,
-                          feature_columns).model_fn,
+        model_fn=_ModelFn(*model_fn_args).model_fn,
         model_dir=model_dir,
         config=config)
-
-  def _predict_one_key(self, input_fn, predict_key):
-    for result in self.predict(input_fn=input_fn, predict_keys=[predict_key]):
+    # The parsed input points are only returned by this Estimator, over the
+    # same model_dir, so that predict() does not return them by default.
+    self._input_points_estimator = estimator.Estimator(
+        model_fn=_ModelFn(*model_fn_args, include_input_points=True).model_fn,
+        model_dir=self.model_dir,
+        config=self.config)
+
+  def _predict_one_key(self, input_fn, predict_key,
+                       yield_single_examples=True):
+    for result in self.predict(
+        input_fn=input_fn,
+        predict_keys=[predict_key],
+        yield_single_examples=yield_single_examples):
       yield result[predict_key]
 
-  def predict_cluster_index(self, input_fn):
+  def _get_center_index(self):
+    """Returns a `_CenterIndex` over the centers of the latest checkpoint."""
+    checkpoint = self.latest_checkpoint()
+    if self._center_index is None or self._center_index_checkpoint != checkpoint:
+      self._center_index = _CenterIndex(self.cluster_centers(),
+                                        self._distance_metric)
+      self._center_index_checkpoint = checkpoint
+    return self._center_index
+
+  def predict_cluster_index(self,
+                            input_fn,
+                            yield_single_examples=True,
+                            num_probes=None,
+                            exact_rerank=True):
     """Finds the index of the closest cluster center to each input point.
 
+    By default the index is computed in the TensorFlow graph against every
+    cluster center. If `num_probes` is set, the input points are instead
+    matched against an index over `cluster_centers()`, which is built once per
+    checkpoint and groups the centers into about `sqrt(num_clusters)` cells.
+    Each point is then only compared against the centers of its `num_probes`
+    closest cells, which is much cheaper when `num_clusters` is large.
+
     Args:
       input_fn: Input points. See `tf.estimator.Estimator.predict`.
+      yield_single_examples: If `False`, yields one vector of indices per batch
+        returned by `input_fn` instead of one index per input point.
+      num_probes: If not `None`, the number of index cells scanned for each
+        input point.
+      exact_rerank: Used only if `num_probes` is set. If `True`, any cell that
+        may still hold a closer center is scanned too, so the result matches
+        the exact search. If `False`, the result is approximate.
 
     Yields:
-      The index of the closest cluster center for each input point.
+      The index of the closest cluster center for each input point, or a
+      vector of shape `(batch_size,)` per batch.
     """
-    for index in self._predict_one_key(input_fn,
-                                       KMeansClustering.CLUSTER_INDEX):
-      yield index
+    if num_probes is None:
+      for index in self._predict_one_key(
+          input_fn, KMeansClustering.CLUSTER_INDEX, yield_single_examples):
+        yield index
+      return
+
+    center_index = self._get_center_index()
+    for result in self._input_points_estimator.predict(
+        input_fn=input_fn,
+        predict_keys=[KMeansClustering.INPUT_POINTS],
+        yield_single_examples=False):
+      points = result[KMeansClustering.INPUT_POINTS]
+      indices = center_index.query(points, num_probes, exact_rerank)
+      if yield_single_examples:
+        for index in indices:
+          yield index
+      else:
+        yield indices
 
   def score(self, input_fn):
     """Returns the sum of squared distances to nearest clusters.
@@ -461,7 +708,7 @@ class KMeansClustering(estimator.Estimator):
     """
     return self.evaluate(input_fn=input_fn, steps=1)[KMeansClustering.SCORE]
 
-  def transform(self, input_fn):
+  def transform(self, input_fn, yield_single_examples=True):
     """Transforms each input point to its distances to all cluster centers.
 
     Note that if `distance_metric=KMeansClustering.SQUARED_EUCLIDEAN_DISTANCE`,
@@ -471,12 +718,16 @@ class KMeansClustering(estimator.Estimator):
 
     Args:
       input_fn: Input points. See `tf.estimator.Estimator.predict`.
+      yield_single_examples: If `False`, yields one `(batch_size, num_clusters)`
+        block of distances per batch returned by `input_fn` instead of one row
+        per input point. This avoids the per-example overhead when
+        transforming large datasets.
 
     Yields:
       The distances from each input point to each cluster center.
     """
-    for distances in self._predict_one_key(input_fn,
-                                           KMeansClustering.ALL_DISTANCES):
+    for distances in self._predict_one_key(
+        input_fn, KMeansClustering.ALL_DISTANCES, yield_single_examples):
       if self._distance_metric == KMeansClustering.SQUARED_EUCLIDEAN_DISTANCE:
         yield np.sqrt(distances)
       else:
@@ -136,6 +136,10 @@ class KMeansTestBase(test.TestCase):
   def mini_batch_steps_per_iteration(self):
     return 1
 
+  @property
+  def input_shard_devices(self):
+    return None
+
 
 @test_util.run_all_in_graph_and_eager_modes
 class KMeansTest(KMeansTestBase):
@@ -158,7 +162,8 @@ class KMeansTest(KMeansTestBase):
         use_mini_batch=self.use_mini_batch,
         mini_batch_steps_per_iteration=self.mini_batch_steps_per_iteration,
         seed=24,
-        relative_tolerance=relative_tolerance)
+        relative_tolerance=relative_tolerance,
+        input_shard_devices=self.input_shard_devices)
 
   def test_clusters(self):
     kmeans = self._kmeans()
@@ -219,6 +224,29 @@ class KMeansTest(KMeansTestBase):
             np.transpose(np.sum(np.square(clusters), axis=1, keepdims=True))))
     self.assertAllClose(transform, true_transform, rtol=0.05, atol=10)
 
+    # Test batched predict and transform.
+    batched_assignments = list(
+        kmeans.predict_cluster_index(input_fn, yield_single_examples=False))
+    self.assertEqual(1, len(batched_assignments))
+    self.assertAllEqual(batched_assignments[0], true_assignments)
+    batched_transform = list(
+        kmeans.transform(input_fn, yield_single_examples=False))
+    self.assertEqual(1, len(batched_transform))
+    self.assertAllEqual([num_points, self.num_centers],
+                        batched_transform[0].shape)
+    self.assertAllClose(batched_transform[0], transform)
+
+    # Test predict through the center index.
+    indexed_assignments = list(
+        kmeans.predict_cluster_index(input_fn, num_probes=1))
+    self.assertAllEqual(indexed_assignments, true_assignments)
+
+    # The parsed input points are not returned by default.
+    predictions = next(kmeans.predict(input_fn))
+    self.assertItemsEqual(
+        [kmeans_lib.KMeansClustering.ALL_DISTANCES,
+         kmeans_lib.KMeansClustering.CLUSTER_INDEX], predictions.keys())
+
   def test_infer(self):
     kmeans = self._kmeans()
     # Make a call to fit to initialize the cluster centers.
@@ -269,6 +297,14 @@ class KMeansTest(KMeansTestBase):
     self._parse_feature_dict_helper(features, parsed_feature_dict)
 
 
+@test_util.run_all_in_graph_and_eager_modes
+class ShardedKMeansTest(KMeansTest):
+
+  @property
+  def input_shard_devices(self):
+    return ['/cpu:0'] * 3
+
+
 @test_util.run_all_in_graph_and_eager_modes
 class KMeansTestMultiStageInit(KMeansTestBase):
 
@@ -334,6 +370,14 @@ class MiniBatchKMeansTest(KMeansTest):
     return True
 
 
+@test_util.run_all_in_graph_and_eager_modes
+class ShardedMiniBatchKMeansTest(MiniBatchKMeansTest):
+
+  @property
+  def input_shard_devices(self):
+    return ['/cpu:0'] * 4
+
+
 @test_util.run_all_in_graph_and_eager_modes
 class FullBatchAsyncKMeansTest(KMeansTest):
 
@@ -494,6 +538,44 @@ class FullBatchAsyncKMeansCosineTest(KMeansCosineDistanceTest):
     return self.num_points // self.batch_size
 
 
+class CenterIndexTest(test.TestCase):
+
+  def setUp(self):
+    np.random.seed(5)
+    self.centers = np.random.randn(400, 8)
+    self.points = np.random.randn(1000, 8)
+
+  def test_exact_rerank_matches_brute_force(self):
+    index = kmeans_lib._CenterIndex(
+        self.centers, kmeans_lib.KMeansClustering.SQUARED_EUCLIDEAN_DISTANCE)
+    self.assertEqual(20, index.num_cells)
+    expected = np.argmin(
+        kmeans_lib._pairwise_squared_distances(self.points, self.centers),
+        axis=1)
+    for num_probes in (1, 3, index.num_cells):
+      self.assertAllEqual(expected, index.query(self.points, num_probes))
+
+  def test_exact_rerank_cosine(self):
+    index = kmeans_lib._CenterIndex(
+        self.centers, kmeans_lib.KMeansClustering.COSINE_DISTANCE)
+    expected = np.argmax(cosine_similarity(self.points, self.centers), axis=1)
+    self.assertAllEqual(expected, index.query(self.points, num_probes=1))
+
+  def test_approximate(self):
+    index = kmeans_lib._CenterIndex(
+        self.centers,
+        kmeans_lib.KMeansClustering.SQUARED_EUCLIDEAN_DISTANCE,
+        num_cells=10)
+    expected = np.argmin(
+        kmeans_lib._pairwise_squared_distances(self.points, self.centers),
+        axis=1)
+    one_probe = np.mean(
+        index.query(self.points, num_probes=1, exact_rerank=False) == expected)
+    all_probes = index.query(self.points, num_probes=10, exact_rerank=False)
+    self.assertGreater(one_probe, 0.3)
+    self.assertAllEqual(expected, all_probes)
+
+
 class KMeansBenchmark(benchmark.Benchmark):
   """Base class for benchmarks."""
 
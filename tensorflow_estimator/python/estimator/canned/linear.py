@@ -18,8 +18,12 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import hashlib
 import math
+import sys
+import threading
 
+import numpy as np
 import six
 
 from tensorflow.python.feature_column import feature_column
@@ -35,6 +39,7 @@ from tensorflow.python.ops import math_ops
 from tensorflow.python.ops import nn
 from tensorflow.python.ops import partitioned_variables
 from tensorflow.python.ops import resource_variable_ops
+from tensorflow.python.ops import script_ops
 from tensorflow.python.ops import variable_scope
 from tensorflow.python.ops import variables as variable_ops
 from tensorflow.python.ops.losses import losses
@@ -48,7 +53,9 @@ from tensorflow.python.util.tf_export import estimator_export
 from tensorflow_estimator.python.estimator import estimator
 from tensorflow_estimator.python.estimator.canned import head as head_lib
 from tensorflow_estimator.python.estimator.canned import optimizers
+from tensorflow_estimator.python.estimator.canned.linear_optimizer.python.utils import example_state_store as example_state_store_lib
 from tensorflow_estimator.python.estimator.canned.linear_optimizer.python.utils import sdca_ops
+from tensorflow_estimator.python.estimator.canned.linear_optimizer.python.utils import sharded_mutable_dense_hashtable
 from tensorflow_estimator.python.estimator.head import binary_class_head
 from tensorflow_estimator.python.estimator.head import head_utils
 from tensorflow_estimator.python.estimator.head import regression_head
@@ -58,6 +65,237 @@ from tensorflow_estimator.python.estimator.mode_keys import ModeKeys
 # implementation, but seems a reasonable choice.
 _LEARNING_RATE = 0.2
 
+# The default maximum size of the sparse features cached by `LinearSDCA` for
+# each model.
+_SPARSE_FEATURE_CACHE_MAX_BYTES = 1 << 30
+
+# Estimated size of a slot of the dicts of `_SparseFeatureCache`, which is
+# counted against its budget along with the key and the cached arrays.
+_DICT_SLOT_BYTES = 64
+
+
+class _SparseFeatureCache(object):
+  """Host-side cache of the SDCA sparse features of each example.
+
+  `LinearSDCA` prunes invalid ids and deduplicates the ids of every categorical
+  column in each training step. For a fixed training set this work is the same
+  in every epoch, so the resulting feature ids and weights are kept here,
+  keyed by example id. A batch whose examples have all been seen before is
+  assembled from the cache and skips the pruning and deduplication ops. The
+  feature column transformations still run, outside of the `cond`, so that
+  their lookup tables are initialized as usual.
+
+  The unique ids of each sparse weight variable and, for a partitioned
+  variable, the partition assignment of these ids, are also cached, keyed by
+  the example ids of the whole batch. They are reused when the same batch comes
+  back, e.g. with a fixed order of the examples.
+
+  The cache lives in the memory of the process that runs the train op, and
+  holds the features of a single model: its columns are identified by their
+  position.
+  """
+
+  def __init__(self, max_bytes):
+    """Creates a `_SparseFeatureCache`.
+
+    Args:
+      max_bytes: Maximum size of the cached features. Once it is reached, new
+        examples are no longer cached.
+    """
+    self._max_bytes = max_bytes
+    self._num_bytes = 0
+    self._entries = {}
+    self._batch_entries = {}
+    self._lock = threading.Lock()
+    self._record_dtype = np.dtype([('column', np.int32), ('id', np.int64),
+                                   ('weight', np.float32)])
+    # The size of an empty cached array, without its data.
+    self._array_overhead = sys.getsizeof(np.zeros([0], self._record_dtype))
+
+  def size(self):
+    return len(self._entries)
+
+  def num_batches(self):
+    return len(self._batch_entries)
+
+  def num_bytes(self):
+    return self._num_bytes
+
+  def _entry_bytes(self, key, arrays):
+    """Returns the memory used by a dict entry holding `arrays`."""
+    return (sys.getsizeof(key) + _DICT_SLOT_BYTES +
+            sum(self._array_overhead + array.nbytes for array in arrays))
+
+  def _batch_key(self, example_ids):
+    """Returns a digest of the example ids of a batch, in order."""
+    digest = hashlib.md5()
+    for example_id in example_ids:
+      digest.update(np.int64(len(example_id)).tobytes())
+      digest.update(example_id)
+    return digest.digest()
+
+  def _lookup_np(self, example_ids, num_columns):
+    """Returns a hit flag and the cached features of `example_ids`."""
+    with self._lock:
+      records = [self._entries.get(example_id) for example_id in example_ids]
+    outputs = [np.array(False)]
+    if not records or any(record is None for record in records):
+      for _ in range(num_columns):
+        outputs.extend([np.zeros([0], np.int64), np.zeros([0], np.int64),
+                        np.zeros([0], np.float32)])
+      return outputs
+
+    outputs[0] = np.array(True)
+    example_indices = np.repeat(
+        np.arange(len(records), dtype=np.int64),
+        [record.shape[0] for record in records])
+    flat = np.concatenate(records)
+    order = np.argsort(flat['column'], kind='stable')
+    bounds = np.searchsorted(flat['column'][order], np.arange(num_columns + 1))
+    for column in range(num_columns):
+      rows = order[bounds[column]:bounds[column + 1]]
+      outputs.extend([example_indices[rows], flat['id'][rows],
+                      flat['weight'][rows]])
+    return outputs
+
+  def _insert_np(self, example_ids, *column_tensors):
+    """Caches the features of each column, split by example."""
+    with self._lock:
+      num_bytes = self._record_dtype.itemsize * sum(
+          ids.shape[0] for ids in column_tensors[1::3]) + sum(
+              self._entry_bytes(example_id, []) + self._array_overhead
+              for example_id in example_ids)
+      if self._num_bytes + num_bytes > self._max_bytes:
+        return np.array(False)
+      parts = []
+      for column in range(len(column_tensors) // 3):
+        example_indices, ids, weights = column_tensors[3 * column:
+                                                       3 * column + 3]
+        part = np.empty(ids.shape[0], dtype=self._record_dtype)
+        part['column'] = column
+        part['id'] = ids
+        part['weight'] = weights
+        parts.append((example_indices, part))
+      if parts:
+        example_indices = np.concatenate([indices for indices, _ in parts])
+        flat = np.concatenate([part for _, part in parts])
+      else:
+        example_indices = np.zeros([0], np.int64)
+        flat = np.zeros([0], self._record_dtype)
+      order = np.argsort(example_indices, kind='stable')
+      bounds = np.searchsorted(example_indices[order],
+                               np.arange(len(example_ids) + 1))
+      for i, example_id in enumerate(example_ids):
+        previous = self._entries.get(example_id)
+        if previous is not None:
+          self._num_bytes -= self._entry_bytes(example_id, [previous])
+        self._entries[example_id] = flat[order[bounds[i]:bounds[i + 1]]]
+        self._num_bytes += self._entry_bytes(example_id,
+                                             [self._entries[example_id]])
+      return np.array(True)
+
+  def _lookup_indices_np(self, example_ids, index_dtypes):
+    """Returns a hit flag and the cached sparse indices of a batch."""
+    key = self._batch_key(example_ids)
+    with self._lock:
+      indices = self._batch_entries.get(key)
+    if indices is None:
+      return [np.array(False)] + [
+          np.zeros([0], dtype.as_numpy_dtype) for dtype in index_dtypes
+      ]
+    return [np.array(True)] + list(indices)
+
+  def _insert_indices_np(self, example_ids, *indices):
+    """Caches the sparse indices of a batch."""
+    key = self._batch_key(example_ids)
+    indices = [np.array(index, copy=True) for index in indices]
+    num_bytes = self._entry_bytes(key, indices)
+    with self._lock:
+      if key in self._batch_entries:
+        return np.array(True)
+      if self._num_bytes + num_bytes > self._max_bytes:
+        return np.array(False)
+      self._batch_entries[key] = indices
+      self._num_bytes += num_bytes
+      return np.array(True)
+
+  def get_or_compute(self, example_ids, num_columns, compute_fn):
+    """Returns the sparse features of a batch, from the cache if possible.
+
+    Args:
+      example_ids: A string vector with the example ids of the batch.
+      num_columns: Number of sparse feature columns.
+      compute_fn: A function without arguments returning the list of
+        `num_columns` `_SparseFeatureColumn`s of the batch. Its ops are only
+        run if some example of the batch is not cached yet, so it should not
+        create any lookup tables.
+
+    Returns:
+      A list of `num_columns` `_SparseFeatureColumn`s.
+    """
+    column_dtypes = [dtypes.int64, dtypes.int64, dtypes.float32] * num_columns
+    lookup = script_ops.numpy_function(
+        lambda ids: self._lookup_np(ids, num_columns), [example_ids],
+        [dtypes.bool] + column_dtypes)
+    hit, cached = lookup[0], lookup[1:]
+    hit.set_shape([])
+    for tensor in cached:
+      tensor.set_shape([None])
+
+    def _computed():
+      tensors = []
+      for sparse_feature in compute_fn():
+        tensors.extend([sparse_feature.example_indices,
+                        sparse_feature.feature_indices,
+                        sparse_feature.feature_values])
+      insert = script_ops.numpy_function(self._insert_np,
+                                         [example_ids] + tensors, dtypes.bool)
+      with ops.control_dependencies([insert]):
+        return [array_ops.identity(tensor) for tensor in tensors]
+
+    if not num_columns:
+      return []
+    tensors = control_flow_ops.cond(hit, lambda: list(cached), _computed)
+    return [
+        sdca_ops._SparseFeatureColumn(*tensors[3 * i:3 * i + 3])  # pylint: disable=protected-access
+        for i in range(num_columns)
+    ]
+
+  def get_or_compute_indices(self, example_ids, index_dtypes, compute_fn):
+    """Returns the sparse indices of a batch, from the cache if possible.
+
+    Used by `_SDCAModel.minimize` for the unique ids of each sparse weight
+    variable and their partition assignments.
+
+    Args:
+      example_ids: A string vector with the example ids of the batch.
+      index_dtypes: The dtypes of the vectors returned by `compute_fn`.
+      compute_fn: A function without arguments returning a list of vectors.
+        Its ops are only run if the batch is not cached yet.
+
+    Returns:
+      A list of vectors with dtypes `index_dtypes`.
+    """
+    if not index_dtypes:
+      return []
+    example_ids = array_ops.reshape(example_ids, [-1])
+    lookup = script_ops.numpy_function(
+        lambda ids: self._lookup_indices_np(ids, index_dtypes), [example_ids],
+        [dtypes.bool] + list(index_dtypes))
+    hit, cached = lookup[0], lookup[1:]
+    hit.set_shape([])
+    for tensor in cached:
+      tensor.set_shape([None])
+
+    def _computed():
+      indices = compute_fn()
+      insert = script_ops.numpy_function(self._insert_indices_np,
+                                         [example_ids] + indices, dtypes.bool)
+      with ops.control_dependencies([insert]):
+        return [array_ops.identity(index) for index in indices]
+
+    return control_flow_ops.cond(hit, lambda: list(cached), _computed)
+
 
 @estimator_export('estimator.experimental.LinearSDCA')
 class LinearSDCA(object):
@@ -107,6 +345,26 @@ class LinearSDCA(object):
   `num_table_shards` defines the number of shards for the internal state
   table, typically set to match the number of parameter servers for large
   data sets.
+  `table_sharding` defines how examples are assigned to the shards of the
+  internal state table. With `'rendezvous'`, rendezvous hashing keeps skewed
+  example ids balanced, and the table can be restored from a checkpoint written
+  with a different `num_table_shards`. The default, `'mod'`, keeps the layout
+  of existing checkpoints.
+  With `cache_sparse_features=True`, the pruned and deduplicated ids of every
+  categorical column are cached per example id on the first epoch, so later
+  epochs feed them to the optimizer without recomputing them. The unique ids
+  and partition assignments of every batch are cached too, and reused when the
+  same batch of example ids comes back. This assumes the features of an example
+  do not change between epochs. Each model (identified by its model directory
+  and categorical columns) has its own cache, which stops caching new examples
+  once it holds about `sparse_feature_cache_max_bytes`, including its
+  bookkeeping overhead.
+  `example_state_store` optionally replaces the internal state table, which is
+  saved in every checkpoint, with a
+  `tf.estimator.experimental.MemoryMappedExampleStateStore` that persists the
+  per-example state in memory-mapped files and can evict examples that were not
+  seen recently. The store is not restored with the checkpoints; see its
+  documentation for how a rollback to an older checkpoint is handled.
 
   The SDCA algorithm was originally introduced in [1] and it was followed by
   the L1 proximal step [2], a distributed version [3] and adaptive sampling [4].
@@ -124,7 +382,11 @@ class LinearSDCA(object):
                num_table_shards=None,
                symmetric_l1_regularization=0.0,
                symmetric_l2_regularization=1.0,
-               adaptive=False):
+               adaptive=False,
+               example_state_store=None,
+               cache_sparse_features=False,
+               table_sharding='mod',
+               sparse_feature_cache_max_bytes=_SPARSE_FEATURE_CACHE_MAX_BYTES):
     """Construct a new SDCA optimizer for linear estimators.
 
     Args:
@@ -137,7 +399,37 @@ class LinearSDCA(object):
       symmetric_l2_regularization: A float value, must be greater than zero and
         should typically be greater than 1.
       adaptive: A boolean indicating whether to use adaptive sampling.
+      example_state_store: Optional
+        `tf.estimator.experimental.MemoryMappedExampleStateStore` of the
+        per-example state, used instead of the internal state table.
+      cache_sparse_features: A boolean indicating whether to cache the
+        preprocessed sparse features of each example across epochs.
+      table_sharding: How examples are assigned to the shards of the internal
+        state table, either `'mod'` or `'rendezvous'`.
+      sparse_feature_cache_max_bytes: Maximum size of the sparse features
+        cached for each model if `cache_sparse_features` is set.
+
+    Raises:
+      TypeError: If `example_state_store` is not a
+        `MemoryMappedExampleStateStore`.
+      ValueError: If `table_sharding` is not supported, or
+        `sparse_feature_cache_max_bytes` is not positive.
     """
+    if example_state_store is not None and not isinstance(
+        example_state_store,
+        example_state_store_lib.MemoryMappedExampleStateStore):
+      raise TypeError(
+          'example_state_store must be a MemoryMappedExampleStateStore. '
+          'Given: {}'.format(example_state_store))
+    supported_shardings = (sharded_mutable_dense_hashtable.MOD_SHARDING,
+                           sharded_mutable_dense_hashtable.RENDEZVOUS_SHARDING)
+    if table_sharding not in supported_shardings:
+      raise ValueError('table_sharding must be one of {}. Given: {}'.format(
+          supported_shardings, table_sharding))
+    if sparse_feature_cache_max_bytes <= 0:
+      raise ValueError(
+          'sparse_feature_cache_max_bytes must be positive. Given: {}'.format(
+              sparse_feature_cache_max_bytes))
 
     self._example_id_column = example_id_column
     self._num_loss_partitions = num_loss_partitions
@@ -145,6 +437,20 @@ class LinearSDCA(object):
     self._symmetric_l1_regularization = symmetric_l1_regularization
     self._symmetric_l2_regularization = symmetric_l2_regularization
     self._adaptive = adaptive
+    self._example_state_store = example_state_store
+    self._table_sharding = table_sharding
+    self._cache_sparse_features = cache_sparse_features
+    self._sparse_feature_cache_max_bytes = sparse_feature_cache_max_bytes
+    # `_SparseFeatureCache`s by model directory and categorical column names.
+    self._sparse_feature_caches = {}
+
+  def _get_sparse_feature_cache(self, model_dir, sparse_columns):
+    """Returns the `_SparseFeatureCache` of a model, creating it if needed."""
+    key = (model_dir, tuple(column.name for column in sparse_columns))
+    if key not in self._sparse_feature_caches:
+      self._sparse_feature_caches[key] = _SparseFeatureCache(
+          self._sparse_feature_cache_max_bytes)
+    return self._sparse_feature_caches[key]
 
   def _prune_and_unique_sparse_ids(self, id_weight_pair):
     """Remove duplicate and negative ids in a sparse tendor."""
@@ -189,7 +495,8 @@ class LinearSDCA(object):
         example_ids_filtered, reproject_ids, weights)
 
   def get_train_step(self, state_manager, weight_column_name, loss_type,
-                     feature_columns, features, targets, bias_var, global_step):
+                     feature_columns, features, targets, bias_var, global_step,
+                     model_dir=None):
     """Returns the training operation of an SdcaModel optimizer."""
 
     batch_size = array_ops.shape(targets)[0]
@@ -199,12 +506,10 @@ class LinearSDCA(object):
     # and sparse features as well as dense and sparse weights (variables) for
     # SDCA.
     dense_features, dense_feature_weights = [], []
-    sparse_feature_with_values, sparse_feature_with_values_weights = [], []
+    sparse_columns, sparse_feature_with_values_weights = [], []
     for column in sorted(feature_columns, key=lambda x: x.name):
       if isinstance(column, feature_column_lib.CategoricalColumn):
-        id_weight_pair = column.get_sparse_tensors(cache, state_manager)
-        sparse_feature_with_values.append(
-            self._prune_and_unique_sparse_ids(id_weight_pair))
+        sparse_columns.append(column)
         # If a partitioner was used during variable creation, we will have a
         # list of Variables here larger than 1.
         sparse_feature_with_values_weights.append(
@@ -222,6 +527,30 @@ class LinearSDCA(object):
         raise ValueError('LinearSDCA does not support column type %s.' %
                          type(column).__name__)
 
+    # The transformations are built outside of the cond of the sparse feature
+    # cache, as their lookup tables must not be created in a control flow
+    # context.
+    id_weight_pairs = [
+        column.get_sparse_tensors(cache, state_manager)
+        for column in sparse_columns
+    ]
+
+    def _sparse_features():
+      return [
+          self._prune_and_unique_sparse_ids(id_weight_pair)
+          for id_weight_pair in id_weight_pairs
+      ]
+
+    sparse_feature_cache = None
+    if not self._cache_sparse_features:
+      sparse_feature_with_values = _sparse_features()
+    else:
+      sparse_feature_cache = self._get_sparse_feature_cache(
+          model_dir, sparse_columns)
+      sparse_feature_with_values = sparse_feature_cache.get_or_compute(
+          array_ops.reshape(features[self._example_id_column], [-1]),
+          len(sparse_columns), _sparse_features)
+
     # Add the bias column
     dense_features.append(array_ops.ones([batch_size, 1]))
     dense_feature_weights.append(bias_var)
@@ -249,8 +578,19 @@ class LinearSDCA(object):
             adaptive=self._adaptive,
             num_loss_partitions=self._num_loss_partitions,
             num_table_shards=self._num_table_shards,
+            table_sharding=self._table_sharding,
+            example_state_store=self._example_state_store,
+            sparse_indices_cache=sparse_feature_cache,
             loss_type=loss_type))
-    train_op = sdca_model.minimize(global_step=global_step)
+    if self._example_state_store is None:
+      train_op = sdca_model.minimize(global_step=global_step)
+    else:
+      # The store is not restored with the checkpoint, so it checks that
+      # training did not resume from an older step than it was updated at.
+      with ops.control_dependencies([
+          self._example_state_store.check_global_step(global_step)
+      ]):
+        train_op = sdca_model.minimize(global_step=global_step)
     return sdca_model, train_op
 
 
@@ -461,7 +801,8 @@ def linear_logit_fn_builder(units, feature_columns, sparse_combiner='sum'):
   return linear_logit_fn
 
 
-def _sdca_model_fn(features, labels, mode, head, feature_columns, optimizer):
+def _sdca_model_fn(features, labels, mode, head, feature_columns, optimizer,
+                   model_dir=None):
   """A model_fn for linear models that use the SDCA optimizer.
 
   Args:
@@ -473,6 +814,8 @@ def _sdca_model_fn(features, labels, mode, head, feature_columns, optimizer):
     feature_columns: An iterable containing all the feature columns used by
       the model.
     optimizer: a `LinearSDCA` instance.
+    model_dir: The model directory, which identifies the sparse feature cache
+      of the model.
 
   Returns:
     An `EstimatorSpec` instance.
@@ -532,7 +875,8 @@ def _sdca_model_fn(features, labels, mode, head, feature_columns, optimizer):
         features,
         labels,
         linear_model.bias,
-        training.get_global_step())
+        training.get_global_step(),
+        model_dir=model_dir)
 
     update_weights_hook = _SDCAUpdateWeightsHook(sdca_model, train_op)
 
@@ -663,12 +1007,10 @@ def _linear_model_fn_v2(features,
     raise ValueError('features should be a dictionary of `Tensor`s. '
                      'Given type: {}'.format(type(features)))
 
-  del config
-
   if isinstance(optimizer, LinearSDCA):
     assert sparse_combiner == 'sum'
     return _sdca_model_fn(features, labels, mode, head, feature_columns,
-                          optimizer)
+                          optimizer, config.model_dir if config else None)
   else:
     logits, trainable_variables = _linear_model_fn_builder_v2(
         units=head.logits_dimension,
@@ -738,7 +1080,8 @@ def _linear_model_fn(features, labels, mode, head, feature_columns, optimizer,
     if isinstance(optimizer, LinearSDCA):
       assert sparse_combiner == 'sum'
       return _sdca_model_fn(
-          features, labels, mode, head, feature_columns, optimizer)
+          features, labels, mode, head, feature_columns, optimizer,
+          config.model_dir if config else None)
     else:
       logit_fn = linear_logit_fn_builder(
           units=head.logits_dimension, feature_columns=feature_columns,
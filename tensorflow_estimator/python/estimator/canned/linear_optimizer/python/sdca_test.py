@@ -127,6 +127,117 @@ class SDCAClassifierTest(test.TestCase):
     loss = classifier.evaluate(input_fn=input_fn, steps=1)['loss']
     self.assertLess(loss, 0.2)
 
+  def testCachedSparseFeatures(self):
+    """Tests LinearClassifier with LinearSDCA and cached sparse features."""
+
+    def input_fn():
+      return {
+          'example_id':
+              constant_op.constant(['1', '2', '3']),
+          'price':
+              sparse_tensor.SparseTensor(
+                  values=[2., 3., 1.],
+                  indices=[[0, 0], [1, 0], [2, 0]],
+                  dense_shape=[3, 5]),
+          'country':
+              sparse_tensor.SparseTensor(
+                  values=['IT', 'US', 'GB', 'IT'],
+                  indices=[[0, 0], [1, 0], [2, 0], [2, 1]],
+                  dense_shape=[3, 5])
+      }, constant_op.constant([[1], [0], [1]])
+
+    country = feature_column_lib.categorical_column_with_hash_bucket(
+        'country', hash_bucket_size=5)
+    country_weighted_by_price = (
+        feature_column_lib.weighted_categorical_column(country, 'price'))
+    optimizer = linear.LinearSDCA(
+        example_id_column='example_id',
+        symmetric_l2_regularization=0.01,
+        cache_sparse_features=True)
+    classifier = linear.LinearClassifierV2(
+        feature_columns=[country, country_weighted_by_price],
+        optimizer=optimizer)
+    classifier.train(input_fn=input_fn, steps=100)
+    # pylint: disable=protected-access
+    caches = list(optimizer._sparse_feature_caches.values())
+    # pylint: enable=protected-access
+    self.assertEqual(1, len(caches))
+    self.assertEqual(3, caches[0].size())
+    # Every step trains on the same batch, whose sparse indices are cached.
+    self.assertEqual(1, caches[0].num_batches())
+    loss = classifier.evaluate(input_fn=input_fn, steps=1)['loss']
+    self.assertLess(loss, 0.2)
+
+    # Another model sharing the optimizer gets its own cache.
+    other_classifier = linear.LinearClassifierV2(
+        feature_columns=[country], optimizer=optimizer)
+    other_classifier.train(input_fn=input_fn, steps=10)
+    # pylint: disable=protected-access
+    self.assertEqual(2, len(optimizer._sparse_feature_caches))
+    # pylint: enable=protected-access
+
+  def testCachedVocabularyListFeatures(self):
+    """Tests LinearSDCA cached sparse features with a vocabulary lookup."""
+
+    def input_fn():
+      return {
+          'example_id':
+              constant_op.constant(['1', '2', '3']),
+          'country':
+              sparse_tensor.SparseTensor(
+                  values=['IT', 'US', 'GB', 'FR'],
+                  indices=[[0, 0], [1, 0], [2, 0], [2, 1]],
+                  dense_shape=[3, 5])
+      }, constant_op.constant([[1], [0], [1]])
+
+    country = feature_column_lib.categorical_column_with_vocabulary_list(
+        'country', vocabulary_list=['US', 'IT', 'GB'])
+    optimizer = linear.LinearSDCA(
+        example_id_column='example_id',
+        symmetric_l2_regularization=0.01,
+        cache_sparse_features=True)
+    classifier = linear.LinearClassifierV2(
+        feature_columns=[country], optimizer=optimizer)
+    classifier.train(input_fn=input_fn, steps=100)
+    # pylint: disable=protected-access
+    caches = list(optimizer._sparse_feature_caches.values())
+    # pylint: enable=protected-access
+    self.assertEqual(3, caches[0].size())
+    loss = classifier.evaluate(input_fn=input_fn, steps=1)['loss']
+    self.assertLess(loss, 0.2)
+
+  def testSparseFeatureCacheMaxBytes(self):
+    """Tests that the sparse feature cache stops growing at its budget."""
+
+    def input_fn():
+      return {
+          'example_id': constant_op.constant(['1', '2']),
+          'country':
+              sparse_tensor.SparseTensor(
+                  values=['IT', 'US'],
+                  indices=[[0, 0], [1, 0]],
+                  dense_shape=[2, 5])
+      }, constant_op.constant([[1], [0]])
+
+    country = feature_column_lib.categorical_column_with_hash_bucket(
+        'country', hash_bucket_size=5)
+    optimizer = linear.LinearSDCA(
+        example_id_column='example_id',
+        symmetric_l2_regularization=0.01,
+        cache_sparse_features=True,
+        sparse_feature_cache_max_bytes=1)
+    classifier = linear.LinearClassifierV2(
+        feature_columns=[country], optimizer=optimizer)
+    classifier.train(input_fn=input_fn, steps=10)
+    # pylint: disable=protected-access
+    caches = list(optimizer._sparse_feature_caches.values())
+    # pylint: enable=protected-access
+    self.assertEqual(0, caches[0].size())
+    self.assertEqual(0, caches[0].num_batches())
+    with self.assertRaisesRegexp(ValueError, 'sparse_feature_cache_max_bytes'):
+      linear.LinearSDCA(
+          example_id_column='example_id', sparse_feature_cache_max_bytes=0)
+
   def testWeightedSparseFeatures(self):
     """LinearClassifier with LinearSDCA and weighted sparse features."""
 
@@ -659,6 +770,31 @@ class SDCARegressorTest(test.TestCase):
     self.assertNear(regressor.get_variable_value(
         'linear/linear_model/bias_weights')[0], 0.5, err=0.1)
 
+  def testRendezvousTableSharding(self):
+    """Tests LinearRegressor with LinearSDCA and rendezvous table sharding."""
+
+    def input_fn():
+      return {
+          'example_id': constant_op.constant(['0', '1']),
+          'always_zero': constant_op.constant([[0.0]] * 2),
+      }, constant_op.constant([0.0, 1.0])
+
+    always_zero = feature_column_lib.numeric_column('always_zero')
+    optimizer = linear.LinearSDCA(
+        example_id_column='example_id',
+        symmetric_l2_regularization=0.1,
+        num_table_shards=3,
+        table_sharding='rendezvous')
+    regressor = linear.LinearRegressorV2(
+        feature_columns=[always_zero], optimizer=optimizer)
+    regressor.train(input_fn=input_fn, steps=100)
+    self.assertNear(regressor.get_variable_value(
+        'linear/linear_model/bias_weights')[0], 0.5, err=0.1)
+
+  def testInvalidTableSharding(self):
+    with self.assertRaisesRegexp(ValueError, 'table_sharding'):
+      linear.LinearSDCA(example_id_column='example_id', table_sharding='hash')
+
 
 if __name__ == '__main__':
   test.main()
@@ -0,0 +1,480 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Memory-mapped store for the per-example state of the SDCA optimizer."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import threading
+
+import numpy as np
+from six.moves import range
+
+from tensorflow.python.framework import dtypes
+from tensorflow.python.framework import ops
+from tensorflow.python.ops import math_ops
+from tensorflow.python.ops import script_ops
+from tensorflow.python.platform import gfile
+from tensorflow.python.platform import tf_logging as logging
+from tensorflow.python.util.tf_export import estimator_export
+
+# SdcaFprint never returns 0 or 1 for the low64 bits, so these keys never
+# collide with actual example fingerprints.
+_EMPTY_KEY = (0, 0)
+_DELETED_KEY = (1, 1)
+
+# Header fields of a shard.
+_CAPACITY, _SIZE, _NUM_DELETED, _GENERATION = range(4)
+
+_MAX_LOAD_FACTOR = 0.7
+
+
+def _record_dtype(value_dim):
+  return np.dtype([('key', np.int64, (2,)), ('value', np.float32,
+                                              (value_dim,)),
+                   ('generation', np.int64)])
+
+
+def _hash_keys(keys):
+  """Mixes the 128 bit fingerprints into bucket hashes."""
+  with np.errstate(over='ignore'):
+    mixed = keys[:, 0].astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    return mixed ^ keys[:, 1].astype(np.uint64)
+
+
+class _ExampleStateShard(object):
+  """An open-addressing hash table of fixed-width records in a memory map.
+
+  Each record holds a 128 bit example fingerprint, the example state and the
+  generation (number of inserts into the shard) at which the example was last
+  updated. The table lives in a file, so reopening it after a restart only maps
+  the file: records are paged in by the operating system as they are touched,
+  instead of the whole table being restored upfront.
+  """
+
+  def __init__(self, path, value_dim, initial_capacity=1024):
+    self._path = path
+    self._value_dim = value_dim
+    self._record_dtype = _record_dtype(value_dim)
+    self._lock = threading.Lock()
+    header_path = path + '.header'
+    if os.path.exists(path + '.tmp'):
+      # Left by a rehash interrupted before its records were renamed into
+      # place, so the shard is still consistent without it.
+      os.remove(path + '.tmp')
+    if os.path.exists(header_path):
+      self._header = np.memmap(header_path, dtype=np.int64, mode='r+')
+      capacity = os.path.getsize(path) // self._record_dtype.itemsize
+      self._records = np.memmap(
+          path, dtype=self._record_dtype, mode='r+', shape=(capacity,))
+      if int(self._header[_CAPACITY]) != capacity:
+        # A rehash was interrupted after its records were renamed into place,
+        # but before the header was committed.
+        self._recount()
+    else:
+      capacity = 1
+      while capacity < initial_capacity:
+        capacity *= 2
+      self._records = self._create_records(path, capacity)
+      self._header = np.memmap(header_path, dtype=np.int64, mode='w+',
+                               shape=(4,))
+      self._header[_CAPACITY] = capacity
+      self._header.flush()
+
+  def _create_records(self, path, capacity):
+    records = np.memmap(path, dtype=self._record_dtype, mode='w+',
+                        shape=(capacity,))
+    records['key'][:] = _EMPTY_KEY
+    return records
+
+  @property
+  def capacity(self):
+    return self._records.shape[0]
+
+  @property
+  def generation(self):
+    return int(self._header[_GENERATION])
+
+  def size(self):
+    return int(self._header[_SIZE])
+
+  def _probe(self, keys, for_insert):
+    """Returns the slot of each key, or -1 if it is missing.
+
+    When `for_insert` is True, missing keys are assigned the first empty or
+    deleted slot of their probe sequence instead. Distinct keys never share a
+    slot.
+
+    Args:
+      keys: An int64 array of shape `[n, 2]` without duplicates.
+      for_insert: Whether to assign slots to missing keys.
+
+    Returns:
+      An int64 array of shape `[n]`.
+    """
+    mask = np.uint64(self.capacity - 1)
+    positions = (_hash_keys(keys) & mask).astype(np.int64)
+    slots = np.full(keys.shape[0], -1, dtype=np.int64)
+    free_slots = np.full(keys.shape[0], -1, dtype=np.int64)
+    pending = np.arange(keys.shape[0])
+    for _ in range(self.capacity):
+      if not pending.size:
+        break
+      stored = self._records['key'][positions[pending]]
+      found = np.all(stored == keys[pending], axis=1)
+      empty = np.all(stored == _EMPTY_KEY, axis=1)
+      deleted = np.all(stored == _DELETED_KEY, axis=1)
+      slots[pending[found]] = positions[pending[found]]
+      first_free = (empty | deleted) & (free_slots[pending] < 0)
+      free_slots[pending[first_free]] = positions[pending[first_free]]
+      done = found | empty
+      pending_missing = pending[empty]
+      pending = pending[~done]
+      positions[pending] = (positions[pending] + 1) & int(mask)
+      if for_insert and pending_missing.size:
+        self._claim(keys, pending_missing, free_slots, slots)
+    return slots
+
+  def _claim(self, keys, indices, free_slots, slots):
+    """Writes `keys[indices]` into their free slots, resolving conflicts."""
+    stored = self._records['key'][free_slots[indices]]
+    still_free = (np.all(stored == _EMPTY_KEY, axis=1) |
+                  np.all(stored == _DELETED_KEY, axis=1))
+    candidates = indices[still_free]
+    _, winners = np.unique(free_slots[candidates], return_index=True)
+    won = candidates[winners]
+    reused = np.all(
+        self._records['key'][free_slots[won]] == _DELETED_KEY, axis=1)
+    self._header[_NUM_DELETED] -= int(np.sum(reused))
+    self._records['key'][free_slots[won]] = keys[won]
+    slots[won] = free_slots[won]
+    # Keys whose slot was taken by another key of the batch probe again.
+    lost = np.setdiff1d(indices, won, assume_unique=True)
+    if lost.size:
+      slots[lost] = self._probe(keys[lost], for_insert=True)
+
+  def lookup(self, keys, default_value):
+    with self._lock:
+      slots = self._probe(keys, for_insert=False)
+      values = np.tile(np.asarray(default_value, dtype=np.float32),
+                       (keys.shape[0], 1))
+      found = slots >= 0
+      values[found] = self._records['value'][slots[found]]
+      return values
+
+  def insert(self, keys, values):
+    """Inserts or overwrites the records of `keys`."""
+    with self._lock:
+      if keys.shape[0]:
+        # Later occurrences of a key win, as for `MutableDenseHashTable`.
+        _, last = np.unique(keys[::-1], axis=0, return_index=True)
+        last = keys.shape[0] - 1 - last
+        keys, values = keys[last], values[last]
+        self._maybe_grow(keys.shape[0])
+        existing = self._probe(keys, for_insert=False) >= 0
+        slots = self._probe(keys, for_insert=True)
+        self._records['value'][slots] = values
+        self._records['generation'][slots] = self.generation
+        self._header[_SIZE] += int(np.sum(~existing))
+      self._header[_GENERATION] += 1
+
+  def _maybe_grow(self, num_new_keys):
+    used = self.size() + int(self._header[_NUM_DELETED]) + num_new_keys
+    if used <= _MAX_LOAD_FACTOR * self.capacity:
+      return
+    capacity = self.capacity
+    while self.size() + num_new_keys > _MAX_LOAD_FACTOR * capacity / 2:
+      capacity *= 2
+    self._rehash(capacity)
+
+  def _rehash(self, capacity):
+    """Moves all live records into a new table of the given capacity.
+
+    The new records are written to a temporary file, which is renamed into
+    place before the header is updated. If the process dies in between, the
+    capacity of the header no longer matches the records file, and the header
+    is recomputed from the records when the shard is reopened.
+
+    Args:
+      capacity: The new number of records, a power of two.
+    """
+    live = self._live_records()
+    tmp_path = self._path + '.tmp'
+    old_records = self._records
+    # The new table has no deleted records, so probing does not touch the
+    # header.
+    self._records = self._create_records(tmp_path, capacity)
+    slots = self._probe(live['key'], for_insert=True)
+    self._records['value'][slots] = live['value']
+    self._records['generation'][slots] = live['generation']
+    self._records.flush()
+    del old_records
+    os.rename(tmp_path, self._path)
+    self._header[_CAPACITY] = capacity
+    self._header[_SIZE] = live.shape[0]
+    self._header[_NUM_DELETED] = 0
+    self._header.flush()
+
+  def _recount(self):
+    """Recomputes the header from the records."""
+    keys = self._records['key']
+    num_empty = int(np.sum(np.all(keys == _EMPTY_KEY, axis=1)))
+    num_deleted = int(np.sum(np.all(keys == _DELETED_KEY, axis=1)))
+    self._header[_CAPACITY] = self.capacity
+    self._header[_SIZE] = self.capacity - num_empty - num_deleted
+    self._header[_NUM_DELETED] = num_deleted
+    self._header.flush()
+
+  def _live_records(self):
+    keys = self._records['key']
+    live = ~(np.all(keys == _EMPTY_KEY, axis=1) |
+             np.all(keys == _DELETED_KEY, axis=1))
+    return np.array(self._records[live])
+
+  def evict(self, max_age):
+    """Deletes the records not updated in the last `max_age` generations.
+
+    Args:
+      max_age: A non-negative integer.
+
+    Returns:
+      The number of evicted records.
+    """
+    with self._lock:
+      keys = self._records['key']
+      live = ~(np.all(keys == _EMPTY_KEY, axis=1) |
+               np.all(keys == _DELETED_KEY, axis=1))
+      # The last insert was made at generation `self.generation - 1`.
+      stale = live & (
+          self._records['generation'] < self.generation - 1 - max_age)
+      num_evicted = int(np.sum(stale))
+      if num_evicted:
+        self._records['key'][stale] = _DELETED_KEY
+        self._header[_SIZE] -= num_evicted
+        self._header[_NUM_DELETED] += num_evicted
+      return num_evicted
+
+  def export(self):
+    with self._lock:
+      live = self._live_records()
+      return live['key'], live['value']
+
+  def flush(self):
+    with self._lock:
+      self._records.flush()
+      self._header.flush()
+
+  def clear(self):
+    """Deletes all the records."""
+    with self._lock:
+      self._records['key'][:] = _EMPTY_KEY
+      self._header[_SIZE] = 0
+      self._header[_NUM_DELETED] = 0
+
+
+@estimator_export('estimator.experimental.MemoryMappedExampleStateStore')
+class MemoryMappedExampleStateStore(object):
+  """A persistent, evicting replacement for the SDCA example state table.
+
+  It is interface compatible with `_ShardedMutableDenseHashTable` as used by
+  `_SDCAModel`: `lookup`, `insert`, `size` and `export_sharded`. Instead of
+  keeping the state in TensorFlow hash table resources that are saved to and
+  restored from checkpoints, every shard is an `_ExampleStateShard` file in
+  `directory`. The state therefore survives restarts without growing the
+  checkpoint, and reopening a large store does not read it in full.
+
+  The table ops run as `numpy_function`s in the process that runs the train op,
+  so every worker should be given its own `directory` (or the examples should be
+  partitioned so that each worker always sees the same ones).
+
+  If `max_age` is set, examples that were not updated in the last `max_age`
+  inserts into their shard are deleted every `eviction_interval` inserts. An
+  evicted example restarts from a zero dual state the next time it is seen.
+
+  The store is not rolled back when an older checkpoint is restored, so its
+  dual state may then be ahead of the restored weights. `check_global_step`
+  records the global step of every train step, and detects when training
+  resumes from a lower step than the store was last updated at: the mismatch
+  is logged and, if `reset_on_rollback` is set, the store is cleared so that
+  every example restarts from a zero dual state. A few steps are typically
+  lost when a job restarts from its latest checkpoint, so small mismatches are
+  expected.
+  """
+
+  def __init__(self,
+               directory,
+               value_dim=4,
+               num_shards=1,
+               max_age=None,
+               eviction_interval=1000,
+               initial_capacity=1024,
+               reset_on_rollback=False,
+               name='MemoryMappedExampleStateStore'):
+    """Creates or reopens a `MemoryMappedExampleStateStore`.
+
+    Args:
+      directory: Directory holding the shard files. Created if missing.
+      value_dim: Number of float32 values per example.
+      num_shards: Number of shards.
+      max_age: Optional number of inserts after which an example that has not
+        been updated is evicted.
+      eviction_interval: Number of inserts between two eviction passes.
+      initial_capacity: Initial number of records of each shard.
+      reset_on_rollback: Whether to clear the store when training resumes from
+        a lower global step than it was last updated at.
+      name: Name scope of the ops.
+
+    Raises:
+      ValueError: If `max_age` is negative.
+    """
+    if max_age is not None and max_age < 0:
+      raise ValueError('max_age must be non-negative. Given: {}'.format(
+          max_age))
+    gfile.MakeDirs(directory)
+    self._value_dim = value_dim
+    self._default_value = np.zeros([value_dim], dtype=np.float32)
+    self._max_age = max_age
+    self._eviction_interval = eviction_interval
+    self._name = name
+    self._shards = [
+        _ExampleStateShard(
+            os.path.join(directory, 'example_state-%05d-of-%05d' %
+                         (i, num_shards)), value_dim, initial_capacity)
+        for i in range(num_shards)
+    ]
+    self._reset_on_rollback = reset_on_rollback
+    step_path = os.path.join(directory, 'global_step')
+    if os.path.exists(step_path):
+      self._global_step = np.memmap(step_path, dtype=np.int64, mode='r+')
+    else:
+      self._global_step = np.memmap(step_path, dtype=np.int64, mode='w+',
+                                    shape=(1,))
+      self._global_step[0] = -1
+      self._global_step.flush()
+    self._checked_global_step = False
+
+  @property
+  def name(self):
+    return self._name
+
+  @property
+  def shards(self):
+    return self._shards
+
+  def _shard_indices(self, keys):
+    return (keys[:, 0].astype(np.uint64) %
+            np.uint64(len(self._shards))).astype(np.int32)
+
+  def _lookup_np(self, keys):
+    values = np.zeros([keys.shape[0], self._value_dim], dtype=np.float32)
+    shard_indices = self._shard_indices(keys)
+    for i, shard in enumerate(self._shards):
+      in_shard = shard_indices == i
+      values[in_shard] = shard.lookup(keys[in_shard], self._default_value)
+    return values
+
+  def _insert_np(self, keys, values):
+    shard_indices = self._shard_indices(keys)
+    for i, shard in enumerate(self._shards):
+      in_shard = shard_indices == i
+      shard.insert(keys[in_shard], values[in_shard])
+      if (self._max_age is not None and
+          shard.generation % self._eviction_interval == 0):
+        shard.evict(self._max_age)
+    return np.int64(self._size_np())
+
+  def _size_np(self):
+    return np.int64(sum(shard.size() for shard in self._shards))
+
+  def _check_global_step_np(self, global_step):
+    """Records `global_step`, first checking it against the stored step."""
+    last_step = int(self._global_step[0])
+    if not self._checked_global_step and global_step < last_step:
+      logging.warning(
+          'The example state store was last updated at step %d, but training '
+          'resumed from step %d: the dual state is ahead of the restored '
+          'weights.%s', last_step, global_step,
+          ' Clearing the store.' if self._reset_on_rollback else '')
+      if self._reset_on_rollback:
+        for shard in self._shards:
+          shard.clear()
+    self._checked_global_step = True
+    self._global_step[0] = global_step
+    return np.int64(last_step)
+
+  def _check_keys(self, keys):
+    if keys.get_shape().ndims != 2:
+      raise ValueError('Expected a matrix of fingerprints for keys, got %s.' %
+                       keys.get_shape())
+
+  def size(self, name=None):
+    with ops.name_scope(name, '%s_Size' % self._name):
+      size = script_ops.numpy_function(self._size_np, [], dtypes.int64)
+      size.set_shape([])
+      return size
+
+  def lookup(self, keys, name=None):
+    """Looks up `keys`, returning zeros for unknown examples."""
+    self._check_keys(keys)
+    with ops.name_scope(name, '%s_lookup' % self._name, [keys]):
+      values = script_ops.numpy_function(self._lookup_np, [keys],
+                                         dtypes.float32)
+      values.set_shape([keys.get_shape()[0], self._value_dim])
+      return values
+
+  def insert(self, keys, values, name=None):
+    """Inserts `keys` with `values`, evicting stale examples if needed."""
+    self._check_keys(keys)
+    with ops.name_scope(name, '%s_insert' % self._name, [keys, values]):
+      return script_ops.numpy_function(self._insert_np, [keys, values],
+                                       dtypes.int64).op
+
+  def check_global_step(self, global_step, name=None):
+    """Returns an op checking and recording the step of the train step.
+
+    Args:
+      global_step: A scalar int64 `Tensor`, the global step before the update.
+      name: Optional name of the op.
+
+    Returns:
+      An op to run before looking up the examples of the train step.
+    """
+    with ops.name_scope(name, '%s_check_global_step' % self._name,
+                        [global_step]):
+      return script_ops.numpy_function(
+          self._check_global_step_np,
+          [math_ops.cast(global_step, dtypes.int64)], dtypes.int64).op
+
+  def export_sharded(self, name=None):
+    """Returns lists of the keys and values tensors of every shard."""
+    keys_list = []
+    values_list = []
+    with ops.name_scope(name, '%s_export' % self._name):
+      for shard in self._shards:
+        keys, values = script_ops.numpy_function(
+            shard.export, [], [dtypes.int64, dtypes.float32])
+        keys.set_shape([None, 2])
+        values.set_shape([None, self._value_dim])
+        keys_list.append(keys)
+        values_list.append(values)
+    return keys_list, values_list
+
+  def flush(self):
+    """Writes all dirty pages of the store to disk."""
+    for shard in self._shards:
+      shard.flush()
+    self._global_step.flush()
@@ -0,0 +1,175 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for example_state_store.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+from tensorflow.python.framework import constant_op
+from tensorflow.python.framework import dtypes
+from tensorflow.python.framework import test_util
+from tensorflow.python.platform import googletest
+from tensorflow_estimator.python.estimator.canned.linear_optimizer.python.utils.example_state_store import MemoryMappedExampleStateStore
+
+
+class MemoryMappedExampleStateStoreTest(test_util.TensorFlowTestCase):
+  """Tests for the MemoryMappedExampleStateStore class."""
+
+  def testInsertAndLookup(self):
+    for num_shards in [1, 3]:
+      with self.cached_session():
+        store = MemoryMappedExampleStateStore(
+            self.get_temp_dir() + '/insert_%d' % num_shards,
+            value_dim=2,
+            num_shards=num_shards)
+        self.assertAllEqual(0, self.evaluate(store.size()))
+
+        keys = constant_op.constant([[11, 12], [13, 14], [15, 16]],
+                                    dtypes.int64)
+        values = constant_op.constant([[0.5, 0.6], [1.5, 1.6], [2.5, 2.6]],
+                                      dtypes.float32)
+        self.evaluate(store.insert(keys, values))
+        self.assertAllEqual(3, self.evaluate(store.size()))
+
+        output = store.lookup(
+            constant_op.constant([[11, 12], [13, 14], [11, 14]], dtypes.int64))
+        self.assertAllEqual([3, 2], output.get_shape())
+        self.assertAllClose([[0.5, 0.6], [1.5, 1.6], [0., 0.]],
+                            self.evaluate(output))
+
+  def testGrowsAndPersists(self):
+    directory = self.get_temp_dir() + '/persist'
+    rng = np.random.RandomState(0)
+    keys = np.unique(rng.randint(2, 1 << 40, size=(500, 2)), axis=0)
+    values = rng.rand(keys.shape[0], 4).astype(np.float32)
+    with self.cached_session():
+      store = MemoryMappedExampleStateStore(
+          directory, num_shards=2, initial_capacity=4)
+      self.evaluate(store.insert(constant_op.constant(keys),
+                                 constant_op.constant(values)))
+      self.assertAllEqual(keys.shape[0], self.evaluate(store.size()))
+      store.flush()
+
+    with self.cached_session():
+      reopened = MemoryMappedExampleStateStore(directory, num_shards=2)
+      self.assertAllEqual(keys.shape[0], self.evaluate(reopened.size()))
+      self.assertAllClose(
+          values, self.evaluate(reopened.lookup(constant_op.constant(keys))))
+
+  def testEviction(self):
+    with self.cached_session():
+      store = MemoryMappedExampleStateStore(
+          self.get_temp_dir() + '/evict', value_dim=1, max_age=1,
+          eviction_interval=1)
+      for i in range(3):
+        self.evaluate(
+            store.insert(
+                constant_op.constant([[10 + i, 10 + i]], dtypes.int64),
+                constant_op.constant([[i + 1.]])))
+      # The first example was last updated two inserts ago.
+      self.assertAllEqual(2, self.evaluate(store.size()))
+      self.assertAllClose([[0.], [2.], [3.]],
+                          self.evaluate(
+                              store.lookup(
+                                  constant_op.constant(
+                                      [[10, 10], [11, 11], [12, 12]],
+                                      dtypes.int64))))
+
+  def testExportSharded(self):
+    with self.cached_session():
+      store = MemoryMappedExampleStateStore(
+          self.get_temp_dir() + '/export', value_dim=1, num_shards=2)
+      self.evaluate(
+          store.insert(
+              constant_op.constant([[10, 2], [11, 2], [12, 2]], dtypes.int64),
+              constant_op.constant([[2.], [3.], [4.]])))
+      keys_list, values_list = store.export_sharded()
+      self.assertAllEqual(2, len(keys_list))
+      # Unlike the hash table, only live entries are exported.
+      self.assertAllEqual(
+          set([10, 12]), set(self.evaluate(keys_list[0])[:, 0]))
+      self.assertAllEqual(set([11]), set(self.evaluate(keys_list[1])[:, 0]))
+      self.assertAllEqual(
+          set([2., 4.]), set(self.evaluate(values_list[0]).flatten()))
+
+  def testInterruptedRehashIsRecovered(self):
+    directory = self.get_temp_dir() + '/rehash'
+    keys = np.array([[10 + i, 2] for i in range(8)], dtype=np.int64)
+    values = np.arange(8, dtype=np.float32).reshape([8, 1])
+    with self.cached_session():
+      store = MemoryMappedExampleStateStore(
+          directory, value_dim=1, initial_capacity=4)
+      self.evaluate(store.insert(constant_op.constant(keys),
+                                 constant_op.constant(values)))
+      store.flush()
+    # Simulates a crash after the records were renamed into place, but before
+    # the header was committed.
+    header = np.memmap(
+        store.shards[0]._path + '.header',  # pylint: disable=protected-access
+        dtype=np.int64,
+        mode='r+')
+    header[:3] = [4, 0, 0]
+    header.flush()
+    del header
+    with self.cached_session():
+      reopened = MemoryMappedExampleStateStore(directory, value_dim=1)
+      self.assertAllEqual(8, self.evaluate(reopened.size()))
+      self.assertAllClose(
+          values, self.evaluate(reopened.lookup(constant_op.constant(keys))))
+
+  def testExtremeKeys(self):
+    with self.cached_session():
+      store = MemoryMappedExampleStateStore(
+          self.get_temp_dir() + '/extreme', value_dim=1, num_shards=3)
+      keys = constant_op.constant(
+          [[np.iinfo(np.int64).min, 2], [-7, 2], [np.iinfo(np.int64).max, 2]],
+          dtypes.int64)
+      self.evaluate(store.insert(keys, constant_op.constant([[1.], [2.],
+                                                             [3.]])))
+      self.assertAllEqual(3, self.evaluate(store.size()))
+      self.assertAllClose([[1.], [2.], [3.]],
+                          self.evaluate(store.lookup(keys)))
+
+  def testRollbackIsDetected(self):
+    directory = self.get_temp_dir() + '/rollback'
+    keys = constant_op.constant([[10, 2]], dtypes.int64)
+    with self.cached_session():
+      store = MemoryMappedExampleStateStore(directory, value_dim=1)
+      self.evaluate(store.check_global_step(constant_op.constant(5)))
+      self.evaluate(store.insert(keys, constant_op.constant([[1.]])))
+      store.flush()
+
+    with self.cached_session():
+      # Resuming from a later step keeps the state.
+      store = MemoryMappedExampleStateStore(
+          directory, value_dim=1, reset_on_rollback=True)
+      self.evaluate(store.check_global_step(constant_op.constant(6)))
+      self.assertAllEqual(1, self.evaluate(store.size()))
+      store.flush()
+
+    with self.cached_session():
+      # Resuming from an older step clears it.
+      store = MemoryMappedExampleStateStore(
+          directory, value_dim=1, reset_on_rollback=True)
+      self.evaluate(store.check_global_step(constant_op.constant(2)))
+      self.assertAllEqual(0, self.evaluate(store.size()))
+      self.assertAllClose([[0.]], self.evaluate(store.lookup(keys)))
+
+
+if __name__ == '__main__':
+  googletest.main()
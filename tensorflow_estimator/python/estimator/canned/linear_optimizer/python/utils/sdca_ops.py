@@ -40,6 +40,7 @@ from tensorflow.python.ops.nn import log_poisson_loss
 from tensorflow.python.ops.nn import sigmoid_cross_entropy_with_logits
 from tensorflow.python.platform import tf_logging as logging
 from tensorflow.python.summary import summary
+from tensorflow_estimator.python.estimator.canned.linear_optimizer.python.utils import sharded_mutable_dense_hashtable
 from tensorflow_estimator.python.estimator.canned.linear_optimizer.python.utils.sharded_mutable_dense_hashtable import _ShardedMutableDenseHashTable
 
 
@@ -190,6 +191,19 @@ class _SDCAModel(object):
       num_table_shards: 1 (Optional, with default value of 1. Number of shards
       of the internal state table, typically set to match the number of
       parameter servers for large data sets.
+      table_sharding: 'mod' (Optional. How examples are assigned to the shards
+      of the internal state table. With 'rendezvous', rendezvous hashing is
+      used and the table can be restored from a checkpoint written with a
+      different `num_table_shards`.)
+      example_state_store: None (Optional. An object with the `lookup`,
+      `insert`, `size` and `export_sharded` methods of
+      `_ShardedMutableDenseHashTable`, e.g. a `MemoryMappedExampleStateStore`,
+      used instead of the internal state table. `num_table_shards` is ignored
+      when it is set.)
+      sparse_indices_cache: None (Optional. An object with a
+      `get_or_compute_indices(example_ids, dtypes, compute_fn)` method that
+      returns the unique ids and partition assignments of the sparse features
+      of a batch, either cached for its example ids or from `compute_fn`.)
     }
     ```
 
@@ -247,15 +261,24 @@ class _SDCAModel(object):
     self._variables = variables
     self._options = options
     self._create_slots()
-    self._hashtable = _ShardedMutableDenseHashTable(
-        key_dtype=dtypes.int64,
-        value_dtype=dtypes.float32,
-        num_shards=self._num_table_shards(),
-        default_value=[0.0, 0.0, 0.0, 0.0],
-        # SdcaFprint never returns 0 or 1 for the low64 bits, so this a safe
-        # empty_key (that will never collide with actual payloads).
-        empty_key=[0, 0],
-        deleted_key=[1, 1])
+    self._hashtable = self._options.get('example_state_store')
+    if self._hashtable is None:
+      rendezvous = (
+          self._table_sharding() ==
+          sharded_mutable_dense_hashtable.RENDEZVOUS_SHARDING)
+      self._hashtable = _ShardedMutableDenseHashTable(
+          key_dtype=dtypes.int64,
+          value_dtype=dtypes.float32,
+          num_shards=self._num_table_shards(),
+          default_value=[0.0, 0.0, 0.0, 0.0],
+          # SdcaFprint never returns 0 or 1 for the low64 bits, so this a safe
+          # empty_key (that will never collide with actual payloads).
+          empty_key=[0, 0],
+          deleted_key=[1, 1],
+          sharding=self._table_sharding(),
+          reshard_on_restore=rendezvous)
+      summary.scalar('example_state_shard_imbalance',
+                     self._hashtable.shard_imbalance())
 
     summary.scalar('approximate_duality_gap', self.approximate_duality_gap())
     summary.scalar('examples_seen', self._hashtable.size())
@@ -280,6 +303,11 @@ class _SDCAModel(object):
     num_shards = self._options.get('num_table_shards')
     return 1 if num_shards is None else num_shards
 
+  def _table_sharding(self):
+    # Sharding function of the hash table.
+    return self._options.get('table_sharding',
+                             sharded_mutable_dense_hashtable.MOD_SHARDING)
+
   def _create_slots(self):
     """Make unshrunk internal variables (slots)."""
     # Unshrunk variables have the updates before applying L1 regularization.
@@ -462,6 +490,48 @@ class _SDCAModel(object):
       update_ops.append(result)
     return update_ops
 
+  def _partition_assignments(self, w, sparse_idx):
+    """Returns the partition and id within it of each id of a variable."""
+    num_partitions = len(w)
+    flat_ids = array_ops.reshape(sparse_idx, [-1])
+    # We use div partitioning, which is easiest to support downstream.
+    # Compute num_total_ids as the sum of dim-0 of w, then assign
+    # to partitions based on a constant number of ids per partition.
+    # Optimize if we already know the full shape statically.
+    dim_0_size = self._get_first_dimension_size_statically(
+        w, num_partitions)
+
+    if tensor_shape.dimension_value(dim_0_size):
+      num_total_ids = constant_op.constant(
+          tensor_shape.dimension_value(dim_0_size),
+          flat_ids.dtype)
+    else:
+      dim_0_sizes = []
+      for p in range(num_partitions):
+        if tensor_shape.dimension_value(w[p].shape[0]) is not None:
+          dim_0_sizes.append(tensor_shape.dimension_value(w[p].shape[0]))
+        else:
+          with ops.colocate_with(w[p]):
+            dim_0_sizes.append(array_ops.shape(w[p])[0])
+      num_total_ids = math_ops.reduce_sum(
+          math_ops.cast(array_ops.stack(dim_0_sizes), flat_ids.dtype))
+    ids_per_partition = num_total_ids // num_partitions
+    extras = num_total_ids % num_partitions
+
+    p_assignments = math_ops.maximum(
+        flat_ids // (ids_per_partition + 1),
+        (flat_ids - extras) // ids_per_partition)
+
+    # Emulate a conditional using a boolean indicator tensor
+    new_ids = array_ops.where_v2(p_assignments < extras,
+                                 flat_ids % (ids_per_partition + 1),
+                                 (flat_ids - extras) % ids_per_partition)
+
+    # Cast partition assignments to int32 for use in dynamic_partition.
+    # There really should not be more than 2^32 partitions.
+    p_assignments = math_ops.cast(p_assignments, dtypes.int32)
+    return p_assignments, new_ids
+
   def minimize(self, global_step=None, name=None):
     """Add operations to train a linear model by minimizing the loss function.
 
@@ -501,53 +571,42 @@ class _SDCAModel(object):
       num_partitions_by_var = {}
       p_assignments_by_var = {}
       gather_ids_by_var = {}
-      for v_num, (w, i) in enumerate(
-          zip(self._slots['unshrunk_sparse_features_weights'],
-              sparse_feature_indices)):
-        # Append the sparse_indices (in full-variable space).
-        sparse_idx = math_ops.cast(
-            array_ops.unique(math_ops.cast(i, dtypes.int32))[0],
-            dtypes.int64)
+      sparse_weights_vars = self._slots['unshrunk_sparse_features_weights']
+      # The unique ids of each variable, followed by their partition
+      # assignments and ids within the partition if it is partitioned.
+      index_dtypes = []
+      for w in sparse_weights_vars:
+        index_dtypes.append(dtypes.int64)
+        if isinstance(w, list) or isinstance(w, var_ops.PartitionedVariable):
+          index_dtypes.extend([dtypes.int32, dtypes.int64])
+
+      def _compute_indices():
+        indices = []
+        for w, i in zip(sparse_weights_vars, sparse_feature_indices):
+          # Append the sparse_indices (in full-variable space).
+          sparse_idx = math_ops.cast(
+              array_ops.unique(math_ops.cast(i, dtypes.int32))[0],
+              dtypes.int64)
+          indices.append(sparse_idx)
+          if isinstance(w, list) or isinstance(w, var_ops.PartitionedVariable):
+            indices.extend(self._partition_assignments(w, sparse_idx))
+        return indices
+
+      sparse_indices_cache = self._options.get('sparse_indices_cache')
+      if sparse_indices_cache is None:
+        indices = _compute_indices()
+      else:
+        indices = sparse_indices_cache.get_or_compute_indices(
+            self._examples['example_ids'], index_dtypes, _compute_indices)
+      indices = iter(indices)
+
+      for v_num, w in enumerate(sparse_weights_vars):
+        sparse_idx = next(indices)
         sparse_indices.append(sparse_idx)
         if isinstance(w, list) or isinstance(w, var_ops.PartitionedVariable):
           num_partitions = len(w)
-          flat_ids = array_ops.reshape(sparse_idx, [-1])
-          # We use div partitioning, which is easiest to support downstream.
-          # Compute num_total_ids as the sum of dim-0 of w, then assign
-          # to partitions based on a constant number of ids per partition.
-          # Optimize if we already know the full shape statically.
-          dim_0_size = self._get_first_dimension_size_statically(
-              w, num_partitions)
-
-          if tensor_shape.dimension_value(dim_0_size):
-            num_total_ids = constant_op.constant(
-                tensor_shape.dimension_value(dim_0_size),
-                flat_ids.dtype)
-          else:
-            dim_0_sizes = []
-            for p in range(num_partitions):
-              if tensor_shape.dimension_value(w[p].shape[0]) is not None:
-                dim_0_sizes.append(tensor_shape.dimension_value(w[p].shape[0]))
-              else:
-                with ops.colocate_with(w[p]):
-                  dim_0_sizes.append(array_ops.shape(w[p])[0])
-            num_total_ids = math_ops.reduce_sum(
-                math_ops.cast(array_ops.stack(dim_0_sizes), flat_ids.dtype))
-          ids_per_partition = num_total_ids // num_partitions
-          extras = num_total_ids % num_partitions
-
-          p_assignments = math_ops.maximum(
-              flat_ids // (ids_per_partition + 1),
-              (flat_ids - extras) // ids_per_partition)
-
-          # Emulate a conditional using a boolean indicator tensor
-          new_ids = array_ops.where_v2(p_assignments < extras,
-                                       flat_ids % (ids_per_partition + 1),
-                                       (flat_ids - extras) % ids_per_partition)
-
-          # Cast partition assignments to int32 for use in dynamic_partition.
-          # There really should not be more than 2^32 partitions.
-          p_assignments = math_ops.cast(p_assignments, dtypes.int32)
+          p_assignments = next(indices)
+          new_ids = next(indices)
           # Partition list of ids based on assignments into num_partitions
           # separate lists.
           gather_ids = data_flow_ops.dynamic_partition(new_ids,
@@ -239,6 +239,48 @@ class _MutableDenseHashTable(lookup_ops.LookupInterface):
             self.op.resource_handle, restored_tensors[0], restored_tensors[1])
 
 
+# Sharding functions supported by _ShardedMutableDenseHashTable.
+MOD_SHARDING = "mod"
+RENDEZVOUS_SHARDING = "rendezvous"
+
+# Arithmetic for rendezvous hashing is done modulo this Mersenne prime so that
+# products of two residues fit in an int64.
+_RENDEZVOUS_PRIME = 2**31 - 1
+
+# Number of buckets a shard is reset to before re-inserting restored keys.
+_RESTORE_NUM_BUCKETS = 16
+
+
+def _rendezvous_shard_indices(keys, num_shards):
+  """Assigns each key to the shard with the highest rendezvous score.
+
+  The score of a key for shard `i` only depends on the key and on `i`, so when
+  the number of shards changes from `n` to `n + 1` only the keys whose score is
+  highest for the new shard move, about `1 / (n + 1)` of them.
+
+  Args:
+    keys: An int64 vector.
+    num_shards: Number of shards.
+
+  Returns:
+    An int32 vector of shard indices.
+  """
+  residues = math_ops.floormod(keys, _RENDEZVOUS_PRIME)
+  # Per-shard multipliers and offsets, derived from the shard index only.
+  shard_ids = math_ops.range(1, num_shards + 1, dtype=dtypes.int64)
+  multipliers = math_ops.floormod(shard_ids * 0x5bd1e995 + 0x27d4eb2d,
+                                  _RENDEZVOUS_PRIME - 1) + 1
+  offsets = math_ops.floormod(shard_ids * 0x165667b1, _RENDEZVOUS_PRIME)
+  scores = math_ops.floormod(
+      array_ops.expand_dims(residues, 1) * multipliers + offsets,
+      _RENDEZVOUS_PRIME)
+  # A second round mixes the low bits of the key into the whole score.
+  scores = math_ops.floormod(
+      math_ops.floormod(scores * scores, _RENDEZVOUS_PRIME) * multipliers +
+      residues[:, None], _RENDEZVOUS_PRIME)
+  return math_ops.cast(math_ops.argmax(scores, axis=1), dtypes.int32)
+
+
 # TODO(rohanj): This should subclass Checkpointable and implement
 # _gather_saveables_for_checkpoint.
 class _ShardedMutableDenseHashTable(object):
@@ -249,7 +291,15 @@ class _ShardedMutableDenseHashTable(object):
   replaced by an export_sharded method.
 
   The _ShardedMutableDenseHashTable keeps `num_shards` _MutableDenseHashTable
-  internally. The shard is computed via the modulo operation on the key.
+  internally. By default the shard is computed via the modulo operation on the
+  key. With `sharding=RENDEZVOUS_SHARDING` it is chosen by rendezvous hashing,
+  which balances skewed keys better and moves few keys when `num_shards`
+  changes.
+
+  With `reshard_on_restore=True`, the table is checkpointed as a whole instead
+  of shard by shard, and restored keys are re-partitioned among the current
+  shards. This allows restoring a checkpoint written with a different number
+  of shards.
   """
 
   def __init__(self,
@@ -260,10 +310,24 @@ class _ShardedMutableDenseHashTable(object):
                deleted_key,
                num_shards=1,
                checkpoint=True,
-               name="ShardedMutableHashTable"):
+               name="ShardedMutableHashTable",
+               sharding=MOD_SHARDING,
+               reshard_on_restore=False):
+    if sharding not in (MOD_SHARDING, RENDEZVOUS_SHARDING):
+      raise ValueError("Unsupported sharding: %s." % sharding)
     self._key_dtype = key_dtype
     self._value_dtype = value_dtype
+    self._sharding = sharding
     with ops.name_scope(name, "sharded_mutable_hash_table") as scope:
+      # Mod-sharded tables keep checkpointing under `name`. Rendezvous tables
+      # are checkpointed under the uniquified scope, so that two of them
+      # created with the same `name` do not collide. Their shards keep the
+      # last scope component, which is `name` for the first table of a scope.
+      if sharding == RENDEZVOUS_SHARDING:
+        scope_name = scope.rstrip("/") or name
+        shard_name = scope_name.split("/")[-1]
+      else:
+        scope_name = shard_name = name
       table_shards = []
       for i in range(num_shards):
         self._table_name = scope
@@ -274,13 +338,17 @@ class _ShardedMutableDenseHashTable(object):
                 default_value=default_value,
                 empty_key=empty_key,
                 deleted_key=deleted_key,
-                checkpoint=checkpoint,
-                name="%s-%d-of-%d" % (name, i + 1, num_shards)))
+                checkpoint=checkpoint and not reshard_on_restore,
+                name="%s-%d-of-%d" % (shard_name, i + 1, num_shards)))
       self._table_shards = table_shards
       # TODO(andreasst): add a value_shape() method to LookupInterface
       # pylint: disable=protected-access
       self._value_shape = self._table_shards[0]._value_shape
       # pylint: enable=protected-access
+    if checkpoint and reshard_on_restore and not context.executing_eagerly():
+      ops.add_to_collection(ops.GraphKeys.SAVEABLE_OBJECTS,
+                            _ShardedMutableDenseHashTable._Saveable(
+                                self, scope_name))
 
   @property
   def name(self):
@@ -294,6 +362,12 @@ class _ShardedMutableDenseHashTable(object):
   def table_shards(self):
     return self._table_shards
 
+  def shard_sizes(self, name=None):
+    """Returns an int64 vector with the number of elements in each shard."""
+    with ops.name_scope(name, "sharded_mutable_hash_table_shard_sizes"):
+      return array_ops.stack(
+          [table_shard.size() for table_shard in self._table_shards])
+
   def size(self, name=None):
     with ops.name_scope(name, "sharded_mutable_hash_table_size"):
       sizes = [
@@ -301,15 +375,44 @@ class _ShardedMutableDenseHashTable(object):
       ]
       return math_ops.add_n(sizes)
 
+  def shard_imbalance(self, name=None):
+    """Returns the ratio between the largest and the mean shard size.
+
+    A perfectly balanced table has an imbalance of 1. The imbalance of an empty
+    table is defined to be 1 as well.
+
+    Args:
+      name: A name for the operation (optional).
+
+    Returns:
+      A float32 scalar.
+    """
+    with ops.name_scope(name, "sharded_mutable_hash_table_shard_imbalance"):
+      sizes = math_ops.cast(self.shard_sizes(), dtypes.float32)
+      mean_size = math_ops.reduce_mean(sizes)
+      return array_ops.where_v2(
+          mean_size > 0,
+          math_ops.reduce_max(sizes) / math_ops.maximum(mean_size, 1.),
+          1.)
+
   def _shard_indices(self, keys):
     key_shape = keys.get_shape()
     if key_shape.ndims > 1:
       # If keys are a matrix (i.e. a single key is a vector), we use the first
       # element of each key vector to determine the shard.
       keys = array_ops.reshape(array_ops.slice(keys, [0, 0], [-1, 1]), [-1])
+    if self._sharding == RENDEZVOUS_SHARDING:
+      return _rendezvous_shard_indices(
+          math_ops.cast(keys, dtypes.int64), self._num_shards)
     indices = math_ops.mod(math_ops.abs(keys), self._num_shards)
     return math_ops.cast(indices, dtypes.int32)
 
+  def _partition_indices(self, keys):
+    """Returns the positions of `keys` belonging to each shard."""
+    return data_flow_ops.dynamic_partition(
+        math_ops.range(array_ops.shape(keys)[0]), self._shard_indices(keys),
+        self._num_shards)
+
   def _check_keys(self, keys):
     if keys.get_shape().ndims != 1 and keys.get_shape().ndims != 2:
       raise ValueError("Expected a vector or matrix for keys, got %s." %
@@ -325,19 +428,14 @@ class _ShardedMutableDenseHashTable(object):
     if num_shards == 1:
       return self._table_shards[0].lookup(keys, name=name)
 
-    shard_indices = self._shard_indices(keys)
-    key_shards = data_flow_ops.dynamic_partition(keys, shard_indices,
-                                                 num_shards)
+    # A single partition of the key positions drives both the per-shard
+    # gathers and the final stitch.
+    partitioned_indices = self._partition_indices(keys)
     value_shards = [
-        self._table_shards[i].lookup(key_shards[i], name=name)
+        self._table_shards[i].lookup(
+            array_ops.gather(keys, partitioned_indices[i]), name=name)
         for i in range(num_shards)
     ]
-
-    num_keys = array_ops.shape(keys)[0]
-    original_indices = math_ops.range(num_keys)
-    partitioned_indices = data_flow_ops.dynamic_partition(original_indices,
-                                                          shard_indices,
-                                                          num_shards)
     return data_flow_ops.dynamic_stitch(partitioned_indices, value_shards)
 
   def insert(self, keys, values, name=None):
@@ -347,14 +445,12 @@ class _ShardedMutableDenseHashTable(object):
     if num_shards == 1:
       return self._table_shards[0].insert(keys, values, name=name)
 
-    shard_indices = self._shard_indices(keys)
-    key_shards = data_flow_ops.dynamic_partition(keys, shard_indices,
-                                                 num_shards)
-    value_shards = data_flow_ops.dynamic_partition(values, shard_indices,
-                                                   num_shards)
+    partitioned_indices = self._partition_indices(keys)
     return_values = [
-        self._table_shards[i].insert(key_shards[i], value_shards[i], name=name)
-        for i in range(num_shards)
+        self._table_shards[i].insert(
+            array_ops.gather(keys, partitioned_indices[i]),
+            array_ops.gather(values, partitioned_indices[i]),
+            name=name) for i in range(num_shards)
     ]
 
     return control_flow_ops.group(*return_values)
@@ -376,3 +472,73 @@ class _ShardedMutableDenseHashTable(object):
       keys_list.append(exported_keys)
       values_list.append(exported_values)
     return keys_list, values_list
+
+  def _restore(self, keys, values):
+    """Replaces the content of all shards with the given keys and values.
+
+    `keys` may come from a table with a different number of shards, and may
+    contain the empty and deleted keys of its buckets, which are dropped.
+
+    Args:
+      keys: Restored keys.
+      values: Restored values.
+
+    Returns:
+      The restore op.
+    """
+    # pylint: disable=protected-access
+    table_shard = self._table_shards[0]
+    empty_key = table_shard._empty_key
+    deleted_key = table_shard._deleted_key
+    is_empty = math_ops.equal(keys, empty_key)
+    is_deleted = math_ops.equal(keys, deleted_key)
+    if keys.get_shape().ndims > 1:
+      is_empty = math_ops.reduce_all(is_empty, axis=1)
+      is_deleted = math_ops.reduce_all(is_deleted, axis=1)
+    is_live = math_ops.logical_not(math_ops.logical_or(is_empty, is_deleted))
+    keys = array_ops.boolean_mask(keys, is_live)
+    values = array_ops.boolean_mask(values, is_live)
+
+    partitioned_indices = self._partition_indices(keys)
+    restore_ops = []
+    for i, table_shard in enumerate(self._table_shards):
+      with ops.colocate_with(table_shard.resource_handle):
+        # Importing buckets that are all empty clears the shard.
+        empty_buckets = array_ops.broadcast_to(
+            empty_key,
+            array_ops.concat(
+                [[_RESTORE_NUM_BUCKETS], array_ops.shape(empty_key)], 0))
+        empty_values = array_ops.broadcast_to(
+            table_shard._default_value,
+            array_ops.concat([[_RESTORE_NUM_BUCKETS],
+                              array_ops.shape(table_shard._default_value)],
+                             0))
+        clear_op = gen_lookup_ops.lookup_table_import_v2(
+            table_shard.resource_handle, empty_buckets, empty_values)
+        with ops.control_dependencies([clear_op]):
+          restore_ops.append(
+              table_shard.insert(
+                  array_ops.gather(keys, partitioned_indices[i]),
+                  array_ops.gather(values, partitioned_indices[i])))
+    # pylint: enable=protected-access
+    return control_flow_ops.group(*restore_ops)
+
+  class _Saveable(BaseSaverBuilder.SaveableObject):
+    """SaveableObject saving a _ShardedMutableDenseHashTable as a whole."""
+
+    def __init__(self, table, name):
+      keys_list, values_list = table.export_sharded()
+      specs = [
+          BaseSaverBuilder.SaveSpec(
+              array_ops.concat(keys_list, 0), "", name + "-keys"),
+          BaseSaverBuilder.SaveSpec(
+              array_ops.concat(values_list, 0), "", name + "-values")
+      ]
+      # pylint: disable=protected-access
+      super(_ShardedMutableDenseHashTable._Saveable, self).__init__(
+          table, specs, name)
+
+    def restore(self, restored_tensors, restored_shapes):
+      del restored_shapes  # unused
+      # pylint: disable=protected-access
+      return self.op._restore(restored_tensors[0], restored_tensors[1])
@@ -18,11 +18,17 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import numpy as np
+
 from tensorflow.python.eager import context
 from tensorflow.python.framework import constant_op
 from tensorflow.python.framework import dtypes
+from tensorflow.python.framework import ops
 from tensorflow.python.framework import test_util
+from tensorflow.python.ops import math_ops
 from tensorflow.python.platform import googletest
+from tensorflow.python.training import saver as saver_lib
+from tensorflow_estimator.python.estimator.canned.linear_optimizer.python.utils import sharded_mutable_dense_hashtable
 from tensorflow_estimator.python.estimator.canned.linear_optimizer.python.utils.sharded_mutable_dense_hashtable import _ShardedMutableDenseHashTable
 
 
@@ -118,6 +124,122 @@ class _ShardedMutableDenseHashTableTest(test_util.TensorFlowTestCase):
       self.assertAllEqual(
           set([0, 3]), set(self.evaluate(values_list[1]).flatten()))
 
+  def testRendezvousSharding(self):
+    for num_shards in [1, 3, 10]:
+      with self.cached_session():
+        table = _ShardedMutableDenseHashTable(
+            dtypes.int64,
+            dtypes.int64,
+            -1,
+            0,
+            -1,
+            num_shards=num_shards,
+            sharding=sharded_mutable_dense_hashtable.RENDEZVOUS_SHARDING)
+        keys = math_ops.range(1, 3001, dtype=dtypes.int64) * num_shards
+        self.evaluate(table.insert(keys, keys * 2))
+        self.assertAllEqual(3000, self.evaluate(table.size()))
+        shard_sizes = self.evaluate(table.shard_sizes())
+        self.assertAllEqual([num_shards], shard_sizes.shape)
+        # Keys that are all multiples of num_shards still spread evenly.
+        self.assertLess(self.evaluate(table.shard_imbalance()), 1.2)
+        self.assertAllEqual(
+            [2 * num_shards, 6 * num_shards, -1],
+            self.evaluate(
+                table.lookup(
+                    constant_op.constant(
+                        [num_shards, 3 * num_shards, 3001 * num_shards],
+                        dtypes.int64))))
+
+  def testRendezvousShardingMovesFewKeys(self):
+    with self.cached_session():
+      keys = math_ops.range(10000, dtype=dtypes.int64)
+      before = sharded_mutable_dense_hashtable._rendezvous_shard_indices(
+          keys, 4)
+      after = sharded_mutable_dense_hashtable._rendezvous_shard_indices(
+          keys, 5)
+      before, after = self.evaluate([before, after])
+      moved = before != after
+      self.assertNear(0.2, np.mean(moved), 0.03)
+      # Keys only ever move to the new shard.
+      self.assertAllEqual([4], np.unique(after[moved]))
+
+  @test_util.run_deprecated_v1
+  def testReshardOnRestore(self):
+    save_path = self.get_temp_dir() + '/reshard'
+    keys = constant_op.constant([[11, 12], [13, 14], [15, 16]], dtypes.int64)
+    values = constant_op.constant([[0.5], [1.5], [2.5]], dtypes.float32)
+    for num_shards in [3, 2]:
+      with ops.Graph().as_default(), self.session() as sess:
+        table = _ShardedMutableDenseHashTable(
+            dtypes.int64,
+            dtypes.float32, [-1.],
+            empty_key=[0, 0],
+            deleted_key=[1, 1],
+            num_shards=num_shards,
+            name='table',
+            sharding=sharded_mutable_dense_hashtable.RENDEZVOUS_SHARDING,
+            reshard_on_restore=True)
+        saver = saver_lib.Saver()
+        if num_shards == 3:
+          sess.run(table.insert(keys, values))
+          saver.save(sess, save_path)
+        else:
+          saver.restore(sess, save_path)
+          self.assertAllEqual(3, sess.run(table.size()))
+          self.assertAllClose([[0.5], [1.5], [2.5]],
+                              sess.run(table.lookup(keys)))
+
+  @test_util.run_deprecated_v1
+  def testModShardedTablesKeepNames(self):
+    with ops.Graph().as_default():
+      for _ in range(2):
+        _ShardedMutableDenseHashTable(
+            dtypes.int64,
+            dtypes.float32, [-1.],
+            empty_key=[0, 0],
+            deleted_key=[1, 1],
+            num_shards=2,
+            name='table')
+      saveable_names = [
+          saveable.name
+          for saveable in ops.get_collection(ops.GraphKeys.SAVEABLE_OBJECTS)
+      ]
+    # Mod-sharded tables are checkpointed under `name`, as they always were.
+    self.assertEqual(['table-1-of-2', 'table-2-of-2'] * 2, saveable_names)
+
+  @test_util.run_deprecated_v1
+  def testRendezvousTablesWithSameNameSaveSeparately(self):
+    save_path = self.get_temp_dir() + '/same_name'
+    keys = constant_op.constant([[11, 12], [13, 14]], dtypes.int64)
+    sharding = sharded_mutable_dense_hashtable.RENDEZVOUS_SHARDING
+    for reshard_on_restore in [False, True]:
+      for restore in [False, True]:
+        with ops.Graph().as_default(), self.session() as sess:
+          tables = [
+              _ShardedMutableDenseHashTable(
+                  dtypes.int64,
+                  dtypes.float32, [-1.],
+                  empty_key=[0, 0],
+                  deleted_key=[1, 1],
+                  num_shards=2,
+                  name='table',
+                  sharding=sharding,
+                  reshard_on_restore=reshard_on_restore) for _ in range(2)
+          ]
+          saver = saver_lib.Saver()
+          if not restore:
+            sess.run([
+                tables[0].insert(keys, [[0.5], [1.5]]),
+                tables[1].insert(keys, [[2.5], [3.5]])
+            ])
+            saver.save(sess, save_path)
+          else:
+            saver.restore(sess, save_path)
+            self.assertAllClose([[0.5], [1.5]],
+                                sess.run(tables[0].lookup(keys)))
+            self.assertAllClose([[2.5], [3.5]],
+                                sess.run(tables[1].lookup(keys)))
+
 
 if __name__ == '__main__':
   googletest.main()
@@ -38,6 +38,17 @@ class MetricKeys(object):
   LABEL_MEAN = 'label/mean'
   PREDICTION_MEAN = 'prediction/mean'
 
+  # The following are computed from a `ScoreSketch` of the predictions.
+  AUC_SKETCH = 'auc_sketch'
+  AUC_SKETCH_ERROR_BOUND = 'auc_sketch/error_bound'
+  LOG_LOSS = 'log_loss'
+  CALIBRATION = 'calibration'
+  # Per calibration bucket curves, with one value per bucket.
+  CALIBRATION_MEAN_PREDICTION = 'calibration_curve/mean_prediction'
+  CALIBRATION_MEAN_LABEL = 'calibration_curve/mean_label'
+  CALIBRATION_WEIGHT = 'calibration_curve/weight'
+  CALIBRATION_LOG_LOSS = 'calibration_curve/log_loss'
+
   # The following require a threshold applied, should be float in range (0, 1).
   ACCURACY_AT_THRESHOLD = 'accuracy/positive_threshold_%g'
   PRECISION_AT_THRESHOLD = 'precision/positive_threshold_%g'
@@ -0,0 +1,120 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Mixed precision utilities for canned estimators.
+
+Canned estimators given a reduced `compute_dtype` cast the output of their
+input layer to it, run their hidden layers in it, and cast back to float32
+before the logits layer. Hidden layers use the 'infer_float32_vars' Keras
+policy, so variables, optimizer slots and checkpoints stay in float32 and are
+cast to `compute_dtype` when read.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from tensorflow.python.framework import dtypes
+from tensorflow.python.framework import ops
+from tensorflow.python.keras.mixed_precision.experimental import loss_scale_optimizer
+from tensorflow.python.keras.mixed_precision.experimental import policy
+
+_COMPUTE_DTYPES = (dtypes.float32, dtypes.bfloat16, dtypes.float16)
+# Arguments of `tf.keras.optimizers.Optimizer` which clip gradients.
+_CLIP_ARGS = ('clipnorm', 'clipvalue', 'global_clipnorm')
+
+
+def get_compute_dtype(compute_dtype):
+  """Returns `compute_dtype` as a `DType`, float32 if it is `None`.
+
+  Args:
+    compute_dtype: `None`, or a `DType` or string naming one of float32,
+      bfloat16 or float16.
+
+  Returns:
+    A `DType`.
+
+  Raises:
+    ValueError: If `compute_dtype` is not supported.
+  """
+  if compute_dtype is None:
+    return dtypes.float32
+  compute_dtype = dtypes.as_dtype(compute_dtype)
+  if compute_dtype not in _COMPUTE_DTYPES:
+    raise ValueError('compute_dtype must be one of {}. Given: {}'.format(
+        [dtype.name for dtype in _COMPUTE_DTYPES], compute_dtype.name))
+  return compute_dtype
+
+
+def layer_dtype(compute_dtype):
+  """Returns the `dtype` argument of layers computing in `compute_dtype`.
+
+  Args:
+    compute_dtype: A `DType` returned by `get_compute_dtype`.
+
+  Returns:
+    `None` for float32, which keeps the default policy of Keras layers.
+    Otherwise a policy inferring the computation dtype from the inputs while
+    keeping float32 variables.
+  """
+  if compute_dtype == dtypes.float32:
+    return None
+  return policy.Policy('infer_float32_vars')
+
+
+def policy_scope(compute_dtype):
+  """Returns a scope in which new Keras layers compute in `compute_dtype`.
+
+  Used for layers creating sublayers without a `dtype`, such as RNN layers and
+  their cells.
+
+  Args:
+    compute_dtype: A `DType` returned by `get_compute_dtype`.
+
+  Returns:
+    A context manager.
+  """
+  dtype = layer_dtype(compute_dtype)
+  if dtype is None:
+    return ops.NullContextmanager()
+  return policy.policy_scope(dtype)
+
+
+def scale_loss(optimizer, compute_dtype):
+  """Adds dynamic loss scaling to `optimizer` for float16 computations.
+
+  float16 gradients underflow without loss scaling. bfloat16 has the exponent
+  range of float32 and float32 computations need none, so `optimizer` is
+  returned as is for them.
+
+  Args:
+    optimizer: A `tf.keras.optimizers.Optimizer` instance. Its `iterations`
+      should already be set, since the wrapped optimizer increments them.
+    compute_dtype: A `DType` returned by `get_compute_dtype`.
+
+  Returns:
+    A `tf.keras.optimizers.Optimizer` instance.
+
+  Raises:
+    ValueError: If float16 is used with an optimizer which clips gradients.
+  """
+  if compute_dtype != dtypes.float16:
+    return optimizer
+  for clip_arg in _CLIP_ARGS:
+    if getattr(optimizer, clip_arg, None) is not None:
+      raise ValueError(
+          'Loss scaling for float16 does not support gradient clipping. '
+          'Given optimizer with {}={}'.format(clip_arg,
+                                              getattr(optimizer, clip_arg)))
+  return loss_scale_optimizer.LossScaleOptimizer(optimizer, 'dynamic')
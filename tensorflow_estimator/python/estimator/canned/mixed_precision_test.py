@@ -0,0 +1,191 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for mixed_precision.py and the canned estimators using it."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from tensorflow.python.feature_column import feature_column_v2
+from tensorflow.python.framework import dtypes
+from tensorflow.python.framework import ops
+from tensorflow.python.framework import sparse_tensor
+from tensorflow.python.keras.mixed_precision.experimental import loss_scale_optimizer
+from tensorflow.python.keras.optimizer_v2 import gradient_descent
+from tensorflow.python.ops import variables
+from tensorflow.python.platform import benchmark
+from tensorflow.python.platform import test
+from tensorflow.python.training import checkpoint_utils
+from tensorflow_estimator.python.estimator.canned import dnn
+from tensorflow_estimator.python.estimator.canned import dnn_linear_combined
+from tensorflow_estimator.python.estimator.canned import mixed_precision
+from tensorflow_estimator.python.estimator.canned import rnn
+from tensorflow_estimator.python.estimator.inputs import numpy_io
+from tensorflow_estimator.python.estimator.mode_keys import ModeKeys
+
+
+def _regression_input_fn(batch_size, num_epochs=None, shuffle=True):
+  """Returns a `numpy_input_fn` learning y = sum(x)."""
+  data = np.random.RandomState(0).uniform(
+      size=(batch_size * 8, 10)).astype(np.float32)
+  return numpy_io.numpy_input_fn(
+      x={'x': data},
+      y=np.sum(data, axis=1, keepdims=True),
+      batch_size=batch_size,
+      num_epochs=num_epochs,
+      shuffle=shuffle)
+
+
+class MixedPrecisionTest(test.TestCase):
+
+  def test_get_compute_dtype(self):
+    self.assertEqual(dtypes.float32, mixed_precision.get_compute_dtype(None))
+    self.assertEqual(dtypes.bfloat16,
+                     mixed_precision.get_compute_dtype('bfloat16'))
+    self.assertEqual(dtypes.float16,
+                     mixed_precision.get_compute_dtype(dtypes.float16))
+    with self.assertRaisesRegexp(ValueError, 'compute_dtype must be one of'):
+      mixed_precision.get_compute_dtype(dtypes.float64)
+
+  def test_layer_dtype(self):
+    self.assertIsNone(mixed_precision.layer_dtype(dtypes.float32))
+    self.assertEqual(
+        'infer_float32_vars',
+        mixed_precision.layer_dtype(dtypes.bfloat16).name)
+
+  def test_scale_loss(self):
+    optimizer = gradient_descent.SGD()
+    self.assertIs(optimizer,
+                  mixed_precision.scale_loss(optimizer, dtypes.bfloat16))
+    self.assertIsInstance(
+        mixed_precision.scale_loss(optimizer, dtypes.float16),
+        loss_scale_optimizer.LossScaleOptimizer)
+
+  def test_scale_loss_with_clipping(self):
+    for clip_arg in ('clipnorm', 'clipvalue'):
+      optimizer = gradient_descent.SGD(**{clip_arg: 1.})
+      self.assertIs(optimizer,
+                    mixed_precision.scale_loss(optimizer, dtypes.bfloat16))
+      with self.assertRaisesRegexp(ValueError,
+                                   'does not support gradient clipping'):
+        mixed_precision.scale_loss(optimizer, dtypes.float16)
+
+
+class MixedPrecisionEstimatorTest(test.TestCase):
+
+  def setUp(self):
+    self._model_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self._model_dir, ignore_errors=True)
+
+  def test_dnn_checkpoint_stays_float32(self):
+    regressor = dnn.DNNRegressorV2(
+        hidden_units=(4, 4),
+        feature_columns=[feature_column_v2.numeric_column('x', shape=(10,))],
+        model_dir=self._model_dir,
+        compute_dtype=dtypes.float16)
+    regressor.train(_regression_input_fn(batch_size=8), steps=5)
+    loss = regressor.evaluate(
+        _regression_input_fn(batch_size=8, num_epochs=1, shuffle=False))['loss']
+    self.assertTrue(np.isfinite(loss))
+    dtype_map = checkpoint_utils.load_checkpoint(
+        self._model_dir).get_variable_to_dtype_map()
+    for name, dtype in dtype_map.items():
+      if name.startswith('dnn/'):
+        self.assertEqual(dtypes.float32, dtype, name)
+
+  def test_dnn_linear_combined_shared_transformations_float16(self):
+    ids = feature_column_v2.categorical_column_with_identity('ids', 5)
+    with ops.Graph().as_default():
+      with self.assertRaisesRegexp(ValueError, 'does not support a float16'):
+        dnn_linear_combined._dnn_linear_combined_model_fn_v2(  # pylint: disable=protected-access
+            features={'ids': sparse_tensor.SparseTensor(
+                indices=[[0, 0]], values=[1], dense_shape=[1, 1])},
+            labels=None,
+            mode=ModeKeys.TRAIN,
+            head=None,
+            linear_feature_columns=[ids],
+            dnn_feature_columns=[feature_column_v2.embedding_column(ids, 2)],
+            dnn_hidden_units=[2],
+            share_input_transformations=True,
+            dnn_compute_dtype=dtypes.float16)
+
+  def test_rnn_variables_stay_float32(self):
+    estimator = rnn.RNNClassifier(
+        sequence_feature_columns=[
+            feature_column_v2.sequence_numeric_column('price', shape=(1,))],
+        units=[4],
+        cell_type='simple_rnn',
+        compute_dtype=dtypes.bfloat16)
+    features = {
+        'price': sparse_tensor.SparseTensor(
+            values=[10., 5., 2.],
+            indices=[[0, 0], [0, 1], [1, 0]],
+            dense_shape=[2, 2]),
+    }
+    with ops.Graph().as_default():
+      spec = estimator.model_fn(
+          features=features, labels=[[1], [0]], mode=ModeKeys.TRAIN,
+          config=None)
+      self.assertEqual(dtypes.float32, spec.loss.dtype)
+      for variable in variables.trainable_variables():
+        self.assertEqual(dtypes.float32, variable.dtype.base_dtype,
+                         variable.name)
+
+
+class DNNMixedPrecisionBenchmark(benchmark.Benchmark):
+  """Benchmarks the training throughput and loss of `DNNRegressorV2`."""
+
+  def _train(self, compute_dtype, batch_size=512, num_steps=200):
+    model_dir = tempfile.mkdtemp()
+    try:
+      regressor = dnn.DNNRegressorV2(
+          hidden_units=(1024, 1024, 1024),
+          feature_columns=[feature_column_v2.numeric_column('x', shape=(10,))],
+          model_dir=model_dir,
+          compute_dtype=compute_dtype)
+      # The first steps include graph construction and initialization.
+      regressor.train(_regression_input_fn(batch_size), steps=10)
+      start = time.time()
+      regressor.train(_regression_input_fn(batch_size), steps=num_steps)
+      wall_time = (time.time() - start) / num_steps
+      loss = regressor.evaluate(
+          _regression_input_fn(batch_size, num_epochs=1, shuffle=False))['loss']
+    finally:
+      shutil.rmtree(model_dir, ignore_errors=True)
+    self.report_benchmark(
+        iters=num_steps,
+        wall_time=wall_time,
+        extras={'examples_per_sec': batch_size / wall_time, 'loss': loss})
+
+  def benchmark_train_float32(self):
+    self._train(dtypes.float32)
+
+  def benchmark_train_bfloat16(self):
+    self._train(dtypes.bfloat16)
+
+  def benchmark_train_float16(self):
+    self._train(dtypes.float16)
+
+
+if __name__ == '__main__':
+  test.main()
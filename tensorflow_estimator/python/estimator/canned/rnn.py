@@ -22,6 +22,7 @@ import six
 
 from tensorflow.python.feature_column import dense_features
 from tensorflow.python.feature_column import feature_column_lib as fc
+from tensorflow.python.framework import dtypes
 from tensorflow.python.framework import ops
 from tensorflow.python.keras import activations
 from tensorflow.python.keras import layers as keras_layers
@@ -29,12 +30,15 @@ from tensorflow.python.keras import models
 from tensorflow.python.keras.layers import recurrent_v2
 from tensorflow.python.keras.utils import losses_utils
 from tensorflow.python.ops import array_ops
+from tensorflow.python.ops import check_ops
+from tensorflow.python.ops import math_ops
 from tensorflow.python.platform import tf_logging as logging
 from tensorflow.python.summary import summary
 from tensorflow.python.training import training_util
 from tensorflow.python.util.tf_export import estimator_export
 from tensorflow_estimator.python.estimator import estimator
 from tensorflow_estimator.python.estimator import model_fn
+from tensorflow_estimator.python.estimator.canned import mixed_precision
 from tensorflow_estimator.python.estimator.canned import optimizers
 from tensorflow_estimator.python.estimator.head import binary_class_head as binary_head_lib
 from tensorflow_estimator.python.estimator.head import multi_class_head as multi_head_lib
@@ -140,6 +144,8 @@ class RNNModel(models.Model):
       context_feature_columns=None,
       activation=None,
       return_sequences=False,
+      packed_logits=False,
+      compute_dtype=None,
       **kwargs):
     """Initializes a RNNModel instance.
 
@@ -162,16 +168,34 @@ class RNNModel(models.Model):
         activation is applied.
       return_sequences: A boolean indicating whether to return the last output
         in the output sequence, or the full sequence.
+      packed_logits: A boolean indicating whether to only return the logits
+        of steps that are not padding, as a `Tensor` of shape
+        (num_steps, logits_size), along with the sequence mask they were
+        packed with. The RNN still runs over the padded sequences, but the
+        logit layer is only applied to those steps, and the logits can be
+        passed as is to a `SequentialHeadWrapper` with `packed_logits=True`.
+        Requires `return_sequences`.
+      compute_dtype: The dtype `rnn_layer` computes in, one of `tf.float32`,
+        `tf.bfloat16` or `tf.float16`. Its input is cast to it and its output
+        cast back to float32 for the logit layer. For reduced precisions,
+        `rnn_layer` should be created with an 'infer_float32_vars' policy to keep
+        its variables in float32. Defaults to float32.
       **kwargs: Additional arguments.
 
     Raises:
       ValueError: If `units` is not an int.
+      ValueError: If `packed_logits` is set without `return_sequences`.
     """
     super(RNNModel, self).__init__(**kwargs)
     if not isinstance(units, int):
       raise ValueError('units must be an int.  Given type: {}'.format(
           type(units)))
+    if packed_logits and not return_sequences:
+      raise ValueError(
+          '`packed_logits` requires `return_sequences` to be set to True.')
     self._return_sequences = return_sequences
+    self._packed_logits = packed_logits
+    self._compute_dtype = mixed_precision.get_compute_dtype(compute_dtype)
     self._sequence_feature_columns = sequence_feature_columns
     self._context_feature_columns = context_feature_columns
     self._sequence_features_layer = fc.SequenceFeatures(
@@ -198,8 +222,11 @@ class RNNModel(models.Model):
 
     Returns:
       A `Tensor` with logits from RNN model. It has shape
-      (batch_size, time_step, logits_size) if `return_sequence` is `True`,
-      (batch_size, logits_size) otherwise.
+      (batch_size, time_step, logits_size) if `return_sequence` is `True`, and
+      (batch_size, logits_size) otherwise. If `packed_logits` is `True`, a
+      tuple of the logits of shape (num_steps, logits_size) and the boolean
+      sequence mask of shape (batch_size, time_step) with `num_steps` true
+      values, which gives the step of each row of the logits.
     """
     if not isinstance(inputs, dict):
       raise ValueError('inputs should be a dictionary of `Tensor`s. '
@@ -215,7 +242,16 @@ class RNNModel(models.Model):
 
     sequence_length_mask = array_ops.sequence_mask(sequence_length)
     rnn_outputs = self._rnn_layer(
-        sequence_input, mask=sequence_length_mask, training=training)
+        math_ops.cast(sequence_input, self._compute_dtype),
+        mask=sequence_length_mask, training=training)
+    rnn_outputs = math_ops.cast(rnn_outputs, dtypes.float32)
+
+    if self._packed_logits:
+      # Only the steps that are not padding go through the logit layer. Their
+      # mask is returned along to flatten labels and features the same way.
+      rnn_outputs = array_ops.gather_nd(
+          rnn_outputs, array_ops.where(sequence_length_mask))
+      return self._logits_layer(rnn_outputs), sequence_length_mask
 
     logits = self._logits_layer(rnn_outputs)
     if self._return_sequences:
@@ -233,6 +269,8 @@ class RNNModel(models.Model):
     }
     config['units'] = self._logits_layer.units
     config['return_sequences'] = self._return_sequences
+    config['packed_logits'] = self._packed_logits
+    config['compute_dtype'] = self._compute_dtype.name
     config['activation'] = activations.serialize(self._logits_layer.activation)
     config['sequence_feature_columns'] = fc.serialize_feature_columns(
         self._sequence_feature_columns)
@@ -270,7 +308,8 @@ class RNNModel(models.Model):
 
 
 def _get_rnn_estimator_spec(
-    features, labels, mode, head, rnn_model, optimizer, return_sequences):
+    features, labels, mode, head, rnn_model, optimizer, return_sequences,
+    packed_logits=False, compute_dtype=None):
   """Computes `EstimatorSpec` from logits to use in estimator model function.
 
   Args:
@@ -287,14 +326,21 @@ def _get_rnn_estimator_spec(
       norm of 5.0.
     return_sequences: A boolean indicating whether to return the last output
       in the output sequence, or the full sequence.
+    packed_logits: A boolean indicating whether `rnn_model` returns packed
+      logits along with their sequence mask, which is then passed to `head`.
+    compute_dtype: The dtype `rnn_model` computes in. float16 training uses
+      dynamic loss scaling, and the default gradient clipping is then skipped.
 
   Returns:
     An `EstimatorSpec` instance.
 
   Raises:
-    ValueError: If mode or optimizer is invalid, or features has the wrong type.
+    ValueError: If mode or optimizer is invalid, if features has the wrong
+      type, if `optimizer` clips gradients in float16 training, or if features
+      has a sequence mask while `packed_logits` is set.
   """
   training = (mode == model_fn.ModeKeys.TRAIN)
+  compute_dtype = mixed_precision.get_compute_dtype(compute_dtype)
   # In TRAIN mode, create optimizer and assign global_step variable to
   # optimizer.iterations to make global_step increased correctly, as Hooks
   # relies on global step as step counter - otherwise skip optimizer
@@ -305,17 +351,38 @@ def _get_rnn_estimator_spec(
     if isinstance(optimizer, six.string_types):
       optimizer = optimizers.get_optimizer_instance_v2(
           optimizer, learning_rate=_DEFAULT_LEARNING_RATE)
-      optimizer.clipnorm = _DEFAULT_CLIP_NORM
+      # Loss scaling does not support gradient clipping.
+      if compute_dtype != dtypes.float16:
+        optimizer.clipnorm = _DEFAULT_CLIP_NORM
     else:
       optimizer = optimizers.get_optimizer_instance_v2(optimizer)
     optimizer.iterations = training_util.get_or_create_global_step()
+    optimizer = mixed_precision.scale_loss(optimizer, compute_dtype)
   else:
     optimizer = None
 
-  logits = rnn_model(features, training)
-
-  if return_sequences and head.input_sequence_mask_key not in features:
-    features[head.input_sequence_mask_key] = logits._keras_mask  # pylint: disable=protected-access
+  if packed_logits:
+    # Packed logits follow the mask computed from the sequence lengths, which
+    # a mask given in the features would contradict.
+    if head.input_sequence_mask_key in features:
+      raise ValueError(
+          'The sequence mask is computed from the sequence lengths when '
+          '`packed_logits` is set, features must not contain it. '
+          'Given: {}'.format(head.input_sequence_mask_key))
+    logits, sequence_mask = rnn_model(features, training)
+    num_steps = math_ops.reduce_sum(
+        math_ops.cast(sequence_mask, dtypes.int32))
+    with ops.control_dependencies([
+        check_ops.assert_equal(
+            array_ops.shape(logits)[0], num_steps,
+            message='Packed logits must have one row per step of the mask.')
+    ]):
+      logits = array_ops.identity(logits)
+    features[head.input_sequence_mask_key] = sequence_mask
+  else:
+    logits = rnn_model(features, training)
+    if return_sequences and head.input_sequence_mask_key not in features:
+      features[head.input_sequence_mask_key] = logits._keras_mask  # pylint: disable=protected-access
 
   return head.create_estimator_spec(
       features=features,
@@ -431,7 +498,9 @@ class RNNEstimator(estimator.Estimator):
                return_sequences=False,
                model_dir=None,
                optimizer='Adagrad',
-               config=None):
+               config=None,
+               packed_logits=False,
+               compute_dtype=None):
     """Initializes a `RNNEstimator` instance.
 
     Args:
@@ -466,6 +535,20 @@ class RNNEstimator(estimator.Estimator):
       optimizer: An instance of `tf.Optimizer` or string specifying optimizer
         type. Defaults to Adagrad optimizer.
       config: `RunConfig` object to configure the runtime settings.
+      packed_logits: A boolean indicating whether the logit layer and the head
+        only process the steps that are not padding, packed together. The RNN
+        itself still runs over the padded sequences, whose padding is best
+        minimized by batching sequences of similar lengths in `input_fn`, e.g.
+        with `tf.data.experimental.bucket_by_sequence_length`. Requires
+        `return_sequences` and a `SequentialHeadWrapper` head with
+        `packed_logits=True`. The sequence mask is then always computed from
+        the sequence lengths, and must not be in the features.
+      compute_dtype: The dtype the RNN computes in, one of `tf.float32`,
+        `tf.bfloat16` or `tf.float16`. Variables and checkpoints stay in
+        float32. float16 training uses dynamic loss scaling, which does not
+        support gradient clipping: the default clip norm of the optimizer is
+        then not applied, and training raises a `ValueError` if `optimizer`
+        clips gradients. Defaults to float32.
 
     Note that a RNN cell is has:
       - a `call` method.
@@ -485,24 +568,34 @@ class RNNEstimator(estimator.Estimator):
       raise ValueError(
           'Provided head must be a `_SequentialHead` object when '
           '`return_sequences` is set to True.')
+    if packed_logits and not getattr(head, 'packed_logits', False):
+      raise ValueError(
+          'Provided head must be a `SequentialHeadWrapper` with '
+          '`packed_logits=True` when `packed_logits` is set to True.')
     _verify_rnn_cell_input(rnn_cell_fn, units, cell_type)
 
     def _model_fn(features, labels, mode, config):
       """RNNEstimator model function."""
       del config  # Unused.
-      rnn_layer = _make_rnn_layer(
-          rnn_cell_fn=rnn_cell_fn, units=units, cell_type=cell_type,
-          return_sequences=return_sequences)
+      # The cells are created by `_make_rnn_layer`, without a `dtype`.
+      with mixed_precision.policy_scope(
+          mixed_precision.get_compute_dtype(compute_dtype)):
+        rnn_layer = _make_rnn_layer(
+            rnn_cell_fn=rnn_cell_fn, units=units, cell_type=cell_type,
+            return_sequences=return_sequences)
       rnn_model = RNNModel(
           rnn_layer=rnn_layer,
           units=head.logits_dimension,
           sequence_feature_columns=sequence_feature_columns,
           context_feature_columns=context_feature_columns,
           return_sequences=return_sequences,
+          packed_logits=packed_logits,
+          compute_dtype=compute_dtype,
           name='rnn_model')
       return _get_rnn_estimator_spec(
           features, labels, mode, head=head, rnn_model=rnn_model,
-          optimizer=optimizer, return_sequences=return_sequences)
+          optimizer=optimizer, return_sequences=return_sequences,
+          packed_logits=packed_logits, compute_dtype=compute_dtype)
 
     super(RNNEstimator, self).__init__(
         model_fn=_model_fn, model_dir=model_dir, config=config)
@@ -575,7 +668,9 @@ class RNNClassifier(RNNEstimator):
                optimizer='Adagrad',
                loss_reduction=losses_utils.ReductionV2.SUM_OVER_BATCH_SIZE,
                sequence_mask='sequence_mask',
-               config=None):
+               config=None,
+               packed_logits=False,
+               compute_dtype=None):
     """Initializes a `RNNClassifier` instance.
 
     Args:
@@ -634,6 +729,20 @@ class RNNClassifier(RNNEstimator):
         padding steps. It is also added to the predictions dictionary in
         prediction mode to indicate which steps are padding.
       config: `RunConfig` object to configure the runtime settings.
+      packed_logits: A boolean indicating whether the logit layer and the head
+        only process the steps that are not padding, packed together, so that
+        the logits are not flattened again. The RNN itself still runs over the
+        padded sequences, whose padding is best minimized by batching
+        sequences of similar lengths in `input_fn`, e.g. with
+        `tf.data.experimental.bucket_by_sequence_length`. Requires
+        `return_sequences`. The sequence mask is then always computed from the
+        sequence lengths, and `sequence_mask` must not be in the features.
+      compute_dtype: The dtype the RNN computes in, one of `tf.float32`,
+        `tf.bfloat16` or `tf.float16`. Variables and checkpoints stay in
+        float32. float16 training uses dynamic loss scaling, which does not
+        support gradient clipping: the default clip norm of the optimizer is
+        then not applied, and training raises a `ValueError` if `optimizer`
+        clips gradients. Defaults to float32.
 
     Note that a RNN cell has:
       - a `call` method.
@@ -663,7 +772,7 @@ class RNNClassifier(RNNEstimator):
                    '`SequentialHeadWrapper` to allow sequential predictions.')
       head = seq_head_lib.SequentialHeadWrapper(
           head, sequence_length_mask=sequence_mask,
-          feature_columns=weight_column)
+          feature_columns=weight_column, packed_logits=packed_logits)
 
     super(RNNClassifier, self).__init__(
         head=head,
@@ -675,4 +784,6 @@ class RNNClassifier(RNNEstimator):
         return_sequences=return_sequences,
         model_dir=model_dir,
         optimizer=optimizer,
-        config=config)
+        config=config,
+        packed_logits=packed_logits,
+        compute_dtype=compute_dtype)
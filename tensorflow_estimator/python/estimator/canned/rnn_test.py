@@ -252,7 +252,8 @@ class RNNLogitFnTest(test.TestCase, parameterized.TestCase):
     return _mock_logits_layer(self.dense_kernel, bias=self.dense_bias)
 
   def _test_logits(self, logits_dimension, features_fn, expected_logits,
-                   expected_mask, return_sequences=False):
+                   expected_mask, return_sequences=False,
+                   packed_logits=False):
     """Tests that the expected logits are calculated."""
     rnn_layer = keras_layers.SimpleRNN(
         2, return_sequences=return_sequences,
@@ -265,9 +266,12 @@ class RNNLogitFnTest(test.TestCase, parameterized.TestCase):
           units=logits_dimension,
           sequence_feature_columns=self.sequence_feature_columns,
           context_feature_columns=self.context_feature_columns,
-          return_sequences=return_sequences)
+          return_sequences=return_sequences,
+          packed_logits=packed_logits)
     logits = logit_layer(features_fn())
-    if return_sequences:
+    if packed_logits:
+      expected_logits = (expected_logits, expected_mask)
+    elif return_sequences:
       logits = (logits, logits._keras_mask)
       expected_logits = (expected_logits, expected_mask)
     self.evaluate(variables_lib.global_variables_initializer())
@@ -479,6 +483,38 @@ class RNNLogitFnTest(test.TestCase, parameterized.TestCase):
         expected_logits=expected_logits,
         return_sequences=return_sequences)
 
+  def testPackedSequences(self):
+    """Tests packed logits only hold the steps that are not padding.
+
+    Same input as `testMultiExamplesDifferentLength`, the padding step of the
+    second example is dropped.
+    """
+    def features_fn():
+      return {
+          'price':
+              sparse_tensor.SparseTensor(
+                  values=[10., 5., 2.],
+                  indices=[[0, 0], [0, 1], [1, 0]],
+                  dense_shape=[2, 2]),
+      }
+
+    self._test_logits(
+        logits_dimension=1,
+        features_fn=features_fn,
+        expected_mask=[[1, 1], [1, 0]],
+        expected_logits=[[-1.4388], [-0.6033], [0.0197]],
+        return_sequences=True,
+        packed_logits=True)
+
+  def testPackedSequencesWithoutReturnSequences(self):
+    with self.assertRaisesRegexp(
+        ValueError, '`packed_logits` requires `return_sequences`'):
+      rnn.RNNModel(
+          rnn_layer=keras_layers.SimpleRNN(2),
+          units=1,
+          sequence_feature_columns=self.sequence_feature_columns,
+          packed_logits=True)
+
   def testMultiExamplesWithContext(self):
     """Tests multiple examples with context features.
 
@@ -824,6 +860,40 @@ class RNNEstimatorInitTest(test.TestCase):
           sequence_feature_columns=self.feature_columns,
           return_sequences=True)
 
+  def testNonPackedHeadProvided(self):
+    with self.assertRaisesRegexp(
+        ValueError,
+        'Provided head must be a `SequentialHeadWrapper` with '
+        '`packed_logits=True`'):
+      rnn.RNNEstimator(
+          head=seq_head_lib.SequentialHeadWrapper(
+              multi_head_lib.MultiClassHead(n_classes=3)),
+          sequence_feature_columns=self.feature_columns,
+          return_sequences=True,
+          packed_logits=True)
+
+  def testPackedSequencesWithSequenceMaskFeature(self):
+    est = rnn.RNNEstimator(
+        head=seq_head_lib.SequentialHeadWrapper(
+            multi_head_lib.MultiClassHead(n_classes=3), packed_logits=True),
+        sequence_feature_columns=self.feature_columns,
+        units=[2],
+        return_sequences=True,
+        packed_logits=True)
+
+    def input_fn():
+      features = {
+          'tokens': sparse_tensor.SparseTensor(
+              values=['the', 'cat'], indices=[[0, 0], [0, 1]],
+              dense_shape=[1, 2]),
+          'sequence_length_mask': [[True, True]],
+      }
+      return features, [[0, 1]]
+
+    with self.assertRaisesRegexp(ValueError,
+                                 'features must not contain it'):
+      est.train(input_fn=input_fn, steps=1)
+
   def testWrongOptimizerTypeProvided(self):
     classifier = rnn.RNNClassifier(
         self.feature_columns, units=[1], optimizer=object())
@@ -39,6 +39,7 @@ from tensorflow.python.util.tf_export import estimator_export
 from tensorflow_estimator.python.estimator import estimator as estimator_lib
 from tensorflow_estimator.python.estimator import model_fn as model_fn_lib
 from tensorflow_estimator.python.estimator.export import export_lib
+from tensorflow_estimator.python.estimator.export import inference_optimization
 from tensorflow_estimator.python.estimator.mode_keys import ModeKeys
 
 
@@ -154,6 +155,10 @@ class SavedModelEstimator(estimator_lib.EstimatorV2):
           'DistributionStrategy.')
     self.saved_model_dir = saved_model_dir
     self.saved_model_loader = loader_impl.SavedModelLoader(saved_model_dir)
+    # The MetaGraphDefs of the modes, as found and as imported by the model
+    # function, built when first needed.
+    self._meta_graph_defs = {}
+    self._pruned_meta_graph_defs = {}
     self._available_modes = self._extract_available_modes()
 
   def _extract_available_modes(self):
@@ -182,15 +187,43 @@ class SavedModelEstimator(estimator_lib.EstimatorV2):
                          'mode has been exported.' % mode)
 
   def _get_meta_graph_def_for_mode(self, mode):
-    tags = export_lib.EXPORT_TAG_MAP[mode]
-    return self.saved_model_loader.get_meta_graph_def_from_tags(tags)
+    if mode not in self._meta_graph_defs:
+      tags = export_lib.EXPORT_TAG_MAP[mode]
+      self._meta_graph_defs[mode] = (
+          self.saved_model_loader.get_meta_graph_def_from_tags(tags))
+    return self._meta_graph_defs[mode]
+
+  def _get_pruned_meta_graph_def_for_mode(self, mode):
+    """Returns the MetaGraphDef of the mode, with only the ops it runs.
+
+    Exports may have many signatures sharing one large graph, while the model
+    function only runs the signature of its mode. The graph is pruned once per
+    mode, so that each call of the model function only imports the ops of the
+    signature, of the saver and of the initialization. Summaries are kept in
+    TRAIN and EVAL modes.
+
+    Args:
+      mode: One of the modes enumerated in `tf.estimator.ModeKeys`.
+
+    Returns:
+      A pruned `MetaGraphDef`.
+    """
+    if mode not in self._pruned_meta_graph_defs:
+      meta_graph_def = self._get_meta_graph_def_for_mode(mode)
+      keep_collections = ()
+      if mode != ModeKeys.PREDICT:
+        keep_collections = (ops.GraphKeys.SUMMARIES,)
+      pruned_meta_graph_def = inference_optimization.prune_meta_graph(
+          meta_graph_def, [_signature_def_key(mode)], keep_collections)
+      logging.info('Pruned the MetaGraph of %s mode from %d to %d nodes.',
+                   mode, len(meta_graph_def.graph_def.node),
+                   len(pruned_meta_graph_def.graph_def.node))
+      self._pruned_meta_graph_defs[mode] = pruned_meta_graph_def
+    return self._pruned_meta_graph_defs[mode]
 
   def _get_signature_def_for_mode(self, mode):
     meta_graph_def = self._get_meta_graph_def_for_mode(mode)
-    if mode == ModeKeys.PREDICT:
-      sig_def_key = signature_constants.DEFAULT_SERVING_SIGNATURE_DEF_KEY
-    else:
-      sig_def_key = mode
+    sig_def_key = _signature_def_key(mode)
     if sig_def_key not in meta_graph_def.signature_def:
       logging.warning('Metagraph for mode %s was found, but SignatureDef with'
                       ' key \"%s\" is missing.' % (mode, sig_def_key))
@@ -240,9 +273,10 @@ class SavedModelEstimator(estimator_lib.EstimatorV2):
 
     # Load the graph. `output_tensors` contains output `Tensors` in the same
     # same order as the `output_tensor_names` list.
-    tags = export_lib.EXPORT_TAG_MAP[mode]
-    _, output_tensors = self.saved_model_loader.load_graph(
-        g, tags, input_map=input_map, return_elements=output_tensor_names)
+    meta_graph_def = self._get_pruned_meta_graph_def_for_mode(mode)
+    _, output_tensors = saver._import_meta_graph_with_return_elements(  # pylint: disable=protected-access
+        meta_graph_def, input_map=input_map,
+        return_elements=output_tensor_names)
 
     # Create saver object, and restore from the SavedModel `variables` directory
     # if no checkpoints have been saved in the `model_dir`.
@@ -255,7 +289,6 @@ class SavedModelEstimator(estimator_lib.EstimatorV2):
     # the graph. This should mirror the steps from _add_meta_graph_for_mode(),
     # which creates a MetaGraphDef from the EstimatorSpec's scaffold.
     # Get asset tensors, if any.
-    meta_graph_def = self._get_meta_graph_def_for_mode(mode)
     asset_tensors_dictionary = loader_impl.get_asset_tensors(
         self.saved_model_loader.export_dir, meta_graph_def, import_scope=None)
     # TODO(kathywu): switch to loader_impl._get_main_op
@@ -307,6 +340,13 @@ class SavedModelEstimator(estimator_lib.EstimatorV2):
             _get_saved_model_ckpt(self.saved_model_dir))
 
 
+def _signature_def_key(mode):
+  """Return the key of the SignatureDef run in a mode."""
+  if mode == ModeKeys.PREDICT:
+    return signature_constants.DEFAULT_SERVING_SIGNATURE_DEF_KEY
+  return mode
+
+
 def _get_saved_model_ckpt(saved_model_dir):
   """Return path to variables checkpoint in a `SavedModel` directory."""
   if not gfile.Exists(
@@ -49,6 +49,7 @@ from tensorflow_estimator.python.estimator import estimator
 from tensorflow_estimator.python.estimator import model_fn as model_fn_lib
 from tensorflow_estimator.python.estimator.canned import saved_model_estimator
 from tensorflow_estimator.python.estimator.export import export_lib
+from tensorflow_estimator.python.estimator.export import inference_optimization
 from tensorflow_estimator.python.estimator.mode_keys import ModeKeys
 
 
@@ -192,6 +193,26 @@ class SavedModelEstimatorTest(test.TestCase):
     predictions = next(sme.predict(dummy_input_fn_features_only))
     self.assertDictEqual({'output': 503}, predictions)
 
+  def test_prunes_meta_graph_once_per_mode(self):
+    sme = saved_model_estimator.SavedModelEstimator(
+        self._export_estimator(), self._get_tmp_dir())
+    with test.mock.patch.object(
+        inference_optimization, 'prune_meta_graph',
+        wraps=inference_optimization.prune_meta_graph) as mock_prune:
+      for _ in range(2):
+        predictions = next(sme.predict(dummy_input_fn_features_only))
+        self.assertDictEqual({'output': 503}, predictions)
+    self.assertEqual(1, mock_prune.call_count)
+
+    meta_graph_def = sme._get_meta_graph_def_for_mode(ModeKeys.PREDICT)
+    pruned_meta_graph_def = sme._get_pruned_meta_graph_def_for_mode(
+        ModeKeys.PREDICT)
+    self.assertEqual(['serving_default'],
+                     list(pruned_meta_graph_def.signature_def))
+    # The unused loss and metrics of the PREDICT graph are not imported.
+    self.assertLess(len(pruned_meta_graph_def.graph_def.node),
+                    len(meta_graph_def.graph_def.node))
+
   def test_partial_exported_estimator(self):
     sme1 = saved_model_estimator.SavedModelEstimator(
         self._export_estimator(train=False, predict=False), self._get_tmp_dir())
@@ -986,6 +986,61 @@ class DNNLinearCombinedTests(test.TestCase):
                      checkpoint_utils.load_variable(
                          self._model_dir, 'dnn_called'))
 
+  def _mock_shared_optimizer(self, real_optimizer, var_name_prefix):
+    """Verifies only apply_gradients is called, on vars with given prefix."""
+
+    def _apply_gradients(grads_and_vars, global_step=None, name=None):
+      self.assertIsNone(global_step)
+      var_names = [var.name for _, var in grads_and_vars]
+      self.assertTrue(var_names)
+      self.assertTrue(all([var_name.startswith(var_name_prefix)
+                           for var_name in var_names]))
+      # var is used to check this op called by training.
+      with ops.name_scope(''):
+        var = variables_lib.Variable(0., name=(var_name_prefix + '_called'))
+      with ops.control_dependencies([var.assign(100.)]):
+        return real_optimizer.apply_gradients(grads_and_vars, global_step, name)
+
+    optimizer_mock = test.mock.NonCallableMagicMock(
+        spec=optimizer_lib.Optimizer, wraps=real_optimizer)
+    optimizer_mock.apply_gradients = test.mock.MagicMock(wraps=_apply_gradients)
+
+    return optimizer_mock
+
+  def test_train_op_with_shared_input_transformations(self, fc_impl):
+    opt = gradient_descent.GradientDescentOptimizer(1.)
+    tokens_column = fc_impl.categorical_column_with_hash_bucket(
+        'tokens', hash_bucket_size=10)
+    input_fn = numpy_io.numpy_input_fn(
+        x={'tokens': np.array([['a'], ['b']])},
+        y=np.array([[0.], [1.]]),
+        batch_size=1,
+        shuffle=False)
+    linear_opt = self._mock_shared_optimizer(opt, 'linear')
+    dnn_opt = self._mock_shared_optimizer(opt, 'dnn')
+    est = dnn_linear_combined.DNNLinearCombinedClassifier(
+        linear_feature_columns=[tokens_column],
+        linear_optimizer=linear_opt,
+        dnn_hidden_units=(2, 2),
+        dnn_feature_columns=[
+            fc_impl.embedding_column(tokens_column, dimension=2)],
+        dnn_optimizer=dnn_opt,
+        model_dir=self._model_dir,
+        share_input_transformations=True)
+    est.train(input_fn, steps=1)
+    # The gradients of both models are computed by a single backprop, not by
+    # either optimizer.
+    linear_opt.compute_gradients.assert_not_called()
+    dnn_opt.compute_gradients.assert_not_called()
+    linear_opt.minimize.assert_not_called()
+    dnn_opt.minimize.assert_not_called()
+    self.assertEqual(100.,
+                     checkpoint_utils.load_variable(
+                         self._model_dir, 'linear_called'))
+    self.assertEqual(100.,
+                     checkpoint_utils.load_variable(
+                         self._model_dir, 'dnn_called'))
+
   def test_dnn_and_linear_logits_are_added(self, fc_impl):
     with ops.Graph().as_default():
       variables_lib.Variable([[1.0]], name='linear/linear_model/x/weights')
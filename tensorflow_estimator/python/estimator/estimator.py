@@ -29,6 +29,7 @@ import six
 
 from google.protobuf import message
 from tensorflow.core.framework import summary_pb2
+from tensorflow.core.protobuf import saver_pb2
 from tensorflow.python.client import session as tf_session
 from tensorflow.python.distribute import distribute_lib
 from tensorflow.python.distribute import estimator_training as distribute_coordinator_training
@@ -53,6 +54,7 @@ from tensorflow.python.summary import summary
 from tensorflow.python.summary.writer import writer_cache
 from tensorflow.python.training import basic_session_run_hooks
 from tensorflow.python.training import checkpoint_management
+from tensorflow.python.training import checkpoint_utils
 from tensorflow.python.training import device_setter
 from tensorflow.python.training import evaluation
 from tensorflow.python.training import monitored_session
@@ -60,6 +62,7 @@ from tensorflow.python.training import saver
 from tensorflow.python.training import training
 from tensorflow.python.training import training_util
 from tensorflow.python.training import warm_starting_util
+from tensorflow.python.training.saving import saveable_object_util
 from tensorflow.python.training.tracking import graph_view
 from tensorflow.python.training.tracking import util as trackable_util
 from tensorflow.python.util import compat
@@ -72,7 +75,10 @@ from tensorflow.python.util.tf_export import estimator_export
 from tensorflow_estimator.python.estimator import model_fn as model_fn_lib
 from tensorflow_estimator.python.estimator import run_config
 from tensorflow_estimator.python.estimator import util as estimator_util
+from tensorflow_estimator.python.estimator import warm_starting
+from tensorflow_estimator.python.estimator.canned import metric_keys
 from tensorflow_estimator.python.estimator.export import export_lib
+from tensorflow_estimator.python.estimator.export import inference_optimization as inference_optimization_lib
 from tensorflow_estimator.python.estimator.mode_keys import ModeKeys
 
 
@@ -665,7 +671,8 @@ class Estimator(object):
       assets_extra=None,
       as_text=False,
       checkpoint_path=None,
-      experimental_mode=ModeKeys.PREDICT):
+      experimental_mode=ModeKeys.PREDICT,
+      experimental_inference_optimization=None):
     # pylint: disable=line-too-long
     """Exports inference graph as a `SavedModel` into the given dir.
 
@@ -718,6 +725,10 @@ class Estimator(object):
         the most recent checkpoint found within the model directory is chosen.
       experimental_mode: `tf.estimator.ModeKeys` value indicating with mode
         will be exported. Note that this feature is experimental.
+      experimental_inference_optimization: An
+        `inference_optimization.InferenceOptimizationConfig` to prune and
+        optimize the graph exported for `tf.estimator.ModeKeys.PREDICT`, or
+        `None` to export it as built.
 
     Returns:
       The string path to the exported directory.
@@ -738,13 +749,15 @@ class Estimator(object):
         assets_extra=assets_extra,
         as_text=as_text,
         checkpoint_path=checkpoint_path,
-        strip_default_attrs=True)
+        strip_default_attrs=True,
+        inference_optimization=experimental_inference_optimization)
 
   def experimental_export_all_saved_models(
       self, export_dir_base, input_receiver_fn_map,
       assets_extra=None,
       as_text=False,
-      checkpoint_path=None):
+      checkpoint_path=None,
+      experimental_inference_optimization=None):
     """Exports a `SavedModel` with `tf.MetaGraphDefs` for each requested mode.
 
     For each mode passed in via the `input_receiver_fn_map`,
@@ -801,6 +814,10 @@ class Estimator(object):
       as_text: whether to write the `SavedModel` proto in text format.
       checkpoint_path: The checkpoint path to export.  If `None` (the default),
         the most recent checkpoint found within the model directory is chosen.
+      experimental_inference_optimization: An
+        `inference_optimization.InferenceOptimizationConfig` to prune and
+        optimize the `tf.MetaGraphDef` of `tf.estimator.ModeKeys.PREDICT`, or
+        `None` to export it as built.
 
     Returns:
       The string path to the exported directory.
@@ -812,12 +829,13 @@ class Estimator(object):
     return self._export_all_saved_models(
         export_dir_base, input_receiver_fn_map,
         assets_extra=assets_extra, as_text=as_text,
-        checkpoint_path=checkpoint_path, strip_default_attrs=True)
+        checkpoint_path=checkpoint_path, strip_default_attrs=True,
+        inference_optimization=experimental_inference_optimization)
 
   def _export_all_saved_models(
       self, export_dir_base, input_receiver_fn_map,
       assets_extra=None, as_text=False, checkpoint_path=None,
-      strip_default_attrs=True):
+      strip_default_attrs=True, inference_optimization=None):
     """Exports multiple modes in the model function to a SavedModel."""
     # TODO(b/65561022): Consider allowing multiple input_receiver_fns per mode.
     with context.graph_mode():
@@ -869,6 +887,14 @@ class Estimator(object):
             input_receiver_fn_map.keys()))
 
       builder.save(as_text)
+      if inference_optimization is not None:
+        inference_optimization_stats = (
+            inference_optimization_lib.optimize_saved_model(
+                temp_export_dir, export_lib.EXPORT_TAG_MAP[ModeKeys.PREDICT],
+                inference_optimization, checkpoint_path))
+        if inference_optimization_stats is not None:
+          inference_optimization_lib.write_stats(inference_optimization_stats,
+                                                 temp_export_dir)
 
       # Add the extra assets
       if assets_extra:
@@ -950,58 +976,65 @@ class Estimator(object):
           getattr(input_receiver, 'receiver_tensors_alternatives', None),
           serving_only=(mode == ModeKeys.PREDICT))
 
-      with tf_session.Session(config=self._session_config) as session:
-
-        if estimator_spec.scaffold.local_init_op is not None:
-          local_init_op = estimator_spec.scaffold.local_init_op
-        else:
-          local_init_op = monitored_session.Scaffold.default_local_init_op()
-
-        # This saver will be used both for restoring variables now,
-        # and in saving out the metagraph below. This ensures that any
-        # Custom Savers stored with the Scaffold are passed through to the
-        # SavedModel for restore later.
-        if isinstance(estimator_spec.scaffold.saver, trackable_util.Checkpoint):
-          graph_saver = saver.Saver(
-              var_list=graph_view.ObjectGraphView(
-                  estimator_spec.scaffold.saver).frozen_saveable_objects(),
-              sharded=True)
-        else:
-          graph_saver = (
-              estimator_spec.scaffold.saver or saver.Saver(sharded=True))
-
-        if save_variables and not check_variables:
-          raise ValueError('If `save_variables` is `True, `check_variables`'
-                           'must not be `False`.')
-        if check_variables:
-          try:
-            graph_saver.restore(session, checkpoint_path)
-          except errors.NotFoundError as e:
-            msg = ('Could not load all requested variables from checkpoint. '
-                   'Please make sure your model_fn does not expect variables '
-                   'that were not saved in the checkpoint.\n\n'
-                   'Encountered error with mode `{}` while restoring '
-                   'checkpoint from: `{}`. Full Traceback:\n\n{}').format(
-                       mode, checkpoint_path, e)
-            raise ValueError(msg)
-
-        # We add the train op explicitly for now, so that we don't have to
-        # change the Builder public interface. Note that this is a no-op
-        # for prediction, where train_op is None.
-        builder._add_train_op(estimator_spec.train_op)  # pylint: disable=protected-access
-
-        meta_graph_kwargs = dict(
-            tags=export_tags,
-            signature_def_map=signature_def_map,
-            assets_collection=ops.get_collection(ops.GraphKeys.ASSET_FILEPATHS),
-            main_op=local_init_op,
-            saver=graph_saver,
-            strip_default_attrs=strip_default_attrs)
-
-        if save_variables:
+      if estimator_spec.scaffold.local_init_op is not None:
+        local_init_op = estimator_spec.scaffold.local_init_op
+      else:
+        local_init_op = monitored_session.Scaffold.default_local_init_op()
+
+      # This saver will be used both for restoring variables now,
+      # and in saving out the metagraph below. This ensures that any
+      # Custom Savers stored with the Scaffold are passed through to the
+      # SavedModel for restore later.
+      if isinstance(estimator_spec.scaffold.saver, trackable_util.Checkpoint):
+        graph_saver = saver.Saver(
+            var_list=graph_view.ObjectGraphView(
+                estimator_spec.scaffold.saver).frozen_saveable_objects(),
+            sharded=True)
+      else:
+        graph_saver = (
+            estimator_spec.scaffold.saver or saver.Saver(sharded=True))
+
+      if save_variables and not check_variables:
+        raise ValueError('If `save_variables` is `True, `check_variables`'
+                         'must not be `False`.')
+
+      # We add the train op explicitly for now, so that we don't have to
+      # change the Builder public interface. Note that this is a no-op
+      # for prediction, where train_op is None.
+      builder._add_train_op(estimator_spec.train_op)  # pylint: disable=protected-access
+
+      meta_graph_kwargs = dict(
+          tags=export_tags,
+          signature_def_map=signature_def_map,
+          assets_collection=ops.get_collection(ops.GraphKeys.ASSET_FILEPATHS),
+          main_op=local_init_op,
+          saver=graph_saver,
+          strip_default_attrs=strip_default_attrs)
+
+      if save_variables and _checkpoint_matches_saver(
+          graph_saver, checkpoint_path):
+        # The checkpoint files already hold the variables, so they are linked
+        # instead of restored and saved again.
+        _link_checkpoint_to_variables(checkpoint_path, builder._export_dir)  # pylint: disable=protected-access
+        builder._has_saved_variables = True  # pylint: disable=protected-access
+        builder.add_meta_graph(**meta_graph_kwargs)
+        return
+      if save_variables:
+        with tf_session.Session(config=self._session_config) as session:
+          _restore_for_export(graph_saver, session, checkpoint_path, mode)
           builder.add_meta_graph_and_variables(session, **meta_graph_kwargs)
-        else:
-          builder.add_meta_graph(**meta_graph_kwargs)
+        return
+
+      builder.add_meta_graph(**meta_graph_kwargs)
+      # The variables were saved with another mode, so the checkpoint is only
+      # checked to have the variables of this mode, from its index. The
+      # metagraph is already added, so this does not add ops to it.
+      if check_variables and not _checkpoint_has_saveables(
+          graph_saver, checkpoint_path):
+        # The saver may still map the keys, e.g. from an object-based
+        # checkpoint, and otherwise raises the detailed error.
+        with tf_session.Session(config=self._session_config) as session:
+          _restore_for_export(graph_saver, session, checkpoint_path, mode)
 
   def _get_features_from_input_fn(self, input_fn, mode):
     """Extracts the `features` from return values of `input_fn`."""
@@ -1380,7 +1413,9 @@ class Estimator(object):
         not checkpoint_management.latest_checkpoint(self._model_dir)):
       logging.info('Warm-starting with WarmStartSettings: %s' %
                    (self._warm_start_settings,))
-      warm_starting_util.warm_start(*self._warm_start_settings)
+      num_warm_started = warm_starting.warm_start(self._warm_start_settings)
+      worker_hooks.append(
+          warm_starting._WarmStartTimingHook(num_warm_started))  # pylint: disable=protected-access
     # Check if the user created a loss summary, and add one if they didn't.
     # We assume here that the summary is called 'loss'. If it is not, we will
     # make another one with the name 'loss' to ensure it shows up in the right
@@ -1650,7 +1685,7 @@ class Estimator(object):
     if not checkpoint_path and self._warm_start_settings:
       logging.info('Warm-starting with WarmStartSettings: %s' %
                    (self._warm_start_settings,))
-      warm_starting_util.warm_start(*self._warm_start_settings)
+      warm_starting.warm_start(self._warm_start_settings)
 
   @deprecation.deprecated(
       None, 'This function has been renamed, use `export_saved_model` instead.')
@@ -1936,6 +1971,120 @@ def _combine_distributed_scaffold(grouped_scaffold, distribution):
   return scaffold
 
 
+def _restore_for_export(graph_saver, session, checkpoint_path, mode):
+  """Restores `checkpoint_path` with `graph_saver` to export `mode`."""
+  try:
+    graph_saver.restore(session, checkpoint_path)
+  except errors.NotFoundError as e:
+    msg = ('Could not load all requested variables from checkpoint. '
+           'Please make sure your model_fn does not expect variables '
+           'that were not saved in the checkpoint.\n\n'
+           'Encountered error with mode `{}` while restoring '
+           'checkpoint from: `{}`. Full Traceback:\n\n{}').format(
+               mode, checkpoint_path, e)
+    raise ValueError(msg)
+
+
+def _checkpoint_has_saveables(graph_saver, checkpoint_path):
+  """Returns whether the checkpoint has all the keys `graph_saver` restores.
+
+  Only reads the index of the checkpoint, unlike restoring it.
+
+  Args:
+    graph_saver: A `tf.compat.v1.train.Saver`.
+    checkpoint_path: Path of the checkpoint.
+
+  Returns:
+    `True` if all keys are found. `False` if some are missing, or if the keys
+    of `graph_saver` cannot be determined.
+  """
+  var_list = graph_saver._var_list  # pylint: disable=protected-access
+  if var_list is None:
+    var_list = variables._all_saveable_objects()  # pylint: disable=protected-access
+  try:
+    saveables = saveable_object_util.validate_and_slice_inputs(var_list)
+  except (TypeError, ValueError):
+    return False
+  reader = checkpoint_utils.load_checkpoint(checkpoint_path)
+  return all(reader.has_tensor(spec.name)
+             for saveable in saveables for spec in saveable.specs)
+
+
+def _saveable_full_shape(saveable, spec):
+  """Returns the full shape of `spec` in a checkpoint, or `None` if unknown."""
+  if spec.slice_spec:
+    return [int(dim) for dim in spec.slice_spec.split()[:-1]]
+  shape = getattr(saveable.op, 'shape', None)
+  if len(saveable.specs) == 1 and shape is not None and shape.is_fully_defined():
+    return shape.as_list()
+  return None
+
+
+def _checkpoint_matches_saver(graph_saver, checkpoint_path):
+  """Returns whether the checkpoint holds exactly what `graph_saver` saves.
+
+  The files of the checkpoint can then be used as the variables of a
+  SavedModel, instead of restoring them and saving them again. A checkpoint
+  with other keys, e.g. the optimizer slots of a training checkpoint exported
+  for serving, does not match: linking it would carry these values into the
+  SavedModel.
+
+  Args:
+    graph_saver: A `tf.compat.v1.train.Saver`.
+    checkpoint_path: Path of the checkpoint.
+
+  Returns:
+    `True` if the checkpoint is in the V2 format of `graph_saver`, with the
+    same keys, dtypes and known shapes as the variables of `graph_saver`.
+  """
+  # Subclasses may save other keys or values than they restore.
+  if (type(graph_saver) is not saver.Saver or  # pylint: disable=unidiomatic-typecheck
+      graph_saver._write_version != saver_pb2.SaverDef.V2 or  # pylint: disable=protected-access
+      not gfile.Exists(checkpoint_path + '.index')):
+    return False
+  var_list = graph_saver._var_list  # pylint: disable=protected-access
+  if var_list is None:
+    var_list = variables._all_saveable_objects()  # pylint: disable=protected-access
+  try:
+    saveables = saveable_object_util.validate_and_slice_inputs(var_list)
+  except (TypeError, ValueError):
+    return False
+  reader = checkpoint_utils.load_checkpoint(checkpoint_path)
+  checkpoint_dtypes = reader.get_variable_to_dtype_map()
+  checkpoint_shapes = reader.get_variable_to_shape_map()
+  keys = set()
+  for saveable in saveables:
+    for spec in saveable.specs:
+      if (checkpoint_dtypes.get(spec.name) !=
+          dtypes.as_dtype(spec.dtype).base_dtype):
+        return False
+      shape = _saveable_full_shape(saveable, spec)
+      if shape is not None and shape != checkpoint_shapes[spec.name]:
+        return False
+      keys.add(spec.name)
+  return keys == set(checkpoint_dtypes)
+
+
+def _link_or_copy(source, destination):
+  """Hard-links `source` to `destination`, or copies it if links fail."""
+  try:
+    os.link(source, destination)
+  except (AttributeError, OSError):
+    # Not a local file system, or a link across devices.
+    gfile.Copy(source, destination, overwrite=True)
+
+
+def _link_checkpoint_to_variables(checkpoint_path, export_dir):
+  """Places the files of a V2 checkpoint as the variables of a SavedModel."""
+  saved_model_utils.get_or_create_variables_dir(export_dir)
+  variables_path = saved_model_utils.get_variables_path(export_dir)
+  suffixes = ['.index'] + [
+      path[len(checkpoint_path):]
+      for path in gfile.Glob(checkpoint_path + '.data-*')]
+  for suffix in suffixes:
+    _link_or_copy(checkpoint_path + suffix, variables_path + suffix)
+
+
 def _check_checkpoint_available(model_dir):
   latest_path = checkpoint_management.latest_checkpoint(model_dir)
   if not latest_path:
@@ -2049,6 +2198,21 @@ def _dict_to_str(dictionary):
                    if not isinstance(v, six.binary_type))
 
 
+# Metrics with one value per bucket, which are also written as one scalar
+# summary per bucket. Head names may be appended to the keys.
+_PER_BUCKET_SUMMARY_KEYS = (
+    metric_keys.MetricKeys.CALIBRATION_MEAN_PREDICTION,
+    metric_keys.MetricKeys.CALIBRATION_MEAN_LABEL,
+    metric_keys.MetricKeys.CALIBRATION_WEIGHT,
+    metric_keys.MetricKeys.CALIBRATION_LOG_LOSS,
+)
+
+
+def _is_per_bucket_summary_key(key):
+  return any(key == bucket_key or key.startswith(bucket_key + '/')
+             for bucket_key in _PER_BUCKET_SUMMARY_KEYS)
+
+
 def _write_dict_to_summary(output_dir,
                            dictionary,
                            current_global_step):
@@ -2091,6 +2255,13 @@ def _write_dict_to_summary(output_dir,
       value.node_name = key
       tensor_proto = tensor_util.make_tensor_proto(dictionary[key])
       value.tensor.CopyFrom(tensor_proto)
+      # Calibration curves are also written as one scalar per bucket so that
+      # they are visible in Tensorboard.
+      if (_is_per_bucket_summary_key(key) and dictionary[key].ndim == 1 and
+          np.issubdtype(dictionary[key].dtype, np.number)):
+        for i, bucket_value in enumerate(dictionary[key]):
+          summary_proto.value.add(
+              tag='%s/%d' % (key, i), simple_value=float(bucket_value))
       # pylint: disable=line-too-long
       logging.info(
           'Summary for np.ndarray is not visible in Tensorboard by default. '
@@ -2154,6 +2325,8 @@ class WarmStartSettings(
         'vars_to_warm_start',
         'var_name_to_vocab_info',
         'var_name_to_prev_var_name',
+        'max_chunk_bytes',
+        'max_concurrent_variables',
     ])):
   """Settings for warm-starting in `tf.estimator.Estimators`.
 
@@ -2326,22 +2499,43 @@ class WarmStartSettings(
       effect on the set of variables that is warm-started, and only controls
       name mapping (use `vars_to_warm_start` for controlling what variables to
       warm-start).
+    max_chunk_bytes: [Optional] The maximum number of bytes of rows of a
+      variable in `var_name_to_vocab_info` that are loaded from the checkpoint
+      and remapped at once. The chunks are loaded one after the other, which
+      bounds the memory needed by warm-starting at the cost of more reads of
+      the checkpoint. Defaults to 64 MiB.
+    max_concurrent_variables: [Optional] The maximum number of variables in
+      `var_name_to_vocab_info` that are warm-started at the same time. The
+      chunks of one variable are always loaded one after the other. Defaults
+      to 4.
   """
 
   def __new__(cls,
               ckpt_to_initialize_from,
               vars_to_warm_start='.*',
               var_name_to_vocab_info=None,
-              var_name_to_prev_var_name=None):
+              var_name_to_prev_var_name=None,
+              max_chunk_bytes=None,
+              max_concurrent_variables=None):
     if not ckpt_to_initialize_from:
       raise ValueError(
           '`ckpt_to_initialize_from` MUST be set in WarmStartSettings')
+    if max_chunk_bytes is not None and max_chunk_bytes <= 0:
+      raise ValueError(
+          '`max_chunk_bytes` must be positive, given: {}'.format(
+              max_chunk_bytes))
+    if max_concurrent_variables is not None and max_concurrent_variables <= 0:
+      raise ValueError(
+          '`max_concurrent_variables` must be positive, given: {}'.format(
+              max_concurrent_variables))
     return super(WarmStartSettings, cls).__new__(
         cls,
         ckpt_to_initialize_from,
         vars_to_warm_start,
         var_name_to_vocab_info or {},
         var_name_to_prev_var_name or {},
+        max_chunk_bytes,
+        max_concurrent_variables,
     )
 
 
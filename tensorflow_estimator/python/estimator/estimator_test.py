@@ -73,6 +73,7 @@ from tensorflow.python.summary.writer import writer_cache
 from tensorflow.python.training import basic_session_run_hooks
 from tensorflow.python.training import checkpoint_management
 from tensorflow.python.training import checkpoint_state_pb2
+from tensorflow.python.training import checkpoint_utils
 from tensorflow.python.training import saver
 from tensorflow.python.training import saver_test_utils
 from tensorflow.python.training import session_run_hook
@@ -82,7 +83,9 @@ from tensorflow.python.util import function_utils
 from tensorflow_estimator.python.estimator import estimator
 from tensorflow_estimator.python.estimator import model_fn as model_fn_lib
 from tensorflow_estimator.python.estimator import run_config
+from tensorflow_estimator.python.estimator.canned import metric_keys
 from tensorflow_estimator.python.estimator.export import export_lib
+from tensorflow_estimator.python.estimator.export import inference_optimization
 from tensorflow_estimator.python.estimator.inputs import numpy_io
 from tensorflow_estimator.python.estimator.mode_keys import ModeKeys
 
@@ -1760,6 +1763,44 @@ class EstimatorEvaluateTest(test.TestCase):
     for value in next(summaries).value:
       if value.tag == metric_key:
         self.assertTrue(value.HasField('tensor'))
+      # Only calibration curves are also written as one scalar per bucket.
+      self.assertFalse(value.tag.startswith(metric_key + '/'))
+
+  def test_summary_writing_with_calibration_curve(self):
+
+    def model_fn_with_calibration_curve_eval_metric_ops(
+        features, labels, mode):
+      _, _ = features, labels
+      global_step = training.get_global_step()
+      predictions = constant_op.constant([1., .5, 0.])
+      eval_metric_ops = {
+          metric_keys.MetricKeys.CALIBRATION_WEIGHT:
+              metrics_lib.mean_tensor(predictions)
+      }
+      return model_fn_lib.EstimatorSpec(
+          mode,
+          loss=constant_op.constant(1.),
+          predictions={'predictions': predictions},
+          train_op=state_ops.assign_add(global_step, 1),
+          eval_metric_ops=eval_metric_ops)
+
+    metric_key = metric_keys.MetricKeys.CALIBRATION_WEIGHT
+    est = estimator.EstimatorV2(
+        model_fn=model_fn_with_calibration_curve_eval_metric_ops,
+        config=run_config.RunConfig(save_summary_steps=1))
+    est.train(input_fn=dummy_input_fn, steps=10)
+    est.evaluate(input_fn=dummy_input_fn, steps=10)
+
+    writer_cache.FileWriterCache.clear()
+
+    summaries = summaries_with_matching_keyword(metric_key, est.eval_dir())
+    bucket_values = {}
+    for value in next(summaries).value:
+      if value.tag.startswith(metric_key + '/'):
+        bucket_values[value.tag] = value.simple_value
+    self.assertAllClose(
+        {metric_key + '/0': 1., metric_key + '/1': .5, metric_key + '/2': 0.},
+        bucket_values)
 
 
 class EstimatorPredictTest(test.TestCase):
@@ -2341,6 +2382,91 @@ class EstimatorExportTest(test.TestCase):
         self.assertTrue('ParseExample/ParseExampleV2' in graph_ops)
         self.assertTrue('weight' in graph_ops)
 
+  def test_export_saved_model_with_inference_optimization(self):
+    tmpdir = tempfile.mkdtemp()
+    est = estimator.EstimatorV2(model_fn=_model_fn_for_export_tests)
+    est.train(input_fn=dummy_input_fn, steps=1)
+
+    export_dir_base = os.path.join(
+        compat.as_bytes(tmpdir), compat.as_bytes('export'))
+    export_dir = est.export_saved_model(
+        export_dir_base, _get_serving_input_receiver_fn(),
+        experimental_inference_optimization=(
+            inference_optimization.InferenceOptimizationConfig()))
+    self._validate_exported_files(export_dir)
+
+    # The outputs do not depend on the parsed features.
+    with ops.Graph().as_default() as graph:
+      with session.Session(graph=graph) as sess:
+        meta_graph = loader.load(sess, [tag_constants.SERVING], export_dir)
+        graph_ops = [x.name for x in graph.get_operations()]
+        self.assertTrue('input_example_tensor' in graph_ops)
+        self.assertFalse('ParseExample/ParseExampleV2' in graph_ops)
+        self.assertTrue('weight' in graph_ops)
+        outputs = meta_graph.signature_def['test'].outputs
+        self.assertAllEqual(
+            [b'wumpus'], sess.run(outputs['classes'].name,
+                                  {'input_example_tensor:0': [b'']}))
+
+    # Clean up.
+    gfile.DeleteRecursively(tmpdir)
+
+  def test_export_saved_model_as_text_with_inference_optimization(self):
+    tmpdir = tempfile.mkdtemp()
+    est = estimator.EstimatorV2(model_fn=_model_fn_for_export_tests)
+    est.train(input_fn=dummy_input_fn, steps=1)
+
+    export_dir_base = os.path.join(
+        compat.as_bytes(tmpdir), compat.as_bytes('export'))
+    export_dir = est.export_saved_model(
+        export_dir_base, _get_serving_input_receiver_fn(), as_text=True,
+        experimental_inference_optimization=(
+            inference_optimization.InferenceOptimizationConfig()))
+
+    # The optimized SavedModel is written back as text.
+    self.assertTrue(gfile.Exists(os.path.join(
+        compat.as_bytes(export_dir), compat.as_bytes('saved_model.pbtxt'))))
+    self.assertFalse(gfile.Exists(os.path.join(
+        compat.as_bytes(export_dir), compat.as_bytes('saved_model.pb'))))
+    with ops.Graph().as_default() as graph:
+      with session.Session(graph=graph) as sess:
+        loader.load(sess, [tag_constants.SERVING], export_dir)
+        graph_ops = [x.name for x in graph.get_operations()]
+        self.assertFalse('ParseExample/ParseExampleV2' in graph_ops)
+
+    # Clean up.
+    gfile.DeleteRecursively(tmpdir)
+
+  def test_export_all_saved_models_with_inference_optimization(self):
+    tmpdir = tempfile.mkdtemp()
+    est = estimator.EstimatorV2(model_fn=_model_fn_for_export_tests)
+    est.train(input_fn=dummy_input_fn, steps=1)
+
+    export_dir_base = os.path.join(
+        compat.as_bytes(tmpdir), compat.as_bytes('export'))
+    export_dir = est.experimental_export_all_saved_models(
+        export_dir_base,
+        {ModeKeys.PREDICT: _get_serving_input_receiver_fn()},
+        experimental_inference_optimization=(
+            inference_optimization.InferenceOptimizationConfig()))
+    self._validate_exported_files(export_dir)
+
+    with ops.Graph().as_default() as graph:
+      with session.Session(graph=graph) as sess:
+        loader.load(sess, [tag_constants.SERVING], export_dir)
+        graph_ops = [x.name for x in graph.get_operations()]
+        self.assertFalse('ParseExample/ParseExampleV2' in graph_ops)
+
+    stats_path = os.path.join(
+        compat.as_bytes(export_dir), compat.as_bytes('assets.extra'),
+        compat.as_bytes(inference_optimization.STATS_FILENAME))
+    with gfile.GFile(stats_path) as f:
+      stats = json.loads(f.read())
+    self.assertLess(stats['num_nodes_after'], stats['num_nodes_before'])
+
+    # Clean up.
+    gfile.DeleteRecursively(tmpdir)
+
   def test_export_saved_model_train(self):
     self._test_export_saved_model_for_mode(
         _get_supervised_input_receiver_fn(), ModeKeys.TRAIN)
@@ -2491,6 +2617,78 @@ class EstimatorExportTest(test.TestCase):
     # Clean up.
     gfile.DeleteRecursively(tmpdir)
 
+  def test_export_all_saved_models_does_not_restore_checkpoint(self):
+    input_receiver_fn_map = {
+        ModeKeys.TRAIN: _get_supervised_input_receiver_fn(),
+        ModeKeys.EVAL: _get_supervised_input_receiver_fn(),
+        ModeKeys.PREDICT: _get_serving_input_receiver_fn()
+    }
+    # The TRAIN variables are linked from the checkpoint, and the other modes
+    # only check the checkpoint index for their variables.
+    with test.mock.patch.object(
+        saver.Saver, 'restore', autospec=True,
+        side_effect=saver.Saver.restore) as mock_restore:
+      _, tmpdir = self._test_export_all_saved_models(input_receiver_fn_map)
+    self.assertEqual(0, mock_restore.call_count)
+
+    # Clean up.
+    gfile.DeleteRecursively(tmpdir)
+
+  def test_export_all_saved_models_links_matching_checkpoint(self):
+    input_receiver_fn_map = {
+        ModeKeys.TRAIN: _get_supervised_input_receiver_fn(),
+    }
+    # The TRAIN graph saves the same variables as the training checkpoint.
+    with test.mock.patch.object(
+        saver.Saver, 'restore', autospec=True,
+        side_effect=saver.Saver.restore) as mock_restore:
+      export_dir, tmpdir = self._test_export_all_saved_models(
+          input_receiver_fn_map)
+    self.assertEqual(0, mock_restore.call_count)
+
+    # The variables are hard links to the checkpoint files.
+    self.assertEqual(2, os.stat(os.path.join(
+        compat.as_text(export_dir), 'variables', 'variables.index')).st_nlink)
+
+    with ops.Graph().as_default() as graph:
+      with session.Session(graph=graph) as sess:
+        loader.load(sess, [tag_constants.TRAINING], export_dir)
+        self.assertEqual(
+            3., sess.run(graph.get_tensor_by_name('name_collision:0')))
+
+    # Clean up.
+    gfile.DeleteRecursively(tmpdir)
+
+  def test_export_all_saved_models_saves_checkpoint_with_more_variables(self):
+    input_receiver_fn_map = {
+        ModeKeys.PREDICT: _get_serving_input_receiver_fn()
+    }
+    # The training checkpoint also holds `later_var`, which PREDICT does not
+    # save, so the checkpoint is restored and saved instead of linked.
+    with test.mock.patch.object(
+        saver.Saver, 'restore', autospec=True,
+        side_effect=saver.Saver.restore) as mock_restore:
+      export_dir, tmpdir = self._test_export_all_saved_models(
+          input_receiver_fn_map)
+    self.assertEqual(1, mock_restore.call_count)
+
+    self.assertEqual(1, os.stat(os.path.join(
+        compat.as_text(export_dir), 'variables', 'variables.index')).st_nlink)
+    self.assertNotIn(
+        'later_var',
+        checkpoint_utils.load_checkpoint(
+            os.path.join(compat.as_text(export_dir), 'variables',
+                         'variables')).get_variable_to_dtype_map())
+
+    with ops.Graph().as_default() as graph:
+      with session.Session(graph=graph) as sess:
+        loader.load(sess, [tag_constants.SERVING], export_dir)
+        self.assertEqual(
+            3., sess.run(graph.get_tensor_by_name('name_collision:0')))
+
+    # Clean up.
+    gfile.DeleteRecursively(tmpdir)
+
   def test_export_all_saved_models_proto_roundtrip_all_vars(self):
     input_receiver_fn_map = {
         ModeKeys.TRAIN: _get_supervised_input_receiver_fn(),
@@ -0,0 +1,336 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""In-process scoring of SavedModels with dynamic batching."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+from multiprocessing import pool
+import threading
+import time
+
+import numpy as np
+import six
+from six.moves import queue
+
+from tensorflow.python.client import session as tf_session
+from tensorflow.python.framework import ops
+from tensorflow.python.saved_model import loader
+from tensorflow.python.saved_model import signature_constants
+from tensorflow.python.saved_model import tag_constants
+
+# Number of most recent request latencies the percentiles are computed from.
+_NUM_LATENCIES = 10000
+
+
+class _PendingPrediction(object):
+  """The prediction of a single example, available once its batch ran."""
+
+  def __init__(self, inputs):
+    self.inputs = inputs
+    self.submit_time = time.time()
+    self._done = threading.Event()
+    self._outputs = None
+    self._error = None
+
+  def _set_outputs(self, outputs):
+    self._outputs = outputs
+    self._done.set()
+
+  def _set_error(self, error):
+    self._error = error
+    self._done.set()
+
+  def done(self):
+    return self._done.is_set()
+
+  def result(self, timeout=None):
+    """Returns the dict of outputs of the example.
+
+    Args:
+      timeout: Seconds to wait for the prediction, or `None` to wait for it
+        however long it takes.
+
+    Returns:
+      A dict of output key to the value of the example.
+
+    Raises:
+      RuntimeError: If the prediction is not done after `timeout` seconds.
+      Exception: The error raised when running the batch of the example.
+    """
+    if not self._done.wait(timeout):
+      raise RuntimeError(
+          'The prediction is not done after {} seconds.'.format(timeout))
+    if self._error is not None:
+      raise self._error  # pylint: disable=raising-bad-type
+    return self._outputs
+
+
+class BatchingPredictor(object):
+  """Scores single examples of a SavedModel in batches, in process.
+
+  The SavedModel, e.g. exported by `Estimator.export_saved_model`, is loaded
+  once. Examples submitted concurrently, e.g. by the threads of a server, are
+  coalesced into batches as configured by a `BatchConfig` of `TPUEstimator`,
+  and each batch is scored with a single `Session.run`:
+
+    * A batch is run once it has `max_batch_size` examples, or
+      `batch_timeout_micros` after its first example was submitted.
+    * If `allowed_batch_sizes` is set, batches are padded to the smallest
+      allowed size, by repeating their last example.
+    * Up to `num_batch_threads` batches run concurrently, and at most
+      `max_enqueued_batches` batches wait to run. `submit` blocks while
+      `max_enqueued_batches` full batches of examples wait to be batched.
+
+  The signature must take dense tensors batched along their first dimension.
+  Each example is a dict of the same keys, with values of one element of the
+  batch. Example:
+
+  ```python
+  with BatchingPredictor(export_dir, batch_config,
+                         signature_def_key='predict') as predictor:
+    outputs = predictor.predict({'x': [1., 2.]})
+  ```
+
+  `predict` blocks the calling thread. `asyncio` code can await it with
+  `loop.run_in_executor(None, predictor.predict, inputs)`, or `submit` an
+  example and poll the returned prediction.
+  """
+
+  def __init__(self,
+               export_dir,
+               batch_config,
+               signature_def_key=(
+                   signature_constants.DEFAULT_SERVING_SIGNATURE_DEF_KEY),
+               tags=None,
+               session_config=None):
+    """Loads the SavedModel and starts batching.
+
+    Args:
+      export_dir: Directory of the SavedModel.
+      batch_config: A `BatchConfig` of `TPUEstimator`, or any object with its
+        `max_batch_size`, `batch_timeout_micros`, `allowed_batch_sizes` and
+        optional `num_batch_threads` and `max_enqueued_batches` attributes.
+      signature_def_key: Key of the `SignatureDef` to run.
+      tags: Tags of the `MetaGraphDef` to load. Defaults to the serving tag.
+      session_config: A `ConfigProto` of the session.
+
+    Raises:
+      ValueError: If `batch_config` is invalid, or the signature is missing or
+        has sparse tensors.
+    """
+    self._max_batch_size = batch_config.max_batch_size
+    self._timeout_secs = batch_config.batch_timeout_micros / 1e6
+    self._allowed_batch_sizes = list(batch_config.allowed_batch_sizes or [])
+    num_batch_threads = getattr(batch_config, 'num_batch_threads', None) or 1
+    max_enqueued_batches = (
+        getattr(batch_config, 'max_enqueued_batches', None) or 10)
+    if self._max_batch_size <= 0:
+      raise ValueError('max_batch_size must be positive. Given: {}'.format(
+          self._max_batch_size))
+    if self._allowed_batch_sizes and (
+        self._allowed_batch_sizes != sorted(set(self._allowed_batch_sizes)) or
+        self._allowed_batch_sizes[-1] != self._max_batch_size):
+      raise ValueError(
+          'allowed_batch_sizes must increase and end with max_batch_size. '
+          'Given: {}'.format(self._allowed_batch_sizes))
+
+    self._graph = ops.Graph()
+    self._session = tf_session.Session(graph=self._graph, config=session_config)
+    meta_graph_def = loader.load(
+        self._session, tags or [tag_constants.SERVING], export_dir)
+    if signature_def_key not in meta_graph_def.signature_def:
+      raise ValueError('Signature {} not found in {}. Available: {}.'.format(
+          signature_def_key, export_dir,
+          sorted(meta_graph_def.signature_def.keys())))
+    signature_def = meta_graph_def.signature_def[signature_def_key]
+    self._inputs = self._tensors(signature_def.inputs)
+    self._outputs = self._tensors(signature_def.outputs)
+
+    self._lock = threading.Lock()
+    self._latencies = collections.deque(maxlen=_NUM_LATENCIES)
+    self._num_examples = 0
+    self._num_batches = 0
+    self._num_padded_examples = 0
+
+    # Serializes submissions with `close`, so that no example is submitted
+    # after the end of the queue.
+    self._submit_lock = threading.Lock()
+    self._closed = False
+    self._queue = queue.Queue(
+        maxsize=max_enqueued_batches * self._max_batch_size)
+    self._pool = pool.ThreadPool(num_batch_threads)
+    self._batch_slots = threading.BoundedSemaphore(
+        num_batch_threads + max_enqueued_batches)
+    self._batching_thread = threading.Thread(target=self._batch_examples)
+    self._batching_thread.daemon = True
+    self._batching_thread.start()
+
+  def _tensors(self, tensor_infos):
+    tensors = {}
+    for key, tensor_info in six.iteritems(tensor_infos):
+      if not tensor_info.name:
+        raise ValueError(
+            'Only dense tensors are supported. Given: {}'.format(key))
+      tensors[key] = self._graph.get_tensor_by_name(tensor_info.name)
+    return tensors
+
+  def submit(self, inputs):
+    """Schedules the prediction of an example.
+
+    Args:
+      inputs: A dict of each input key of the signature to the value of the
+        example.
+
+    Blocks while the queue of examples waiting to be batched is full.
+
+    Returns:
+      A pending prediction, whose `result()` is the dict of outputs.
+
+    Raises:
+      ValueError: If the keys of `inputs` are not those of the signature, or a
+        value does not match the shape or dtype of one element of its input.
+      RuntimeError: If the predictor is closed.
+    """
+    if set(inputs) != set(self._inputs):
+      raise ValueError('Expected inputs {}. Given: {}.'.format(
+          sorted(self._inputs), sorted(inputs)))
+    # Bad examples are rejected here, so that they do not fail the batch of the
+    # examples submitted with them.
+    example = {}
+    for key, tensor in six.iteritems(self._inputs):
+      value = np.asarray(inputs[key])
+      np_dtype = tensor.dtype.as_numpy_dtype
+      if not np.can_cast(value.dtype, np_dtype, casting='same_kind'):
+        raise ValueError('Input {} must be of dtype {}. Given: {}.'.format(
+            key, tensor.dtype.name, value.dtype))
+      if not tensor.shape[1:].is_compatible_with(value.shape):
+        raise ValueError('Input {} must be of shape {}. Given: {}.'.format(
+            key, tensor.shape[1:], value.shape))
+      example[key] = value.astype(np_dtype)
+    prediction = _PendingPrediction(example)
+    with self._submit_lock:
+      if self._closed:
+        raise RuntimeError('Cannot submit examples to a closed predictor.')
+      self._queue.put(prediction)
+    return prediction
+
+  def predict(self, inputs):
+    """Returns the dict of outputs of an example, see `submit`."""
+    return self.submit(inputs).result()
+
+  def stats(self):
+    """Returns a dict of latency and batching statistics.
+
+    Returns:
+      A dict with the numbers of examples and batches run, the 50th and 99th
+      percentiles of the seconds from the submission of a recent example to
+      its outputs, the mean number of examples per batch, and the fraction of
+      the run batches filled by examples rather than padding.
+    """
+    with self._lock:
+      latencies = list(self._latencies)
+      num_examples = self._num_examples
+      num_batches = self._num_batches
+      num_padded_examples = self._num_padded_examples
+    return {
+        'num_examples': num_examples,
+        'num_batches': num_batches,
+        'latency_p50_secs': (
+            np.percentile(latencies, 50) if latencies else 0.),
+        'latency_p99_secs': (
+            np.percentile(latencies, 99) if latencies else 0.),
+        'mean_batch_size': (
+            float(num_examples) / num_batches if num_batches else 0.),
+        'batch_fill_ratio': (
+            float(num_examples) / num_padded_examples
+            if num_padded_examples else 0.),
+    }
+
+  def close(self):
+    """Runs the submitted examples, then releases the session."""
+    with self._submit_lock:
+      if self._closed:
+        return
+      self._closed = True
+      self._queue.put(None)
+    self._batching_thread.join()
+    self._pool.close()
+    self._pool.join()
+    self._session.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+
+  def _batch_examples(self):
+    """Groups the submitted examples into batches, until `close`."""
+    closed = False
+    while not closed:
+      prediction = self._queue.get()
+      if prediction is None:
+        break
+      batch = [prediction]
+      deadline = prediction.submit_time + self._timeout_secs
+      while len(batch) < self._max_batch_size:
+        try:
+          prediction = self._queue.get(
+              timeout=max(deadline - time.time(), 0.))
+        except queue.Empty:
+          break
+        if prediction is None:
+          closed = True
+          break
+        batch.append(prediction)
+      self._batch_slots.acquire()
+      self._pool.apply_async(self._run_batch, (batch,))
+
+  def _padded_batch_size(self, batch_size):
+    for allowed_batch_size in self._allowed_batch_sizes:
+      if allowed_batch_size >= batch_size:
+        return allowed_batch_size
+    return batch_size
+
+  def _run_batch(self, batch):
+    """Scores a batch of pending predictions with one `Session.run`."""
+    try:
+      padded_batch_size = self._padded_batch_size(len(batch))
+      padding = [batch[-1]] * (padded_batch_size - len(batch))
+      feed_dict = {
+          tensor: np.stack([p.inputs[key] for p in batch + padding])
+          for key, tensor in six.iteritems(self._inputs)
+      }
+      outputs = self._session.run(self._outputs, feed_dict=feed_dict)
+    except Exception as e:  # pylint: disable=broad-except
+      for prediction in batch:
+        prediction._set_error(e)  # pylint: disable=protected-access
+      return
+    finally:
+      self._batch_slots.release()
+    now = time.time()
+    for i, prediction in enumerate(batch):
+      prediction._set_outputs({  # pylint: disable=protected-access
+          key: value[i] if np.ndim(value) else value
+          for key, value in six.iteritems(outputs)
+      })
+    with self._lock:
+      self._latencies.extend(now - p.submit_time for p in batch)
+      self._num_examples += len(batch)
+      self._num_batches += 1
+      self._num_padded_examples += padded_batch_size
@@ -0,0 +1,165 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for batching_predictor.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import os
+
+from tensorflow.python.client import session
+from tensorflow.python.framework import dtypes
+from tensorflow.python.framework import ops
+from tensorflow.python.framework import test_util
+from tensorflow.python.ops import array_ops
+from tensorflow.python.ops import variables
+from tensorflow.python.platform import test
+from tensorflow.python.saved_model import builder as saved_model_builder
+from tensorflow.python.saved_model import signature_def_utils
+from tensorflow.python.saved_model import tag_constants
+from tensorflow_estimator.python.estimator.export import batching_predictor
+
+_BatchConfig = collections.namedtuple('_BatchConfig', [
+    'num_batch_threads', 'max_batch_size', 'batch_timeout_micros',
+    'allowed_batch_sizes'
+])
+
+
+def _export_saved_model(export_dir):
+  """Exports a SavedModel computing `y = 2 * x` for `x` of shape [2]."""
+  with ops.Graph().as_default():
+    x = array_ops.placeholder(dtypes.float32, shape=(None, 2), name='x')
+    w = variables.VariableV1(2., name='w')
+    y = array_ops.identity(x * w, name='y')
+    with session.Session() as sess:
+      sess.run(variables.global_variables_initializer())
+      builder = saved_model_builder.SavedModelBuilder(export_dir)
+      builder.add_meta_graph_and_variables(
+          sess, [tag_constants.SERVING],
+          signature_def_map={
+              'serving_default':
+                  signature_def_utils.predict_signature_def({'x': x},
+                                                            {'y': y})
+          })
+      builder.save()
+  return export_dir
+
+
+@test_util.run_v1_only('Loads v1 SavedModels.')
+class BatchingPredictorTest(test.TestCase):
+
+  def setUp(self):
+    self._export_dir = _export_saved_model(
+        os.path.join(self.get_temp_dir(), 'export'))
+
+  def test_batches_concurrent_examples(self):
+    config = _BatchConfig(
+        num_batch_threads=1,
+        max_batch_size=4,
+        batch_timeout_micros=10 * 1000 * 1000,
+        allowed_batch_sizes=None)
+    with batching_predictor.BatchingPredictor(self._export_dir,
+                                              config) as predictor:
+      predictions = [
+          predictor.submit({'x': [float(i), 1.]}) for i in range(4)]
+      for i, prediction in enumerate(predictions):
+        self.assertAllClose([2. * i, 2.], prediction.result()['y'])
+      stats = predictor.stats()
+    self.assertEqual(4, stats['num_examples'])
+    self.assertEqual(1, stats['num_batches'])
+    self.assertEqual(4., stats['mean_batch_size'])
+    self.assertEqual(1., stats['batch_fill_ratio'])
+    self.assertLessEqual(stats['latency_p50_secs'], stats['latency_p99_secs'])
+
+  def test_pads_to_allowed_batch_size(self):
+    config = _BatchConfig(
+        num_batch_threads=2,
+        max_batch_size=4,
+        batch_timeout_micros=1000,
+        allowed_batch_sizes=[2, 4])
+    with batching_predictor.BatchingPredictor(self._export_dir,
+                                              config) as predictor:
+      self.assertAllClose([2., 4.], predictor.predict({'x': [1., 2.]})['y'])
+      stats = predictor.stats()
+    self.assertEqual(1, stats['num_examples'])
+    self.assertEqual(.5, stats['batch_fill_ratio'])
+
+  def test_run_error_is_raised_to_callers(self):
+    config = _BatchConfig(
+        num_batch_threads=1,
+        max_batch_size=2,
+        batch_timeout_micros=1000,
+        allowed_batch_sizes=None)
+    with batching_predictor.BatchingPredictor(self._export_dir,
+                                              config) as predictor:
+      with self.assertRaises(ValueError):
+        predictor.predict({'x': [1., 2., 3.]})
+      with self.assertRaisesRegexp(ValueError, 'Expected inputs'):
+        predictor.submit({'z': [1., 2.]})
+
+  def test_bad_examples_are_rejected_before_batching(self):
+    config = _BatchConfig(
+        num_batch_threads=1,
+        max_batch_size=3,
+        batch_timeout_micros=10 * 1000 * 1000,
+        allowed_batch_sizes=None)
+    with batching_predictor.BatchingPredictor(self._export_dir,
+                                              config) as predictor:
+      first = predictor.submit({'x': [1., 2.]})
+      with self.assertRaisesRegexp(ValueError, 'shape'):
+        predictor.submit({'x': [1., 2., 3.]})
+      with self.assertRaisesRegexp(ValueError, 'dtype'):
+        predictor.submit({'x': ['a', 'b']})
+      second = predictor.submit({'x': [3, 4]})
+      third = predictor.submit({'x': [5., 6.]})
+      self.assertAllClose([2., 4.], first.result()['y'])
+      self.assertAllClose([6., 8.], second.result()['y'])
+      self.assertAllClose([10., 12.], third.result()['y'])
+      stats = predictor.stats()
+    self.assertEqual(3, stats['num_examples'])
+    self.assertEqual(1, stats['num_batches'])
+
+  def test_submit_after_close(self):
+    config = _BatchConfig(1, 4, 1000, None)
+    predictor = batching_predictor.BatchingPredictor(self._export_dir, config)
+    prediction = predictor.submit({'x': [1., 2.]})
+    predictor.close()
+    self.assertAllClose([2., 4.], prediction.result()['y'])
+    with self.assertRaisesRegexp(RuntimeError, 'closed'):
+      predictor.submit({'x': [1., 2.]})
+    # Closing again is a no-op.
+    predictor.close()
+
+  def test_invalid_config(self):
+    with self.assertRaisesRegexp(ValueError, 'max_batch_size'):
+      batching_predictor.BatchingPredictor(
+          self._export_dir,
+          _BatchConfig(1, 0, 1000, None))
+    with self.assertRaisesRegexp(ValueError, 'allowed_batch_sizes'):
+      batching_predictor.BatchingPredictor(
+          self._export_dir,
+          _BatchConfig(1, 4, 1000, [4, 2]))
+
+  def test_missing_signature(self):
+    config = _BatchConfig(1, 4, 1000, None)
+    with self.assertRaisesRegexp(ValueError, 'not found'):
+      batching_predictor.BatchingPredictor(
+          self._export_dir, config, signature_def_key='classification')
+
+
+if __name__ == '__main__':
+  test.main()
@@ -25,6 +25,7 @@ from __future__ import division
 from __future__ import print_function
 
 import collections
+import functools
 
 import six
 
@@ -33,7 +34,10 @@ from tensorflow.python.framework import ops
 from tensorflow.python.framework import sparse_tensor
 from tensorflow.python.framework import tensor_shape
 from tensorflow.python.ops import array_ops
+from tensorflow.python.ops import control_flow_ops
+from tensorflow.python.ops import math_ops
 from tensorflow.python.ops import parsing_ops
+from tensorflow.python.ops.ragged import ragged_tensor
 from tensorflow.python.saved_model.model_utils import export_utils
 from tensorflow.python.saved_model.model_utils.export_utils import SINGLE_FEATURE_DEFAULT_NAME
 from tensorflow.python.saved_model.model_utils.export_utils import SINGLE_LABEL_DEFAULT_NAME
@@ -41,6 +45,9 @@ from tensorflow.python.saved_model.model_utils.export_utils import SINGLE_RECEIV
 from tensorflow.python.util.tf_export import estimator_export
 from tensorflow_estimator.python.estimator import util
 
+# Name of the receiver alternative of the features fed as tensors.
+COLUMNAR_RECEIVER_NAME = 'columnar'
+
 _SINGLE_TENSOR_DEFAULT_NAMES = {
     'feature': SINGLE_FEATURE_DEFAULT_NAME,
     'label': SINGLE_LABEL_DEFAULT_NAME,
@@ -318,6 +325,103 @@ def build_parsing_serving_input_receiver_fn(feature_spec,
   return serving_input_receiver_fn
 
 
+@estimator_export(
+    'estimator.export.build_multi_format_serving_input_receiver_fn')
+def build_multi_format_serving_input_receiver_fn(feature_spec,
+                                                 default_batch_size=None):
+  """Build a serving_input_receiver_fn expecting tf.Examples or tensors.
+
+  The default signatures expect serialized tf.Examples, as with
+  `build_parsing_serving_input_receiver_fn`. Additional signatures, named
+  `'columnar:<output key>'`, expect the features of the batch as tensors
+  instead, so that clients skip serializing protos and the server skips
+  parsing them:
+
+    * A `FixedLenFeature` or `FixedLenSequenceFeature` is fed as the dense
+      tensor it is parsed into, under the key of the feature.
+    * A `VarLenFeature` is fed in compressed sparse row (CSR) form, as the
+      1-D `'<key>/values'` of all the examples and the int64
+      `'<key>/row_splits'`, where the values of example `i` are
+      `values[row_splits[i]:row_splits[i + 1]]`.
+
+  Both formats produce the same features, so the model is the same. Only
+  `PredictOutput`s get columnar signatures, since classification and regression
+  signatures take serialized tf.Examples.
+
+  A request feeds the inputs of one of the signatures; the inputs of the other
+  one default to an empty batch. Parsed `VarLenFeature`s are passed to the
+  model as they are, and only columnar requests convert CSR to sparse tensors.
+
+  Args:
+    feature_spec: a dict of string to `VarLenFeature`/`FixedLenFeature`/
+      `FixedLenSequenceFeature`.
+    default_batch_size: the number of query examples expected per batch.
+        Leave unset for variable batch size (recommended). Only sets the static
+        batch size of the dense features.
+
+  Returns:
+    A serving_input_receiver_fn suitable for use in serving.
+
+  Raises:
+    ValueError: if `feature_spec` has other features.
+  """
+  for key, feature in six.iteritems(feature_spec):
+    if not isinstance(feature, (parsing_ops.FixedLenFeature,
+                                parsing_ops.FixedLenSequenceFeature,
+                                parsing_ops.VarLenFeature)):
+      raise ValueError(
+          'Unsupported feature for feature {}: {}. Only FixedLenFeature, '
+          'FixedLenSequenceFeature and VarLenFeature are supported.'.format(
+              key, feature))
+
+  def serving_input_receiver_fn():
+    """An input_fn that expects serialized tf.Examples or feature tensors."""
+    serialized_tf_example = array_ops.placeholder_with_default(
+        array_ops.constant([], dtype=dtypes.string),
+        shape=[None],
+        name='input_example_tensor')
+    parsed_features = parsing_ops.parse_example(serialized_tf_example,
+                                                feature_spec)
+    # Columnar requests leave the examples empty, so any parsing they run is of
+    # an empty batch. Dense features are computed from placeholders defaulting
+    # to the parsed tensors, and sparse features are only converted from CSR
+    # for columnar requests.
+    is_columnar = math_ops.equal(array_ops.size(serialized_tf_example), 0)
+    features = {}
+    columnar_tensors = {}
+    for key in sorted(feature_spec):
+      parsed = parsed_features[key]
+      if isinstance(feature_spec[key], parsing_ops.VarLenFeature):
+        values = array_ops.placeholder_with_default(
+            array_ops.zeros([0], dtype=parsed.dtype), shape=[None])
+        row_splits = array_ops.placeholder_with_default(
+            array_ops.zeros([1], dtype=dtypes.int64), shape=[None])
+        features[key] = control_flow_ops.cond(
+            is_columnar,
+            functools.partial(_sparse_from_row_splits, values, row_splits),
+            lambda parsed=parsed: parsed)
+        columnar_tensors[key + '/values'] = values
+        columnar_tensors[key + '/row_splits'] = row_splits
+      else:
+        features[key] = array_ops.placeholder_with_default(
+            parsed,
+            shape=tensor_shape.TensorShape([default_batch_size]).concatenate(
+                parsed.shape[1:]))
+        columnar_tensors[key] = features[key]
+    return ServingInputReceiver(
+        features, {'examples': serialized_tf_example},
+        receiver_tensors_alternatives={
+            COLUMNAR_RECEIVER_NAME: columnar_tensors})
+
+  return serving_input_receiver_fn
+
+
+def _sparse_from_row_splits(values, row_splits):
+  """Returns the `SparseTensor` of the CSR rows `values` and `row_splits`."""
+  return ragged_tensor.RaggedTensor.from_row_splits(values,
+                                                    row_splits).to_sparse()
+
+
 def _placeholder_from_tensor(t, default_batch_size=None):
   """Creates a placeholder that matches the dtype and shape of passed tensor.
 
@@ -36,10 +36,12 @@ from tensorflow.python.saved_model.model_utils.export_output import ExportOutput
 from tensorflow.python.saved_model.model_utils.export_output import PredictOutput
 from tensorflow.python.saved_model.model_utils.export_output import RegressionOutput
 from tensorflow.python.saved_model.model_utils.export_output import TrainOutput
+from tensorflow_estimator.python.estimator.export.export import build_multi_format_serving_input_receiver_fn
 from tensorflow_estimator.python.estimator.export.export import build_parsing_serving_input_receiver_fn
 from tensorflow_estimator.python.estimator.export.export import build_raw_serving_input_receiver_fn
 from tensorflow_estimator.python.estimator.export.export import build_raw_supervised_input_receiver_fn
 from tensorflow_estimator.python.estimator.export.export import build_supervised_input_receiver_fn_from_input_fn
+from tensorflow_estimator.python.estimator.export.export import COLUMNAR_RECEIVER_NAME
 from tensorflow_estimator.python.estimator.export.export import ServingInputReceiver
 from tensorflow_estimator.python.estimator.export.export import SupervisedInputReceiver
 from tensorflow_estimator.python.estimator.export.export import TensorServingInputReceiver
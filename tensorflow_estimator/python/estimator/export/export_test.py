@@ -21,6 +21,7 @@ from __future__ import print_function
 from google.protobuf import text_format
 
 from tensorflow.core.example import example_pb2
+from tensorflow.core.protobuf import config_pb2
 from tensorflow.python.framework import constant_op
 from tensorflow.python.framework import dtypes
 from tensorflow.python.framework import ops
@@ -411,6 +412,68 @@ class ExportTest(test_util.TensorFlowTestCase):
         self.assertAllEqual([525.25],
                             sparse_result["float_feature"].values)
 
+  # Calling serving_input_receiver_fn requires graph mode.
+  @test_util.deprecated_graph_mode_only
+  def test_build_multi_format_serving_input_receiver_fn(self):
+    feature_spec = {"ids": parsing_ops.VarLenFeature(dtypes.int64),
+                    "price": parsing_ops.FixedLenFeature([2], dtypes.float32)}
+    serving_input_receiver_fn = (
+        export.build_multi_format_serving_input_receiver_fn(feature_spec))
+    with ops.Graph().as_default():
+      serving_input_receiver = serving_input_receiver_fn()
+      self.assertEqual(set(["examples"]),
+                       set(serving_input_receiver.receiver_tensors.keys()))
+      columnar_tensors = serving_input_receiver.receiver_tensors_alternatives[
+          export.COLUMNAR_RECEIVER_NAME]
+      self.assertEqual(set(["ids/values", "ids/row_splits", "price"]),
+                       set(columnar_tensors.keys()))
+
+      examples = []
+      for ids, price in (([21, 2], [1., 2.]), ([], [3., 4.]), ([5], [5., 6.])):
+        example = example_pb2.Example()
+        example.features.feature["ids"].int64_list.value.extend(ids)
+        example.features.feature["price"].float_list.value.extend(price)
+        examples.append(example.SerializeToString())
+
+      with self.cached_session() as sess:
+        run_metadata = config_pb2.RunMetadata()
+        parsed = sess.run(
+            serving_input_receiver.features,
+            feed_dict={
+                serving_input_receiver.receiver_tensors["examples"]: examples},
+            options=config_pb2.RunOptions(
+                trace_level=config_pb2.RunOptions.FULL_TRACE),
+            run_metadata=run_metadata)
+        # The serialized examples are not needed to feed the tensors.
+        fed = sess.run(
+            serving_input_receiver.features,
+            feed_dict={
+                columnar_tensors["ids/values"]: [21, 2, 5],
+                columnar_tensors["ids/row_splits"]: [0, 2, 2, 3],
+                columnar_tensors["price"]: [[1., 2.], [3., 4.], [5., 6.]]})
+      # Parsed examples are not converted to CSR and back.
+      to_sparse_ops = set(
+          op.name for op in ops.get_default_graph().get_operations()
+          if op.type == "RaggedTensorToSparse")
+      self.assertTrue(to_sparse_ops)
+      executed_ops = set(
+          node_stats.node_name
+          for device_stats in run_metadata.step_stats.dev_stats
+          for node_stats in device_stats.node_stats)
+      self.assertFalse(to_sparse_ops & executed_ops)
+      for features in (parsed, fed):
+        self.assertAllEqual([[0, 0], [0, 1], [2, 0]],
+                            features["ids"].indices)
+        self.assertAllEqual([21, 2, 5], features["ids"].values)
+        self.assertAllEqual([3, 2], features["ids"].dense_shape)
+        self.assertAllClose([[1., 2.], [3., 4.], [5., 6.]], features["price"])
+
+  def test_build_multi_format_serving_input_receiver_fn_unsupported(self):
+    with self.assertRaisesRegexp(ValueError, "Unsupported feature"):
+      export.build_multi_format_serving_input_receiver_fn({
+          "ids": parsing_ops.SparseFeature(
+              "index", "value", dtypes.float32, size=10)})
+
   # Calling serving_input_receiver_fn requires graph mode.
   @test_util.deprecated_graph_mode_only
   def test_build_raw_serving_input_receiver_fn_name(self):
@@ -0,0 +1,674 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Optimizes the PREDICT graphs of SavedModels exported by Estimators.
+
+`Estimator.export_saved_model` saves the whole graph built by `model_fn` in
+PREDICT mode, including ops its signatures never run, such as summaries, unused
+head outputs and their conversions, and the assertions of the heads.
+`optimize_meta_graph` rewrites such a `MetaGraphDef` to only keep the ops needed
+by its signatures, its saver and its initialization ops. It also folds constant
+subgraphs, including the shapes known statically, and removes the assertions
+they prove. `prune_meta_graph` only does the pruning, for some of the
+signatures, e.g. to import the graph of one mode faster.
+
+The Estimator export methods optimize the SERVING `MetaGraphDef` of the saved
+SavedModel with `optimize_saved_model`, and write the statistics returned by
+`optimize_meta_graph` to `assets.extra/inference_optimization_stats.json` in
+the SavedModel. Serving latency is not measured at export time, since it
+depends on the inputs and the serving hardware; it can be compared by loading
+the SavedModel exported with and without the optimization.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import json
+import os
+
+import numpy as np
+
+from google.protobuf import text_format
+from tensorflow.core.framework import attr_value_pb2
+from tensorflow.core.framework import graph_pb2
+from tensorflow.core.framework import node_def_pb2
+from tensorflow.core.framework import variable_pb2
+from tensorflow.core.protobuf import meta_graph_pb2
+from tensorflow.core.protobuf import saved_model_pb2
+from tensorflow.python.client import session as tf_session
+from tensorflow.python.framework import dtypes
+from tensorflow.python.framework import errors
+from tensorflow.python.framework import importer
+from tensorflow.python.framework import ops
+from tensorflow.python.framework import tensor_shape
+from tensorflow.python.framework import tensor_util
+from tensorflow.python.platform import gfile
+from tensorflow.python.platform import tf_logging as logging
+from tensorflow.python.saved_model import constants
+from tensorflow.python.training import checkpoint_utils
+from tensorflow.python.util import compat
+
+# Name of the statistics file written by `write_stats`, in `assets.extra`.
+STATS_FILENAME = 'inference_optimization_stats.json'
+
+# Collections of the ops run when loading a SavedModel.
+_INITIALIZATION_COLLECTIONS = (
+    constants.MAIN_OP_KEY,
+    constants.LEGACY_INIT_OP_KEY,
+    constants.TRAIN_OP_KEY,
+    ops.GraphKeys.ASSET_FILEPATHS,
+    ops.GraphKeys.TABLE_INITIALIZERS,
+)
+
+_CONTROL_FLOW_OPS = frozenset([
+    'Switch', 'RefSwitch', 'Merge', 'RefMerge', 'Enter', 'RefEnter', 'Exit',
+    'RefExit', 'NextIteration', 'RefNextIteration', 'LoopCond'])
+
+_PLACEHOLDER_OPS = frozenset(['Placeholder', 'PlaceholderWithDefault'])
+
+# Ops whose value only depends on the static shape of their input.
+_STATIC_SHAPE_OPS = frozenset(['Shape', 'Size', 'Rank'])
+
+_VARIABLE_OPS = frozenset(['Variable', 'VariableV2', 'VarHandleOp'])
+
+# Ops reading the value of a variable.
+_VARIABLE_READ_OPS = frozenset(['Identity', 'ReadVariableOp'])
+
+
+class InferenceOptimizationConfig(
+    collections.namedtuple('InferenceOptimizationConfig', [
+        'fold_constants', 'strip_proven_assertions',
+        'freeze_variables_max_bytes', 'max_constant_bytes'
+    ])):
+  """Settings of `optimize_meta_graph`.
+
+  Attributes:
+    fold_constants: Whether to replace the ops computed from constants only,
+      or from statically known shapes, by constants.
+    strip_proven_assertions: Whether to remove the `Assert` ops whose condition
+      is a true constant, e.g. once the static shapes they check are folded.
+    freeze_variables_max_bytes: Reads of variables of at most this many bytes
+      are replaced by their value in the checkpoint. The variables themselves
+      are still saved and restored. `0` freezes no variable.
+    max_constant_bytes: Folded values larger than this stay computed, to keep
+      the `GraphDef` small.
+  """
+
+  def __new__(cls,
+              fold_constants=True,
+              strip_proven_assertions=True,
+              freeze_variables_max_bytes=0,
+              max_constant_bytes=1 << 20):
+    if freeze_variables_max_bytes < 0:
+      raise ValueError(
+          'freeze_variables_max_bytes must be non-negative. Given: {}'.format(
+              freeze_variables_max_bytes))
+    if max_constant_bytes < 0:
+      raise ValueError(
+          'max_constant_bytes must be non-negative. Given: {}'.format(
+              max_constant_bytes))
+    return super(InferenceOptimizationConfig, cls).__new__(
+        cls,
+        fold_constants=fold_constants,
+        strip_proven_assertions=strip_proven_assertions,
+        freeze_variables_max_bytes=freeze_variables_max_bytes,
+        max_constant_bytes=max_constant_bytes)
+
+
+def _node_name(name):
+  """Returns the node name of an input or tensor `name`."""
+  if name.startswith('^'):
+    name = name[1:]
+  return name.split(':')[0]
+
+
+def _data_inputs(node):
+  return [name for name in node.input if not name.startswith('^')]
+
+
+def _tensor_info_names(tensor_info):
+  if tensor_info.HasField('coo_sparse'):
+    return [tensor_info.coo_sparse.values_tensor_name,
+            tensor_info.coo_sparse.indices_tensor_name,
+            tensor_info.coo_sparse.dense_shape_tensor_name]
+  return [tensor_info.name]
+
+
+def _signature_node_names(meta_graph_def):
+  """Returns the names of the nodes of the signatures of `meta_graph_def`."""
+  names = set()
+  for signature_def in meta_graph_def.signature_def.values():
+    for tensor_info in (list(signature_def.inputs.values()) +
+                        list(signature_def.outputs.values())):
+      names.update(_node_name(name) for name in _tensor_info_names(tensor_info))
+  return names
+
+
+def _required_node_names(meta_graph_def):
+  """Returns the names of the nodes needed to load and run `meta_graph_def`."""
+  names = _signature_node_names(meta_graph_def)
+  saver_def = meta_graph_def.saver_def
+  names.update(
+      _node_name(name) for name in (saver_def.filename_tensor_name,
+                                    saver_def.save_tensor_name,
+                                    saver_def.restore_op_name) if name)
+  for key, collection_def in meta_graph_def.collection_def.items():
+    if key in _INITIALIZATION_COLLECTIONS:
+      names.update(_node_name(name) for name in collection_def.node_list.value)
+    elif key == constants.ASSETS_KEY:
+      for value in collection_def.any_list.value:
+        asset_file_def = meta_graph_pb2.AssetFileDef()
+        value.Unpack(asset_file_def)
+        names.update(_node_name(name) for name in _tensor_info_names(
+            asset_file_def.tensor_info))
+    elif key in ops.GraphKeys._VARIABLE_COLLECTIONS:  # pylint: disable=protected-access
+      for value in collection_def.bytes_list.value:
+        variable_def = variable_pb2.VariableDef()
+        variable_def.ParseFromString(value)
+        names.update(
+            _node_name(name) for name in (variable_def.variable_name,
+                                          variable_def.initializer_name,
+                                          variable_def.snapshot_name,
+                                          variable_def.initial_value_name)
+            if name)
+  return names
+
+
+def _reachable_node_names(graph_def, node_names):
+  """Returns the names of `node_names` and of the nodes they depend on."""
+  inputs = {node.name: node.input for node in graph_def.node}
+  reachable = set()
+  to_visit = [name for name in node_names if name in inputs]
+  while to_visit:
+    name = to_visit.pop()
+    if name in reachable:
+      continue
+    reachable.add(name)
+    to_visit.extend(_node_name(input_name) for input_name in inputs[name])
+  return reachable
+
+
+def _prune(graph_def, node_names):
+  """Returns `graph_def` with only the nodes `node_names` depend on."""
+  reachable = _reachable_node_names(graph_def, node_names)
+  pruned = graph_pb2.GraphDef()
+  pruned.versions.CopyFrom(graph_def.versions)
+  pruned.library.CopyFrom(graph_def.library)
+  pruned.node.extend(node for node in graph_def.node if node.name in reachable)
+  return pruned
+
+
+def _replace_nodes(graph_def, replacements):
+  """Returns `graph_def` with the nodes named in `replacements` replaced."""
+  replaced = graph_pb2.GraphDef()
+  replaced.versions.CopyFrom(graph_def.versions)
+  replaced.library.CopyFrom(graph_def.library)
+  replaced.node.extend(
+      replacements.get(node.name, node) for node in graph_def.node)
+  return replaced
+
+
+def _const_node(node, value, dtype):
+  """Returns a `Const` node of `value` replacing `node`.
+
+  The control inputs of `node` are kept, so that the constant still runs after
+  them.
+
+  Args:
+    node: The replaced `NodeDef`.
+    value: The value of the constant.
+    dtype: The `DType` of the constant.
+
+  Returns:
+    A `NodeDef`.
+  """
+  const = node_def_pb2.NodeDef(name=node.name, op='Const', device=node.device)
+  const.input.extend(name for name in node.input if name.startswith('^'))
+  const.attr['dtype'].CopyFrom(
+      attr_value_pb2.AttrValue(type=dtype.as_datatype_enum))
+  const.attr['value'].CopyFrom(attr_value_pb2.AttrValue(
+      tensor=tensor_util.make_tensor_proto(value, dtype=dtype)))
+  return const
+
+
+def _import_for_analysis(graph_def):
+  """Imports `graph_def` without devices, to run it in a local session."""
+  graph_def_without_devices = graph_pb2.GraphDef()
+  graph_def_without_devices.CopyFrom(graph_def)
+  for node in graph_def_without_devices.node:
+    node.device = ''
+  graph = ops.Graph()
+  with graph.as_default():
+    importer.import_graph_def(graph_def_without_devices, name='')
+  return graph
+
+
+def _saves_variables_by_name(graph_def):
+  """Returns whether the saver of `graph_def` saves variables by node name.
+
+  This is what a default `Saver` does. A `Saver` built with a dict of names,
+  or one of the V1 format, may store a variable under another key, so its
+  checkpoint cannot be used to look variables up by name.
+
+  Args:
+    graph_def: A `GraphDef` with the ops of its `Saver`.
+
+  Returns:
+    `True` if the graph has `SaveV2` ops, and each variable they save is saved
+    under its node name.
+  """
+  nodes = {node.name: node for node in graph_def.node}
+  save_nodes = [node for node in graph_def.node if node.op == 'SaveV2']
+  if not save_nodes:
+    return False
+  for node in save_nodes:
+    inputs = _data_inputs(node)
+    names_node = nodes.get(_node_name(inputs[1]))
+    if names_node is None or names_node.op != 'Const':
+      return False
+    keys = tensor_util.MakeNdarray(names_node.attr['value'].tensor)
+    for key, tensor_name in zip(keys.tolist(), inputs[3:]):
+      source = nodes.get(_node_name(tensor_name))
+      while (source is not None and source.op in _VARIABLE_READ_OPS and
+             _data_inputs(source)):
+        source = nodes.get(_node_name(_data_inputs(source)[0]))
+      if source is None:
+        return False
+      if source.op in _VARIABLE_OPS and compat.as_text(key) != source.name:
+        return False
+  return True
+
+
+def _freeze_variables(graph_def, signature_names, checkpoint_path, max_bytes):
+  """Replaces reads of small variables by constants.
+
+  Only the reads the signatures depend on are replaced. Variables are looked up
+  in the checkpoint by name, so the caller checks that the `Saver` saves them
+  under their name, and are skipped if the checkpoint has no value of their
+  shape and dtype there.
+
+  Args:
+    graph_def: A `GraphDef`.
+    signature_names: The names of the nodes of the signatures.
+    checkpoint_path: The checkpoint the variables are restored from.
+    max_bytes: The maximum size of the frozen variables.
+
+  Returns:
+    The new `GraphDef` and the number of reads replaced.
+  """
+  reader = checkpoint_utils.load_checkpoint(checkpoint_path)
+  checkpoint_shapes = reader.get_variable_to_shape_map()
+  checkpoint_dtypes = reader.get_variable_to_dtype_map()
+  nodes = {node.name: node for node in graph_def.node}
+  replacements = {}
+  for name in _reachable_node_names(graph_def, signature_names):
+    node = nodes[name]
+    if node.op not in _VARIABLE_READ_OPS or len(_data_inputs(node)) != 1:
+      continue
+    variable = nodes.get(_node_name(_data_inputs(node)[0]))
+    if (variable is None or variable.op not in _VARIABLE_OPS or
+        variable.name not in checkpoint_shapes):
+      continue
+    shape = tensor_shape.TensorShape(variable.attr['shape'].shape)
+    dtype = checkpoint_dtypes[variable.name]
+    if (not shape.is_fully_defined() or
+        shape.as_list() != checkpoint_shapes[variable.name] or
+        dtypes.as_dtype(variable.attr['dtype'].type).base_dtype != dtype or
+        shape.num_elements() * dtype.size > max_bytes):
+      continue
+    replacements[name] = _const_node(
+        node, reader.get_tensor(variable.name), dtype)
+  return _replace_nodes(graph_def, replacements), len(replacements)
+
+
+def _fold_constants(graph_def, required_names, max_bytes):
+  """Replaces the ops computed from constants only by constants.
+
+  Stateless single-output ops without control inputs are folded when all their
+  inputs are constants, or are static shapes known at graph construction. Only
+  the outermost of such ops are evaluated and replaced, keeping their names.
+
+  Args:
+    graph_def: A `GraphDef`.
+    required_names: The names of the nodes which must remain in the graph.
+    max_bytes: The maximum size of a folded constant.
+
+  Returns:
+    The new `GraphDef` and the number of nodes replaced by constants.
+  """
+  graph = _import_for_analysis(graph_def)
+  foldable = {}
+  static_values = {}
+  # Imported graphs list the operations in a topological order, except for the
+  # back edges of loops, which are never folded.
+  for op in graph.get_operations():
+    if (op.control_inputs or len(op.outputs) != 1 or
+        op.type in _CONTROL_FLOW_OPS or op.type in _PLACEHOLDER_OPS or
+        op.outputs[0].dtype in (dtypes.resource, dtypes.variant) or
+        op.outputs[0].dtype._is_ref_dtype or  # pylint: disable=protected-access
+        op.op_def.is_stateful):
+      foldable[op.name] = False
+    elif op.type == 'Const':
+      foldable[op.name] = True
+    elif op.type in _STATIC_SHAPE_OPS and (
+        tensor_util.constant_value(op.outputs[0]) is not None):
+      static_values[op.outputs[0]] = tensor_util.constant_value(op.outputs[0])
+      foldable[op.name] = True
+    else:
+      foldable[op.name] = all(
+          foldable.get(tensor.op.name, False) for tensor in op.inputs)
+
+  targets = [
+      op for op in graph.get_operations()
+      if foldable[op.name] and op.type != 'Const' and (
+          op.name in required_names or
+          not all(foldable[consumer.name]
+                  for consumer in op.outputs[0].consumers()))
+  ]
+  if not targets:
+    return graph_def, 0
+  with tf_session.Session(graph=graph) as session:
+    try:
+      values = session.run([op.outputs[0] for op in targets],
+                           feed_dict=static_values)
+    except errors.OpError as e:
+      logging.warning('Not folding constants, failed to evaluate them: %s', e)
+      return graph_def, 0
+
+  nodes = {node.name: node for node in graph_def.node}
+  replacements = {}
+  for op, value in zip(targets, values):
+    const = _const_node(nodes[op.name], value, op.outputs[0].dtype)
+    if const.attr['value'].tensor.ByteSize() <= max_bytes:
+      replacements[op.name] = const
+  return _replace_nodes(graph_def, replacements), len(replacements)
+
+
+def _is_true_constant(nodes, name):
+  """Returns whether the tensor `name` is a constant with only true values."""
+  node = nodes.get(_node_name(name))
+  while node is not None and node.op == 'Identity':
+    node = nodes.get(_node_name(_data_inputs(node)[0]))
+  if node is None or node.op != 'Const':
+    return False
+  return bool(np.all(tensor_util.MakeNdarray(node.attr['value'].tensor)))
+
+
+def _is_proven_assertion(nodes, node):
+  """Returns whether `node` is an assertion of a constant true condition.
+
+  Besides `Assert` ops, `tf.debugging.Assert` guards the assertion of
+  non-string data with a 'AssertGuard' `tf.cond`, whose `Merge` is then the
+  assertion.
+
+  Args:
+    nodes: A dict of the `NodeDef`s of a graph by name.
+    node: A `NodeDef` of the graph.
+
+  Returns:
+    A bool.
+  """
+  if node.op == 'Assert':
+    return _is_true_constant(nodes, node.input[0])
+  guard_suffix = 'AssertGuard/Merge'
+  if node.op == 'Merge' and node.name.endswith(guard_suffix):
+    switch = nodes.get(node.name[:-len('Merge')] + 'Switch')
+    return switch is not None and _is_true_constant(nodes, switch.input[1])
+  return False
+
+
+def _strip_proven_assertions(graph_def):
+  """Removes the control dependencies on assertions of constant conditions.
+
+  The assertions themselves are then pruned, unless something else needs them.
+
+  Args:
+    graph_def: A `GraphDef`.
+
+  Returns:
+    The new `GraphDef` and the number of assertions stripped.
+  """
+  nodes = {node.name: node for node in graph_def.node}
+  proven = set('^' + node.name for node in graph_def.node
+               if _is_proven_assertion(nodes, node))
+  if not proven:
+    return graph_def, 0
+  stripped = graph_pb2.GraphDef()
+  stripped.CopyFrom(graph_def)
+  for node in stripped.node:
+    if proven.intersection(node.input):
+      inputs = [name for name in node.input if name not in proven]
+      del node.input[:]
+      node.input.extend(inputs)
+  return stripped, len(proven)
+
+
+def _bypass_identities(graph_def, required_names):
+  """Connects the consumers of `Identity` ops to the inputs of the ops.
+
+  Identities are kept when they are required, have control inputs, read
+  variables, forward control flow ops, or move tensors across devices.
+
+  Args:
+    graph_def: A `GraphDef`.
+    required_names: The names of the nodes which must remain in the graph.
+
+  Returns:
+    The new `GraphDef`.
+  """
+  nodes = {node.name: node for node in graph_def.node}
+  bypassed = {}
+  for node in graph_def.node:
+    if (node.op != 'Identity' or node.name in required_names or
+        len(node.input) != 1 or node.input[0].startswith('^')):
+      continue
+    source = nodes.get(_node_name(node.input[0]))
+    if (source is None or source.op in _VARIABLE_OPS or
+        source.op in _CONTROL_FLOW_OPS or source.device != node.device):
+      continue
+    bypassed[node.name] = node.input[0]
+  if not bypassed:
+    return graph_def
+
+  def _resolve(name):
+    while _node_name(name) in bypassed:
+      name = bypassed[_node_name(name)]
+    return name
+
+  rewired = graph_pb2.GraphDef()
+  rewired.CopyFrom(graph_def)
+  for node in rewired.node:
+    for i, name in enumerate(node.input):
+      if not name.startswith('^') and _node_name(name) in bypassed:
+        node.input[i] = _resolve(name)
+  return rewired
+
+
+def _filter_collections(meta_graph_def):
+  """Removes the collection items referring to nodes pruned from the graph."""
+  graph = _import_for_analysis(meta_graph_def.graph_def)
+  node_names = set(node.name for node in meta_graph_def.graph_def.node)
+  with graph.as_default():
+    for key, collection_def in meta_graph_def.collection_def.items():
+      kind = collection_def.WhichOneof('kind')
+      if kind == 'node_list':
+        values = [value for value in collection_def.node_list.value
+                  if _node_name(value) in node_names]
+        del collection_def.node_list.value[:]
+        collection_def.node_list.value.extend(values)
+      elif kind == 'bytes_list':
+        proto_type = ops.get_collection_proto_type(key)
+        from_proto = ops.get_from_proto_function(key)
+        if proto_type is None or from_proto is None:
+          continue
+        values = []
+        for value in collection_def.bytes_list.value:
+          proto = proto_type()
+          proto.ParseFromString(value)
+          try:
+            from_proto(proto)
+          except (KeyError, ValueError):
+            continue
+          values.append(value)
+        del collection_def.bytes_list.value[:]
+        collection_def.bytes_list.value.extend(values)
+
+
+def prune_meta_graph(meta_graph_def, signature_def_keys, keep_collections=()):
+  """Returns a copy of `meta_graph_def` only running some of its signatures.
+
+  The copy only has the signatures `signature_def_keys`, and the ops they,
+  the saver, the initialization ops and the node lists `keep_collections` need.
+
+  Args:
+    meta_graph_def: A `MetaGraphDef`.
+    signature_def_keys: Keys of the signatures to keep.
+    keep_collections: Keys of the node list collections whose ops are kept,
+      e.g. `tf.GraphKeys.SUMMARIES`.
+
+  Returns:
+    A pruned `MetaGraphDef`.
+  """
+  pruned = meta_graph_pb2.MetaGraphDef()
+  pruned.CopyFrom(meta_graph_def)
+  for key in list(pruned.signature_def):
+    if key not in signature_def_keys:
+      del pruned.signature_def[key]
+  required_names = _required_node_names(pruned)
+  for key in keep_collections:
+    if key in pruned.collection_def:
+      required_names.update(
+          _node_name(name)
+          for name in pruned.collection_def[key].node_list.value)
+  pruned.graph_def.CopyFrom(_prune(meta_graph_def.graph_def, required_names))
+  _filter_collections(pruned)
+  return pruned
+
+
+def optimize_meta_graph(meta_graph_def, config, checkpoint_path=None):
+  """Optimizes `meta_graph_def` in place for running its signatures.
+
+  Args:
+    meta_graph_def: A `MetaGraphDef` whose graph only runs its signatures, e.g.
+      the SERVING one of a SavedModel exported in PREDICT mode.
+    config: An `InferenceOptimizationConfig`.
+    checkpoint_path: The checkpoint the variables of `meta_graph_def` are
+      restored from. Needed to freeze variables.
+
+  Returns:
+    A dict with the number of nodes before and after the optimization, and the
+    numbers of variable reads frozen, nodes folded and assertions stripped. See
+    `write_stats`.
+  """
+  required_names = _required_node_names(meta_graph_def)
+  stats = {
+      'num_nodes_before': len(meta_graph_def.graph_def.node),
+      'num_frozen_variable_reads': 0,
+      'num_folded_nodes': 0,
+      'num_stripped_assertions': 0,
+  }
+  graph_def = _prune(meta_graph_def.graph_def, required_names)
+  if config.freeze_variables_max_bytes and checkpoint_path:
+    if _saves_variables_by_name(meta_graph_def.graph_def):
+      graph_def, stats['num_frozen_variable_reads'] = _freeze_variables(
+          graph_def, _signature_node_names(meta_graph_def), checkpoint_path,
+          config.freeze_variables_max_bytes)
+    else:
+      logging.warning('Not freezing variables, the saver does not save them '
+                      'under their names.')
+  if config.fold_constants:
+    graph_def, stats['num_folded_nodes'] = _fold_constants(
+        graph_def, required_names, config.max_constant_bytes)
+  if config.strip_proven_assertions:
+    graph_def, stats['num_stripped_assertions'] = _strip_proven_assertions(
+        graph_def)
+  graph_def = _prune(_bypass_identities(graph_def, required_names),
+                     required_names)
+  meta_graph_def.graph_def.CopyFrom(graph_def)
+  _filter_collections(meta_graph_def)
+  stats['num_nodes_after'] = len(graph_def.node)
+  logging.info(
+      'Optimized inference graph from %d to %d nodes: %d variable reads '
+      'frozen, %d nodes folded and %d assertions stripped.',
+      stats['num_nodes_before'], stats['num_nodes_after'],
+      stats['num_frozen_variable_reads'], stats['num_folded_nodes'],
+      stats['num_stripped_assertions'])
+  return stats
+
+
+def optimize_saved_model(export_dir, tags, config, checkpoint_path=None):
+  """Optimizes the `MetaGraphDef` of `tags` of a saved SavedModel in place.
+
+  The `saved_model.pb` or `saved_model.pbtxt` file of `export_dir` is read,
+  the `MetaGraphDef` with exactly `tags` is optimized with
+  `optimize_meta_graph`, and the file is written back in the same format.
+
+  Args:
+    export_dir: The directory of the SavedModel.
+    tags: The tags of the `MetaGraphDef` to optimize, e.g. the SERVING ones.
+    config: An `InferenceOptimizationConfig`.
+    checkpoint_path: The checkpoint the variables of the `MetaGraphDef` are
+      restored from. Needed to freeze variables.
+
+  Returns:
+    The statistics of `optimize_meta_graph`, or `None` if the SavedModel has
+    no `MetaGraphDef` with `tags`.
+  """
+  as_text = not gfile.Exists(os.path.join(
+      compat.as_bytes(export_dir),
+      compat.as_bytes(constants.SAVED_MODEL_FILENAME_PB)))
+  path = os.path.join(
+      compat.as_bytes(export_dir),
+      compat.as_bytes(constants.SAVED_MODEL_FILENAME_PBTXT if as_text
+                      else constants.SAVED_MODEL_FILENAME_PB))
+  saved_model = saved_model_pb2.SavedModel()
+  with gfile.GFile(path, 'rb') as f:
+    if as_text:
+      text_format.Merge(f.read(), saved_model)
+    else:
+      saved_model.ParseFromString(f.read())
+
+  stats = None
+  for meta_graph_def in saved_model.meta_graphs:
+    if set(meta_graph_def.meta_info_def.tags) == set(tags):
+      stats = optimize_meta_graph(meta_graph_def, config, checkpoint_path)
+  if stats is None:
+    return None
+
+  with gfile.GFile(path, 'wb') as f:
+    if as_text:
+      f.write(text_format.MessageToString(saved_model))
+    else:
+      f.write(saved_model.SerializeToString())
+  return stats
+
+
+def write_stats(stats, export_dir):
+  """Writes the statistics of `optimize_meta_graph` to a SavedModel.
+
+  Args:
+    stats: The dict returned by `optimize_meta_graph`.
+    export_dir: The directory of the SavedModel. The statistics are written to
+      `STATS_FILENAME` in its `assets.extra` directory, which is not loaded
+      with the SavedModel.
+  """
+  assets_extra_path = os.path.join(
+      compat.as_bytes(export_dir), compat.as_bytes('assets.extra'))
+  gfile.MakeDirs(assets_extra_path)
+  with gfile.GFile(
+      os.path.join(assets_extra_path, compat.as_bytes(STATS_FILENAME)),
+      'w') as f:
+    f.write(json.dumps(stats, sort_keys=True))
@@ -0,0 +1,207 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for inference_optimization.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import time
+
+import numpy as np
+
+from tensorflow.python.client import session
+from tensorflow.python.framework import constant_op
+from tensorflow.python.framework import dtypes
+from tensorflow.python.framework import ops
+from tensorflow.python.framework import test_util
+from tensorflow.python.ops import array_ops
+from tensorflow.python.ops import check_ops
+from tensorflow.python.ops import control_flow_ops
+from tensorflow.python.ops import math_ops
+from tensorflow.python.ops import variables
+from tensorflow.python.platform import benchmark
+from tensorflow.python.platform import test
+from tensorflow.python.saved_model import signature_def_utils
+from tensorflow.python.summary import summary
+from tensorflow.python.training import saver
+from tensorflow_estimator.python.estimator.export import inference_optimization
+
+_X = np.array([[1., 2.], [3., 4.], [5., 6.]], dtype=np.float32)
+
+
+def _build_meta_graph(checkpoint_dir, num_layers=1, rename_variables=False):
+  """Returns a `MetaGraphDef` computing `y` from `x`, and its checkpoint."""
+  with ops.Graph().as_default():
+    x = array_ops.placeholder(dtypes.float32, shape=(3, 2), name='x')
+    net = x
+    var_list = {}
+    for i in range(num_layers):
+      # Mimics the input checks of the heads, proven by the static shapes.
+      net = control_flow_ops.with_dependencies(
+          [check_ops.assert_equal(array_ops.shape(net), [3, 2])], net)
+      w = variables.VariableV1([[1., 0.], [0., 1.]], name='w{}'.format(i))
+      # Saves the variables in reverse order of their names.
+      var_list['w{}'.format(num_layers - 1 - i)] = w
+      scale = math_ops.multiply(
+          constant_op.constant(2.), constant_op.constant(0.5))
+      net = math_ops.matmul(net, w) * scale
+    y = array_ops.identity(net, name='y')
+    summary.scalar('unused_sum', math_ops.reduce_sum(y, name='unused_sum'))
+    graph_saver = saver.Saver(
+        var_list if rename_variables else None, sharded=True)
+    with session.Session() as sess:
+      sess.run(variables.global_variables_initializer())
+      checkpoint_path = graph_saver.save(
+          sess, os.path.join(checkpoint_dir, 'model.ckpt'))
+    meta_graph_def = graph_saver.export_meta_graph()
+    meta_graph_def.signature_def['serving_default'].CopyFrom(
+        signature_def_utils.predict_signature_def({'x': x}, {'y': y}))
+  return meta_graph_def, checkpoint_path
+
+
+def _run(meta_graph_def, checkpoint_path=None):
+  """Imports `meta_graph_def` and returns `y` for `_X`."""
+  with ops.Graph().as_default():
+    graph_saver = saver.import_meta_graph(meta_graph_def)
+    with session.Session() as sess:
+      if checkpoint_path:
+        graph_saver.restore(sess, checkpoint_path)
+      return sess.run('y:0', {'x:0': _X})
+
+
+def _ops(meta_graph_def):
+  return [node.op for node in meta_graph_def.graph_def.node]
+
+
+@test_util.run_v1_only('Optimizes graphs of v1 SavedModels.')
+class InferenceOptimizationTest(test.TestCase):
+
+  def test_optimize_meta_graph(self):
+    meta_graph_def, checkpoint_path = _build_meta_graph(self.get_temp_dir())
+    self.assertIn('Assert', _ops(meta_graph_def))
+    self.assertIn('ScalarSummary', _ops(meta_graph_def))
+
+    stats = inference_optimization.optimize_meta_graph(
+        meta_graph_def, inference_optimization.InferenceOptimizationConfig())
+
+    self.assertNotIn('Assert', _ops(meta_graph_def))
+    self.assertNotIn('ScalarSummary', _ops(meta_graph_def))
+    self.assertNotIn(
+        'unused_sum', [node.name for node in meta_graph_def.graph_def.node])
+    self.assertNotIn(ops.GraphKeys.SUMMARIES, [
+        key for key, collection_def in meta_graph_def.collection_def.items()
+        if collection_def.node_list.value])
+    self.assertEqual(1, stats['num_stripped_assertions'])
+    self.assertLess(stats['num_nodes_after'], stats['num_nodes_before'])
+    self.assertAllClose(_X, _run(meta_graph_def, checkpoint_path))
+
+  def test_freeze_variables(self):
+    meta_graph_def, checkpoint_path = _build_meta_graph(self.get_temp_dir())
+    stats = inference_optimization.optimize_meta_graph(
+        meta_graph_def,
+        inference_optimization.InferenceOptimizationConfig(
+            freeze_variables_max_bytes=16),
+        checkpoint_path)
+    self.assertEqual(1, stats['num_frozen_variable_reads'])
+    nodes = {node.name: node for node in meta_graph_def.graph_def.node}
+    self.assertEqual('VariableV2', nodes['w0'].op)
+    # The variable is still saved, but no longer read.
+    self.assertAllClose(_X, _run(meta_graph_def))
+
+  def test_variables_over_limit_are_not_frozen(self):
+    meta_graph_def, checkpoint_path = _build_meta_graph(self.get_temp_dir())
+    stats = inference_optimization.optimize_meta_graph(
+        meta_graph_def,
+        inference_optimization.InferenceOptimizationConfig(
+            freeze_variables_max_bytes=15),
+        checkpoint_path)
+    self.assertEqual(0, stats['num_frozen_variable_reads'])
+    self.assertAllClose(_X, _run(meta_graph_def, checkpoint_path))
+
+  def test_variables_saved_under_other_names_are_not_frozen(self):
+    meta_graph_def, checkpoint_path = _build_meta_graph(
+        self.get_temp_dir(), num_layers=2, rename_variables=True)
+    stats = inference_optimization.optimize_meta_graph(
+        meta_graph_def,
+        inference_optimization.InferenceOptimizationConfig(
+            freeze_variables_max_bytes=16),
+        checkpoint_path)
+    self.assertEqual(0, stats['num_frozen_variable_reads'])
+    self.assertAllClose(_X, _run(meta_graph_def, checkpoint_path))
+
+  def test_prune_meta_graph(self):
+    meta_graph_def, checkpoint_path = _build_meta_graph(self.get_temp_dir())
+    meta_graph_def.signature_def['copy'].CopyFrom(
+        meta_graph_def.signature_def['serving_default'])
+    pruned = inference_optimization.prune_meta_graph(
+        meta_graph_def, ['serving_default'],
+        keep_collections=[ops.GraphKeys.SUMMARIES])
+    self.assertEqual(['serving_default'], list(pruned.signature_def))
+    self.assertIn('ScalarSummary', _ops(pruned))
+    # The original is not modified.
+    self.assertIn('copy', meta_graph_def.signature_def)
+    self.assertAllClose(_X, _run(pruned, checkpoint_path))
+
+    pruned = inference_optimization.prune_meta_graph(
+        meta_graph_def, ['serving_default'])
+    self.assertNotIn('ScalarSummary', _ops(pruned))
+    self.assertAllClose(_X, _run(pruned, checkpoint_path))
+
+  def test_invalid_config(self):
+    with self.assertRaisesRegexp(ValueError, 'freeze_variables_max_bytes'):
+      inference_optimization.InferenceOptimizationConfig(
+          freeze_variables_max_bytes=-1)
+    with self.assertRaisesRegexp(ValueError, 'max_constant_bytes'):
+      inference_optimization.InferenceOptimizationConfig(max_constant_bytes=-1)
+
+
+class InferenceOptimizationBenchmark(benchmark.Benchmark):
+  """Benchmarks the latency of a graph before and after its optimization."""
+
+  def _benchmark(self, optimize, num_runs=1000):
+    checkpoint_dir = test.get_temp_dir()
+    meta_graph_def, checkpoint_path = _build_meta_graph(
+        checkpoint_dir, num_layers=20)
+    if optimize:
+      inference_optimization.optimize_meta_graph(
+          meta_graph_def,
+          inference_optimization.InferenceOptimizationConfig(
+              freeze_variables_max_bytes=1 << 10),
+          checkpoint_path)
+    with ops.Graph().as_default():
+      graph_saver = saver.import_meta_graph(meta_graph_def)
+      with session.Session() as sess:
+        graph_saver.restore(sess, checkpoint_path)
+        sess.run('y:0', {'x:0': _X})
+        start = time.time()
+        for _ in range(num_runs):
+          sess.run('y:0', {'x:0': _X})
+        wall_time = (time.time() - start) / num_runs
+    self.report_benchmark(
+        iters=num_runs,
+        wall_time=wall_time,
+        extras={'num_nodes': len(meta_graph_def.graph_def.node)})
+
+  def benchmark_unoptimized(self):
+    self._benchmark(optimize=False)
+
+  def benchmark_optimized(self):
+    self._benchmark(optimize=True)
+
+
+if __name__ == '__main__':
+  test.main()
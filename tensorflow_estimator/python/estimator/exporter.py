@@ -24,7 +24,6 @@ import os
 from tensorflow_estimator.python.estimator import gc
 from tensorflow_estimator.python.estimator import util
 from tensorflow_estimator.python.estimator.canned import metric_keys
-from tensorflow.python.framework import errors_impl
 from tensorflow.python.platform import gfile
 from tensorflow.python.platform import tf_logging
 from tensorflow.python.summary import summary_iterator
@@ -166,6 +165,14 @@ def _verify_compare_fn_args(compare_fn):
                      (compare_fn, non_valid_args))
 
 
+def _export_version_parser(path):
+  # create a simple parser that pulls the export_version from the directory.
+  filename = os.path.basename(path.path)
+  if not (len(filename) == 10 and filename.isdigit()):
+    return None
+  return path._replace(export_version=int(filename))
+
+
 @estimator_export('estimator.BestExporter')
 class BestExporter(Exporter):
   """This class exports the serving graph and checkpoints of the best models.
@@ -181,7 +188,9 @@ class BestExporter(Exporter):
                compare_fn=_loss_smaller,
                assets_extra=None,
                as_text=False,
-               exports_to_keep=5):
+               exports_to_keep=5,
+               garbage_collect_in_background=False,
+               track_bytes_reclaimed=False):
     """Create an `Exporter` to use with `tf.estimator.EvalSpec`.
 
     Example of creating a BestExporter for training and evaluation:
@@ -253,6 +262,13 @@ class BestExporter(Exporter):
       exports_to_keep: Number of exports to keep.  Older exports will be
         garbage-collected.  Defaults to 5.  Set to `None` to disable garbage
         collection.
+      garbage_collect_in_background: Whether `export` returns before the old
+        exports are deleted. The deletions are then waited for by the next
+        `export` and when the interpreter exits. Defaults to `False`.
+      track_bytes_reclaimed: Whether to size the old exports before deleting
+        them, to report the bytes reclaimed in `garbage_collection_stats`. This
+        doubles the file system round trips of the deletions. Defaults to
+        `False`.
 
     Raises:
       ValueError: if any argument is invalid.
@@ -275,11 +291,28 @@ class BestExporter(Exporter):
       raise ValueError(
           '`exports_to_keep`, if provided, must be a positive number. Got %s'
           % exports_to_keep)
+    self._export_gc = gc._ExportGarbageCollector(  # pylint: disable=protected-access
+        track_bytes_reclaimed=track_bytes_reclaimed,
+        background=garbage_collect_in_background)
 
   @property
   def name(self):
     return self._saved_model_exporter.name
 
+  def garbage_collection_stats(self):
+    """Returns metrics of the deletion of old exports.
+
+    Old exports are deleted in parallel when `exports_to_keep` is set.
+
+    Returns:
+      A dict with the number of exports deleted (`'num_deleted'`) and still
+      pending deletion (`'num_pending'`), and the seconds between the
+      scheduling and the end of the last deletion (`'deletion_lag_secs'`).
+      `'bytes_reclaimed'` is the bytes of the deleted exports with
+      `track_bytes_reclaimed`, and `None` otherwise.
+    """
+    return self._export_gc.stats()
+
   def export(self, estimator, export_path, checkpoint_path, eval_result,
              is_the_final_export):
     export_result = None
@@ -304,40 +337,34 @@ class BestExporter(Exporter):
       export_result = self._saved_model_exporter.export(
           estimator, export_path, checkpoint_path, eval_result,
           is_the_final_export)
-      self._garbage_collect_exports(export_path)
+      self._garbage_collect_exports(export_path, export_result)
       self._has_exported = True
 
+    if is_the_final_export:
+      self._export_gc.close()
     return export_result
 
-  def _garbage_collect_exports(self, export_dir_base):
+  def _garbage_collect_exports(self, export_dir_base, export_result=None):
     """Deletes older exports, retaining only a given number of the most recent.
 
     Export subdirectories are assumed to be named with monotonically increasing
     integers; the most recent are taken to be those with the largest values.
+    The exports are deleted in parallel, see `gc._ExportGarbageCollector`.
 
     Args:
       export_dir_base: the base directory under which each export is in a
         versioned subdirectory.
+      export_result: the directory of the export just written, if any.
     """
     if self._exports_to_keep is None:
       return
 
-    def _export_version_parser(path):
-      # create a simple parser that pulls the export_version from the directory.
-      filename = os.path.basename(path.path)
-      if not (len(filename) == 10 and filename.isdigit()):
-        return None
-      return path._replace(export_version=int(filename))
-
     # pylint: disable=protected-access
-    keep_filter = gc._largest_export_versions(self._exports_to_keep)
-    delete_filter = gc._negation(keep_filter)
-    for p in delete_filter(
-        gc._get_paths(export_dir_base, parser=_export_version_parser)):
-      try:
-        gfile.DeleteRecursively(p.path)
-      except errors_impl.NotFoundError as e:
-        tf_logging.warn('Can not delete %s recursively: %s', p.path, e)
+    self._export_gc.collect(
+        export_dir_base,
+        parser=_export_version_parser,
+        keep_filter=gc._largest_export_versions(self._exports_to_keep),
+        new_paths=[export_result] if export_result is not None else [])
     # pylint: enable=protected-access
 
   def _get_best_eval_result(self, event_files):
@@ -430,7 +457,9 @@ class LatestExporter(Exporter):
                serving_input_receiver_fn,
                assets_extra=None,
                as_text=False,
-               exports_to_keep=5):
+               exports_to_keep=5,
+               garbage_collect_in_background=False,
+               track_bytes_reclaimed=False):
     """Create an `Exporter` to use with `tf.estimator.EvalSpec`.
 
     Args:
@@ -450,6 +479,13 @@ class LatestExporter(Exporter):
       exports_to_keep: Number of exports to keep.  Older exports will be
         garbage-collected.  Defaults to 5.  Set to `None` to disable garbage
         collection.
+      garbage_collect_in_background: Whether `export` returns before the old
+        exports are deleted. The deletions are then waited for by the next
+        `export` and when the interpreter exits. Defaults to `False`.
+      track_bytes_reclaimed: Whether to size the old exports before deleting
+        them, to report the bytes reclaimed in `garbage_collection_stats`. This
+        doubles the file system round trips of the deletions. Defaults to
+        `False`.
 
     Raises:
       ValueError: if any arguments is invalid.
@@ -460,47 +496,58 @@ class LatestExporter(Exporter):
     if exports_to_keep is not None and exports_to_keep <= 0:
       raise ValueError(
           '`exports_to_keep`, if provided, must be positive number')
+    self._export_gc = gc._ExportGarbageCollector(  # pylint: disable=protected-access
+        track_bytes_reclaimed=track_bytes_reclaimed,
+        background=garbage_collect_in_background)
 
   @property
   def name(self):
     return self._saved_model_exporter.name
 
+  def garbage_collection_stats(self):
+    """Returns metrics of the deletion of old exports.
+
+    Old exports are deleted in parallel when `exports_to_keep` is set.
+
+    Returns:
+      A dict with the number of exports deleted (`'num_deleted'`) and still
+      pending deletion (`'num_pending'`), and the seconds between the
+      scheduling and the end of the last deletion (`'deletion_lag_secs'`).
+      `'bytes_reclaimed'` is the bytes of the deleted exports with
+      `track_bytes_reclaimed`, and `None` otherwise.
+    """
+    return self._export_gc.stats()
+
   def export(self, estimator, export_path, checkpoint_path, eval_result,
              is_the_final_export):
     export_result = self._saved_model_exporter.export(
         estimator, export_path, checkpoint_path, eval_result,
         is_the_final_export)
 
-    self._garbage_collect_exports(export_path)
+    self._garbage_collect_exports(export_path, export_result)
+    if is_the_final_export:
+      self._export_gc.close()
     return export_result
 
-  def _garbage_collect_exports(self, export_dir_base):
+  def _garbage_collect_exports(self, export_dir_base, export_result=None):
     """Deletes older exports, retaining only a given number of the most recent.
 
     Export subdirectories are assumed to be named with monotonically increasing
     integers; the most recent are taken to be those with the largest values.
+    The exports are deleted in parallel, see `gc._ExportGarbageCollector`.
 
     Args:
       export_dir_base: the base directory under which each export is in a
         versioned subdirectory.
+      export_result: the directory of the export just written, if any.
     """
     if self._exports_to_keep is None:
       return
 
-    def _export_version_parser(path):
-      # create a simple parser that pulls the export_version from the directory.
-      filename = os.path.basename(path.path)
-      if not (len(filename) == 10 and filename.isdigit()):
-        return None
-      return path._replace(export_version=int(filename))
-
     # pylint: disable=protected-access
-    keep_filter = gc._largest_export_versions(self._exports_to_keep)
-    delete_filter = gc._negation(keep_filter)
-    for p in delete_filter(
-        gc._get_paths(export_dir_base, parser=_export_version_parser)):
-      try:
-        gfile.DeleteRecursively(p.path)
-      except errors_impl.NotFoundError as e:
-        tf_logging.warn('Can not delete %s recursively: %s', p.path, e)
+    self._export_gc.collect(
+        export_dir_base,
+        parser=_export_version_parser,
+        keep_filter=gc._largest_export_versions(self._exports_to_keep),
+        new_paths=[export_result] if export_result is not None else [])
     # pylint: enable=protected-access
@@ -359,6 +359,38 @@ class LatestExporterTest(test.TestCase):
     self.assertFalse(gfile.Exists(export_dir_2))
     self.assertTrue(gfile.Exists(export_dir_3))
     self.assertTrue(gfile.Exists(export_dir_4))
+    stats = exporter.garbage_collection_stats()
+    self.assertEqual(2, stats["num_deleted"])
+    self.assertEqual(0, stats["num_pending"])
+    self.assertIsNone(stats["bytes_reclaimed"])
+
+  def test_garbage_collect_exports_in_background(self):
+    export_dir_base = tempfile.mkdtemp() + "export/"
+    gfile.MkDir(export_dir_base)
+    export_dir_1 = _create_test_export_dir(export_dir_base)
+    export_dir_2 = _create_test_export_dir(export_dir_base)
+    with gfile.GFile(os.path.join(export_dir_1, "saved_model.pb"), "w") as f:
+      f.write("0123456789")
+
+    def _serving_input_receiver_fn():
+      return array_ops.constant([1]), None
+
+    exporter = exporter_lib.LatestExporter(
+        name="latest_exporter",
+        serving_input_receiver_fn=_serving_input_receiver_fn,
+        exports_to_keep=1,
+        garbage_collect_in_background=True,
+        track_bytes_reclaimed=True)
+    estimator = test.mock.Mock(spec=estimator_lib.Estimator)
+    exporter.export(estimator, export_dir_base, None, None, False)
+    exporter._export_gc.wait()  # pylint: disable=protected-access
+
+    self.assertFalse(gfile.Exists(export_dir_1))
+    self.assertTrue(gfile.Exists(export_dir_2))
+    stats = exporter.garbage_collection_stats()
+    self.assertEqual(1, stats["num_deleted"])
+    self.assertEqual(0, stats["num_pending"])
+    self.assertEqual(10, stats["bytes_reclaimed"])
 
   def test_garbage_collect_exports_with_trailing_delimiter(self):
     export_dir_base = tempfile.mkdtemp() + "export/"
@@ -87,6 +87,8 @@ class AddMetricsTest(test.TestCase):
       self.assertIn('x', features)
       self.assertIsNotNone(labels)
       self.assertIn('logistic', predictions)
+      # The head builds every prediction by default.
+      self.assertIn('classes', predictions)
       self.assertTrue(isinstance(config, run_config.RunConfig))
       return {}
 
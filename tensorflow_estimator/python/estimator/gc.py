@@ -60,18 +60,29 @@ For example,
   for p in to_delete(all_paths):
     gfile.DeleteRecursively(p.path)  # deletes:  "/tmp/1", "/tmp/2",
                                      # "/tmp/3", "/tmp/4", "/tmp/6",
+
+_ExportGarbageCollector applies such a filter to the export versions of a base
+directory, listed once and then kept in memory, and deletes the other exports
+on a bounded pool of threads.
 """
 
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import atexit
 import collections
 import heapq
 import math
+from multiprocessing import pool
 import os
+import threading
+import time
+import weakref
 
+from tensorflow.python.framework import errors_impl
 from tensorflow.python.platform import gfile
+from tensorflow.python.platform import tf_logging
 from tensorflow.python.util import compat
 
 Path = collections.namedtuple('Path', 'path export_version')
@@ -209,3 +220,172 @@ def _get_paths(base_dir, parser):
     if p:
       paths.append(p)
   return sorted(paths)
+
+
+def _get_size(path):
+  """Returns the number of bytes in the files under `path`."""
+  num_bytes = 0
+  for dir_name, _, file_names in gfile.Walk(path):
+    for file_name in file_names:
+      num_bytes += gfile.Stat(os.path.join(
+          compat.as_str_any(dir_name), compat.as_str_any(file_name))).length
+  return num_bytes
+
+
+# Collectors deleting in the background, closed when the interpreter exits.
+_BACKGROUND_COLLECTORS = weakref.WeakSet()
+
+
+def _close_background_collectors():
+  for collector in list(_BACKGROUND_COLLECTORS):
+    collector.close()
+
+
+atexit.register(_close_background_collectors)
+
+
+class _ExportGarbageCollector(object):
+  """Deletes old exports on a bounded pool of threads.
+
+  The export versions of a base directory are listed the first time it is
+  collected, and then kept in an index updated with the new exports given to
+  `collect`. Exports rejected by the keep filter are removed from the index
+  and deleted by at most `max_concurrent_deletes` threads at once, so that
+  deleting large exports from object stores does not take one round trip per
+  export. Exports that fail to be deleted are added back to the index, so that
+  the next `collect` retries them.
+
+  By default `collect` returns once its deletions are done. With `background`,
+  it returns as soon as they are scheduled, so that they do not block the
+  caller. It then first waits for the deletions scheduled by the previous
+  `collect`, so that at most one round of deletions is in flight, and the
+  pending deletions are waited for when the interpreter exits, so that an
+  early exit does not leave exports partly deleted.
+  """
+
+  def __init__(self, max_concurrent_deletes=8, track_bytes_reclaimed=False,
+               background=False):
+    """Creates a collector.
+
+    Args:
+      max_concurrent_deletes: Maximum number of exports deleted at once.
+      track_bytes_reclaimed: Whether to size the exports before deleting them,
+        to report the bytes reclaimed. This stats every file of the exports,
+        which doubles the file system round trips of the deletions.
+      background: Whether `collect` returns before its deletions are done.
+
+    Raises:
+      ValueError: If `max_concurrent_deletes` is not positive.
+    """
+    if max_concurrent_deletes <= 0:
+      raise ValueError(
+          '`max_concurrent_deletes` must be positive. Got %s' %
+          max_concurrent_deletes)
+    self._max_concurrent_deletes = max_concurrent_deletes
+    self._track_bytes_reclaimed = track_bytes_reclaimed
+    self._background = background
+    self._lock = threading.Lock()
+    self._pool = None
+    self._pending = []
+    self._index = {}
+    self._num_deleted = 0
+    self._bytes_reclaimed = 0
+    self._deletion_lag_secs = 0.
+    if background:
+      _BACKGROUND_COLLECTORS.add(self)
+
+  def collect(self, base_dir, parser, keep_filter, new_paths=()):
+    """Schedules the deletion of the exports of `base_dir` not kept.
+
+    Args:
+      base_dir: directory containing the exports.
+      parser: a function as in `_get_paths`, which must populate
+        `Path.export_version` of the exports.
+      keep_filter: a filter function selecting the exports to keep.
+      new_paths: paths of the exports written since the last call.
+    """
+    if self._background:
+      # Exports whose deletion failed are back in the index once it is done.
+      self.wait()
+    base_dir = compat.as_str_any(base_dir)
+    with self._lock:
+      if base_dir not in self._index:
+        self._index[base_dir] = {}
+        new_paths = [p.path for p in _get_paths(base_dir, parser)]
+      index = self._index[base_dir]
+      for new_path in new_paths:
+        p = parser(Path(compat.as_str_any(new_path), None))
+        if p and p.export_version is not None:
+          index[p.export_version] = p
+      to_delete = _negation(keep_filter)(sorted(index.values()))
+      for p in to_delete:
+        del index[p.export_version]
+      self._pending = [r for r in self._pending if not r.ready()]
+      if to_delete and self._pool is None:
+        self._pool = pool.ThreadPool(self._max_concurrent_deletes)
+      scheduled = time.time()
+      for p in to_delete:
+        self._pending.append(
+            self._pool.apply_async(self._delete, (base_dir, p, scheduled)))
+    if not self._background:
+      self.wait()
+
+  def wait(self):
+    """Blocks until all scheduled deletions are done."""
+    with self._lock:
+      pending, self._pending = self._pending, []
+    for result in pending:
+      result.wait()
+
+  def close(self):
+    """Waits for the scheduled deletions, then stops the deletion threads.
+
+    A later `collect` starts new threads.
+    """
+    self.wait()
+    with self._lock:
+      deletion_pool, self._pool = self._pool, None
+    if deletion_pool is not None:
+      deletion_pool.close()
+      deletion_pool.join()
+
+  def stats(self):
+    """Returns a dict of deletion metrics.
+
+    Returns:
+      A dict with the number of exports deleted and still pending deletion,
+      the bytes reclaimed by the deletions (`None` unless
+      `track_bytes_reclaimed`), and the seconds between the scheduling and the
+      end of the last deletion.
+    """
+    with self._lock:
+      return {
+          'num_deleted': self._num_deleted,
+          'num_pending': len([r for r in self._pending if not r.ready()]),
+          'bytes_reclaimed': (self._bytes_reclaimed
+                              if self._track_bytes_reclaimed else None),
+          'deletion_lag_secs': self._deletion_lag_secs,
+      }
+
+  def _delete(self, base_dir, p, scheduled):
+    """Deletes the export `p` of `base_dir`, scheduled at time `scheduled`."""
+    path = p.path
+    try:
+      num_bytes = _get_size(path) if self._track_bytes_reclaimed else 0
+      gfile.DeleteRecursively(path)
+    except errors_impl.NotFoundError as e:
+      tf_logging.warn('Can not delete %s recursively: %s', path, e)
+      return
+    except errors_impl.OpError as e:
+      tf_logging.warn('Can not delete %s recursively, it will be retried: %s',
+                      path, e)
+      with self._lock:
+        self._index.setdefault(base_dir, {}).setdefault(p.export_version, p)
+      return
+    lag_secs = time.time() - scheduled
+    with self._lock:
+      self._num_deleted += 1
+      self._bytes_reclaimed += num_bytes
+      self._deletion_lag_secs = lag_secs
+    tf_logging.info('Deleted export %s %.2f secs after it was scheduled.',
+                    path, lag_secs)
@@ -23,6 +23,7 @@ import re
 
 from six.moves import xrange  # pylint: disable=redefined-builtin
 
+from tensorflow.python.framework import errors_impl
 from tensorflow.python.framework import test_util
 from tensorflow.python.platform import gfile
 from tensorflow.python.platform import test
@@ -154,5 +155,85 @@ class GcTest(test_util.TensorFlowTestCase):
               gc.Path(os.path.join(base_dir, "1"), 1)
           ])
 
+  def testExportGarbageCollector(self):
+    base_dir = os.path.join(test.get_temp_dir(), "export_gc")
+    for p in xrange(4):
+      gfile.MakeDirs(os.path.join(base_dir, "%d" % p))
+      with gfile.GFile(os.path.join(base_dir, "%d" % p, "data"), "w") as f:
+        f.write("1234")
+    collector = gc._ExportGarbageCollector(
+        max_concurrent_deletes=2, track_bytes_reclaimed=True)
+    collector.collect(base_dir, _create_parser(base_dir),
+                      gc._largest_export_versions(2))
+    collector.wait()
+    self.assertEqual(["2", "3"], sorted(gfile.ListDirectory(base_dir)))
+    self.assertEqual(
+        {"num_deleted": 2, "num_pending": 0, "bytes_reclaimed": 8},
+        {k: v for k, v in collector.stats().items()
+         if k != "deletion_lag_secs"})
+
+    # New exports come from the index, without listing the directory again.
+    gfile.MakeDirs(os.path.join(base_dir, "4"))
+    with test.mock.patch.object(gfile, "ListDirectory") as mock_list_directory:
+      collector.collect(base_dir, _create_parser(base_dir),
+                        gc._largest_export_versions(2),
+                        new_paths=[os.path.join(base_dir, "4")])
+      collector.wait()
+      self.assertEqual(0, mock_list_directory.call_count)
+    self.assertEqual(["3", "4"], sorted(gfile.ListDirectory(base_dir)))
+    self.assertEqual(3, collector.stats()["num_deleted"])
+    collector.close()
+    self.assertIsNone(collector._pool)
+    gfile.DeleteRecursively(base_dir)
+
+  def testExportGarbageCollectorRetriesFailedDeletes(self):
+    base_dir = os.path.join(test.get_temp_dir(), "export_gc_retry")
+    for p in xrange(3):
+      gfile.MakeDirs(os.path.join(base_dir, "%d" % p))
+    collector = gc._ExportGarbageCollector()
+    with test.mock.patch.object(
+        gfile, "DeleteRecursively",
+        side_effect=errors_impl.PermissionDeniedError(None, None, "denied")):
+      collector.collect(base_dir, _create_parser(base_dir),
+                        gc._largest_export_versions(2))
+      collector.wait()
+    self.assertEqual(["0", "1", "2"], sorted(gfile.ListDirectory(base_dir)))
+    self.assertEqual(
+        {"num_deleted": 0, "num_pending": 0, "bytes_reclaimed": None},
+        {k: v for k, v in collector.stats().items()
+         if k != "deletion_lag_secs"})
+
+    # The failed export is back in the index, and deleted by the next collect.
+    collector.collect(base_dir, _create_parser(base_dir),
+                      gc._largest_export_versions(2))
+    collector.close()
+    self.assertEqual(["1", "2"], sorted(gfile.ListDirectory(base_dir)))
+    self.assertEqual(1, collector.stats()["num_deleted"])
+    gfile.DeleteRecursively(base_dir)
+
+  def testExportGarbageCollectorInBackground(self):
+    base_dir = os.path.join(test.get_temp_dir(), "export_gc_background")
+    for p in xrange(4):
+      gfile.MakeDirs(os.path.join(base_dir, "%d" % p))
+    collector = gc._ExportGarbageCollector(background=True)
+    self.assertIn(collector, gc._BACKGROUND_COLLECTORS)
+    collector.collect(base_dir, _create_parser(base_dir),
+                      gc._largest_export_versions(3))
+    # The next collect waits for the deletions scheduled by this one.
+    with test.mock.patch.object(collector, "wait") as mock_wait:
+      collector.collect(base_dir, _create_parser(base_dir),
+                        gc._largest_export_versions(3))
+      self.assertEqual(1, mock_wait.call_count)
+    gc._close_background_collectors()
+    self.assertIsNone(collector._pool)
+    self.assertEqual(["1", "2", "3"], sorted(gfile.ListDirectory(base_dir)))
+    self.assertEqual(1, collector.stats()["num_deleted"])
+    gfile.DeleteRecursively(base_dir)
+
+  def testExportGarbageCollectorInvalidConcurrency(self):
+    with self.assertRaisesRegexp(ValueError, "must be positive"):
+      gc._ExportGarbageCollector(max_concurrent_deletes=0)
+
+
 if __name__ == "__main__":
   test.main()
@@ -45,6 +45,7 @@ from tensorflow.python.util import function_utils
 from tensorflow.python.util.tf_export import estimator_export
 from tensorflow_estimator.python.estimator.canned import metric_keys
 from tensorflow_estimator.python.estimator.export import export_output
+from tensorflow_estimator.python.estimator.mode_keys import ModeKeys
 
 DEFAULT_SERVING_KEY = signature_constants.DEFAULT_SERVING_SIGNATURE_DEF_KEY
 
@@ -480,20 +481,7 @@ def get_weights_and_check_match_logits(
     # Fetch the weights.
     if weight_column is None:
       return 1.
-    # TODO(b/117839674): update feature_column
-    if isinstance(weight_column, six.string_types):
-      weight_column = feature_column_lib.numeric_column(
-          key=weight_column, shape=(1,))
-    if not isinstance(weight_column,
-                      (feature_column_lib.NumericColumn, _NumericColumn)):
-      raise TypeError('Weight column must be either a string or NumericColumn.'
-                      ' Given type: {}.'.format(type(weight_column)))
-    weights = weight_column._get_dense_tensor(  # pylint: disable=protected-access
-        _LazyBuilder(features))
-    if not (weights.dtype.is_floating or weights.dtype.is_integer):
-      raise ValueError('Weight column should be castable to float. '
-                       'Given dtype: {}'.format(weights.dtype))
-    weights = math_ops.cast(weights, name='weights', dtype=dtypes.float32)
+    weights = _fetch_weights(features, weight_column)
     # Validate the weights shape.
     # Eager mode.
     if context.executing_eagerly():
@@ -552,6 +540,172 @@ def get_weights_and_check_match_logits(
       return array_ops.identity(weights, name=scope)
 
 
+def _weight_column_key(weight_column):
+  """Returns the features key of a string or `NumericColumn` weight column."""
+  if isinstance(weight_column, six.string_types):
+    return weight_column
+  return weight_column.key
+
+
+def _fetch_weights(features, weight_column):
+  """Returns the float32 weights of `weight_column` in `features`."""
+  # TODO(b/117839674): update feature_column
+  if isinstance(weight_column, six.string_types):
+    weight_column = feature_column_lib.numeric_column(
+        key=weight_column, shape=(1,))
+  if not isinstance(weight_column,
+                    (feature_column_lib.NumericColumn, _NumericColumn)):
+    raise TypeError('Weight column must be either a string or NumericColumn.'
+                    ' Given type: {}.'.format(type(weight_column)))
+  weights = weight_column._get_dense_tensor(  # pylint: disable=protected-access
+      _LazyBuilder(features))
+  if not (weights.dtype.is_floating or weights.dtype.is_integer):
+    raise ValueError('Weight column should be castable to float. '
+                     'Given dtype: {}'.format(weights.dtype))
+  return math_ops.cast(weights, name='weights', dtype=dtypes.float32)
+
+
+def preprocess_labels_and_weights(features, labels, n_classes,
+                                  labels_dtype=dtypes.int64,
+                                  weight_column=None, class_id_table=None):
+  """Maps labels to class ids and validates weights in an input pipeline.
+
+  Meant to be mapped over the elements of a `tf.data.Dataset`, before or after
+  batching, so that `check_preprocessed_labels_and_reshape` and
+  `get_preprocessed_weights` only need static shape checks in the model graph.
+  Labels and weights may have shapes `[D0, D1, ... DN]` or
+  `[D0, D1, ... DN, 1]`.
+
+  Args:
+    features: `dict` of `Tensor` or `SparseTensor` objects.
+    labels: Labels `Tensor`.
+    n_classes: Number of classes of the labels.
+    labels_dtype: The dtype of the returned labels.
+    weight_column: Optional string or `NumericColumn` of the weights.
+    class_id_table: Optional lookup table mapping string labels to class ids.
+
+  Returns:
+    A `(features, labels)` tuple. `labels` have dtype `labels_dtype`. If
+    `weight_column` is given, `features` holds the float32 weights, with the
+    shape of `labels`, under the key of `weight_column`.
+
+  Raises:
+    ValueError: If `labels` is `None`, a `SparseTensor`, or has the wrong
+      dtype.
+  """
+  if labels is None:
+    raise ValueError(_LABEL_NONE_ERR_MSG)
+  with ops.name_scope('preprocess_labels_and_weights'):
+    labels = sparse_tensor.convert_to_tensor_or_sparse_tensor(labels)
+    if isinstance(labels, sparse_tensor.SparseTensor):
+      raise ValueError(_SPARSE_LABEL_ERR_MSG.format(1, 1, 1))
+    if class_id_table is not None:
+      if labels.dtype != dtypes.string:
+        raise ValueError('Labels dtype should be string if there is a '
+                         'vocabulary. Instead got {}'.format(labels.dtype))
+      labels = class_id_table.lookup(labels)
+    elif labels_dtype.is_integer and not labels.dtype.is_integer:
+      raise ValueError('Labels dtype should be integer. Instead got {}.'.format(
+          labels.dtype))
+    labels = check_label_range(
+        math_ops.cast(labels, dtype=labels_dtype), n_classes)
+    if weight_column is None:
+      return features, labels
+    weights = _fetch_weights(features, weight_column)
+    if weights.shape.ndims is not None and labels.shape.ndims is not None:
+      if weights.shape.ndims == labels.shape.ndims - 1:
+        weights = array_ops.expand_dims(weights, -1)
+      elif labels.shape.ndims == weights.shape.ndims - 1:
+        labels = array_ops.expand_dims(labels, -1)
+    labels_shape = array_ops.shape(labels)
+    weights_shape = array_ops.shape(weights)
+    assert_dimension = check_ops.assert_equal(
+        labels_shape, weights_shape,
+        message='weights shape must match labels shape',
+        data=['labels_shape: ', labels_shape, 'weights_shape: ', weights_shape])
+    with ops.control_dependencies([assert_dimension]):
+      weights = array_ops.identity(weights)
+    features = dict(features)
+    features[_weight_column_key(weight_column)] = weights
+    return features, labels
+
+
+def _static_reshape_to_match_logits(tensor, logits, err_msg):
+  """Reshapes `tensor` to `[D0, D1, ... DN, 1]`, checking static shapes."""
+  if (tensor.shape.ndims is not None and logits.shape.ndims is not None and
+      tensor.shape.ndims == logits.shape.ndims - 1):
+    tensor = array_ops.expand_dims(tensor, -1)
+  if logits.shape.ndims is not None:
+    expected_shape = logits.shape[:-1].concatenate([1])
+    if not tensor.shape.is_compatible_with(expected_shape):
+      raise ValueError('{}, expected_shape: {}. shape: {}.'.format(
+          err_msg, expected_shape, tensor.shape))
+  return tensor
+
+
+def check_preprocessed_labels_and_reshape(labels, logits, labels_dtype):
+  """Checks labels returned by `preprocess_labels_and_weights`.
+
+  Unlike `check_dense_labels_match_logits_and_reshape`, only checks static
+  shapes and adds no assertion to the graph.
+
+  Args:
+    labels: labels Tensor.
+    logits: logits Tensor.
+    labels_dtype: The `labels_dtype` given to `preprocess_labels_and_weights`.
+
+  Returns:
+    Labels reshaped to `[D0, D1, ... DN, 1]`.
+
+  Raises:
+    ValueError: If labels are missing, have another dtype than `labels_dtype`,
+      or a static shape which does not match logits.
+  """
+  if labels is None:
+    raise ValueError(_LABEL_NONE_ERR_MSG)
+  labels = sparse_tensor.convert_to_tensor_or_sparse_tensor(labels)
+  if isinstance(labels, sparse_tensor.SparseTensor):
+    raise ValueError(_SPARSE_LABEL_ERR_MSG.format(1, 1, 1))
+  if labels.dtype != labels_dtype:
+    raise ValueError(
+        'Preprocessed labels dtype should be {}. Instead got {}. Labels must '
+        'be mapped by `preprocess_input` in the input pipeline.'.format(
+            labels_dtype, labels.dtype))
+  return _static_reshape_to_match_logits(
+      labels, logits, _LABEL_SHAPE_ERR_MSG.format(1))
+
+
+def get_preprocessed_weights(features, weight_column, logits):
+  """Fetches weights returned by `preprocess_labels_and_weights`.
+
+  Unlike `get_weights_and_check_match_logits`, only checks static shapes and
+  adds no assertion to the graph.
+
+  Args:
+    features: The features dict that contains weights.
+    weight_column: The weight column. If not given, this method returns 1.
+    logits: logits Tensor.
+
+  Returns:
+    Weights reshaped to `[D0, D1, ... DN, 1]`.
+
+  Raises:
+    ValueError: If the weights are not float32, or have a static shape which
+      does not match logits.
+  """
+  if weight_column is None:
+    return 1.
+  weights = features[_weight_column_key(weight_column)]
+  if weights.dtype != dtypes.float32:
+    raise ValueError(
+        'Preprocessed weights dtype should be float32. Instead got {}. '
+        'Weights must be mapped by `preprocess_input` in the input '
+        'pipeline.'.format(weights.dtype))
+  return _static_reshape_to_match_logits(
+      weights, logits,
+      'weights shape must be [D0, D1, ... DN] or [D0, D1, ... DN, 1]')
+
+
 def check_logits_final_dim(logits, expected_logits_dimension):
   """Checks that logits shape is [D0, D1, ... DN, logits_dimension]."""
   with ops.name_scope('logits', values=(logits,)) as scope:
@@ -733,6 +887,29 @@ def check_prediction_keys(pred_keys, valid_keys):
           'Valid prediction keys include {}.'.format(key, valid_keys))
 
 
+def spec_predictions(head, logits, mode, numeric_keys):
+  """Returns the predictions of `head` for its `EstimatorSpec` in `mode`.
+
+  PREDICT builds every key, since export signatures and `predict_keys` may ask
+  for any of them. TRAIN and EVAL build every key too, unless `numeric_keys`
+  is given, which skips e.g. the string lookups of `CLASSES` and the `ALL_*`
+  tensors.
+
+  Args:
+    head: A `Head`.
+    logits: The logits passed to `create_estimator_spec`.
+    mode: Estimator's `ModeKeys`.
+    numeric_keys: The prediction keys built in TRAIN and EVAL, or `None` to
+      build every key.
+
+  Returns:
+    A dict of predictions.
+  """
+  if mode == ModeKeys.PREDICT or numeric_keys is None:
+    return head.predictions(logits)
+  return head.predictions(logits, numeric_keys)
+
+
 def all_class_ids(logits, n_classes):
   batch_size = array_ops.shape(logits)[0]
   class_id_list = math_ops.range(n_classes)
@@ -18,6 +18,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import six
+
 from tensorflow.python.eager import context
 from tensorflow.python.framework import ops
 from tensorflow.python.framework import dtypes
@@ -29,15 +31,26 @@ from tensorflow.python.ops import lookup_ops
 from tensorflow.python.ops import math_ops
 from tensorflow.python.ops import nn
 from tensorflow.python.ops import string_ops
-from tensorflow.python.ops import weights_broadcast_ops
 from tensorflow.python.util.tf_export import estimator_export
 from tensorflow_estimator.python.estimator import model_fn
 from tensorflow_estimator.python.estimator.canned import metric_keys
 from tensorflow_estimator.python.estimator.canned import prediction_keys
 from tensorflow_estimator.python.estimator.export import export_output
 from tensorflow_estimator.python.estimator.head import base_head
+from tensorflow_estimator.python.estimator.head import binary_metrics
 from tensorflow_estimator.python.estimator.mode_keys import ModeKeys
 
+# Maximum number of calibration curve buckets reported with
+# `score_sketch_buckets`.
+_CALIBRATION_BUCKETS = 10
+
+# Predictions returned in TRAIN and EVAL mode with `numeric_predictions_only`.
+_NUMERIC_PREDICTION_KEYS = (
+    prediction_keys.PredictionKeys.LOGITS,
+    prediction_keys.PredictionKeys.LOGISTIC,
+    prediction_keys.PredictionKeys.PROBABILITIES,
+    prediction_keys.PredictionKeys.CLASS_IDS)
+
 
 @estimator_export('estimator.BinaryClassHead')
 class BinaryClassHead(base_head.Head):
@@ -145,6 +158,24 @@ class BinaryClassHead(base_head.Head):
     loss_fn: Optional loss function.
     name: Name of the head. If provided, summary and metrics keys will be
       suffixed by `"/" + name`. Also used as `name_scope` when creating ops.
+    score_sketch_buckets: Optional positive number of equal-width buckets of a
+      fixed-size sketch of the logistic predictions. If given, eval also
+      reports the AUC from the sketch with its error bound, the log loss, the
+      calibration, and calibration curves over 10 buckets (or
+      `score_sketch_buckets`, if fewer). The sketch uses memory independent of
+      the number of eval examples. The AUC error bound is the weighted fraction
+      of positive/negative pairs sharing a bucket, halved, so it depends on how
+      the predictions spread over the buckets, not only on their number.
+    input_preprocessing: Whether `label_vocabulary` lookups, label range checks
+      and weight shape checks run in the input pipeline, once per dataset
+      element, instead of on every step of the model graph. `input_fn` must
+      then map `preprocess_input` over its dataset, e.g.
+      `dataset.map(head.preprocess_input)`, and the head only checks static
+      shapes.
+    numeric_predictions_only: Whether the predictions of TRAIN and EVAL specs
+      are only `logits`, `logistic`, `probabilities` and `class_ids`. This
+      skips building the `classes` string lookups and the `all_class_ids` and
+      `all_classes` tensors. PREDICT specs always hold every prediction.
   """
 
   def __init__(self,
@@ -153,7 +184,10 @@ class BinaryClassHead(base_head.Head):
                label_vocabulary=None,
                loss_reduction=losses_utils.ReductionV2.SUM_OVER_BATCH_SIZE,
                loss_fn=None,
-               name=None):
+               name=None,
+               score_sketch_buckets=None,
+               input_preprocessing=False,
+               numeric_predictions_only=False):
     if label_vocabulary is not None and not isinstance(label_vocabulary,
                                                        (list, tuple)):
       raise ValueError(
@@ -163,6 +197,10 @@ class BinaryClassHead(base_head.Head):
     for threshold in thresholds:
       if (threshold <= 0.0) or (threshold >= 1.0):
         raise ValueError('thresholds not in (0, 1): {}.'.format((thresholds,)))
+    if score_sketch_buckets is not None and score_sketch_buckets < 1:
+      raise ValueError(
+          'score_sketch_buckets must be positive. Given: {}'.format(
+              score_sketch_buckets))
     base_head.validate_loss_reduction(loss_reduction)
     if loss_fn:
       base_head.validate_loss_fn_args(loss_fn)
@@ -172,6 +210,9 @@ class BinaryClassHead(base_head.Head):
     self._loss_reduction = loss_reduction
     self._loss_fn = loss_fn
     self._name = name
+    self._score_sketch_buckets = score_sketch_buckets
+    self._input_preprocessing = input_preprocessing
+    self._numeric_predictions_only = numeric_predictions_only
     # Metric keys.
     keys = metric_keys.MetricKeys
     self._loss_mean_key = self._summary_key(keys.LOSS_MEAN)
@@ -197,6 +238,19 @@ class BinaryClassHead(base_head.Head):
     self._accuracy_keys = tuple(accuracy_keys)
     self._precision_keys = tuple(precision_keys)
     self._recall_keys = tuple(recall_keys)
+    self._auc_sketch_key = self._summary_key(keys.AUC_SKETCH)
+    self._auc_sketch_error_bound_key = self._summary_key(
+        keys.AUC_SKETCH_ERROR_BOUND)
+    self._log_loss_key = self._summary_key(keys.LOG_LOSS)
+    self._calibration_key = self._summary_key(keys.CALIBRATION)
+    self._calibration_curve_keys = {
+        binary_metrics.MEAN_PREDICTION: self._summary_key(
+            keys.CALIBRATION_MEAN_PREDICTION),
+        binary_metrics.MEAN_LABEL: self._summary_key(
+            keys.CALIBRATION_MEAN_LABEL),
+        binary_metrics.WEIGHT: self._summary_key(keys.CALIBRATION_WEIGHT),
+        binary_metrics.LOG_LOSS: self._summary_key(keys.CALIBRATION_LOG_LOSS),
+    }
 
   @property
   def name(self):
@@ -256,8 +310,36 @@ class BinaryClassHead(base_head.Head):
               ))
     return self._cached_class_string_table
 
+  def preprocess_input(self, features, labels):
+    """Maps labels to class ids and validates weights in an input pipeline.
+
+    Used with `input_preprocessing=True`, on dataset elements before or after
+    batching, e.g. `dataset.map(head.preprocess_input)`.
+
+    Args:
+      features: `dict` of `Tensor` or `SparseTensor` objects.
+      labels: Labels `Tensor` with shape `[D0, D1, ... DN]` or
+        `[D0, D1, ... DN, 1]`.
+
+    Returns:
+      A `(features, labels)` tuple, with float32 labels and, if
+      `weight_column` is set, float32 weights of the same shape in `features`.
+    """
+    class_id_table = None
+    if self._label_vocabulary is not None:
+      # Creates the table outside of the dataset functions, in the graph of the
+      # model where lookup tables are initialized.
+      with ops.init_scope():
+        class_id_table = self._class_id_table
+    return base_head.preprocess_labels_and_weights(
+        features, labels, n_classes=2, labels_dtype=dtypes.float32,
+        weight_column=self._weight_column, class_id_table=class_id_table)
+
   def _processed_labels(self, logits, labels):
     """Converts labels to integer id space."""
+    if self._input_preprocessing:
+      return base_head.check_preprocessed_labels_and_reshape(
+          labels, logits, labels_dtype=dtypes.float32)
     labels = base_head.check_dense_labels_match_logits_and_reshape(
         labels=labels, logits=logits, expected_labels_dimension=1)
     if self._label_vocabulary is not None:
@@ -274,20 +356,29 @@ class BinaryClassHead(base_head.Head):
     else:
       unweighted_loss = nn.sigmoid_cross_entropy_with_logits(
           labels=labels, logits=logits)
-    weights = base_head.get_weights_and_check_match_logits(
-        features=features, weight_column=self._weight_column, logits=logits)
+    if self._input_preprocessing:
+      weights = base_head.get_preprocessed_weights(
+          features=features, weight_column=self._weight_column, logits=logits)
+    else:
+      weights = base_head.get_weights_and_check_match_logits(
+          features=features, weight_column=self._weight_column, logits=logits)
     return unweighted_loss, weights
 
+  def _loss_terms(self, logits, labels, features):
+    """Returns the processed labels, the unweighted loss and the weights."""
+    logits = base_head.check_logits_final_dim(logits, self.logits_dimension)
+    labels = self._processed_labels(logits, labels)
+    unweighted_loss, weights = self._unweighted_loss_and_weights(
+        logits, labels, features)
+    return labels, unweighted_loss, weights
+
   def loss(self, labels, logits, features=None, mode=None,
            regularization_losses=None):
     """Returns regularized training loss. See `base_head.Head` for details."""
     del mode  # Unused for this head.
     with ops.name_scope('losses', values=(logits, labels, regularization_losses,
                                           features)):
-      logits = base_head.check_logits_final_dim(logits, self.logits_dimension)
-      labels = self._processed_labels(logits, labels)
-      unweighted_loss, weights = self._unweighted_loss_and_weights(
-          logits, labels, features)
+      _, unweighted_loss, weights = self._loss_terms(logits, labels, features)
       training_loss = losses_utils.compute_weighted_loss(
           unweighted_loss,
           sample_weight=weights,
@@ -330,9 +421,11 @@ class BinaryClassHead(base_head.Head):
       if pred_keys.LOGISTIC in keys:
         logistic = math_ops.sigmoid(logits, name=pred_keys.LOGISTIC)
         predictions[pred_keys.LOGISTIC] = logistic
-      two_class_logits = array_ops.concat(
-          (array_ops.zeros_like(logits), logits),
-          axis=-1, name='two_class_logits')
+      if (pred_keys.PROBABILITIES in keys or pred_keys.CLASS_IDS in keys or
+          pred_keys.CLASSES in keys):
+        two_class_logits = array_ops.concat(
+            (array_ops.zeros_like(logits), logits),
+            axis=-1, name='two_class_logits')
       if pred_keys.PROBABILITIES in keys:
         probabilities = nn.softmax(
             two_class_logits, name=pred_keys.PROBABILITIES)
@@ -372,19 +465,42 @@ class BinaryClassHead(base_head.Head):
       eval_metrics[self._label_mean_key] = metrics.Mean(name=keys.LABEL_MEAN)
       eval_metrics[self._accuracy_baseline_key] = (
           metrics.Mean(name=keys.ACCURACY_BASELINE))
-      # The default summation_method is "interpolation" in the AUC metric.
-      eval_metrics[self._auc_key] = metrics.AUC(name=keys.AUC)
-      eval_metrics[self._auc_pr_key] = metrics.AUC(curve='PR', name=keys.AUC_PR)
+      # AUC, AUC-PR and the per-threshold metrics are all derived from one
+      # histogram of the logistic predictions, which is updated once per step.
+      histogram = binary_metrics.BinaryScoreHistogram(
+          thresholds=binary_metrics.auc_thresholds() + list(self._thresholds),
+          name='score_histogram')
+      eval_metrics[self._auc_key] = binary_metrics.HistogramAUC(
+          histogram, name=keys.AUC)
+      eval_metrics[self._auc_pr_key] = binary_metrics.HistogramAUC(
+          histogram, curve=binary_metrics.PR, name=keys.AUC_PR)
       if regularization_losses is not None:
         eval_metrics[self._loss_regularization_key] = metrics.Mean(
             name=keys.LOSS_REGULARIZATION)
       for i, threshold in enumerate(self._thresholds):
-        eval_metrics[self._accuracy_keys[i]] = metrics.BinaryAccuracy(
-            name=self._accuracy_keys[i], threshold=threshold)
-        eval_metrics[self._precision_keys[i]] = metrics.Precision(
-            name=self._precision_keys[i], thresholds=threshold)
-        eval_metrics[self._recall_keys[i]] = metrics.Recall(
-            name=self._recall_keys[i], thresholds=threshold)
+        eval_metrics[self._accuracy_keys[i]] = binary_metrics.ThresholdAccuracy(
+            histogram, threshold, name=self._accuracy_keys[i])
+        eval_metrics[self._precision_keys[i]] = (
+            binary_metrics.ThresholdPrecision(
+                histogram, threshold, name=self._precision_keys[i]))
+        eval_metrics[self._recall_keys[i]] = binary_metrics.ThresholdRecall(
+            histogram, threshold, name=self._recall_keys[i])
+      if self._score_sketch_buckets:
+        sketch = binary_metrics.ScoreSketch(
+            self._score_sketch_buckets, name='score_sketch')
+        eval_metrics[self._auc_sketch_key] = binary_metrics.SketchAUC(
+            sketch, name=keys.AUC_SKETCH)
+        eval_metrics[self._auc_sketch_error_bound_key] = (
+            binary_metrics.SketchAUCErrorBound(
+                sketch, name=keys.AUC_SKETCH_ERROR_BOUND))
+        eval_metrics[self._log_loss_key] = binary_metrics.SketchLogLoss(
+            sketch, name=keys.LOG_LOSS)
+        eval_metrics[self._calibration_key] = binary_metrics.SketchCalibration(
+            sketch, name=keys.CALIBRATION)
+        for statistic, key in six.iteritems(self._calibration_curve_keys):
+          eval_metrics[key] = binary_metrics.CalibrationCurve(
+              sketch, min(_CALIBRATION_BUCKETS, self._score_sketch_buckets),
+              statistic, name=key)
     return eval_metrics
 
   def _update_accuracy_baseline(self, eval_metrics):
@@ -423,22 +539,34 @@ class BinaryClassHead(base_head.Head):
         label_mean_metric.count - label_mean_metric.total)
     accuracy_baseline_metric.count = label_mean_metric.count
 
-  def _update_auc(self, auc_metric, labels, predictions, weights=None):
-    predictions = math_ops.cast(predictions, dtype=dtypes.float32)
-    if weights is not None:
-      weights = weights_broadcast_ops.broadcast_weights(weights, predictions)
-    auc_metric.update_state(
-        y_true=labels, y_pred=predictions, sample_weight=weights)
+  # The `_update_metrics` arguments computed from the predictions, with their
+  # prediction keys.
+  _METRIC_PREDICTION_KEYS = {
+      'class_ids': prediction_keys.PredictionKeys.CLASS_IDS,
+      'logistic': prediction_keys.PredictionKeys.LOGISTIC,
+  }
 
   def update_metrics(self, eval_metrics, features, logits, labels,
                      regularization_losses=None):
     """Updates eval metrics. See `base_head.Head` for details."""
-    preds = self.predictions(logits)
-    class_ids = preds[prediction_keys.PredictionKeys.CLASS_IDS]
-    logits = base_head.check_logits_final_dim(logits, self.logits_dimension)
-    labels = self._processed_labels(logits, labels)
-    unweighted_loss, weights = self._unweighted_loss_and_weights(
-        logits, labels, features)
+    pred_keys = prediction_keys.PredictionKeys
+    predictions = self.predictions(
+        logits, [pred_keys.CLASS_IDS, pred_keys.LOGISTIC])
+    return self._update_metrics(
+        eval_metrics, features, logits, labels,
+        class_ids=predictions[pred_keys.CLASS_IDS],
+        logistic=predictions[pred_keys.LOGISTIC],
+        regularization_losses=regularization_losses)
+
+  def _update_metrics(self, eval_metrics, features, logits, labels, class_ids,
+                      logistic, regularization_losses=None, loss_terms=None):
+    """Updates eval metrics given the already computed predictions.
+
+    `loss_terms` are the already computed `_loss_terms`, if any.
+    """
+    if loss_terms is None:
+      loss_terms = self._loss_terms(logits, labels, features)
+    labels, unweighted_loss, weights = loss_terms
     # Update metrics.
     eval_metrics[self._loss_mean_key].update_state(
         values=unweighted_loss, sample_weight=weights)
@@ -448,31 +576,27 @@ class BinaryClassHead(base_head.Head):
         y_true=labels, y_pred=class_ids, sample_weight=weights)
     eval_metrics[self._recall_key].update_state(
         y_true=labels, y_pred=class_ids, sample_weight=weights)
-    logistic_key = prediction_keys.PredictionKeys.LOGISTIC
-    predictions = self.predictions(logits, [logistic_key])
-    logistic = predictions[logistic_key]
     base_head.update_metric_with_broadcast_weights(
         eval_metrics[self._prediction_mean_key], logistic, weights)
     base_head.update_metric_with_broadcast_weights(
         eval_metrics[self._label_mean_key], labels, weights)
     self._update_accuracy_baseline(eval_metrics)
-    self._update_auc(
-        auc_metric=eval_metrics[self._auc_key], labels=labels,
-        predictions=logistic, weights=weights)
-    self._update_auc(
-        auc_metric=eval_metrics[self._auc_pr_key], labels=labels,
-        predictions=logistic, weights=weights)
+    # The metrics derived from a histogram are updated with the same tensors,
+    # so the predictions are binned once per histogram.
+    histogram_keys = ((self._auc_key, self._auc_pr_key) + self._accuracy_keys +
+                      self._precision_keys + self._recall_keys)
+    if self._score_sketch_buckets:
+      histogram_keys += ((self._auc_sketch_key,
+                          self._auc_sketch_error_bound_key, self._log_loss_key,
+                          self._calibration_key) +
+                         tuple(self._calibration_curve_keys.values()))
+    for key in histogram_keys:
+      eval_metrics[key].update_state(
+          y_true=labels, y_pred=logistic, sample_weight=weights)
     if regularization_losses is not None:
       regularization_loss = math_ops.add_n(regularization_losses)
       eval_metrics[self._loss_regularization_key].update_state(
           values=regularization_loss)
-    for i in range(len(self._thresholds)):
-      eval_metrics[self._accuracy_keys[i]].update_state(
-          y_true=labels, y_pred=logistic, sample_weight=weights)
-      eval_metrics[self._precision_keys[i]].update_state(
-          y_true=labels, y_pred=logistic, sample_weight=weights)
-      eval_metrics[self._recall_keys[i]].update_state(
-          y_true=labels, y_pred=logistic, sample_weight=weights)
     return eval_metrics
 
   def _create_tpu_estimator_spec(
@@ -524,7 +648,9 @@ class BinaryClassHead(base_head.Head):
     with ops.name_scope(self._name, 'head'):
       # Predict.
       pred_keys = prediction_keys.PredictionKeys
-      predictions = self.predictions(logits)
+      predictions = base_head.spec_predictions(
+          self, logits, mode,
+          _NUMERIC_PREDICTION_KEYS if self._numeric_predictions_only else None)
       if mode == ModeKeys.PREDICT:
         probabilities = predictions[pred_keys.PROBABILITIES]
         logistic = predictions[pred_keys.LOGISTIC]
@@ -553,11 +679,13 @@ class BinaryClassHead(base_head.Head):
             predictions=predictions,
             loss=regularized_training_loss,
             eval_metrics=base_head.create_eval_metrics_tuple(
-                self.update_metrics, {
+                self._update_metrics, {
                     'eval_metrics': eval_metrics,
                     'features': features,
                     'logits': logits,
                     'labels': labels,
+                    'class_ids': predictions[pred_keys.CLASS_IDS],
+                    'logistic': predictions[pred_keys.LOGISTIC],
                     'regularization_losses': regularization_losses
                 }))
       # Train.
@@ -21,6 +21,7 @@ from __future__ import print_function
 import numpy as np
 import six
 
+from tensorflow.python.data.ops import dataset_ops
 from tensorflow.python.eager import context
 from tensorflow.python.feature_column import feature_column_lib as feature_column
 from tensorflow.python.framework import constant_op
@@ -33,6 +34,7 @@ from tensorflow.python.keras.utils import losses_utils
 from tensorflow.python.ops import array_ops
 from tensorflow.python.ops import check_ops
 from tensorflow.python.ops import control_flow_ops
+from tensorflow.python.ops import lookup_ops
 from tensorflow.python.ops import math_ops
 from tensorflow.python.ops import nn
 from tensorflow.python.ops import string_ops
@@ -609,6 +611,131 @@ class BinaryClassHeadTest(test.TestCase):
       self.assertAllClose(1. / 2,
                           value_ops[accuracy_key].eval())
 
+  def test_eval_with_score_sketch(self):
+    head = head_lib.BinaryClassHead(score_sketch_buckets=100)
+    logits = np.array(((45,), (-41,),), dtype=np.float32)
+    labels = np.array(((1,), (0,),), dtype=np.int32)
+    features = {'x': np.array(((42,),), dtype=np.int32)}
+    keys = metric_keys.MetricKeys
+    expected_metrics = {
+        keys.AUC_SKETCH: 1.,
+        keys.AUC_SKETCH_ERROR_BOUND: 0.,
+        keys.CALIBRATION: 1.,
+        keys.CALIBRATION_WEIGHT: [1., 0., 0., 0., 0., 0., 0., 0., 0., 1.],
+        keys.CALIBRATION_MEAN_LABEL: [0., 0., 0., 0., 0., 0., 0., 0., 0., 1.],
+    }
+
+    if context.executing_eagerly():
+      eval_metrics = head.metrics()
+      updated_metrics = head.update_metrics(
+          eval_metrics, features, logits, labels)
+      self.assertAllClose(
+          expected_metrics,
+          {k: updated_metrics[k].result() for k in expected_metrics})
+      return
+
+    spec = head.create_estimator_spec(
+        features=features,
+        mode=ModeKeys.EVAL,
+        logits=logits,
+        labels=labels,
+        trainable_variables=[
+            variables.Variable([1.0, 2.0], dtype=dtypes.float32)])
+    self.assertIn(keys.LOG_LOSS, spec.eval_metric_ops)
+    self.assertIn(keys.CALIBRATION_MEAN_PREDICTION, spec.eval_metric_ops)
+    self.assertIn(keys.CALIBRATION_LOG_LOSS, spec.eval_metric_ops)
+    with self.cached_session() as sess:
+      test_lib._initialize_variables(self, spec.scaffold)
+      value_ops = {k: spec.eval_metric_ops[k][0] for k in spec.eval_metric_ops}
+      update_ops = {k: spec.eval_metric_ops[k][1] for k in spec.eval_metric_ops}
+      sess.run(update_ops)
+      self.assertAllClose(
+          expected_metrics,
+          {k: value_ops[k].eval() for k in expected_metrics})
+
+  def test_invalid_score_sketch_buckets(self):
+    with self.assertRaisesRegexp(
+        ValueError, r'score_sketch_buckets must be positive'):
+      head_lib.BinaryClassHead(score_sketch_buckets=0)
+
+  def test_score_sketch_with_few_buckets(self):
+    head = head_lib.BinaryClassHead(score_sketch_buckets=4)
+    calibration_weight_key = metric_keys.MetricKeys.CALIBRATION_WEIGHT
+    self.assertEqual(
+        4, head.metrics()[calibration_weight_key]._num_buckets)  # pylint: disable=protected-access
+
+  def test_eval_builds_numeric_predictions_once(self):
+    if context.executing_eagerly():
+      return
+    head = head_lib.BinaryClassHead(numeric_predictions_only=True)
+    logits = np.array(((45,), (-41,),), dtype=np.float32)
+    labels = np.array(((1,), (1,),), dtype=np.int32)
+    features = {'x': np.array(((42,),), dtype=np.int32)}
+
+    spec = head.create_estimator_spec(
+        features=features,
+        mode=ModeKeys.EVAL,
+        logits=logits,
+        labels=labels,
+        trainable_variables=[
+            variables.Variable([1.0, 2.0], dtype=dtypes.float32)])
+
+    keys = prediction_keys.PredictionKeys
+    self.assertItemsEqual(
+        (keys.LOGITS, keys.LOGISTIC, keys.PROBABILITIES, keys.CLASS_IDS),
+        spec.predictions.keys())
+    op_types = [op.type for op in ops.get_default_graph().get_operations()]
+    # The eval metrics reuse the spec predictions instead of rebuilding them.
+    self.assertEqual(1, op_types.count('Sigmoid'))
+    self.assertEqual(1, op_types.count('ArgMax'))
+    # No class strings are built in eval.
+    self.assertNotIn('AsString', op_types)
+
+  def test_eval_builds_all_predictions_by_default(self):
+    if context.executing_eagerly():
+      return
+    head = head_lib.BinaryClassHead()
+    logits = np.array(((45,), (-41,),), dtype=np.float32)
+    labels = np.array(((1,), (1,),), dtype=np.int32)
+    features = {'x': np.array(((42,),), dtype=np.int32)}
+
+    spec = head.create_estimator_spec(
+        features=features,
+        mode=ModeKeys.EVAL,
+        logits=logits,
+        labels=labels,
+        trainable_variables=[
+            variables.Variable([1.0, 2.0], dtype=dtypes.float32)])
+
+    keys = prediction_keys.PredictionKeys
+    self.assertItemsEqual(
+        (keys.LOGITS, keys.LOGISTIC, keys.PROBABILITIES, keys.CLASS_IDS,
+         keys.CLASSES, keys.ALL_CLASS_IDS, keys.ALL_CLASSES),
+        spec.predictions.keys())
+
+  def test_tpu_eval_metrics_take_prediction_tensors(self):
+    if context.executing_eagerly():
+      return
+    head = head_lib.BinaryClassHead()
+    logits = np.array(((45,), (-41,),), dtype=np.float32)
+    labels = np.array(((1,), (1,),), dtype=np.int32)
+    features = {'x': np.array(((42,),), dtype=np.int32)}
+
+    spec = head._create_tpu_estimator_spec(  # pylint: disable=protected-access
+        features=features,
+        mode=ModeKeys.EVAL,
+        logits=logits,
+        labels=labels,
+        trainable_variables=[
+            variables.Variable([1.0, 2.0], dtype=dtypes.float32)])
+
+    # The predictions reach the host metric fn as tensor arguments, not in a
+    # closure.
+    _, tensor_kwargs = spec.eval_metrics
+    keys = prediction_keys.PredictionKeys
+    self.assertIs(spec.predictions[keys.CLASS_IDS], tensor_kwargs['class_ids'])
+    self.assertIs(spec.predictions[keys.LOGISTIC], tensor_kwargs['logistic'])
+
   def test_eval_with_thresholds_create_loss(self):
     thresholds = [0.25, 0.5, 0.75]
     head = head_lib.BinaryClassHead(thresholds=thresholds)
@@ -1654,6 +1781,41 @@ class BinaryClassHeadForEstimator(test.TestCase):
     # Predict.
     est.predict(input_fn)
 
+  def test_input_preprocessing(self):
+    head = head_lib.BinaryClassHead(
+        weight_column='label_weights', label_vocabulary=['aang', 'iroh'],
+        input_preprocessing=True)
+    dataset = dataset_ops.Dataset.from_tensor_slices((
+        {'label_weights': np.array((1., .1, 1.5), dtype=np.float64)},
+        np.array((b'iroh', b'iroh', b'aang')))).batch(3)
+    iterator = dataset_ops.make_initializable_iterator(
+        dataset.map(head.preprocess_input))
+    features, labels = iterator.get_next()
+    num_ops = len(ops.get_default_graph().get_operations())
+    logits = np.array(((45,), (-41,), (44,)), dtype=np.float32)
+    loss = head.loss(
+        logits=logits, labels=labels, features=features, mode=ModeKeys.TRAIN)
+    # Lookups and runtime checks only run in the input pipeline.
+    self.assertFalse([
+        op.type for op in ops.get_default_graph().get_operations()[num_ops:]
+        if op.type in ('Assert', 'LookupTableFindV2')])
+    # losses = label_weights*cross_entropy(labels, logits)
+    #        = (1*0 + .1*41 + 1.5*44) = (1, 4.1, 66)
+    # loss = sum(losses) / batch_size = (1 + 4.1 + 66) / 3 = 23.366666667
+    with self.cached_session() as sess:
+      sess.run((lookup_ops.tables_initializer(), iterator.initializer))
+      self.assertAllClose(23.366666667, sess.run(loss))
+
+  def test_input_preprocessing_without_preprocessed_labels(self):
+    head = head_lib.BinaryClassHead(
+        label_vocabulary=['aang', 'iroh'], input_preprocessing=True)
+    with self.assertRaisesRegexp(ValueError, 'must be mapped by'):
+      head.loss(
+          logits=np.array(((45,), (-41,),), dtype=np.float32),
+          labels=[[b'iroh'], [b'iroh']],
+          features={},
+          mode=ModeKeys.TRAIN)
+
 
 if __name__ == '__main__':
   test.main()
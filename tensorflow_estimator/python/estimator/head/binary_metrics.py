@@ -0,0 +1,550 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Binary classification metrics derived from one shared score histogram.
+
+`BinaryClassHead` evaluates AUC, AUC-PR and accuracy/precision/recall at every
+user threshold on the same `logistic` predictions. Instead of one Keras metric
+per key, each comparing every prediction against its own thresholds, the
+predictions are binned once per step into a `BinaryScoreHistogram`, and every
+metric is derived from the accumulated histogram when its result is read.
+
+`ScoreSketch` is a finer, fixed-size histogram of the predictions per label. It
+yields AUC with a data-dependent error bound, log loss and calibration curves
+without materializing the predictions.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+from tensorflow.python.framework import constant_op
+from tensorflow.python.framework import dtypes
+from tensorflow.python.keras import metrics
+from tensorflow.python.ops import array_ops
+from tensorflow.python.ops import clip_ops
+from tensorflow.python.ops import control_flow_ops
+from tensorflow.python.ops import init_ops
+from tensorflow.python.ops import math_ops
+from tensorflow.python.ops import weights_broadcast_ops
+
+# Matches the defaults of `tf.keras.metrics.AUC`.
+_AUC_NUM_THRESHOLDS = 200
+_AUC_EPSILON = 1e-7
+# Matches `tf.keras.backend.epsilon()`, used to clip log loss predictions.
+_LOG_LOSS_EPSILON = 1e-7
+
+ROC = 'ROC'
+PR = 'PR'
+
+
+def auc_thresholds(num_thresholds=_AUC_NUM_THRESHOLDS):
+  """Returns the evenly spaced thresholds used by `tf.keras.metrics.AUC`."""
+  thresholds = [(i + 1) * 1.0 / (num_thresholds - 1)
+                for i in range(num_thresholds - 2)]
+  return [0.0 - _AUC_EPSILON] + thresholds + [1.0 + _AUC_EPSILON]
+
+
+class _HistogramUpdate(object):
+  """The inputs and op of the last shared update of a histogram."""
+
+  def __init__(self, inputs, update_op):
+    self.inputs = inputs
+    self.update_op = update_op
+
+
+class _SharedHistogram(metrics.Metric):
+  """Base class of the histograms shared by `HistogramMetric`s."""
+
+  def __init__(self, name=None, dtype=None):
+    super(_SharedHistogram, self).__init__(name=name, dtype=dtype)
+    self._last_shared_update = None
+
+  def shared_update_state(self, y_true, y_pred, sample_weight=None):
+    """Updates the histogram once for all the metrics derived from it.
+
+    The derived metrics of a step are updated with the same inputs. The first
+    of their calls runs `update_state`; the following calls with the same
+    input objects return its update op instead of adding the batch again.
+
+    Args:
+      y_true: Labels `Tensor`.
+      y_pred: Predicted probabilities `Tensor`.
+      sample_weight: (Optional) weights `Tensor`.
+
+    Returns:
+      The update op.
+    """
+    inputs = (y_true, y_pred, sample_weight)
+    last_update = self._last_shared_update
+    if last_update is not None and all(
+        given is last for given, last in zip(inputs, last_update.inputs)):
+      return last_update.update_op
+    update_op = self.update_state(y_true, y_pred, sample_weight=sample_weight)
+    self._last_shared_update = _HistogramUpdate(inputs, update_op)
+    return update_op
+
+  def reset_states(self):
+    self._last_shared_update = None
+    super(_SharedHistogram, self).reset_states()
+
+
+class BinaryScoreHistogram(_SharedHistogram):
+  """Weighted histogram of binary predictions, bucketed by thresholds.
+
+  A prediction falls into bucket `i` when exactly `i` thresholds are strictly
+  below it, i.e. it is classified positive at the first `i` thresholds. The
+  weights of positive (`label != 0`), negative (`label == 0`) and exactly
+  positive (`label == 1`) examples are accumulated per bucket, so the confusion
+  matrix at any threshold is a suffix sum of the histograms.
+  """
+
+  def __init__(self, thresholds, name=None, dtype=None):
+    """Creates the histogram.
+
+    Args:
+      thresholds: Python list of float thresholds in `[0, 1]`. They are sorted
+        and deduplicated.
+      name: (Optional) string name of the metric instance.
+      dtype: (Optional) data type of the metric result.
+    """
+    super(BinaryScoreHistogram, self).__init__(name=name, dtype=dtype)
+    self._thresholds = np.unique(np.asarray(thresholds, dtype=np.float32))
+    num_buckets = len(self._thresholds) + 1
+    self.positives = self.add_weight(
+        'positives', shape=(num_buckets,),
+        initializer=init_ops.zeros_initializer)
+    self.negatives = self.add_weight(
+        'negatives', shape=(num_buckets,),
+        initializer=init_ops.zeros_initializer)
+    self.exact_positives = self.add_weight(
+        'exact_positives', shape=(num_buckets,),
+        initializer=init_ops.zeros_initializer)
+
+  @property
+  def thresholds(self):
+    """Sorted float32 numpy array of the histogram thresholds."""
+    return self._thresholds
+
+  def threshold_indices(self, thresholds):
+    """Returns the positions of `thresholds` among the histogram thresholds."""
+    thresholds = np.asarray(thresholds, dtype=np.float32)
+    indices = np.searchsorted(self._thresholds, thresholds)
+    if (np.any(indices >= len(self._thresholds)) or
+        np.any(self._thresholds[np.minimum(
+            indices, len(self._thresholds) - 1)] != thresholds)):
+      raise ValueError(
+          'thresholds must be a subset of the histogram thresholds. '
+          'Given: {}'.format(thresholds))
+    return indices
+
+  def update_state(self, y_true, y_pred, sample_weight=None):
+    """Bins `y_pred` and adds the weights of the examples to the histograms.
+
+    Args:
+      y_true: Labels `Tensor`, with values in `[0, 1]`.
+      y_pred: Predicted probabilities `Tensor` with the same shape as `y_true`.
+      sample_weight: (Optional) weights `Tensor` broadcastable to `y_pred`.
+
+    Returns:
+      The update op.
+    """
+    y_true = math_ops.cast(y_true, dtype=self.dtype)
+    y_pred = math_ops.cast(y_pred, dtype=self.dtype)
+    if sample_weight is None:
+      sample_weight = array_ops.ones_like(y_pred)
+    else:
+      sample_weight = weights_broadcast_ops.broadcast_weights(
+          math_ops.cast(sample_weight, dtype=self.dtype), y_pred)
+    y_true = array_ops.reshape(y_true, [-1])
+    y_pred = array_ops.reshape(y_pred, [-1])
+    sample_weight = array_ops.reshape(sample_weight, [-1])
+
+    # Number of thresholds strictly below each prediction.
+    buckets = array_ops.searchsorted(
+        constant_op.constant(self._thresholds[np.newaxis, :]),
+        array_ops.expand_dims(math_ops.cast(y_pred, dtypes.float32), 0),
+        side='left')[0]
+    num_buckets = len(self._thresholds) + 1
+
+    def _histogram(is_label):
+      return math_ops.unsorted_segment_sum(
+          sample_weight * math_ops.cast(is_label, dtype=self.dtype),
+          buckets, num_buckets)
+
+    return control_flow_ops.group(
+        self.positives.assign_add(_histogram(math_ops.not_equal(y_true, 0.))),
+        self.negatives.assign_add(_histogram(math_ops.equal(y_true, 0.))),
+        self.exact_positives.assign_add(
+            _histogram(math_ops.equal(y_true, 1.))))
+
+  def result(self):
+    """Returns the total weight accumulated so far."""
+    return math_ops.reduce_sum(self.positives) + math_ops.reduce_sum(
+        self.negatives)
+
+  def confusion_matrix(self, indices=None):
+    """Returns `(tp, fp, tn, fn)` weights at the given threshold indices.
+
+    Args:
+      indices: (Optional) positions of the thresholds, as returned by
+        `threshold_indices`. Defaults to all thresholds.
+
+    Returns:
+      A tuple of four 1-D `Tensor`s.
+    """
+    true_positives = _weight_above(self.positives, indices)
+    false_positives = _weight_above(self.negatives, indices)
+    true_negatives = math_ops.reduce_sum(self.negatives) - false_positives
+    false_negatives = math_ops.reduce_sum(self.positives) - true_positives
+    return true_positives, false_positives, true_negatives, false_negatives
+
+
+def _weight_above(histogram, indices=None):
+  """Weight of the buckets above each threshold, i.e. predicted positive."""
+  weight_above = math_ops.cumsum(histogram, reverse=True)[1:]
+  if indices is None:
+    return weight_above
+  return array_ops.gather(weight_above, indices)
+
+
+class HistogramMetric(metrics.Metric):
+  """Base class of the metrics derived from a shared histogram.
+
+  The histogram is a `BinaryScoreHistogram` or a `ScoreSketch`.
+
+  These metrics do not accumulate anything themselves. `update_state` updates
+  the histogram, once for all the metrics derived from it that are updated
+  with the same inputs, so they share one update per step. `reset_states`
+  resets the histogram, and with it every metric derived from it.
+  """
+
+  def __init__(self, histogram, name=None):
+    super(HistogramMetric, self).__init__(name=name, dtype=histogram.dtype)
+    self.histogram = histogram
+
+  def update_state(self, y_true, y_pred, sample_weight=None):
+    """Adds a batch of predictions to the shared histogram.
+
+    Args:
+      y_true: Labels `Tensor`, with values in `[0, 1]`.
+      y_pred: Predicted probabilities `Tensor` with the same shape as `y_true`.
+      sample_weight: (Optional) weights `Tensor` broadcastable to `y_pred`.
+
+    Returns:
+      The update op of the histogram.
+    """
+    return self.histogram.shared_update_state(
+        y_true, y_pred, sample_weight=sample_weight)
+
+  def reset_states(self):
+    self.histogram.reset_states()
+
+
+class ThresholdAccuracy(HistogramMetric):
+  """Binary accuracy at one threshold, like `tf.keras.metrics.BinaryAccuracy`.
+
+  Examples count as correct when `label == 1` and `prediction > threshold`, or
+  `label == 0` and `prediction <= threshold`.
+  """
+
+  def __init__(self, histogram, threshold, name=None):
+    super(ThresholdAccuracy, self).__init__(histogram, name=name)
+    self._index = histogram.threshold_indices([threshold])
+
+  def result(self):
+    exact_true_positives = _weight_above(
+        self.histogram.exact_positives, self._index)
+    _, _, true_negatives, _ = self.histogram.confusion_matrix(self._index)
+    return math_ops.div_no_nan(
+        exact_true_positives + true_negatives, self.histogram.result())[0]
+
+
+class ThresholdPrecision(HistogramMetric):
+  """Precision at one threshold, like `tf.keras.metrics.Precision`."""
+
+  def __init__(self, histogram, threshold, name=None):
+    super(ThresholdPrecision, self).__init__(histogram, name=name)
+    self._index = histogram.threshold_indices([threshold])
+
+  def result(self):
+    true_positives, false_positives, _, _ = self.histogram.confusion_matrix(
+        self._index)
+    return math_ops.div_no_nan(
+        true_positives, true_positives + false_positives)[0]
+
+
+class ThresholdRecall(HistogramMetric):
+  """Recall at one threshold, like `tf.keras.metrics.Recall`."""
+
+  def __init__(self, histogram, threshold, name=None):
+    super(ThresholdRecall, self).__init__(histogram, name=name)
+    self._index = histogram.threshold_indices([threshold])
+
+  def result(self):
+    true_positives, _, _, false_negatives = self.histogram.confusion_matrix(
+        self._index)
+    return math_ops.div_no_nan(
+        true_positives, true_positives + false_negatives)[0]
+
+
+class HistogramAUC(HistogramMetric):
+  """Area under the ROC or PR curve, like `tf.keras.metrics.AUC`.
+
+  Uses the default `tf.keras.metrics.AUC` thresholds and its "interpolation"
+  summation method, so results match the Keras metric.
+  """
+
+  def __init__(self, histogram, curve=ROC, name=None):
+    super(HistogramAUC, self).__init__(histogram, name=name)
+    if curve not in (ROC, PR):
+      raise ValueError('curve must be one of {}. Given: {}'.format(
+          (ROC, PR), curve))
+    self._curve = curve
+    self._indices = histogram.threshold_indices(auc_thresholds())
+
+  def result(self):
+    tp, fp, tn, fn = self.histogram.confusion_matrix(self._indices)
+    if self._curve == PR:
+      return _interpolate_pr_auc(tp, fp, fn)
+    recall = math_ops.div_no_nan(tp, tp + fn)
+    fp_rate = math_ops.div_no_nan(fp, fp + tn)
+    heights = (recall[:-1] + recall[1:]) / 2.
+    return math_ops.reduce_sum((fp_rate[:-1] - fp_rate[1:]) * heights)
+
+
+def _interpolate_pr_auc(tp, fp, fn):
+  """Interpolation formula of Davis & Goadrich (2006), as in Keras AUC."""
+  dtp = tp[:-1] - tp[1:]
+  p = tp + fp
+  dp = p[:-1] - p[1:]
+  prec_slope = math_ops.div_no_nan(dtp, math_ops.maximum(dp, 0))
+  intercept = tp[1:] - prec_slope * p[1:]
+  safe_p_ratio = array_ops.where(
+      math_ops.logical_and(p[:-1] > 0, p[1:] > 0),
+      math_ops.div_no_nan(p[:-1], math_ops.maximum(p[1:], 0)),
+      array_ops.ones_like(p[1:]))
+  return math_ops.reduce_sum(
+      math_ops.div_no_nan(
+          prec_slope * (dtp + intercept * math_ops.log(safe_p_ratio)),
+          math_ops.maximum(tp[1:] + fn[1:], 0)))
+
+
+class ScoreSketch(_SharedHistogram):
+  """Fixed-size sketch of weighted binary predictions and labels.
+
+  Predictions in `[0, 1]` are binned into `num_buckets` equal-width buckets.
+  Each bucket accumulates the weight of the positive (`weight * label`) and
+  negative (`weight * (1 - label)`) examples, and the weighted sums of the
+  predictions and of the log losses. Memory is independent of the number of
+  examples.
+
+  Equal-width buckets give an error-bounded AUC, not one exact to a chosen
+  epsilon: positive/negative pairs that share a bucket count as ties, and
+  `auc_error_bound()` is the resulting worst case error, half the weighted
+  fraction of positive/negative pairs that share a bucket. The bound depends
+  on the data, not only on `num_buckets`: when the predictions concentrate in
+  a narrow range, e.g. scores of rare positives all close to 0, most pairs can
+  share a few buckets and the bound stays large however many buckets are used.
+  Check the reported bound rather than assuming a precision of `1 / num_buckets`.
+  """
+
+  def __init__(self, num_buckets, name=None, dtype=None):
+    """Creates the sketch.
+
+    Args:
+      num_buckets: Number of equal-width prediction buckets.
+      name: (Optional) string name of the metric instance.
+      dtype: (Optional) data type of the metric result.
+
+    Raises:
+      ValueError: If `num_buckets` is not positive.
+    """
+    if num_buckets < 1:
+      raise ValueError(
+          'num_buckets must be positive. Given: {}'.format(num_buckets))
+    super(ScoreSketch, self).__init__(name=name, dtype=dtype)
+    self._num_buckets = num_buckets
+    self.positives = self.add_weight(
+        'positives', shape=(num_buckets,),
+        initializer=init_ops.zeros_initializer)
+    self.negatives = self.add_weight(
+        'negatives', shape=(num_buckets,),
+        initializer=init_ops.zeros_initializer)
+    self.predictions = self.add_weight(
+        'predictions', shape=(num_buckets,),
+        initializer=init_ops.zeros_initializer)
+    self.log_losses = self.add_weight(
+        'log_losses', shape=(num_buckets,),
+        initializer=init_ops.zeros_initializer)
+
+  @property
+  def num_buckets(self):
+    return self._num_buckets
+
+  def update_state(self, y_true, y_pred, sample_weight=None):
+    """Adds a batch of predictions to the sketch.
+
+    Args:
+      y_true: Labels `Tensor`, with values in `[0, 1]`.
+      y_pred: Predicted probabilities `Tensor` with the same shape as `y_true`.
+      sample_weight: (Optional) weights `Tensor` broadcastable to `y_pred`.
+
+    Returns:
+      The update op.
+    """
+    y_true = math_ops.cast(y_true, dtype=self.dtype)
+    y_pred = math_ops.cast(y_pred, dtype=self.dtype)
+    if sample_weight is None:
+      sample_weight = array_ops.ones_like(y_pred)
+    else:
+      sample_weight = weights_broadcast_ops.broadcast_weights(
+          math_ops.cast(sample_weight, dtype=self.dtype), y_pred)
+    y_true = array_ops.reshape(y_true, [-1])
+    y_pred = array_ops.reshape(y_pred, [-1])
+    sample_weight = array_ops.reshape(sample_weight, [-1])
+
+    buckets = math_ops.cast(
+        math_ops.floor(y_pred * self._num_buckets), dtypes.int32)
+    buckets = math_ops.minimum(math_ops.maximum(buckets, 0),
+                               self._num_buckets - 1)
+    clipped_pred = clip_ops.clip_by_value(
+        y_pred, _LOG_LOSS_EPSILON, 1. - _LOG_LOSS_EPSILON)
+    log_losses = -(y_true * math_ops.log(clipped_pred) +
+                   (1. - y_true) * math_ops.log(1. - clipped_pred))
+
+    def _histogram(values):
+      return math_ops.unsorted_segment_sum(
+          sample_weight * values, buckets, self._num_buckets)
+
+    return control_flow_ops.group(
+        self.positives.assign_add(_histogram(y_true)),
+        self.negatives.assign_add(_histogram(1. - y_true)),
+        self.predictions.assign_add(_histogram(y_pred)),
+        self.log_losses.assign_add(_histogram(log_losses)))
+
+  def result(self):
+    """Returns the total weight accumulated so far."""
+    return math_ops.reduce_sum(self.positives) + math_ops.reduce_sum(
+        self.negatives)
+
+  def auc(self):
+    """Returns the ROC AUC, with the pairs within a bucket counted as ties."""
+    negatives_below = math_ops.cumsum(self.negatives, exclusive=True)
+    concordant = math_ops.reduce_sum(
+        self.positives * (negatives_below + 0.5 * self.negatives))
+    return math_ops.div_no_nan(concordant, self._num_pairs())
+
+  def auc_error_bound(self):
+    """Returns the maximum error of `auc()` due to the bucketing."""
+    ties = math_ops.reduce_sum(self.positives * self.negatives)
+    return math_ops.div_no_nan(0.5 * ties, self._num_pairs())
+
+  def _num_pairs(self):
+    return math_ops.reduce_sum(self.positives) * math_ops.reduce_sum(
+        self.negatives)
+
+
+class SketchAUC(HistogramMetric):
+  """ROC AUC from a `ScoreSketch`, see `ScoreSketch.auc`."""
+
+  def result(self):
+    return self.histogram.auc()
+
+
+class SketchAUCErrorBound(HistogramMetric):
+  """Maximum bucketing error of `SketchAUC`."""
+
+  def result(self):
+    return self.histogram.auc_error_bound()
+
+
+class SketchLogLoss(HistogramMetric):
+  """Weighted mean log loss of the predictions in a `ScoreSketch`."""
+
+  def result(self):
+    return math_ops.div_no_nan(
+        math_ops.reduce_sum(self.histogram.log_losses), self.histogram.result())
+
+
+class SketchCalibration(HistogramMetric):
+  """Ratio of the mean prediction to the mean label in a `ScoreSketch`."""
+
+  def result(self):
+    return math_ops.div_no_nan(
+        math_ops.reduce_sum(self.histogram.predictions),
+        math_ops.reduce_sum(self.histogram.positives))
+
+
+MEAN_PREDICTION = 'mean_prediction'
+MEAN_LABEL = 'mean_label'
+WEIGHT = 'weight'
+LOG_LOSS = 'log_loss'
+
+
+class CalibrationCurve(HistogramMetric):
+  """Per-bucket statistic of a `ScoreSketch`, over coarser equal buckets.
+
+  The result is a 1-D `Tensor` with one value per calibration bucket:
+  `MEAN_PREDICTION` and `MEAN_LABEL` give the reliability diagram, `WEIGHT` the
+  weight of the examples and `LOG_LOSS` the mean log loss in each bucket. Each
+  sketch bucket is added to the calibration bucket that contains its center.
+  """
+
+  def __init__(self, histogram, num_buckets, statistic, name=None):
+    """Creates the curve.
+
+    Args:
+      histogram: The `ScoreSketch`.
+      num_buckets: Number of calibration buckets, at most the number of sketch
+        buckets.
+      statistic: One of `MEAN_PREDICTION`, `MEAN_LABEL`, `WEIGHT` or
+        `LOG_LOSS`.
+      name: (Optional) string name of the metric instance.
+
+    Raises:
+      ValueError: If `statistic` is invalid, or `num_buckets` is not in
+        `[1, histogram.num_buckets]`.
+    """
+    super(CalibrationCurve, self).__init__(histogram, name=name)
+    statistics = (MEAN_PREDICTION, MEAN_LABEL, WEIGHT, LOG_LOSS)
+    if statistic not in statistics:
+      raise ValueError('statistic must be one of {}. Given: {}'.format(
+          statistics, statistic))
+    if not 1 <= num_buckets <= histogram.num_buckets:
+      raise ValueError(
+          'num_buckets must be in [1, {}], the number of sketch buckets. '
+          'Given: {}'.format(histogram.num_buckets, num_buckets))
+    self._num_buckets = num_buckets
+    self._statistic = statistic
+    centers = (np.arange(histogram.num_buckets) + 0.5) / histogram.num_buckets
+    self._bucket_ids = np.minimum(
+        np.floor(centers * num_buckets), num_buckets - 1).astype(np.int32)
+
+  def _coarse(self, values):
+    return math_ops.unsorted_segment_sum(
+        values, constant_op.constant(self._bucket_ids), self._num_buckets)
+
+  def result(self):
+    weights = self._coarse(self.histogram.positives + self.histogram.negatives)
+    if self._statistic == WEIGHT:
+      return weights
+    values = {
+        MEAN_PREDICTION: self.histogram.predictions,
+        MEAN_LABEL: self.histogram.positives,
+        LOG_LOSS: self.histogram.log_losses,
+    }[self._statistic]
+    return math_ops.div_no_nan(self._coarse(values), weights)
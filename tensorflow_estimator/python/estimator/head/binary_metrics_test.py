@@ -0,0 +1,206 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for binary_metrics.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+from tensorflow.python.framework import test_util
+from tensorflow.python.keras import metrics
+from tensorflow.python.ops import variables
+from tensorflow.python.platform import test
+from tensorflow_estimator.python.estimator.head import binary_metrics
+
+
+@test_util.run_all_in_graph_and_eager_modes
+class BinaryMetricsTest(test.TestCase):
+
+  def setUp(self):
+    super(BinaryMetricsTest, self).setUp()
+    rng = np.random.RandomState(42)
+    self._labels = rng.randint(0, 2, size=(64, 1)).astype(np.float32)
+    self._predictions = rng.uniform(size=(64, 1)).astype(np.float32)
+    # Predictions exactly on a threshold are classified negative.
+    self._predictions[:4] = 0.5
+    self._weights = rng.uniform(size=(64, 1)).astype(np.float32)
+
+  def _assert_matches_keras(self, histogram_metric, keras_metric, batches=2):
+    histogram = histogram_metric.histogram
+    self.evaluate(variables.variables_initializer(
+        histogram.variables + keras_metric.variables))
+    for labels, predictions, weights in zip(
+        np.split(self._labels, batches), np.split(self._predictions, batches),
+        np.split(self._weights, batches)):
+      self.evaluate(histogram_metric.update_state(
+          labels, predictions, sample_weight=weights))
+      self.evaluate(keras_metric.update_state(
+          labels, predictions, sample_weight=weights))
+    self.assertAllClose(
+        self.evaluate(keras_metric.result()),
+        self.evaluate(histogram_metric.result()), atol=1e-5)
+
+  def test_auc(self):
+    histogram = binary_metrics.BinaryScoreHistogram(
+        binary_metrics.auc_thresholds())
+    self._assert_matches_keras(
+        binary_metrics.HistogramAUC(histogram), metrics.AUC())
+
+  def test_auc_pr(self):
+    histogram = binary_metrics.BinaryScoreHistogram(
+        binary_metrics.auc_thresholds())
+    self._assert_matches_keras(
+        binary_metrics.HistogramAUC(histogram, curve=binary_metrics.PR),
+        metrics.AUC(curve='PR'))
+
+  def test_threshold_metrics(self):
+    thresholds = [0.2, 0.5, 0.75]
+    for threshold in thresholds:
+      self._assert_matches_keras(
+          binary_metrics.ThresholdAccuracy(
+              binary_metrics.BinaryScoreHistogram(thresholds), threshold),
+          metrics.BinaryAccuracy(threshold=threshold))
+      self._assert_matches_keras(
+          binary_metrics.ThresholdPrecision(
+              binary_metrics.BinaryScoreHistogram(thresholds), threshold),
+          metrics.Precision(thresholds=threshold))
+      self._assert_matches_keras(
+          binary_metrics.ThresholdRecall(
+              binary_metrics.BinaryScoreHistogram(thresholds), threshold),
+          metrics.Recall(thresholds=threshold))
+
+  def test_derived_metrics_share_histogram_updates(self):
+    histogram = binary_metrics.BinaryScoreHistogram(
+        binary_metrics.auc_thresholds())
+    auc = binary_metrics.HistogramAUC(histogram)
+    auc_pr = binary_metrics.HistogramAUC(histogram, curve=binary_metrics.PR)
+    self.evaluate(variables.variables_initializer(histogram.variables))
+    update_ops = [
+        metric.update_state(
+            self._labels, self._predictions, sample_weight=self._weights)
+        for metric in (auc, auc_pr)]
+    self.evaluate(update_ops)
+    # The batch is added to the histogram once.
+    self.assertAllClose(np.sum(self._weights),
+                        self.evaluate(histogram.result()))
+    auc_pr.reset_states()
+    self.assertAllClose(0., self.evaluate(histogram.result()))
+    self.assertAllClose(0., self.evaluate(auc.result()))
+
+  def test_threshold_not_in_histogram(self):
+    histogram = binary_metrics.BinaryScoreHistogram([0.5])
+    with self.assertRaisesRegexp(ValueError, 'subset of the histogram'):
+      binary_metrics.ThresholdPrecision(histogram, 0.7)
+
+  def test_invalid_curve(self):
+    histogram = binary_metrics.BinaryScoreHistogram(
+        binary_metrics.auc_thresholds())
+    with self.assertRaisesRegexp(ValueError, 'curve must be one of'):
+      binary_metrics.HistogramAUC(histogram, curve='ROCPR')
+
+
+def _exact_auc(labels, predictions, weights):
+  """Weighted ROC AUC over all positive/negative pairs, ties counting half."""
+  labels = labels.ravel()
+  predictions = predictions.ravel()
+  weights = weights.ravel()
+  pos = labels == 1
+  neg = labels == 0
+  diff = predictions[pos][:, np.newaxis] - predictions[neg][np.newaxis, :]
+  pair_weights = weights[pos][:, np.newaxis] * weights[neg][np.newaxis, :]
+  concordant = np.sum(pair_weights * ((diff > 0) + 0.5 * (diff == 0)))
+  return concordant / np.sum(pair_weights)
+
+
+@test_util.run_all_in_graph_and_eager_modes
+class ScoreSketchTest(test.TestCase):
+
+  def setUp(self):
+    super(ScoreSketchTest, self).setUp()
+    rng = np.random.RandomState(7)
+    self._labels = rng.randint(0, 2, size=(200, 1)).astype(np.float32)
+    self._predictions = np.clip(
+        0.6 * rng.uniform(size=(200, 1)) + 0.3 * self._labels, 0.,
+        1.).astype(np.float32)
+    self._weights = rng.uniform(size=(200, 1)).astype(np.float32)
+
+  def _sketch(self, num_buckets, labels, predictions, weights):
+    sketch = binary_metrics.ScoreSketch(num_buckets)
+    self.evaluate(variables.variables_initializer(sketch.variables))
+    self.evaluate(
+        sketch.update_state(labels, predictions, sample_weight=weights))
+    return sketch
+
+  def test_auc_within_error_bound(self):
+    exact_auc = _exact_auc(self._labels, self._predictions, self._weights)
+    previous_error_bound = 1.
+    for num_buckets in (10, 100, 1000):
+      sketch = self._sketch(
+          num_buckets, self._labels, self._predictions, self._weights)
+      auc = binary_metrics.SketchAUC(sketch)
+      error_bound = binary_metrics.SketchAUCErrorBound(sketch)
+      auc, error_bound = self.evaluate((auc.result(), error_bound.result()))
+      self.assertLessEqual(abs(auc - exact_auc), error_bound + 1e-6)
+      self.assertLess(error_bound, previous_error_bound)
+      previous_error_bound = error_bound
+
+  def test_log_loss_and_calibration(self):
+    labels = np.array([[1.], [0.], [1.], [0.]], dtype=np.float32)
+    predictions = np.array([[0.9], [0.2], [0.4], [0.05]], dtype=np.float32)
+    weights = np.array([[1.], [2.], [1.], [1.]], dtype=np.float32)
+    sketch = self._sketch(10, labels, predictions, weights)
+    log_losses = -np.array(
+        [np.log(0.9), 2. * np.log(0.8), np.log(0.4), np.log(0.95)])
+    self.assertAllClose(
+        np.sum(log_losses) / 5.,
+        self.evaluate(binary_metrics.SketchLogLoss(sketch).result()))
+    # sum(weight * prediction) / sum(weight * label) = 1.75 / 2.
+    self.assertAllClose(
+        1.75 / 2.,
+        self.evaluate(binary_metrics.SketchCalibration(sketch).result()))
+
+  def test_calibration_curve(self):
+    labels = np.array([[1.], [0.], [1.], [0.]], dtype=np.float32)
+    predictions = np.array([[0.9], [0.2], [0.95], [0.15]], dtype=np.float32)
+    sketch = self._sketch(10, labels, predictions, None)
+
+    def _curve(statistic):
+      return self.evaluate(
+          binary_metrics.CalibrationCurve(sketch, 2, statistic).result())
+
+    self.assertAllClose([2., 2.], _curve(binary_metrics.WEIGHT))
+    self.assertAllClose([0.175, 0.925], _curve(binary_metrics.MEAN_PREDICTION))
+    self.assertAllClose([0., 1.], _curve(binary_metrics.MEAN_LABEL))
+
+  def test_calibration_curve_uneven_buckets(self):
+    labels = np.array([[1.], [0.], [1.], [0.]], dtype=np.float32)
+    predictions = np.array([[0.9], [0.2], [0.95], [0.15]], dtype=np.float32)
+    sketch = self._sketch(10, labels, predictions, None)
+    # Sketch buckets 0 to 2 have centers in [0, 1/3), and 7 to 9 in [2/3, 1].
+    self.assertAllClose(
+        [2., 0., 2.],
+        self.evaluate(binary_metrics.CalibrationCurve(
+            sketch, 3, binary_metrics.WEIGHT).result()))
+
+  def test_invalid_calibration_buckets(self):
+    with self.assertRaisesRegexp(ValueError, 'must be in'):
+      binary_metrics.CalibrationCurve(
+          binary_metrics.ScoreSketch(10), 11, binary_metrics.WEIGHT)
+
+
+if __name__ == '__main__':
+  test.main()
@@ -37,6 +37,12 @@ from tensorflow_estimator.python.estimator.export import export_output
 from tensorflow_estimator.python.estimator.head import base_head
 from tensorflow_estimator.python.estimator.mode_keys import ModeKeys
 
+# Predictions returned in TRAIN and EVAL mode with `numeric_predictions_only`.
+_NUMERIC_PREDICTION_KEYS = (
+    prediction_keys.PredictionKeys.LOGITS,
+    prediction_keys.PredictionKeys.PROBABILITIES,
+    prediction_keys.PredictionKeys.CLASS_IDS)
+
 
 @estimator_export('estimator.MultiClassHead')
 class MultiClassHead(base_head.Head):
@@ -137,6 +143,16 @@ class MultiClassHead(base_head.Head):
     loss_fn: Optional loss function.
     name: Name of the head. If provided, summary and metrics keys will be
       suffixed by `"/" + name`. Also used as `name_scope` when creating ops.
+    input_preprocessing: Whether `label_vocabulary` lookups, label range checks
+      and weight shape checks run in the input pipeline, once per dataset
+      element, instead of on every step of the model graph. `input_fn` must
+      then map `preprocess_input` over its dataset, e.g.
+      `dataset.map(head.preprocess_input)`, and the head only checks static
+      shapes.
+    numeric_predictions_only: Whether the predictions of TRAIN and EVAL specs
+      are only `logits`, `probabilities` and `class_ids`. This skips building
+      the `classes` string lookups and the `all_class_ids` and `all_classes`
+      tensors. PREDICT specs always hold every prediction.
   """
 
   def __init__(self,
@@ -145,7 +161,9 @@ class MultiClassHead(base_head.Head):
                label_vocabulary=None,
                loss_reduction=losses_utils.ReductionV2.SUM_OVER_BATCH_SIZE,
                loss_fn=None,
-               name=None):
+               name=None,
+               input_preprocessing=False,
+               numeric_predictions_only=False):
     if n_classes is None:
       raise ValueError('n_classes cannot be None')
     if label_vocabulary is not None and not isinstance(label_vocabulary,
@@ -167,6 +185,8 @@ class MultiClassHead(base_head.Head):
     self._loss_reduction = loss_reduction
     self._loss_fn = loss_fn
     self._name = name
+    self._input_preprocessing = input_preprocessing
+    self._numeric_predictions_only = numeric_predictions_only
     # Metric keys.
     keys = metric_keys.MetricKeys
     self._loss_mean_key = self._summary_key(keys.LOSS_MEAN)
@@ -231,8 +251,36 @@ class MultiClassHead(base_head.Head):
               ))
     return self._cached_class_string_table
 
+  def preprocess_input(self, features, labels):
+    """Maps labels to class ids and validates weights in an input pipeline.
+
+    Used with `input_preprocessing=True`, on dataset elements before or after
+    batching, e.g. `dataset.map(head.preprocess_input)`.
+
+    Args:
+      features: `dict` of `Tensor` or `SparseTensor` objects.
+      labels: Labels `Tensor` with shape `[D0, D1, ... DN]` or
+        `[D0, D1, ... DN, 1]`.
+
+    Returns:
+      A `(features, labels)` tuple, with int64 labels and, if
+      `weight_column` is set, float32 weights of the same shape in `features`.
+    """
+    class_id_table = None
+    if self._label_vocabulary is not None:
+      # Creates the table outside of the dataset functions, in the graph of the
+      # model where lookup tables are initialized.
+      with ops.init_scope():
+        class_id_table = self._class_id_table
+    return base_head.preprocess_labels_and_weights(
+        features, labels, n_classes=self._n_classes, labels_dtype=dtypes.int64,
+        weight_column=self._weight_column, class_id_table=class_id_table)
+
   def _processed_labels(self, logits, labels):
     """Converts labels to integer id space."""
+    if self._input_preprocessing:
+      return base_head.check_preprocessed_labels_and_reshape(
+          labels, logits, labels_dtype=dtypes.int64)
     labels = base_head.check_dense_labels_match_logits_and_reshape(
         labels=labels,
         logits=logits,
@@ -263,22 +311,31 @@ class MultiClassHead(base_head.Head):
           labels=label_ids, logits=logits, reduction=losses.Reduction.NONE)
       # Restore the squeezed dim, so unweighted_loss matches the weights shape.
       unweighted_loss = array_ops.expand_dims(unweighted_loss, axis=-1)
-    weights = base_head.get_weights_and_check_match_logits(
-        features=features,
-        weight_column=self._weight_column,
-        logits=logits)
+    if self._input_preprocessing:
+      weights = base_head.get_preprocessed_weights(
+          features=features, weight_column=self._weight_column, logits=logits)
+    else:
+      weights = base_head.get_weights_and_check_match_logits(
+          features=features,
+          weight_column=self._weight_column,
+          logits=logits)
     return unweighted_loss, weights
 
+  def _loss_terms(self, logits, labels, features):
+    """Returns the processed labels, the unweighted loss and the weights."""
+    logits = base_head.check_logits_final_dim(logits, self.logits_dimension)
+    labels = self._processed_labels(logits, labels)
+    unweighted_loss, weights = self._unweighted_loss_and_weights(
+        logits, labels, features)
+    return labels, unweighted_loss, weights
+
   def loss(self, labels, logits, features=None, mode=None,
            regularization_losses=None):
     """Returns regularized training loss. See `base_head.Head` for details."""
     del mode  # Unused for this head.
     with ops.name_scope('losses', values=(logits, labels, regularization_losses,
                                           features)):
-      logits = base_head.check_logits_final_dim(logits, self.logits_dimension)
-      label_ids = self._processed_labels(logits, labels)
-      unweighted_loss, weights = self._unweighted_loss_and_weights(
-          logits, label_ids, features)
+      _, unweighted_loss, weights = self._loss_terms(logits, labels, features)
       training_loss = losses_utils.compute_weighted_loss(
           unweighted_loss,
           sample_weight=weights,
@@ -356,15 +413,31 @@ class MultiClassHead(base_head.Head):
       eval_metrics[self._accuracy_key] = metrics.Accuracy(name=keys.ACCURACY)
     return eval_metrics
 
+  # The `_update_metrics` arguments computed from the predictions, with their
+  # prediction keys.
+  _METRIC_PREDICTION_KEYS = {
+      'class_ids': prediction_keys.PredictionKeys.CLASS_IDS,
+  }
+
   def update_metrics(self, eval_metrics, features, logits, labels,
                      regularization_losses=None):
     """Updates eval metrics. See `base_head.Head` for details."""
-    preds = self.predictions(logits)
-    class_ids = preds[prediction_keys.PredictionKeys.CLASS_IDS]
-    logits = base_head.check_logits_final_dim(logits, self.logits_dimension)
-    label_ids = self._processed_labels(logits, labels)
-    unweighted_loss, weights = self._unweighted_loss_and_weights(
-        logits, label_ids, features)
+    predictions = self.predictions(
+        logits, [prediction_keys.PredictionKeys.CLASS_IDS])
+    return self._update_metrics(
+        eval_metrics, features, logits, labels,
+        class_ids=predictions[prediction_keys.PredictionKeys.CLASS_IDS],
+        regularization_losses=regularization_losses)
+
+  def _update_metrics(self, eval_metrics, features, logits, labels, class_ids,
+                      regularization_losses=None, loss_terms=None):
+    """Updates eval metrics given the already computed class ids.
+
+    `loss_terms` are the already computed `_loss_terms`, if any.
+    """
+    if loss_terms is None:
+      loss_terms = self._loss_terms(logits, labels, features)
+    label_ids, unweighted_loss, weights = loss_terms
 
     # Update metrics.
     eval_metrics[self._loss_mean_key].update_state(
@@ -424,7 +497,9 @@ class MultiClassHead(base_head.Head):
     with ops.name_scope(self._name, 'head'):
       # Predict.
       pred_keys = prediction_keys.PredictionKeys
-      predictions = self.predictions(logits)
+      predictions = base_head.spec_predictions(
+          self, logits, mode,
+          _NUMERIC_PREDICTION_KEYS if self._numeric_predictions_only else None)
       if mode == ModeKeys.PREDICT:
         probabilities = predictions[pred_keys.PROBABILITIES]
         classifier_output = base_head.classification_output(
@@ -453,11 +528,12 @@ class MultiClassHead(base_head.Head):
             predictions=predictions,
             loss=regularized_training_loss,
             eval_metrics=base_head.create_eval_metrics_tuple(
-                self.update_metrics, {
+                self._update_metrics, {
                     'eval_metrics': eval_metrics,
                     'features': features,
                     'logits': logits,
                     'labels': labels,
+                    'class_ids': predictions[pred_keys.CLASS_IDS],
                     'regularization_losses': regularization_losses
                 }))
       # Train.
@@ -21,6 +21,7 @@ from __future__ import print_function
 import numpy as np
 import six
 
+from tensorflow.python.data.ops import dataset_ops
 from tensorflow.python.eager import context
 from tensorflow.python.feature_column import feature_column_lib as feature_column
 from tensorflow.python.framework import constant_op
@@ -1848,6 +1849,29 @@ class MultiClassHeadForEstimator(test.TestCase):
     # Predict.
     est.predict(input_fn)
 
+  def test_input_preprocessing_with_estimator(self):
+    head = head_lib.MultiClassHead(
+        n_classes=3,
+        weight_column='w',
+        label_vocabulary=['aang', 'iroh', 'zuko'],
+        input_preprocessing=True)
+    est = dnn.DNNEstimatorV2(
+        head=head,
+        hidden_units=(2, 2),
+        feature_columns=[feature_column.numeric_column('x')])
+
+    def input_fn():
+      dataset = dataset_ops.Dataset.from_tensor_slices((
+          {'x': np.array(((42.,), (43.,),), dtype=np.float32),
+           'w': np.array((1., 2.), dtype=np.float32)},
+          np.array((b'iroh', b'zuko'))))
+      # Labels and weights are preprocessed once per example.
+      return dataset.map(head.preprocess_input).batch(2).repeat()
+
+    est.train(input_fn, steps=1)
+    eval_results = est.evaluate(input_fn, steps=1)
+    self.assertIn('loss', six.iterkeys(eval_results))
+
   def test_missmatch_n_classes_label_vocabulary(self):
     with self.assertRaises(ValueError):
       head_lib.MultiClassHead(
@@ -20,17 +20,21 @@ from __future__ import print_function
 
 import six
 
-from tensorflow.python.eager import context
+from tensorflow.python.framework import dtypes
 from tensorflow.python.framework import ops
+from tensorflow.python.framework import tensor_util
 from tensorflow.python.keras import metrics
+from tensorflow.python.keras.utils import losses_utils
 from tensorflow.python.ops import array_ops
 from tensorflow.python.ops import control_flow_ops
 from tensorflow.python.ops import math_ops
+from tensorflow.python.ops import nn
 from tensorflow.python.util.tf_export import estimator_export
 from tensorflow_estimator.python.estimator import model_fn
 from tensorflow_estimator.python.estimator.canned import metric_keys
 from tensorflow_estimator.python.estimator.export import export_output
 from tensorflow_estimator.python.estimator.head import base_head
+from tensorflow_estimator.python.estimator.head import binary_class_head
 from tensorflow_estimator.python.estimator.mode_keys import ModeKeys
 
 
@@ -176,9 +180,14 @@ class MultiHead(base_head.Head):
     head_weights: Optional list of weights, same length as `heads`. Used when
       merging losses to calculate the weighted sum of losses from each head. If
       `None`, all losses are weighted equally.
+    fuse_binary_heads: If `True`, the losses of the `BinaryClassHead`s that do
+      not have a custom `loss_fn` are computed together, with their labels and
+      weights batched into one `[D0, D1, ... DN, n_binary_heads]` sigmoid cross
+      entropy, instead of one loss graph per head. This shrinks the graph of
+      models with many binary heads.
   """
 
-  def __init__(self, heads, head_weights=None):
+  def __init__(self, heads, head_weights=None, fuse_binary_heads=False):
     if not heads:
       raise ValueError('Must specify heads. Given: {}'.format(heads))
     if head_weights:
@@ -195,6 +204,7 @@ class MultiHead(base_head.Head):
       self._logits_dimension += head.logits_dimension
     self._heads = tuple(heads)
     self._head_weights = tuple(head_weights) if head_weights else tuple()
+    self._fuse_binary_heads = fuse_binary_heads
     # Metric keys.
     keys = metric_keys.MetricKeys
     self._loss_regularization_key = self._summary_key(keys.LOSS_REGULARIZATION)
@@ -267,23 +277,10 @@ class MultiHead(base_head.Head):
               ((logits_tensor_shape, logits_dimensions, last_dimension_size,
                 total_logits_dimension)))
 
-      # TODO(b/119617064): unify eager and graph implementations
-      if context.executing_eagerly():
-        logits_shape = logits._shape_tuple()  # pylint: disable=protected-access
-        batch_shape = logits_shape[:-1]
-      else:
-        batch_shape = array_ops.shape(logits)[:-1]
-      zeros_like_batch_shape = array_ops.zeros_like(batch_shape)
-      minus_ones_like_batch_shape = -1 * array_ops.ones_like(batch_shape)
-      begin_idx = 0
-      for head in self._heads:
-        begin_tensor = array_ops.concat(
-            [zeros_like_batch_shape, [begin_idx]], axis=0)
-        size_tensor = array_ops.concat(
-            [minus_ones_like_batch_shape, [head.logits_dimension]], axis=0)
-        logits_dict[head.name] = array_ops.slice(
-            logits, begin=begin_tensor, size=size_tensor)
-        begin_idx += head.logits_dimension
+      # A single split op slices the logits of all heads.
+      head_logits = array_ops.split(logits, logits_dimensions, axis=-1)
+      for head, logits in zip(self._heads, head_logits):
+        logits_dict[head.name] = logits
     return logits_dict
 
   def _check_logits_and_labels(self, logits, labels=None):
@@ -314,14 +311,139 @@ class MultiHead(base_head.Head):
            regularization_losses=None):
     """Returns regularized training loss. See `base_head.Head` for details."""
     logits_dict = self._check_logits_and_labels(logits, labels)
+    training_losses, _ = self._head_losses(
+        logits_dict, labels, features, mode)
+    return self._merge_losses(training_losses, regularization_losses)
+
+  def _head_losses(self, logits_dict, labels, features=None, mode=None):
+    """Returns the training losses and loss terms of the heads, in head order.
+
+    Args:
+      logits_dict: `dict` of logits keyed by head name.
+      labels: `dict` of labels keyed by head name.
+      features: Input `dict` of `Tensor` or `SparseTensor` objects.
+      mode: Estimator's `ModeKeys`.
+
+    Returns:
+      A tuple of the unregularized training loss of each head, and a tuple of
+      the `(labels, unweighted_loss, weights)` loss terms of each head, from
+      which its eval metrics are updated. The loss terms are `None` for heads
+      without `_loss_terms`, whose `loss` is called instead.
+    """
+    fused_heads = self._fused_binary_heads()
+    fused_losses = (
+        self._fused_binary_losses(fused_heads, logits_dict, labels, features)
+        if fused_heads else {})
     training_losses = []
+    all_loss_terms = []
     for head in self._heads:
-      training_loss = head.loss(
-          logits=logits_dict[head.name], labels=labels[head.name],
-          features=features, mode=mode)
+      if head.name in fused_losses:
+        training_loss, loss_terms = fused_losses[head.name]
+      elif hasattr(head, '_loss_terms'):
+        with ops.name_scope('losses'):
+          loss_terms = head._loss_terms(  # pylint: disable=protected-access
+              logits_dict[head.name], labels[head.name], features)
+          _, unweighted_loss, weights = loss_terms
+          training_loss = losses_utils.compute_weighted_loss(
+              unweighted_loss, sample_weight=weights,
+              reduction=head.loss_reduction)
+      else:
+        training_loss = head.loss(
+            logits=logits_dict[head.name], labels=labels[head.name],
+            features=features, mode=mode)
+        loss_terms = None
       training_losses.append(training_loss)
+      all_loss_terms.append(loss_terms)
+    return tuple(training_losses), tuple(all_loss_terms)
+
+  def _fused_binary_heads(self):
+    """Returns the heads whose losses are computed together, if any."""
+    if not self._fuse_binary_heads:
+      return ()
+    fused_heads = tuple(
+        head for head in self._heads
+        if isinstance(head, binary_class_head.BinaryClassHead) and
+        head._loss_fn is None and  # pylint: disable=protected-access
+        not head._input_preprocessing)  # pylint: disable=protected-access
+    # A single head gains nothing from fusing.
+    return fused_heads if len(fused_heads) > 1 else ()
+
+  def _fused_binary_losses(self, heads, logits_dict, labels, features):
+    """Computes the losses of `BinaryClassHead`s as one batched op.
+
+    Each head's logits, labels and weights are one column of a
+    `[D0, D1, ... DN, len(heads)]` `Tensor`. Label ranges are checked once,
+    weights are fetched once per distinct weight column, and the per-head
+    losses are reduced from a single sigmoid cross entropy, matching
+    `BinaryClassHead.loss`.
+
+    Args:
+      heads: Tuple of `BinaryClassHead` without `loss_fn`.
+      logits_dict: `dict` of logits keyed by head name.
+      labels: `dict` of labels keyed by head name.
+      features: Input `dict` of `Tensor` or `SparseTensor` objects.
 
-    training_losses = tuple(training_losses)
+    Returns:
+      A `dict` keyed by head name of the scalar training loss of the head and
+      its `(labels, unweighted_loss, weights)` loss terms.
+    """
+    # pylint: disable=protected-access
+    with ops.name_scope('fused_binary_losses'):
+      head_logits = []
+      head_labels = []
+      head_weights = []
+      weights_by_column = {}
+      for head in heads:
+        logits = base_head.check_logits_final_dim(logits_dict[head.name], 1)
+        labels_tensor = base_head.check_dense_labels_match_logits_and_reshape(
+            labels=labels[head.name], logits=logits,
+            expected_labels_dimension=1)
+        if head._label_vocabulary is not None:
+          labels_tensor = head._class_id_table.lookup(labels_tensor)
+        head_logits.append(logits)
+        head_labels.append(math_ops.cast(labels_tensor, dtype=dtypes.float32))
+        if head._weight_column not in weights_by_column:
+          weights_by_column[head._weight_column] = (
+              base_head.get_weights_and_check_match_logits(
+                  features=features, weight_column=head._weight_column,
+                  logits=logits))
+        head_weights.append(weights_by_column[head._weight_column])
+      logits = array_ops.concat(head_logits, axis=-1)
+      labels = base_head.check_label_range(
+          array_ops.concat(head_labels, axis=-1), n_classes=2)
+      unweighted_loss = nn.sigmoid_cross_entropy_with_logits(
+          labels=labels, logits=logits)
+      # The per-head columns, from which the eval metrics are updated.
+      head_labels = array_ops.split(labels, len(heads), axis=-1)
+      head_unweighted_losses = array_ops.split(
+          unweighted_loss, len(heads), axis=-1)
+      if any(tensor_util.is_tensor(weights) for weights in head_weights):
+        unweighted_loss *= array_ops.concat(
+            [weights * array_ops.ones_like(head_logits_tensor)
+             for weights, head_logits_tensor in zip(head_weights, head_logits)],
+            axis=-1)
+      # Sum over all dimensions but the last one, i.e. per head.
+      loss_sums = array_ops.unstack(
+          math_ops.reduce_sum(
+              unweighted_loss,
+              axis=math_ops.range(array_ops.rank(unweighted_loss) - 1)),
+          num=len(heads))
+      num_elements = math_ops.cast(
+          array_ops.size(unweighted_loss) // len(heads), dtype=dtypes.float32)
+      training_losses = {}
+      for i, (head, loss_sum) in enumerate(zip(heads, loss_sums)):
+        if head.loss_reduction == losses_utils.ReductionV2.SUM:
+          training_loss = loss_sum
+        else:
+          training_loss = math_ops.div_no_nan(loss_sum, num_elements)
+        training_losses[head.name] = (
+            training_loss,
+            (head_labels[i], head_unweighted_losses[i], head_weights[i]))
+    # pylint: enable=protected-access
+    return training_losses
+
+  def _merge_losses(self, training_losses, regularization_losses=None):
+    """Returns the weighted sum of `training_losses` and regularization."""
     with ops.name_scope(
         'merge_losses',
         values=training_losses + (self._head_weights or tuple())):
@@ -343,10 +465,15 @@ class MultiHead(base_head.Head):
   def predictions(self, logits, keys=None):
     """Create predictions. See `base_head.Head` for details."""
     logits_dict = self._check_logits_and_labels(logits)
+    return self._merge_predictions(
+        [head.predictions(logits=logits_dict[head.name])
+         for head in self._heads])
+
+  def _merge_predictions(self, all_predictions):
+    """Merges per-head predictions into a dict keyed by `(head.name, key)`."""
     predictions = {}
     with ops.name_scope('merge_pred'):
-      for head in self._heads:
-        head_preds = head.predictions(logits=logits_dict[head.name])
+      for head, head_preds in zip(self._heads, all_predictions):
         for k, v in six.iteritems(head_preds):
           predictions[(head.name, k)] = v
     return predictions
@@ -369,6 +496,40 @@ class MultiHead(base_head.Head):
                      regularization_losses=None):
     """Updates eval metrics. See `base_head.Head` for details."""
     logits_dict = self._check_logits_and_labels(logits, labels)
+    training_losses, loss_terms = self._head_losses(
+        logits_dict, labels, features)
+    # Only the predictions used by the metrics are built.
+    head_predictions = []
+    for head in self._heads:
+      metric_prediction_keys = getattr(head, '_METRIC_PREDICTION_KEYS', None)
+      head_predictions.append(
+          head.predictions(logits_dict[head.name],
+                           list(metric_prediction_keys.values()))
+          if metric_prediction_keys else None)
+    return self._update_metrics(
+        eval_metrics, features, logits_dict, labels, training_losses,
+        loss_terms, head_predictions, regularization_losses)
+
+  def _update_metrics(self, eval_metrics, features, logits_dict, labels,
+                      training_losses, loss_terms, head_predictions,
+                      regularization_losses=None):
+    """Updates eval metrics given the already computed per-head results.
+
+    Args:
+      eval_metrics: A `dict` of metrics to be updated.
+      features: Input `dict` of `Tensor` or `SparseTensor` objects.
+      logits_dict: `dict` of logits keyed by head name.
+      labels: `dict` of labels keyed by head name.
+      training_losses: The training loss of each head, in head order.
+      loss_terms: The loss terms of each head, see `_head_losses`.
+      head_predictions: The predictions of each head. Heads without
+        `_METRIC_PREDICTION_KEYS` ignore them, and their `update_metrics` is
+        called instead.
+      regularization_losses: A list of additional scalar losses.
+
+    Returns:
+      A `dict` of updated metrics.
+    """
     # Update regularization loss metric
     if regularization_losses is not None:
       regularization_loss = math_ops.add_n(regularization_losses)
@@ -379,13 +540,23 @@ class MultiHead(base_head.Head):
       head_logits = logits_dict[head.name]
       head_labels = labels[head.name]
       # Update loss metrics
-      training_loss = head.loss(
-          logits=head_logits, labels=head_labels, features=features)
-      eval_metrics[self._loss_keys[i]].update_state(values=training_loss)
-      # Update existing metrics in each head
+      eval_metrics[self._loss_keys[i]].update_state(values=training_losses[i])
+      # Update existing metrics in each head, from its predictions and loss
+      # terms when it takes them.
       head_metrics = head.metrics()
-      updated_metrics = head.update_metrics(
-          head_metrics, features, head_logits, head_labels)
+      metric_prediction_keys = getattr(head, '_METRIC_PREDICTION_KEYS', None)
+      if metric_prediction_keys:
+        prediction_kwargs = {
+            arg: head_predictions[i][key]
+            for arg, key in six.iteritems(metric_prediction_keys)}
+        # pylint: disable=protected-access
+        updated_metrics = head._update_metrics(
+            head_metrics, features, head_logits, head_labels,
+            loss_terms=loss_terms[i], **prediction_kwargs)
+        # pylint: enable=protected-access
+      else:
+        updated_metrics = head.update_metrics(
+            head_metrics, features, head_logits, head_labels)
       eval_metrics.update(updated_metrics or {})
     return eval_metrics
 
@@ -442,30 +613,38 @@ class MultiHead(base_head.Head):
     """
     with ops.name_scope(self.name, 'multi_head'):
       logits_dict = self._check_logits_and_labels(logits, labels)
-      # Get all estimator spec.
-      all_estimator_spec = []
-      for head in self._heads:
-        all_estimator_spec.append(
-            head.create_estimator_spec(
-                features=features,
-                mode=mode,
-                logits=logits_dict[head.name],
-                labels=labels[head.name] if labels else None,
-                train_op_fn=_no_op_train_fn))
       # Predict.
-      predictions = self.predictions(logits)
       if mode == ModeKeys.PREDICT:
+        # The individual specs are only needed for their export outputs.
+        all_estimator_spec = []
+        for head in self._heads:
+          all_estimator_spec.append(
+              head.create_estimator_spec(
+                  features=features,
+                  mode=mode,
+                  logits=logits_dict[head.name],
+                  train_op_fn=_no_op_train_fn))
+        predictions = self._merge_predictions(
+            [spec.predictions for spec in all_estimator_spec])
         export_outputs = self._merge_predict_export_outputs(all_estimator_spec)
         return model_fn.EstimatorSpec(
             mode=ModeKeys.PREDICT,
             predictions=predictions,
             export_outputs=export_outputs)
-      loss = self.loss(labels, logits, features, mode, regularization_losses)
+      # The logits are split, and each head's predictions and loss computed,
+      # once for the spec.
+      head_predictions = [head.predictions(logits=logits_dict[head.name])
+                          for head in self._heads]
+      predictions = self._merge_predictions(head_predictions)
+      training_losses, loss_terms = self._head_losses(
+          logits_dict, labels, features, mode)
+      loss = self._merge_losses(training_losses, regularization_losses)
       # Eval.
       if mode == ModeKeys.EVAL:
         eval_metrics = self.metrics(regularization_losses=regularization_losses)
-        updated_metrics = self.update_metrics(
-            eval_metrics, features, logits, labels,
+        updated_metrics = self._update_metrics(
+            eval_metrics, features, logits_dict, labels, training_losses,
+            loss_terms, head_predictions,
             regularization_losses=regularization_losses)
         return model_fn.EstimatorSpec(
             mode=ModeKeys.EVAL,
@@ -484,17 +663,17 @@ class MultiHead(base_head.Head):
             loss_reduction=self.loss_reduction)
         # Create summary.
         base_head.create_estimator_spec_summary(loss, regularization_losses)
-        # eval_metrics.
-        eval_metrics = {}
-        for spec in all_estimator_spec:
-          eval_metrics.update(spec.eval_metric_ops or {})
+        # pylint: disable=protected-access
+        for head, training_loss in zip(self._heads, training_losses):
+          base_head.create_estimator_spec_summary(
+              training_loss, summary_key_fn=head._summary_key)
+        # pylint: enable=protected-access
         # predictions can be used to access the logits in `TRAIN` mode
         return model_fn.EstimatorSpec(
             mode=ModeKeys.TRAIN,
             loss=loss,
             train_op=train_op,
-            predictions=predictions,
-            eval_metric_ops=eval_metrics)
+            predictions=predictions)
       raise ValueError('mode={} unrecognized'.format(mode))
 
   def _merge_predict_export_outputs(self, all_estimator_spec):
@@ -18,21 +18,29 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import time
+
 import numpy as np
 import six
 
 from tensorflow.python.eager import context
 from tensorflow.python.framework import constant_op
 from tensorflow.python.framework import dtypes
+from tensorflow.python.framework import ops
 from tensorflow.python.framework import test_util
 from tensorflow.python.keras.optimizer_v2 import optimizer_v2
 from tensorflow.python.keras.utils import losses_utils
+from tensorflow.python.ops import array_ops
+from tensorflow.python.ops import control_flow_ops
 from tensorflow.python.ops import nn
 from tensorflow.python.ops import string_ops
 from tensorflow.python.ops import variables
+from tensorflow.python.platform import benchmark
 from tensorflow.python.platform import test
+from tensorflow.python.training import monitored_session
 from tensorflow_estimator.python.estimator.canned import metric_keys
 from tensorflow_estimator.python.estimator.canned import prediction_keys
+from tensorflow_estimator.python.estimator.head import binary_class_head
 from tensorflow_estimator.python.estimator.head import head_utils as test_lib
 from tensorflow_estimator.python.estimator.head import multi_head as multi_head_lib
 from tensorflow_estimator.python.estimator.head import multi_label_head
@@ -424,6 +432,45 @@ class MultiHeadTest(test.TestCase):
     # head-weighted training_loss = 1 * 12.5 + 2 * 35 = 82.5
     self.assertAllClose(82.5, self.evaluate(training_loss), rtol=tol, atol=tol)
 
+  def test_fused_binary_losses(self):
+    """Tests fused binary losses match the per-head losses."""
+    weights = np.array([[1.], [2.], [.5]], dtype=np.float32)
+    heads = [
+        binary_class_head.BinaryClassHead(name='head1'),
+        binary_class_head.BinaryClassHead(
+            name='head2', weight_column='weights'),
+        binary_class_head.BinaryClassHead(
+            name='head3', label_vocabulary=['neg', 'pos']),
+        binary_class_head.BinaryClassHead(
+            name='head4', loss_reduction=losses_utils.ReductionV2.SUM),
+        regression_head.RegressionHead(name='head5'),
+    ]
+    logits = np.array(
+        [[-1., 2., .5, 3., 1.], [.5, -2., 1., -1., 2.], [2., 1., -.5, 0., 3.]],
+        dtype=np.float32)
+    labels = {
+        'head1': np.array([[0], [1], [1]], dtype=np.int64),
+        'head2': np.array([[1], [0], [0]], dtype=np.int64),
+        'head3': np.array([['neg'], ['pos'], ['pos']]),
+        'head4': np.array([[1], [1], [0]], dtype=np.int64),
+        'head5': np.array([[1.], [2.], [3.]], dtype=np.float32),
+    }
+    features = {'weights': weights}
+    fused_head = multi_head_lib.MultiHead(
+        heads, head_weights=[1., 2., 3., 4., 5.], fuse_binary_heads=True)
+    unfused_head = multi_head_lib.MultiHead(
+        heads, head_weights=[1., 2., 3., 4., 5.])
+    fused_loss = fused_head.loss(
+        logits=logits, labels=labels, features=features, mode=ModeKeys.TRAIN)
+    unfused_loss = unfused_head.loss(
+        logits=logits, labels=labels, features=features, mode=ModeKeys.TRAIN)
+    if context.executing_eagerly():
+      self.assertAllClose(unfused_loss, fused_loss)
+      return
+    with self.cached_session():
+      test_lib._initialize_variables(self, monitored_session.Scaffold())
+      self.assertAllClose(*self.evaluate((unfused_loss, fused_loss)))
+
   def test_train_loss_logits_tensor(self):
     """Tests loss with logits Tensor."""
     weights1 = np.array([[1.], [2.]], dtype=np.float32)
@@ -887,6 +934,84 @@ class MultiHeadForEstimator(test.TestCase):
           logits=logits,
           labels=labels)
 
+  def test_logits_tensor_split_once(self):
+    """Tests the logits Tensor is split by a single op."""
+    heads = [binary_class_head.BinaryClassHead(name='head%d' % i)
+             for i in range(4)]
+    multi_head = multi_head_lib.MultiHead(heads)
+    logits = np.array([[-1., 2., .5, 3.], [.5, -2., 1., -1.]],
+                      dtype=np.float32)
+    labels = {head.name: np.array([[0], [1]], dtype=np.int64)
+              for head in heads}
+    multi_head.create_estimator_spec(
+        features={'x': np.array(((42,),), dtype=np.int32)},
+        mode=ModeKeys.EVAL,
+        logits=logits,
+        labels=labels)
+    op_types = [op.type for op in ops.get_default_graph().get_operations()]
+    self.assertEqual(1, op_types.count('SplitV'))
+
+  def test_eval_metrics_reuse_head_predictions_and_losses(self):
+    """Tests EVAL builds each head's predictions and loss only once."""
+    if context.executing_eagerly():
+      return
+    heads = [binary_class_head.BinaryClassHead(name='head%d' % i)
+             for i in range(4)]
+    logits = np.array([[-1., 2., .5, 3.], [.5, -2., 1., -1.]],
+                      dtype=np.float32)
+    labels = {head.name: np.array([[0], [1]], dtype=np.int64)
+              for head in heads}
+    for fuse_binary_heads, num_losses in [(False, 4), (True, 1)]:
+      with ops.Graph().as_default() as g:
+        multi_head_lib.MultiHead(
+            heads, fuse_binary_heads=fuse_binary_heads).create_estimator_spec(
+                features={'x': np.array(((42,),), dtype=np.int32)},
+                mode=ModeKeys.EVAL,
+                logits=logits,
+                labels=labels)
+        op_types = [op.type for op in g.get_operations()]
+      self.assertEqual(4, op_types.count('Sigmoid'))
+      # Each sigmoid cross entropy has a single Log1p.
+      self.assertEqual(num_losses, op_types.count('Log1p'))
+
+
+class MultiHeadBenchmark(benchmark.Benchmark):
+  """Benchmarks building the graph of a `MultiHead` with many binary heads."""
+
+  def _build_spec(self, mode, num_heads, fuse_binary_heads, num_iters=5):
+    heads = [binary_class_head.BinaryClassHead(name='head%d' % i)
+             for i in range(num_heads)]
+    multi_head = multi_head_lib.MultiHead(
+        heads, fuse_binary_heads=fuse_binary_heads)
+    wall_times = []
+    for _ in range(num_iters):
+      with ops.Graph().as_default() as g:
+        logits = array_ops.placeholder(dtypes.float32, [None, num_heads])
+        labels = {head.name: array_ops.placeholder(dtypes.int64, [None, 1])
+                  for head in heads}
+        start = time.time()
+        multi_head.create_estimator_spec(
+            features={}, mode=mode, logits=logits, labels=labels,
+            train_op_fn=lambda loss: control_flow_ops.no_op())
+        wall_times.append(time.time() - start)
+        num_ops = len(g.get_operations())
+    self.report_benchmark(
+        iters=num_iters,
+        wall_time=np.median(wall_times),
+        extras={'num_ops': num_ops})
+
+  def benchmark_train_100_heads(self):
+    self._build_spec(ModeKeys.TRAIN, 100, fuse_binary_heads=False)
+
+  def benchmark_train_100_heads_fused(self):
+    self._build_spec(ModeKeys.TRAIN, 100, fuse_binary_heads=True)
+
+  def benchmark_eval_100_heads(self):
+    self._build_spec(ModeKeys.EVAL, 100, fuse_binary_heads=False)
+
+  def benchmark_eval_100_heads_fused(self):
+    self._build_spec(ModeKeys.EVAL, 100, fuse_binary_heads=True)
+
 
 if __name__ == '__main__':
   test.main()
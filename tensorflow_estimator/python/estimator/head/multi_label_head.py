@@ -39,6 +39,11 @@ from tensorflow_estimator.python.estimator.export import export_output
 from tensorflow_estimator.python.estimator.head import base_head
 from tensorflow_estimator.python.estimator.mode_keys import ModeKeys
 
+# Predictions returned in TRAIN and EVAL mode with `numeric_predictions_only`.
+_NUMERIC_PREDICTION_KEYS = (
+    prediction_keys.PredictionKeys.LOGITS,
+    prediction_keys.PredictionKeys.PROBABILITIES)
+
 
 @estimator_export('estimator.MultiLabelHead')
 class MultiLabelHead(base_head.Head):
@@ -154,6 +159,10 @@ class MultiLabelHead(base_head.Head):
       `label_vocabulary`.
     name: Name of the head. If provided, summary and metrics keys will be
       suffixed by `"/" + name`. Also used as `name_scope` when creating ops.
+    numeric_predictions_only: Whether the predictions of TRAIN and EVAL specs
+      are only `logits` and `probabilities`. This skips building the
+      `all_class_ids` and `all_classes` tensors. PREDICT specs always hold
+      every prediction.
   """
 
   def __init__(self,
@@ -164,7 +173,8 @@ class MultiLabelHead(base_head.Head):
                loss_reduction=losses_utils.ReductionV2.SUM_OVER_BATCH_SIZE,
                loss_fn=None,
                classes_for_class_based_metrics=None,
-               name=None):
+               name=None,
+               numeric_predictions_only=False):
     if n_classes is None or n_classes < 2:
       raise ValueError(
           'n_classes must be > 1 for multi-label classification. '
@@ -213,6 +223,7 @@ class MultiLabelHead(base_head.Head):
     self._loss_fn = loss_fn
     self._classes_for_class_based_metrics = classes_for_class_based_metrics
     self._name = name
+    self._numeric_predictions_only = numeric_predictions_only
     # Metric keys.
     keys = metric_keys.MetricKeys
     self._loss_mean_key = self._summary_key(keys.LOSS_MEAN)
@@ -352,16 +363,21 @@ class MultiLabelHead(base_head.Head):
         logits=logits)
     return unweighted_loss, weights
 
+  def _loss_terms(self, logits, labels, features):
+    """Returns the processed labels, the unweighted loss and the weights."""
+    logits = base_head.check_logits_final_dim(logits, self.logits_dimension)
+    labels = self._processed_labels(logits, labels)
+    unweighted_loss, weights = self._unweighted_loss_and_weights(
+        logits, labels, features)
+    return labels, unweighted_loss, weights
+
   def loss(self, labels, logits, features=None, mode=None,
            regularization_losses=None):
     """Returns regularized training loss. See `base_head.Head` for details."""
     del mode  # Unused for this head.
     with ops.name_scope('losses', values=(logits, labels, regularization_losses,
                                           features)):
-      logits = base_head.check_logits_final_dim(logits, self.logits_dimension)
-      processed_labels = self._processed_labels(logits, labels)
-      unweighted_loss, weights = self._unweighted_loss_and_weights(
-          logits, processed_labels, features)
+      _, unweighted_loss, weights = self._loss_terms(logits, labels, features)
       training_loss = losses_utils.compute_weighted_loss(
           unweighted_loss,
           sample_weight=weights,
@@ -434,16 +450,33 @@ class MultiLabelHead(base_head.Head):
             curve='PR', name=self._auc_pr_keys[i])
     return eval_metrics
 
+  # The `_update_metrics` arguments computed from the predictions, with their
+  # prediction keys.
+  _METRIC_PREDICTION_KEYS = {
+      'probabilities': prediction_keys.PredictionKeys.PROBABILITIES,
+  }
+
   def update_metrics(self, eval_metrics, features, logits, labels,
                      regularization_losses=None):
     """Updates eval metrics. See `base_head.Head` for details."""
-    logits = base_head.check_logits_final_dim(logits, self.logits_dimension)
-    processed_labels = self._processed_labels(logits, labels)
-    unweighted_loss, weights = self._unweighted_loss_and_weights(
-        logits, processed_labels, features)
-    prob_key = prediction_keys.PredictionKeys.PROBABILITIES
-    predictions = self.predictions(logits, [prob_key])
-    probabilities = predictions[prob_key]
+    predictions = self.predictions(
+        logits, [prediction_keys.PredictionKeys.PROBABILITIES])
+    return self._update_metrics(
+        eval_metrics, features, logits, labels,
+        probabilities=predictions[
+            prediction_keys.PredictionKeys.PROBABILITIES],
+        regularization_losses=regularization_losses)
+
+  def _update_metrics(self, eval_metrics, features, logits, labels,
+                      probabilities, regularization_losses=None,
+                      loss_terms=None):
+    """Updates eval metrics given the already computed probabilities.
+
+    `loss_terms` are the already computed `_loss_terms`, if any.
+    """
+    if loss_terms is None:
+      loss_terms = self._loss_terms(logits, labels, features)
+    processed_labels, unweighted_loss, weights = loss_terms
 
     # Update metrics.
     eval_metrics[self._loss_mean_key].update_state(
@@ -531,7 +564,9 @@ class MultiLabelHead(base_head.Head):
     with ops.name_scope(self._name, 'head'):
       # Predict.
       pred_keys = prediction_keys.PredictionKeys
-      predictions = self.predictions(logits)
+      predictions = base_head.spec_predictions(
+          self, logits, mode,
+          _NUMERIC_PREDICTION_KEYS if self._numeric_predictions_only else None)
       if mode == ModeKeys.PREDICT:
         probabilities = predictions[pred_keys.PROBABILITIES]
         classifier_output = base_head.classification_output(
@@ -558,11 +593,12 @@ class MultiLabelHead(base_head.Head):
             predictions=predictions,
             loss=regularized_training_loss,
             eval_metrics=base_head.create_eval_metrics_tuple(
-                self.update_metrics, {
+                self._update_metrics, {
                     'eval_metrics': eval_metrics,
                     'features': features,
                     'logits': logits,
                     'labels': labels,
+                    'probabilities': predictions[pred_keys.PROBABILITIES],
                     'regularization_losses': regularization_losses
                 }))
       # Train.
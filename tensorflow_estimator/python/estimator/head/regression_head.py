@@ -196,16 +196,21 @@ class RegressionHead(base_head.Head):
         allow_per_logit_weights=True)
     return unweighted_loss, weights
 
+  def _loss_terms(self, logits, labels, features):
+    """Returns the processed labels, the unweighted loss and the weights."""
+    logits = base_head.check_logits_final_dim(logits, self.logits_dimension)
+    labels = self._processed_labels(logits, labels)
+    unweighted_loss, weights = self._unweighted_loss_and_weights(
+        logits, labels, features)
+    return labels, unweighted_loss, weights
+
   def loss(self, labels, logits, features=None, mode=None,
            regularization_losses=None):
     """Return predictions based on keys. See `base_head.Head` for details."""
     del mode  # Unused for this head.
     with ops.name_scope('losses', values=(logits, labels, regularization_losses,
                                           features)):
-      logits = base_head.check_logits_final_dim(logits, self._logits_dimension)
-      labels = self._processed_labels(logits, labels)
-      unweighted_loss, weights = self._unweighted_loss_and_weights(
-          logits, labels, features)
+      _, unweighted_loss, weights = self._loss_terms(logits, labels, features)
       training_loss = losses_utils.compute_weighted_loss(
           unweighted_loss,
           sample_weight=weights,
@@ -217,29 +222,40 @@ class RegressionHead(base_head.Head):
           else training_loss)
     return regularized_training_loss
 
-  def predictions(self, logits):
+  def predictions(self, logits, keys=None):
     """Return predictions based on keys.  See `base_head.Head` for details.
 
     Args:
       logits: logits `Tensor` with shape `[D0, D1, ... DN, logits_dimension]`.
         For many applications, the shape is `[batch_size, logits_dimension]`.
+      keys: a list of prediction keys. Key can be either the class variable
+        of prediction_keys.PredictionKeys or its string value, such as:
+        prediction_keys.PredictionKeys.PREDICTIONS or 'predictions'. `LOGITS`
+        is only a valid key when the head has an `inverse_link_fn`. If not
+        specified, it will return the predictions for all valid keys.
 
     Returns:
       A dict of predictions.
     """
-    logits = base_head.check_logits_final_dim(logits, self._logits_dimension)
     pred_keys = prediction_keys.PredictionKeys
+    valid_keys = [pred_keys.PREDICTIONS]
+    if self._inverse_link_fn:
+      valid_keys.append(pred_keys.LOGITS)
+    if keys:
+      base_head.check_prediction_keys(keys, valid_keys)
+    else:
+      keys = valid_keys
+    logits = base_head.check_logits_final_dim(logits, self._logits_dimension)
+    predictions = {}
     with ops.name_scope('predictions', values=(logits,)):
-      if self._inverse_link_fn:
-        predicted_value = self._inverse_link_fn(logits)
-        predictions = {
-            pred_keys.PREDICTIONS: predicted_value,
-            pred_keys.LOGITS: logits,
-        }
-      else:
-        predicted_value = logits
-        predictions = {
-            pred_keys.PREDICTIONS: predicted_value}
+      if pred_keys.PREDICTIONS in keys:
+        if self._inverse_link_fn:
+          predicted_value = self._inverse_link_fn(logits)
+        else:
+          predicted_value = logits
+        predictions[pred_keys.PREDICTIONS] = predicted_value
+      if pred_keys.LOGITS in keys:
+        predictions[pred_keys.LOGITS] = logits
     return predictions
 
   def metrics(self, regularization_losses=None):
@@ -257,16 +273,34 @@ class RegressionHead(base_head.Head):
             name=keys.LOSS_REGULARIZATION)
     return eval_metrics
 
+  # The `_update_metrics` arguments computed from the predictions, with their
+  # prediction keys.
+  _METRIC_PREDICTION_KEYS = {
+      'predicted_value': prediction_keys.PredictionKeys.PREDICTIONS,
+  }
+
   def update_metrics(self, eval_metrics, features, logits, labels,
                      regularization_losses=None):
     """Updates eval metrics. See `base_head.Head` for details."""
     # Compute predictions.
-    predictions = self.predictions(logits)
-    predicted_value = predictions[prediction_keys.PredictionKeys.PREDICTIONS]
-    logits = base_head.check_logits_final_dim(logits, self.logits_dimension)
-    label_ids = self._processed_labels(logits, labels)
-    unweighted_loss, weights = self._unweighted_loss_and_weights(
-        logits, label_ids, features)
+    predictions = self.predictions(
+        logits, [prediction_keys.PredictionKeys.PREDICTIONS])
+    return self._update_metrics(
+        eval_metrics, features, logits, labels,
+        predicted_value=predictions[
+            prediction_keys.PredictionKeys.PREDICTIONS],
+        regularization_losses=regularization_losses)
+
+  def _update_metrics(self, eval_metrics, features, logits, labels,
+                      predicted_value, regularization_losses=None,
+                      loss_terms=None):
+    """Updates eval metrics given the already computed predicted values.
+
+    `loss_terms` are the already computed `_loss_terms`, if any.
+    """
+    if loss_terms is None:
+      loss_terms = self._loss_terms(logits, labels, features)
+    label_ids, unweighted_loss, weights = loss_terms
 
     # Update metrics.
     eval_metrics[self._loss_mean_key].update_state(
@@ -355,11 +389,13 @@ class RegressionHead(base_head.Head):
             predictions=predictions,
             loss=regularized_training_loss,
             eval_metrics=base_head.create_eval_metrics_tuple(
-                self.update_metrics, {
+                self._update_metrics, {
                     'eval_metrics': eval_metrics,
                     'features': features,
                     'logits': logits,
                     'labels': labels,
+                    'predicted_value': predictions[
+                        prediction_keys.PredictionKeys.PREDICTIONS],
                     'regularization_losses': regularization_losses
                 }))
       # Train.
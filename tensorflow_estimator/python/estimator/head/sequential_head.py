@@ -29,7 +29,6 @@ from tensorflow.python.framework import ops
 from tensorflow.python.framework import sparse_tensor
 from tensorflow.python.ops import array_ops
 from tensorflow.python.ops import check_ops
-from tensorflow.python.ops import math_ops
 from tensorflow.python.ops import sparse_ops
 from tensorflow_estimator.python.estimator.head import base_head
 from tensorflow_estimator.python.estimator.head import multi_head
@@ -88,10 +87,14 @@ class SequentialHeadWrapper(_SequentialHead):
       metrics computation with the `update_metrics` method.
     - Predictions: To add a sequence length mask tensor to the predictions
       dictionary.
+
+  With `packed_logits=True`, the logits only hold the steps that are not
+  padding, e.g. as returned by `RNNModel` with `packed_logits=True`. They are
+  passed as is to the static head, and only labels and features are flattened.
   """
 
   def __init__(self, static_head, sequence_length_mask='sequence_length_mask',
-               feature_columns=None):
+               feature_columns=None, packed_logits=False):
     """Initializes a `SequentialHeadWrapper` instance.
 
     Example of usage:
@@ -140,6 +143,10 @@ class SequentialHeadWrapper(_SequentialHead):
         applied, and which are passed to the static head's methods when calling
         `create_estimator_spec`, `loss` or `update_metrics`. This is typically a
         weight tensor.
+      packed_logits: A boolean indicating whether logits are packed, i.e. have
+        shape [num_steps, D2, ... DN] with one row per step where the sequence
+        mask is `True`, in row-major order of the mask. Packed logits are not
+        flattened, and are unpacked to the padded shape in PREDICT mode.
 
     Raises:
       TypeError: If `sequence_length_mask` is not of string type.
@@ -175,6 +182,7 @@ class SequentialHeadWrapper(_SequentialHead):
       raise ValueError(
           '`MultiHead` is not supported with `SequentialHeadWrapper`.')
     self._static_head = static_head
+    self._packed_logits = packed_logits
 
     super(SequentialHeadWrapper, self).__init__()
 
@@ -184,7 +192,7 @@ class SequentialHeadWrapper(_SequentialHead):
     Provided tensors need to have at least two dimensions. The two first
     dimensions of the provided tensors are flattened to one single dimension.
     If a tensor is dense, the sequence mask in the features dictionary is used
-    to flatten it.
+    to flatten it. Packed logits are returned as is.
 
     Note: If indices of a sparse tensor are not sorted, they will be reordered.
 
@@ -215,11 +223,18 @@ class SequentialHeadWrapper(_SequentialHead):
                        '{} instead.'.format(sequence_mask.get_shape().ndims))
 
     with ops.name_scope('flatten'):
-      expected_length = math_ops.reduce_sum(
-          math_ops.cast(sequence_mask, dtypes.int32))
+      # The indices of the valid steps are computed once, and shared by all the
+      # tensors to flatten.
+      indices = array_ops.where(sequence_mask)
+      expected_length = array_ops.shape(indices, out_type=dtypes.int32)[0]
       # Flatten logits and labels.
-      flat_logits = _flatten_tensor(logits, sequence_mask, expected_length)
-      flat_labels = _flatten_tensor(labels, sequence_mask, expected_length)
+      if self._packed_logits:
+        flat_logits = logits
+      else:
+        flat_logits = _flatten_tensor(
+            logits, sequence_mask, expected_length, indices=indices)
+      flat_labels = _flatten_tensor(
+          labels, sequence_mask, expected_length, indices=indices)
 
       # Flatten features.
       flat_features = {}
@@ -228,7 +243,7 @@ class SequentialHeadWrapper(_SequentialHead):
           raise ValueError('`{}` column expected in features '
                            'dictionary.'.format(column))
         flat_features[column] = _flatten_tensor(
-            features[column], sequence_mask, expected_length)
+            features[column], sequence_mask, expected_length, indices=indices)
 
       return flat_labels, flat_logits, flat_features
 
@@ -241,7 +256,8 @@ class SequentialHeadWrapper(_SequentialHead):
 
     Args:
       logits: Logits `Tensor` of rank >= 2 and shape
-        [batch_size, seq_length, D2, ... DN].
+        [batch_size, seq_length, D2, ... DN], or [num_steps, D2, ... DN] if
+        logits are packed.
       labels: Labels `Tensor` or `SparseTensor` or rank >= 2 and shape
         [batch_size, seq_length, D2, ... DN].
       features: Input `dict` mapping string feature names to `Tensor` or
@@ -273,9 +289,10 @@ class SequentialHeadWrapper(_SequentialHead):
     If in TRAIN or EVAL mode, `logits`, `labels`, and `features` tensors
     corresponding to the head's `feature_columns` are flattened before calling
     the static head's `create_estimator_spec` method.
-    If in PREDICT mode, no flattening is done. The `EstimatatorSpec` is computed
-    using the static head's `create_estimator_spec` method. The sequence length
-    mask tensor is added to the predictions dictionary.
+    If in PREDICT mode, no flattening is done (packed logits are unpacked to
+    the padded shape). The `EstimatatorSpec` is computed using the static head's
+    `create_estimator_spec` method. The sequence length mask tensor is added to
+    the predictions dictionary.
 
     Args:
       features: Input `dict` mapping string feature names to `Tensor` or
@@ -314,6 +331,8 @@ class SequentialHeadWrapper(_SequentialHead):
       `EstimatorSpec`.
     """
     if mode == ModeKeys.PREDICT:
+      if self._packed_logits:
+        logits = _unpack_tensor(logits, features[self.input_sequence_mask_key])
       spec = self._static_head.create_estimator_spec(
           features=features, mode=mode, logits=logits)
       spec.predictions[self.input_sequence_mask_key] = features[
@@ -404,8 +423,33 @@ class SequentialHeadWrapper(_SequentialHead):
     """Returns the wrapped static head."""
     return self._static_head
 
+  @property
+  def packed_logits(self):
+    """Returns whether logits are expected to be packed."""
+    return self._packed_logits
+
+
+def _unpack_tensor(tensor, sequence_mask):
+  """Scatters a packed `tensor` back to the padded shape of `sequence_mask`.
+
+  Args:
+    tensor: A `Tensor` of shape [num_steps, D2, ... DN], with one row per `True`
+      entry of `sequence_mask` in row-major order.
+    sequence_mask: A `Tensor` of shape [batch_size, seq_length].
+
+  Returns:
+    A `Tensor` of shape [batch_size, seq_length, D2, ... DN], zero on padding
+    steps.
+  """
+  with ops.name_scope('unpack'):
+    indices = array_ops.where(sequence_mask)
+    shape = array_ops.concat(
+        [array_ops.shape(sequence_mask, out_type=dtypes.int64),
+         array_ops.shape(tensor, out_type=dtypes.int64)[1:]], axis=0)
+    return array_ops.scatter_nd(indices, tensor, shape)
+
 
-def _flatten_tensor(tensor, sequence_mask, expected_length):
+def _flatten_tensor(tensor, sequence_mask, expected_length, indices=None):
   """Flattens the two first dimensions and reshapes a tensor or sparse tensor.
 
   If `tensor` is a dense tensor, the sequence_mask is used to infer valid
@@ -420,6 +464,9 @@ def _flatten_tensor(tensor, sequence_mask, expected_length):
     sequence_mask: A boolean `Tensor` of shape [batch_size, seq_length].
     expected_length: A integer scalar `Tensor` with the expected length of the
       resulting flattenned Tensor.
+    indices: Optional int64 `Tensor` of shape [expected_length, 2] with the
+      indices of the `True` entries of `sequence_mask`, as returned by
+      `tf.where`. Computed from `sequence_mask` if not given.
 
   Returns:
     A `Tensor` object of shape [expected_length, D0, D1, ..., DN].
@@ -442,7 +489,13 @@ def _flatten_tensor(tensor, sequence_mask, expected_length):
       new_shape = array_ops.concat([[-1], shape[2:]], axis=0)
       flat_tensor = array_ops.reshape(tensor.values, new_shape)
   elif isinstance(tensor, ops.Tensor):
-    flat_tensor = array_ops.boolean_mask_v2(tensor, sequence_mask)
+    if indices is None:
+      indices = array_ops.where(sequence_mask)
+    tensor = _check_sequence_shape(tensor, sequence_mask)
+    flat_tensor = array_ops.gather_nd(tensor, indices)
+    if shape.ndims == 2:
+      flat_tensor = array_ops.expand_dims(flat_tensor, -1)
+    return flat_tensor
   else:
     raise ValueError('`tensor` expected to be a `Tensor` or  `SparseTensor` '
                      'got `{}` instead.'.format(tensor))
@@ -463,3 +516,34 @@ def _flatten_tensor(tensor, sequence_mask, expected_length):
           array_ops.shape(flat_tensor), expected_shape,
           message=err_message)]):
     return array_ops.identity(flat_tensor)
+
+
+def _check_sequence_shape(tensor, sequence_mask):
+  """Checks the two first dimensions of a dense `tensor` match the mask.
+
+  The check is done statically when both shapes are fully defined, and adds a
+  runtime assertion otherwise.
+
+  Args:
+    tensor: A `Tensor` of shape [batch_size, seq_length, D0, D1, ..., DN].
+    sequence_mask: A `Tensor` of shape [batch_size, seq_length].
+
+  Returns:
+    `tensor`, with a control dependency on the check if done at runtime.
+
+  Raises:
+    ValueError: If the static shapes are incompatible.
+  """
+  err_message = 'Tensor shape is incompatible with provided mask.'
+  sequence_mask = ops.convert_to_tensor(sequence_mask)
+  tensor_shape = tensor.get_shape()[:2]
+  mask_shape = sequence_mask.get_shape()
+  if tensor_shape.is_fully_defined() and mask_shape.is_fully_defined():
+    if tensor_shape != mask_shape:
+      raise ValueError(err_message)
+    return tensor
+  with ops.control_dependencies([
+      check_ops.assert_equal(
+          array_ops.shape(tensor)[:2], array_ops.shape(sequence_mask),
+          message=err_message)]):
+    return array_ops.identity(tensor)
@@ -189,6 +189,29 @@ class TestFlatten(test.TestCase, parameterized.TestCase):
         error, 'Tensor shape is incompatible with provided mask.'):
       _ = self._test_flatten_method(features, feature_columns=[])
 
+  def test_flatten_packed_logits(self):
+    """Tests `_flatten` passes packed logits as is."""
+    head = seq_head_lib.SequentialHeadWrapper(
+        static_head=None, sequence_length_mask='sequence_mask',
+        feature_columns='weights', packed_logits=True)
+    features = _convert_to_tensor({
+        'sequence_mask': np.array([[1, 1], [1, 0]]),
+        'weights': np.array([[0.5, 0.5], [1., 0]])})
+    labels = ops.convert_to_tensor(np.array([[1, 2], [3, 0]]))
+    logits = ops.convert_to_tensor(np.array([[10.], [11.], [12.]]))
+    output = self.evaluate(head._flatten(labels, logits, features))
+    self.assertAllClose(
+        ([[1], [2], [3]], [[10.], [11.], [12.]],
+         {'weights': [[0.5], [0.5], [1.]]}), output)
+
+  def test_unpack_tensor(self):
+    """Tests packed tensors are scattered back to the padded shape."""
+    sequence_mask = ops.convert_to_tensor(np.array([[1, 1], [1, 0]]))
+    packed = ops.convert_to_tensor(np.array([[10.], [11.], [12.]]))
+    self.assertAllClose(
+        [[[10.], [11.]], [[12.], [0.]]],
+        self.evaluate(seq_head_lib._unpack_tensor(packed, sequence_mask)))
+
   def test_flatten_tensor_wrong_mask_dim(self):
     """Tests `_flatten` with mask that has wrong dimensions."""
     features = {'sequence_mask': np.array([1, 1])}
@@ -19,6 +19,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import copy
 import os
 import re
 
@@ -29,8 +30,11 @@ from tensorflow.python.framework import random_seed
 from tensorflow.python.framework import sparse_tensor as sparse_tensor_lib
 from tensorflow.python.framework import tensor_util
 from tensorflow.python.keras import backend as K
+from tensorflow.python.keras import metrics as metrics_module
 from tensorflow.python.keras import models
+from tensorflow.python.keras import optimizers
 from tensorflow.python.keras.engine import training_utils
+from tensorflow.python.keras.utils import generic_utils
 from tensorflow.python.ops import math_ops
 from tensorflow.python.platform import gfile
 from tensorflow.python.platform import tf_logging as logging
@@ -184,12 +188,58 @@ def _extract_sample_weight_tensors(features):
   return feature_tensor, sample_weight_tensors
 
 
+class _ModelTemplate(object):
+  """Template to clone a functional or Sequential keras model in new graphs.
+
+  `models.clone_and_build_model` serializes every layer of the model with
+  `get_config()` each time it clones it, i.e. in each call of the model
+  function. Configs can be large, e.g. with constant initializers, so the
+  template serializes the layers once, and is passed as the `clone_function`
+  of `models.clone_model` to build each clone from copies of their configs.
+  """
+
+  def __init__(self, keras_model):
+    self._layer_configs = {
+        id(layer): layer.get_config() for layer in keras_model.layers}
+
+  def __call__(self, layer):
+    config = self._layer_configs.get(id(layer))
+    if config is None:
+      config = layer.get_config()
+    # `from_config` of some layers pops items from the config.
+    return layer.__class__.from_config(copy.deepcopy(config))
+
+
+def _compile_clone(model, clone, target_tensors, optimizer_iterations,
+                   optimizer_config):
+  """Compiles `clone` like `model`, as `models.clone_and_build_model` does."""
+  if isinstance(model.optimizer, optimizers.TFOptimizer):
+    optimizer = optimizers.TFOptimizer(
+        model.optimizer.optimizer, optimizer_iterations)
+    K.track_tf_optimizer(optimizer)
+  else:
+    optimizer = model.optimizer.__class__.from_config(
+        optimizer_config or model.optimizer.get_config())
+    if optimizer_iterations is not None:
+      optimizer.iterations = optimizer_iterations
+  clone.compile(
+      optimizer,
+      model.loss,
+      metrics=metrics_module.clone_metrics(model._compile_metrics),
+      loss_weights=model.loss_weights,
+      sample_weight_mode=model.sample_weight_mode,
+      weighted_metrics=metrics_module.clone_metrics(
+          model._compile_weighted_metrics),
+      target_tensors=target_tensors)
+
+
 def _clone_and_build_model(mode,
                            keras_model,
                            custom_objects,
                            features=None,
                            labels=None,
-                           optimizer_config=None):
+                           optimizer_config=None,
+                           model_template=None):
   """Clone and build the given keras_model.
 
   Args:
@@ -203,6 +253,8 @@ def _clone_and_build_model(mode,
       an optimizer. Since `_clone_and_build_model` is called in a different
       graph and session from the model, `optimizer.get_config()` may raise an
       error during the attempt to serialize the optimizer hyperparameter values.
+    model_template: Optional `_ModelTemplate` of keras_model, to clone it
+      without serializing its layers again.
 
   Returns:
     The newly built model.
@@ -221,12 +273,22 @@ def _clone_and_build_model(mode,
     global_step = training_util.get_or_create_global_step()
     K.track_variable(global_step)
 
-  clone = models.clone_and_build_model(
-      keras_model, input_tensors, target_tensors, custom_objects,
-      compile_clone=compile_clone,
-      in_place_reset=(not keras_model._is_graph_network),
-      optimizer_iterations=global_step,
-      optimizer_config=optimizer_config)
+  if model_template is not None and input_tensors is not None:
+    with generic_utils.CustomObjectScope(custom_objects or {}):
+      clone = models.clone_model(
+          keras_model, input_tensors=input_tensors,
+          clone_function=model_template)
+    if compile_clone:
+      _compile_clone(keras_model, clone, target_tensors,
+                     optimizer_iterations=global_step,
+                     optimizer_config=optimizer_config)
+  else:
+    clone = models.clone_and_build_model(
+        keras_model, input_tensors, target_tensors, custom_objects,
+        compile_clone=compile_clone,
+        in_place_reset=(not keras_model._is_graph_network),
+        optimizer_iterations=global_step,
+        optimizer_config=optimizer_config)
 
   if sample_weight_tensors is not None:
     sample_weight_tensors = training_utils.standardize_sample_weights(
@@ -279,6 +341,15 @@ def _create_keras_model_fn(keras_model, custom_objects=None,
     # TFOptimizers and other custom optimizers do not have a config.
     optimizer_config = None
 
+  # Serialize the layers once, rather than in each call of model_fn. Subclassed
+  # models are reset in place instead of cloned, and models with several
+  # optimizers are compiled differently, so they are cloned by Keras.
+  model_template = None
+  if ((keras_model._is_graph_network or
+       isinstance(keras_model, models.Sequential)) and
+      not isinstance(keras_model.optimizer, (tuple, list))):
+    model_template = _ModelTemplate(keras_model)
+
   def model_fn(features, labels, mode):
     """model_fn for keras Estimator."""
     model = _clone_and_build_model(
@@ -287,7 +358,8 @@ def _create_keras_model_fn(keras_model, custom_objects=None,
         custom_objects=custom_objects,
         features=features,
         labels=labels,
-        optimizer_config=optimizer_config)
+        optimizer_config=optimizer_config,
+        model_template=model_template)
     model_output_names = []
     # We need to make sure that the output names of the last layer in the model
     # is the same for each of the cloned models. This is required for mirrored
@@ -379,23 +451,16 @@ def _save_first_checkpoint(keras_model, custom_objects, config,
     with ops.Graph().as_default():
       random_seed.set_random_seed(config.tf_random_seed)
       training_util.create_global_step()
-      model = _clone_and_build_model(ModeKeys.TRAIN, keras_model,
+      # Only the weights of the model are warm-started from this checkpoint, so
+      # the clone is neither compiled nor given a training function, whose
+      # optimizer variables would only be initialized to be saved.
+      model = _clone_and_build_model(ModeKeys.PREDICT, keras_model,
                                      custom_objects)
 
-      # Init the train_function outside of the context of session. This is due
-      # to the fact that train function will update the graph by adding backprop
-      # parts. This will potentially trying to update the node in forward graph
-      # which will fail if it is done within same session.
-      # Always create the train_function here since the model is just cloned.
-      # See https://github.com/tensorflow/tensorflow/issues/27750 for details.
-      model._make_train_function()  # pylint: disable=protected-access
-
       # save to checkpoint
       with session.Session(config=config.session_config) as sess:
         if keras_weights:
           model.set_weights(keras_weights)
-        # model._make_train_function() will potentially create the optimizer
-        # variable, which will require another variable initialization.
         K._initialize_variables(sess)   # pylint: disable=protected-access
 
         if save_object_ckpt:
@@ -483,6 +483,53 @@ class TestKerasEstimator(test_util.TensorFlowTestCase, parameterized.TestCase):
           msg='%s mismatch, keras model: %s, estimator: %s' %
           (metric_name, keras_eval[i], est_eval[metric_name]))
 
+  def test_model_fn_serializes_layers_once(self):
+    keras_model, _, _, train_input_fn, eval_input_fn = (
+        get_resource_for_simple_model(model_type='functional',
+                                      is_evaluate=True))
+    keras_model.compile(
+        loss='categorical_crossentropy',
+        optimizer='rmsprop',
+        metrics=['accuracy'])
+    get_config = keras.layers.Dense.get_config
+    with test.mock.patch.object(
+        keras.layers.Dense, 'get_config', autospec=True,
+        side_effect=get_config) as mock_get_config:
+      keras_est = keras_lib.model_to_estimator(
+          keras_model=keras_model, config=self._config)
+      num_calls = mock_get_config.call_count
+      keras_est.train(input_fn=train_input_fn, steps=1)
+      keras_est.evaluate(input_fn=eval_input_fn, steps=1)
+    # The layers were serialized when creating the estimator only.
+    self.assertEqual(num_calls, mock_get_config.call_count)
+
+  def test_first_checkpoint_only_has_model_weights(self):
+    keras_model, _, _, _, _ = get_resource_for_simple_model(
+        model_type='functional')
+    keras_model.compile(
+        loss='categorical_crossentropy',
+        optimizer='rmsprop',
+        metrics=['accuracy'])
+    keras_model.train_on_batch(
+        np.random.random((10,) + _INPUT_SIZE),
+        np.random.random((10, _NUM_CLASS)))
+    weights = keras_model.get_weights()
+    keras_lib.model_to_estimator(
+        keras_model=keras_model, config=self._config, checkpoint_format='saver')
+
+    reader = training.load_checkpoint(
+        os.path.join(self._config.model_dir, 'keras'))
+    kernels = [
+        reader.get_tensor(name) for name in reader.get_variable_to_shape_map()
+        if name.endswith('kernel')]
+    self.assertEqual(2, len(kernels))
+    first_kernel, = [
+        kernel for kernel in kernels if kernel.shape == weights[0].shape]
+    self.assertAllClose(weights[0], first_kernel)
+    self.assertFalse([
+        name for name in reader.get_variable_to_shape_map()
+        if 'RMSprop' in name or name.endswith('/rms')])
+
   def test_predict(self):
     # Check that predict on a pretrained model yield the same result.
     keras_model, (x_train, y_train), (
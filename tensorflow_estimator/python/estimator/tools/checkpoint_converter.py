@@ -46,6 +46,13 @@ old checkpoint files in the new directory:
   /tmp/my_converted_checkpoint/model.ckpt-100.data-00000-of-00001
   /tmp/my_converted_checkpoint/model.ckpt-100.index
   /tmp/my_converted_checkpoint/model.ckpt-100.meta
+
+By default, the converted variables are all loaded in a graph and saved from a
+session, so the whole checkpoint is in memory about twice. For multi-GB
+checkpoints, pass `--streaming` to copy the tensors into the new checkpoint one
+at a time, without a graph or session. Shards of tensors are written in
+parallel, and merged into the data files of the new checkpoint. No .meta file
+is written in this mode.
 """
 
 from __future__ import absolute_import
@@ -53,22 +60,31 @@ from __future__ import division
 from __future__ import print_function
 
 import argparse
+import collections
+import functools
+from multiprocessing import pool
+import os
 import sys
+import threading
+import uuid
 
 from google.protobuf import text_format
+import numpy as np
 from tensorflow.core.framework import graph_pb2
 from tensorflow.python.client import session
+from tensorflow.python.eager import context
 from tensorflow.python.framework import ops
 from tensorflow.python.keras.optimizer_v2 import adagrad
 from tensorflow.python.keras.optimizer_v2 import adam
 from tensorflow.python.keras.optimizer_v2 import ftrl
 from tensorflow.python.keras.optimizer_v2 import gradient_descent
 from tensorflow.python.keras.optimizer_v2 import rmsprop
-from tensorflow.python.ops import math_ops
+from tensorflow.python.ops import gen_io_ops
 from tensorflow.python.ops import variables
 from tensorflow.python.platform import app
 from tensorflow.python.platform import gfile
 from tensorflow.python.platform import tf_logging as logging
+from tensorflow.python.training import checkpoint_management
 from tensorflow.python.training import saver as saver_lib
 from tensorflow.python.training import training
 
@@ -130,21 +146,51 @@ OPT_V2_INSTANCE = {
     'SGD': gradient_descent.SGD(),
 }
 
+# Maximum size of the tensors of a shard written by the streaming converter,
+# unless a single tensor is larger.
+_STREAMING_SHARD_BYTES = 64 << 20
+
+# A tensor of the source checkpoint, read when the new checkpoint is written,
+# and the function converting its value, if any.
+_SourceTensor = collections.namedtuple('_SourceTensor', ['name', 'convert'])
+
 
 def _add_new_variable(initial_value, var_name_v2, var_name_v1, var_map,
                       var_names_map):
-  """Creates a new variable and add it to the variable maps."""
-  var = variables.Variable(initial_value, name=var_name_v2)
-  var_map[var_name_v2] = var
+  """Adds a new variable to the variable maps.
+
+  Args:
+    initial_value: The value of the variable, or a `_SourceTensor`.
+    var_name_v2: Name of the variable in the new checkpoint.
+    var_name_v1: Name of the variable it is converted from.
+    var_map: Dict of the values of the new variables, by name.
+    var_names_map: Dict of the names of the converted variables, by new name.
+  """
+  var_map[var_name_v2] = initial_value
   var_names_map[var_name_v2] = var_name_v1
 
 
-def _add_opt_variable(opt_name_v2, var_name_v1, idx, suffix_v2, reader, var_map,
+def _add_opt_variable(opt_name_v2, var_name_v1, idx, suffix_v2, var_map,
                       var_names_map):
   """Adds a new optimizer v2 variable."""
   var_name_v2 = 'training/' + opt_name_v2 + '/' + var_name_v1[:idx] + suffix_v2
-  tensor = reader.get_tensor(var_name_v1)
-  _add_new_variable(tensor, var_name_v2, var_name_v1, var_map, var_names_map)
+  _add_new_variable(_SourceTensor(var_name_v1, None), var_name_v2, var_name_v1,
+                    var_map, var_names_map)
+
+
+def _beta_from_power(beta_power, global_step):
+  """Returns the beta of Adam, given its power at `global_step`."""
+  return np.power(beta_power, 1.0 / global_step).astype(beta_power.dtype)
+
+
+def _read_value(reader, value):
+  """Returns the value of a new variable, reading it from `reader` if needed."""
+  if not isinstance(value, _SourceTensor):
+    return value
+  tensor = reader.get_tensor(value.name)
+  if value.convert:
+    tensor = value.convert(tensor)
+  return tensor
 
 
 def _convert_variables_in_ckpt(opt_name_v1, reader, variable_names, var_map,
@@ -169,13 +215,14 @@ def _convert_variables_in_ckpt(opt_name_v1, reader, variable_names, var_map,
       for hp_name in hp_ckpt:
         if hp_name in var_name:
           var_name_v2 = hp_ckpt[hp_name]
-          tensor = reader.get_tensor(var_name)
           # For Adam optimizer, in the old checkpoint, the optimizer variables
           # are beta1_power and beta2_power. The corresponding variables in the
           # new checkpoint are beta_1 and beta_2, and
           # beta_1 = pow(beta1_power, 1/global_step)
           # beta_2 = pow(beta2_power, 1/global_step)
-          tensor = math_ops.pow(tensor, 1.0 / global_step)
+          tensor = _SourceTensor(
+              var_name,
+              functools.partial(_beta_from_power, global_step=global_step))
           _add_new_variable(tensor, var_name_v2, var_name, var_map,
                             var_names_map)
           break
@@ -190,24 +237,24 @@ def _convert_variables_in_ckpt(opt_name_v1, reader, variable_names, var_map,
           # The optimizer variable of DNN model in TF 1.x has 't_0' in its
           # name (b/131719899). This is amended in TF 2.0.
           idx = var_name.rfind('t_0')
-          _add_opt_variable(opt_name_v2, var_name, idx, suffix_v2, reader,
-                            var_map, var_names_map)
+          _add_opt_variable(opt_name_v2, var_name, idx, suffix_v2, var_map,
+                            var_names_map)
         # for Linear model.
         elif est_type == 'linear':
           # The optimizer variable of Linear model in TF 1.x has 'part_0' in its
           # name (b/131719899). This is amended in TF 2.0.
           idx = var_name.rfind('part_0')
-          _add_opt_variable(opt_name_v2, var_name, idx, suffix_v2, reader,
-                            var_map, var_names_map)
+          _add_opt_variable(opt_name_v2, var_name, idx, suffix_v2, var_map,
+                            var_names_map)
         # for DNNLinearCombined model.
         else:
           idx = var_name.rfind(suffix_v1)
-          _add_opt_variable(opt_name_v2, var_name, idx, suffix_v2, reader,
-                            var_map, var_names_map)
+          _add_opt_variable(opt_name_v2, var_name, idx, suffix_v2, var_map,
+                            var_names_map)
     # If it's a model variable which is already backward compatible.
     else:
-      tensor = reader.get_tensor(var_name)
-      _add_new_variable(tensor, var_name, var_name, var_map, var_names_map)
+      _add_new_variable(_SourceTensor(var_name, None), var_name, var_name,
+                        var_map, var_names_map)
 
 
 def _convert_hyper_params_in_graph(graph_from_path, opt_name_v1, var_map,
@@ -256,8 +303,125 @@ def _convert_hyper_params_in_graph(graph_from_path, opt_name_v1, var_map,
                       var_names_map)
 
 
-def convert_checkpoint(estimator_type, source_checkpoint, source_graph,
-                       target_checkpoint):
+def _write_checkpoint(reader, var_map, target_checkpoint):
+  """Writes the new variables from a session, with a .meta file."""
+  with ops.Graph().as_default():
+    var_list = {
+        name: variables.Variable(_read_value(reader, value), name=name)
+        for name, value in var_map.items()
+    }
+    saver = saver_lib.Saver(var_list=var_list)
+    with session.Session() as sess:
+      sess.run(variables.global_variables_initializer())
+      logging.info('Writing checkpoint_to_path %s' % target_checkpoint)
+      saver.save(sess, target_checkpoint)
+
+
+def _shard_variables(reader, var_map, max_shard_bytes):
+  """Groups the names of the new variables in shards of bounded size.
+
+  Args:
+    reader: A `CheckpointReader` of the source checkpoint.
+    var_map: Dict of the values of the new variables, by name.
+    max_shard_bytes: The maximum size of the tensors of a shard, unless a
+      single tensor is larger.
+
+  Returns:
+    A list of lists of names of new variables.
+  """
+  shape_map = reader.get_variable_to_shape_map()
+  dtype_map = reader.get_variable_to_dtype_map()
+  shards = []
+  shard = []
+  shard_bytes = 0
+  for name in sorted(var_map):
+    value = var_map[name]
+    num_bytes = 0
+    # Values which are not read from the source checkpoint are scalars.
+    if isinstance(value, _SourceTensor):
+      num_bytes = (int(np.prod(shape_map[value.name])) *
+                   dtype_map[value.name].size)
+    if shard and shard_bytes + num_bytes > max_shard_bytes:
+      shards.append(shard)
+      shard = []
+      shard_bytes = 0
+    shard.append(name)
+    shard_bytes += num_bytes
+  if shard:
+    shards.append(shard)
+  return shards
+
+
+def _write_checkpoint_streaming(source_checkpoint,
+                                var_map,
+                                target_checkpoint,
+                                num_threads,
+                                max_shard_bytes=_STREAMING_SHARD_BYTES):
+  """Copies the new variables to the target checkpoint, without a session.
+
+  The variables are grouped in shards, written concurrently by `num_threads`
+  threads to temporary checkpoints, which are then merged into
+  `target_checkpoint`. Each thread reads the tensors of a shard one at a time,
+  so at most about `num_threads` shards are in memory at once. Unlike
+  `_write_checkpoint`, no .meta file is written.
+
+  Args:
+    source_checkpoint: Path to the source checkpoint.
+    var_map: Dict of the values of the new variables, by name.
+    target_checkpoint: Path to the target checkpoint to be written out.
+    num_threads: The number of shards written concurrently.
+    max_shard_bytes: The maximum size of the tensors of a shard, unless a
+      single tensor is larger.
+  """
+  shards = _shard_variables(
+      training.NewCheckpointReader(source_checkpoint), var_map,
+      max_shard_bytes)
+  temp_dir = '%s_temp_%s' % (target_checkpoint, uuid.uuid4().hex)
+  gfile.MakeDirs(temp_dir)
+  prefixes = [
+      os.path.join(temp_dir, 'part-%05d-of-%05d' % (i, len(shards)))
+      for i in range(len(shards))
+  ]
+  local = threading.local()
+
+  def write_shard(i):
+    """Reads the tensors of the i-th shard and writes them to its prefix."""
+    # Checkpoint readers are not shared between threads.
+    if not hasattr(local, 'reader'):
+      local.reader = training.NewCheckpointReader(source_checkpoint)
+    names = shards[i]
+    # The eager context is thread-local.
+    with context.eager_mode():
+      tensors = [
+          ops.convert_to_tensor(_read_value(local.reader, var_map[name]))
+          for name in names
+      ]
+      gen_io_ops.save_v2(prefixes[i], names, [''] * len(names), tensors)
+    logging.info('Wrote %d variables to %s.', len(names), prefixes[i])
+
+  logging.info('Writing %d shards of %d variables with %d threads.',
+               len(shards), len(var_map), num_threads)
+  thread_pool = pool.ThreadPool(max(min(num_threads, len(shards)), 1))
+  try:
+    thread_pool.map(write_shard, range(len(shards)))
+  finally:
+    thread_pool.close()
+    thread_pool.join()
+
+  logging.info('Writing checkpoint_to_path %s' % target_checkpoint)
+  with context.eager_mode():
+    gen_io_ops.merge_v2_checkpoints(
+        prefixes, target_checkpoint, delete_old_dirs=True)
+  checkpoint_management.update_checkpoint_state(
+      os.path.dirname(target_checkpoint), target_checkpoint)
+
+
+def convert_checkpoint(estimator_type,
+                       source_checkpoint,
+                       source_graph,
+                       target_checkpoint,
+                       streaming=False,
+                       num_threads=8):
   """Converts checkpoint from TF 1.x to TF 2.0 for CannedEstimator.
 
   Args:
@@ -266,79 +430,84 @@ def convert_checkpoint(estimator_type, source_checkpoint, source_graph,
     source_checkpoint: Path to the source checkpoint file to be read in.
     source_graph: Path to the source graph file to be read in.
     target_checkpoint: Path to the target checkpoint to be written out.
+    streaming: Whether to copy the tensors to the target checkpoint without a
+      graph or session, so that only a few tensors are in memory at once. No
+      .meta file is written in this case.
+    num_threads: The number of shards of tensors written concurrently, if
+      `streaming`.
   """
-  with ops.Graph().as_default():
-    # Get v1 optimizer names and it's corresponding variable name
-    reader = training.NewCheckpointReader(source_checkpoint)
-    variable_names = sorted(reader.get_variable_to_shape_map())
-    opt_names_v1 = {}
-    for var_name in variable_names:
-      for opt_name in OPT_NAME_V1_TO_V2:
-        if opt_name in var_name:
-          opt_names_v1[opt_name] = var_name
-
-    # SGD doesn't appear in optimizer variables, so we need to add it manually
-    # if no optimizer is found in checkpoint for DNN or Linear model.
-    if not opt_names_v1:
-      if estimator_type == 'dnn' or estimator_type == 'linear':
-        opt_names_v1['SGD'] = ''
-      # As the case is not handled in the converter if dnn_optimizer and
-      # linear_optimizer in DNNLinearCombined model are the same, an error is
-      # is raised if two SGD optimizers are used in DNNLinearCombined model.
-      elif estimator_type == 'combined':
-        raise ValueError('Two `SGD` optimizers are used in DNNLinearCombined '
-                         'model, and this is not handled by the checkpoint '
-                         'converter.')
-
-    # A dict mapping from v2 variable name to the v2 variable.
-    var_map = {}
-    # A dict mapping from v2 variable name to v1 variable name.
-    var_names_map = {}
-
-    # Determine the names of dnn_optimizer and linear_optimizer in
-    # DNNLinearCombined model.
-    if estimator_type == 'combined':
-      linear_opt_v1 = None
-      if len(opt_names_v1) == 1:  # When one of the optimizer is 'SGD'.
-        key = list(opt_names_v1.keys())[0]
-        # Case 1: linear_optimizer is non-SGD, and dnn_optimizer is SGD.
+  # Get v1 optimizer names and it's corresponding variable name
+  reader = training.NewCheckpointReader(source_checkpoint)
+  variable_names = sorted(reader.get_variable_to_shape_map())
+  opt_names_v1 = {}
+  for var_name in variable_names:
+    for opt_name in OPT_NAME_V1_TO_V2:
+      if opt_name in var_name:
+        opt_names_v1[opt_name] = var_name
+
+  # SGD doesn't appear in optimizer variables, so we need to add it manually
+  # if no optimizer is found in checkpoint for DNN or Linear model.
+  if not opt_names_v1:
+    if estimator_type == 'dnn' or estimator_type == 'linear':
+      opt_names_v1['SGD'] = ''
+    # As the case is not handled in the converter if dnn_optimizer and
+    # linear_optimizer in DNNLinearCombined model are the same, an error is
+    # is raised if two SGD optimizers are used in DNNLinearCombined model.
+    elif estimator_type == 'combined':
+      raise ValueError('Two `SGD` optimizers are used in DNNLinearCombined '
+                       'model, and this is not handled by the checkpoint '
+                       'converter.')
+
+  # A dict mapping from v2 variable name to its value, or the tensor of the
+  # v1 checkpoint it is read from.
+  var_map = {}
+  # A dict mapping from v2 variable name to v1 variable name.
+  var_names_map = {}
+
+  # Determine the names of dnn_optimizer and linear_optimizer in
+  # DNNLinearCombined model.
+  if estimator_type == 'combined':
+    linear_opt_v1 = None
+    if len(opt_names_v1) == 1:  # When one of the optimizer is 'SGD'.
+      key = list(opt_names_v1.keys())[0]
+      # Case 1: linear_optimizer is non-SGD, and dnn_optimizer is SGD.
+      if opt_names_v1[key].startswith('linear/linear_model/'):
+        linear_opt_v1 = key
+      # Case 2: linear_optimizer is SGD, and dnn_optimizer is non-SGD.
+      if not linear_opt_v1:
+        linear_opt_v1 = 'SGD'
+      opt_names_v1['SGD'] = ''
+    else:  # two non-SGD optimizers
+      for key in opt_names_v1:
         if opt_names_v1[key].startswith('linear/linear_model/'):
           linear_opt_v1 = key
-        # Case 2: linear_optimizer is SGD, and dnn_optimizer is non-SGD.
-        if not linear_opt_v1:
-          linear_opt_v1 = 'SGD'
-        opt_names_v1['SGD'] = ''
-      else:  # two non-SGD optimizers
-        for key in opt_names_v1:
-          if opt_names_v1[key].startswith('linear/linear_model/'):
-            linear_opt_v1 = key
-      # Add the 'iter' hyper parameter to the new checkpoint for
-      # linear_optimizer. Note dnn_optimizer uses global_step.
-      tensor = reader.get_tensor('global_step')
-      var_name_v2 = 'training/' + OPT_NAME_V1_TO_V2[linear_opt_v1] + '/iter'
-      var_name_v1 = 'global_step'
-      _add_new_variable(tensor, var_name_v2, var_name_v1, var_map,
-                        var_names_map)
-
-    for opt_name_v1 in opt_names_v1:
-      # Convert all existing variables from checkpoint.
-      _convert_variables_in_ckpt(opt_name_v1, reader, variable_names, var_map,
-                                 var_names_map, estimator_type)
-      # Convert hyper parameters for optimizer v2 from the graph.
-      _convert_hyper_params_in_graph(source_graph, opt_name_v1, var_map,
-                                     var_names_map)
-
-    # Log the variable mapping from opt v1 to v2.
-    logging.info('<----- Variable names converted (v1 --> v2): ----->')
-    for name_v2 in var_names_map:
-      logging.info('%s --> %s' % (var_names_map[name_v2], name_v2))
-
-    # Save to checkpoint v2.
-    saver = saver_lib.Saver(var_list=var_map)
-    with session.Session() as sess:
-      sess.run(variables.global_variables_initializer())
-      logging.info('Writing checkpoint_to_path %s' % target_checkpoint)
-      saver.save(sess, target_checkpoint)
+    # Add the 'iter' hyper parameter to the new checkpoint for
+    # linear_optimizer. Note dnn_optimizer uses global_step.
+    tensor = reader.get_tensor('global_step')
+    var_name_v2 = 'training/' + OPT_NAME_V1_TO_V2[linear_opt_v1] + '/iter'
+    var_name_v1 = 'global_step'
+    _add_new_variable(tensor, var_name_v2, var_name_v1, var_map,
+                      var_names_map)
+
+  for opt_name_v1 in opt_names_v1:
+    # Convert all existing variables from checkpoint.
+    _convert_variables_in_ckpt(opt_name_v1, reader, variable_names, var_map,
+                               var_names_map, estimator_type)
+    # Convert hyper parameters for optimizer v2 from the graph.
+    _convert_hyper_params_in_graph(source_graph, opt_name_v1, var_map,
+                                   var_names_map)
+
+  # Log the variable mapping from opt v1 to v2.
+  logging.info('<----- Variable names converted (v1 --> v2): ----->')
+  for name_v2 in var_names_map:
+    logging.info('%s --> %s' % (var_names_map[name_v2], name_v2))
+
+  # Save to checkpoint v2.
+  if streaming:
+    _write_checkpoint_streaming(source_checkpoint, var_map, target_checkpoint,
+                                num_threads)
+  else:
+    _write_checkpoint(reader, var_map, target_checkpoint)
 
 
 def main(_):
@@ -347,6 +516,8 @@ def main(_):
       FLAGS.source_checkpoint,
       FLAGS.source_graph,
       FLAGS.target_checkpoint,
+      streaming=FLAGS.streaming,
+      num_threads=FLAGS.num_threads,
   )
 
 
@@ -369,5 +540,16 @@ if __name__ == '__main__':
       'target_checkpoint',
       type=str,
       help='Path to checkpoint file to be written out.')
+  parser.add_argument(
+      '--streaming',
+      action='store_true',
+      help='Copy the tensors to the target checkpoint one at a time, without a '
+           'graph or session. No .meta file is written.')
+  parser.add_argument(
+      '--num_threads',
+      type=int,
+      default=8,
+      help='Number of shards of tensors written concurrently with '
+           '--streaming.')
   FLAGS, unparsed = parser.parse_known_args()
   app.run(main=main, argv=[sys.argv[0]] + unparsed)
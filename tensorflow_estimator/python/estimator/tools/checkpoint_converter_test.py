@@ -28,6 +28,7 @@ from tensorflow.python.feature_column import feature_column_v2
 from tensorflow.python.framework import ops
 from tensorflow.python.platform import test
 from tensorflow.python.summary.writer import writer_cache
+from tensorflow.python.training import training
 from tensorflow_estimator.python.estimator.canned import dnn
 from tensorflow_estimator.python.estimator.canned import dnn_linear_combined
 from tensorflow_estimator.python.estimator.canned import head as head_lib
@@ -53,7 +54,7 @@ class DNNCheckpointConverterTest(test.TestCase):
 
   def _test_ckpt_converter(self, train_input_fn, eval_input_fn,
                            predict_input_fn, input_dimension, label_dimension,
-                           batch_size, optimizer):
+                           batch_size, optimizer, streaming=False):
 
     # Create checkpoint in CannedEstimator v1.
     feature_columns_v1 = [
@@ -76,8 +77,25 @@ class DNNCheckpointConverterTest(test.TestCase):
     source_checkpoint = os.path.join(self._old_ckpt_dir, 'model.ckpt-10')
     source_graph = os.path.join(self._old_ckpt_dir, 'graph.pbtxt')
     target_checkpoint = os.path.join(self._new_ckpt_dir, 'model.ckpt-10')
-    checkpoint_converter.convert_checkpoint('dnn', source_checkpoint,
-                                            source_graph, target_checkpoint)
+    checkpoint_converter.convert_checkpoint(
+        'dnn', source_checkpoint, source_graph, target_checkpoint,
+        streaming=streaming, num_threads=2)
+    if streaming:
+      # The streaming converter writes the same tensors as the converter
+      # running a session.
+      session_checkpoint = os.path.join(self._old_ckpt_dir, 'session_ckpt',
+                                        'model.ckpt-10')
+      checkpoint_converter.convert_checkpoint('dnn', source_checkpoint,
+                                              source_graph, session_checkpoint)
+      reader = training.NewCheckpointReader(target_checkpoint)
+      session_reader = training.NewCheckpointReader(session_checkpoint)
+      self.assertEqual(session_reader.get_variable_to_shape_map(),
+                       reader.get_variable_to_shape_map())
+      self.assertEqual(session_reader.get_variable_to_dtype_map(),
+                       reader.get_variable_to_dtype_map())
+      for name in reader.get_variable_to_shape_map():
+        self.assertAllClose(
+            session_reader.get_tensor(name), reader.get_tensor(name))
 
     # Create CannedEstimator V2 and restore from the converted checkpoint.
     feature_columns_v2 = [
@@ -117,7 +135,7 @@ class DNNCheckpointConverterTest(test.TestCase):
 
     return train_input_fn, eval_input_fn, predict_input_fn
 
-  def _test_ckpt_converter_with_an_optimizer(self, opt):
+  def _test_ckpt_converter_with_an_optimizer(self, opt, streaming=False):
     """Tests checkpoint converter with an optimizer."""
     label_dimension = 2
     batch_size = 10
@@ -131,7 +149,8 @@ class DNNCheckpointConverterTest(test.TestCase):
         input_dimension=label_dimension,
         label_dimension=label_dimension,
         batch_size=batch_size,
-        optimizer=opt)
+        optimizer=opt,
+        streaming=streaming)
 
   def test_ckpt_converter_with_adagrad(self):
     """Tests checkpoint converter with Adagrad."""
@@ -153,6 +172,10 @@ class DNNCheckpointConverterTest(test.TestCase):
     """Tests checkpoint converter with SGD."""
     self._test_ckpt_converter_with_an_optimizer('SGD')
 
+  def test_streaming_ckpt_converter_with_adam(self):
+    """Tests the streaming checkpoint converter with Adam."""
+    self._test_ckpt_converter_with_an_optimizer('Adam', streaming=True)
+
 
 class LinearCheckpointConverterTest(test.TestCase):
 
@@ -0,0 +1,333 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Warm-starting of Estimator variables, remapping vocabularies in chunks.
+
+`warm_starting_util.warm_start` loads each variable with a `VocabInfo` from the
+checkpoint and remaps it in full, which needs several times the memory of the
+largest partition. `warm_start` applies the same `WarmStartSettings`, but
+loads and remaps these variables in chunks of rows of at most
+`WarmStartSettings.max_chunk_bytes`, and assigns each chunk to its rows of the
+variable. The chunks of a variable are chained with control dependencies, and
+at most `WarmStartSettings.max_concurrent_variables` variables are loaded at
+once: besides the variables themselves and their vocabulary remappings,
+warm-starting needs a few times `max_chunk_bytes` of memory per concurrently
+loaded variable.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+import six
+
+from tensorflow.python.framework import dtypes
+from tensorflow.python.framework import ops
+from tensorflow.python.ops import array_ops
+from tensorflow.python.ops import gen_checkpoint_ops
+from tensorflow.python.ops import init_ops
+from tensorflow.python.ops import math_ops
+from tensorflow.python.ops import state_ops
+from tensorflow.python.ops import variables as variables_lib
+from tensorflow.python.platform import tf_logging as logging
+from tensorflow.python.training import checkpoint_utils
+from tensorflow.python.training import session_run_hook
+from tensorflow.python.training import warm_starting_util
+
+# Default maximum size of the rows of a variable loaded from the checkpoint at
+# once. The load and remap op only supports float32 variables.
+_DEFAULT_MAX_CHUNK_BYTES = 64 << 20
+
+# Default maximum number of variables with a vocabulary warm-started at once.
+_DEFAULT_MAX_CONCURRENT_VARIABLES = 4
+
+
+def _max_rows_in_memory(num_columns, max_chunk_bytes):
+  """Returns the number of rows of `num_columns` floats in a chunk."""
+  row_bytes = max(num_columns, 1) * dtypes.float32.size
+  return max(max_chunk_bytes // row_bytes, 1)
+
+
+def _control_inputs(op):
+  """Returns the control inputs to run after `op`, which may be `None`."""
+  return [op] if op is not None else []
+
+
+def _variable_list(var):
+  """Returns the partitions of a variable, see `_warm_start_var_with_vocab`."""
+  # pylint: disable=protected-access
+  if checkpoint_utils._is_variable(var):
+    return [var]
+  if (isinstance(var, list) and
+      all(checkpoint_utils._is_variable(v) for v in var)):
+    return var
+  if isinstance(var, variables_lib.PartitionedVariable):
+    return var._get_variable_list()
+  # pylint: enable=protected-access
+  raise TypeError(
+      'var MUST be one of the following: a Variable, list of Variable or '
+      'PartitionedVariable, but is {}'.format(type(var)))
+
+
+def _warm_start_var_with_vocab(var, vocab_info, prev_ckpt, prev_tensor_name,
+                               max_chunk_bytes, previous_op=None):
+  """Warm-starts a variable with a vocabulary, in chunks of rows.
+
+  Like `warm_starting_util._warm_start_var_with_vocab`, except that each
+  partition is loaded from the checkpoint, remapped and assigned in chunks of at
+  most `max_chunk_bytes` of rows. The vocabulary remapping is generated once per
+  partition (or once per variable along axis 1) and sliced for each chunk, so
+  the old vocabulary file is read once rather than once per chunk. Each chunk
+  is loaded after the assignment of the previous one, starting after
+  `previous_op`.
+
+  Args:
+    var: A `Variable`, `PartitionedVariable` or list of slices of a variable.
+    vocab_info: The `VocabInfo` of the variable.
+    prev_ckpt: The checkpoint, or directory of checkpoints, to warm-start from.
+    prev_tensor_name: Name of the tensor in `prev_ckpt`, or `None` if it is
+      the same as the name of the variable.
+    max_chunk_bytes: The maximum size of the rows loaded at once.
+    previous_op: An `Operation` to run before loading the first chunk, or
+      `None`.
+
+  Returns:
+    The number of bytes of the variable, the number of chunks it is loaded in
+    and the assignment of its last chunk.
+
+  Raises:
+    ValueError: If `vocab_info` is incomplete or has an invalid axis.
+  """
+  # pylint: disable=protected-access
+  if not (vocab_info.new_vocab and vocab_info.new_vocab_size and prev_ckpt and
+          vocab_info.old_vocab):
+    raise ValueError('Invalid args: Must provide all of [current_vocab_path, '
+                     'current_vocab_size, prev_ckpt, prev_vocab_path}.')
+  if vocab_info.axis not in (0, 1):
+    raise ValueError('The only supported values for the axis argument are 0 '
+                     'and 1.  Provided axis: {}'.format(vocab_info.axis))
+  var = _variable_list(var)
+  if not prev_tensor_name:
+    prev_tensor_name = warm_starting_util._infer_var_name(var)
+  ckpt_path = checkpoint_utils._get_checkpoint_filename(prev_ckpt)
+  backup_initializer = (
+      vocab_info.backup_initializer or init_ops.zeros_initializer())
+
+  if vocab_info.axis == 1:
+    # As in warm_starting_util, variables are not partitioned along axis 1, so
+    # all the partitions share one column remapping.
+    num_vocab_cols = vocab_info.new_vocab_size
+    col_remapping, num_cols_present = (
+        gen_checkpoint_ops.generate_vocab_remapping(
+            new_vocab_file=vocab_info.new_vocab,
+            old_vocab_file=vocab_info.old_vocab,
+            new_vocab_offset=0,
+            num_new_vocab=num_vocab_cols))
+
+  num_bytes = 0
+  num_chunks = 0
+  for v in var:
+    v_shape = v.get_shape().as_list()
+    slice_info = v._get_save_slice_info()
+    v_offset = slice_info.var_offset[0] if slice_info else 0
+
+    if vocab_info.axis == 0:
+      num_vocab_cols = v_shape[1]
+      num_cols_present = num_vocab_cols
+      col_remapping = []
+      # Rows past the new vocabulary are OOV buckets, which are not loaded.
+      num_rows_to_load = max(
+          min(vocab_info.new_vocab_size - v_offset, v_shape[0]), 0)
+      if num_rows_to_load:
+        row_remapping, _ = gen_checkpoint_ops.generate_vocab_remapping(
+            new_vocab_file=vocab_info.new_vocab,
+            old_vocab_file=vocab_info.old_vocab,
+            new_vocab_offset=v_offset,
+            num_new_vocab=num_rows_to_load,
+            old_vocab_size=vocab_info.old_vocab_size)
+    else:
+      num_rows_to_load = v_shape[0]
+      row_remapping = math_ops.range(
+          v_offset, v_offset + num_rows_to_load, dtype=dtypes.int64)
+
+    max_rows_in_memory = _max_rows_in_memory(v_shape[1], max_chunk_bytes)
+    chunk_starts = list(range(0, v_shape[0], max_rows_in_memory))
+    if len(chunk_starts) > 1:
+      # The variable must be initialized before assigning to its rows.
+      with ops.control_dependencies(_control_inputs(previous_op)):
+        previous_op = state_ops.assign(
+            v, array_ops.zeros(v_shape, dtype=dtypes.float32)).op
+    for start in chunk_starts:
+      end = min(start + max_rows_in_memory, v_shape[0])
+      load_end = min(end, num_rows_to_load)
+      with ops.control_dependencies(_control_inputs(previous_op)):
+        parts = []
+        if start < load_end:
+          chunk_remapping = row_remapping[start:load_end]
+          num_rows_present = math_ops.reduce_sum(
+              math_ops.cast(
+                  math_ops.not_equal(chunk_remapping, -1), dtypes.int32))
+          initializing_values = backup_initializer(
+              [(load_end - start) * num_vocab_cols -
+               num_rows_present * num_cols_present],
+              dtype=dtypes.float32)
+          parts.append(
+              gen_checkpoint_ops.load_and_remap_matrix(
+                  ckpt_path=ckpt_path,
+                  old_tensor_name=prev_tensor_name,
+                  row_remapping=chunk_remapping,
+                  col_remapping=col_remapping,
+                  initializing_values=initializing_values,
+                  num_rows=load_end - start,
+                  num_cols=num_vocab_cols,
+                  max_rows_in_memory=max_rows_in_memory))
+        if end > max(start, load_end):
+          # Out-of-vocabulary rows, with nothing to load.
+          parts.append(
+              backup_initializer([end - max(start, load_end), num_vocab_cols],
+                                 dtype=dtypes.float32))
+        chunk = array_ops.concat(parts, 0) if len(parts) > 1 else parts[0]
+        if vocab_info.axis == 1 and vocab_info.num_oov_buckets:
+          chunk = array_ops.concat([
+              chunk,
+              backup_initializer([end - start, vocab_info.num_oov_buckets],
+                                 dtype=dtypes.float32)
+          ], 1)
+        chunk = ops.convert_to_tensor(chunk)
+        if len(chunk_starts) == 1:
+          previous_op = state_ops.assign(v, chunk).op
+        else:
+          previous_op = v[start:end].assign(chunk).op
+    v._initializer_op = previous_op
+    num_bytes += v_shape[0] * v_shape[1] * dtypes.float32.size
+    num_chunks += len(chunk_starts)
+  # pylint: enable=protected-access
+  return num_bytes, num_chunks, previous_op
+
+
+def warm_start(warm_start_settings):
+  """Warm-starts the variables of the default graph.
+
+  Args:
+    warm_start_settings: A `tf.estimator.WarmStartSettings`. If its
+      `max_chunk_bytes` is not set, the rows of a variable with a `VocabInfo`
+      are loaded in chunks of at most 64 MiB. If its
+      `max_concurrent_variables` is not set, at most 4 such variables are
+      loaded at once.
+
+  Returns:
+    The number of warm-started variables.
+
+  Raises:
+    ValueError: If `var_name_to_prev_var_name` or `var_name_to_vocab_info` of
+      `warm_start_settings` name variables which are not warm-started.
+  """
+  ckpt_to_initialize_from = warm_start_settings.ckpt_to_initialize_from
+  vars_to_warm_start = warm_start_settings.vars_to_warm_start
+  var_name_to_vocab_info = warm_start_settings.var_name_to_vocab_info or {}
+  var_name_to_prev_var_name = (
+      warm_start_settings.var_name_to_prev_var_name or {})
+  max_chunk_bytes = (
+      warm_start_settings.max_chunk_bytes or _DEFAULT_MAX_CHUNK_BYTES)
+  max_concurrent_variables = (
+      warm_start_settings.max_concurrent_variables or
+      _DEFAULT_MAX_CONCURRENT_VARIABLES)
+  logging.info('Warm-starting from: %s', (ckpt_to_initialize_from,))
+  grouped_variables = warm_starting_util._get_grouped_variables(  # pylint: disable=protected-access
+      vars_to_warm_start)
+
+  prev_var_name_used = set()
+  vocab_info_used = set()
+  vocabless_vars = {}
+  vocab_bytes = 0
+  vocab_chunks = 0
+  # The variables are spread over max_concurrent_variables chains of
+  # assignments; each chain loads one chunk at a time.
+  last_ops = [None] * max_concurrent_variables
+  for var_name, variable in six.iteritems(grouped_variables):
+    prev_var_name = var_name_to_prev_var_name.get(var_name)
+    if prev_var_name:
+      prev_var_name_used.add(var_name)
+    vocab_info = var_name_to_vocab_info.get(var_name)
+    if vocab_info:
+      chain = len(vocab_info_used) % max_concurrent_variables
+      vocab_info_used.add(var_name)
+      num_bytes, num_chunks, last_ops[chain] = _warm_start_var_with_vocab(
+          variable, vocab_info, ckpt_to_initialize_from, prev_var_name,
+          max_chunk_bytes, previous_op=last_ops[chain])
+      logging.info(
+          'Warm-starting variable %s from %s with vocabulary %s: %d bytes in '
+          '%d chunks.', var_name, prev_var_name or 'the same name',
+          vocab_info.new_vocab, num_bytes, num_chunks)
+      vocab_bytes += num_bytes
+      vocab_chunks += num_chunks
+    elif vars_to_warm_start:
+      # For the special value of vars_to_warm_start = None, only variables with
+      # a vocabulary are warm-started.
+      if len(variable) == 1:
+        variable = variable[0]
+      prev_tensor_name, var = warm_starting_util._get_var_info(  # pylint: disable=protected-access
+          variable, prev_var_name)
+      vocabless_vars[prev_tensor_name] = var
+
+  checkpoint_utils.init_from_checkpoint(ckpt_to_initialize_from, vocabless_vars)
+  num_variables = len(vocab_info_used) + len(vocabless_vars)
+  logging.info(
+      'Warm-started %d variables, remapping %d bytes of %d variables with '
+      'vocabularies in %d chunks.', num_variables, vocab_bytes,
+      len(vocab_info_used), vocab_chunks)
+
+  prev_var_name_not_used = set(
+      var_name_to_prev_var_name.keys()) - prev_var_name_used
+  vocab_info_not_used = set(var_name_to_vocab_info.keys()) - vocab_info_used
+  if prev_var_name_not_used:
+    raise ValueError(
+        'You provided the following variables in '
+        'var_name_to_prev_var_name that were not used: '
+        '{0}.  Perhaps you misspelled them?  Here is the list of viable '
+        'variable names: {1}'.format(prev_var_name_not_used,
+                                     grouped_variables.keys()))
+  if vocab_info_not_used:
+    raise ValueError(
+        'You provided the following variables in '
+        'var_name_to_vocab_info that were not used: {0}. '
+        ' Perhaps you misspelled them?  Here is the list of viable variable '
+        'names: {1}'.format(vocab_info_not_used, grouped_variables.keys()))
+  return num_variables
+
+
+class _WarmStartTimingHook(session_run_hook.SessionRunHook):
+  """Logs how long creating the first session took, including warm-starting.
+
+  The warm-started variables are initialized with the other variables, when the
+  session is created.
+  """
+
+  def __init__(self, num_variables):
+    self._num_variables = num_variables
+    self._begin_time = None
+
+  def begin(self):
+    self._begin_time = time.time()
+
+  def after_create_session(self, session, coord):
+    del session, coord  # Unused.
+    if self._begin_time is None:
+      return
+    logging.info('Created the session in %.2f secs, warm-starting %d '
+                 'variables.', time.time() - self._begin_time,
+                 self._num_variables)
+    self._begin_time = None
@@ -0,0 +1,171 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for warm_starting.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+import numpy as np
+
+from tensorflow.python.framework import ops
+from tensorflow.python.framework import test_util
+from tensorflow.python.ops import init_ops
+from tensorflow.python.ops import partitioned_variables
+from tensorflow.python.ops import variable_scope
+from tensorflow.python.ops import variables
+from tensorflow.python.platform import test
+from tensorflow.python.training import saver
+from tensorflow_estimator.python.estimator import estimator as estimator_lib
+from tensorflow_estimator.python.estimator import warm_starting
+
+_PREV_EMBEDDINGS = np.array(
+    [[0., 0.5], [1., 1.5], [2., 2.5], [3., 3.5]], dtype=np.float32)
+
+
+@test_util.run_v1_only('Warm-starts graph variables.')
+class WarmStartingTest(test.TestCase):
+
+  def setUp(self):
+    super(WarmStartingTest, self).setUp()
+    self._ckpt_dir = os.path.join(self.get_temp_dir(), 'prev')
+    with ops.Graph().as_default() as g:
+      variable_scope.get_variable('emb', initializer=_PREV_EMBEDDINGS)
+      variable_scope.get_variable('bias', initializer=[4., 5.])
+      with self.session(graph=g) as sess:
+        sess.run(variables.global_variables_initializer())
+        saver.Saver().save(sess, os.path.join(self._ckpt_dir, 'model'))
+    self._old_vocab = self._write_vocab('old_vocab', ['a', 'b', 'c', 'd'])
+    self._new_vocab = self._write_vocab('new_vocab', ['d', 'a', 'e'])
+
+  def _write_vocab(self, name, values):
+    path = os.path.join(self.get_temp_dir(), name)
+    with open(path, 'w') as f:
+      f.write('\n'.join(values) + '\n')
+    return path
+
+  def test_warm_start_in_chunks(self):
+    with ops.Graph().as_default() as g:
+      emb = variable_scope.get_variable(
+          'emb',
+          shape=[4, 2],
+          initializer=init_ops.ones_initializer(),
+          partitioner=partitioned_variables.fixed_size_partitioner(2))
+      bias = variable_scope.get_variable(
+          'bias', shape=[2], initializer=init_ops.ones_initializer())
+      vocab_info = estimator_lib.VocabInfo(
+          new_vocab=self._new_vocab,
+          new_vocab_size=3,
+          num_oov_buckets=1,
+          old_vocab=self._old_vocab)
+      # Loads one row of the checkpoint at a time.
+      num_warm_started = warm_starting.warm_start(
+          estimator_lib.WarmStartSettings(
+              self._ckpt_dir,
+              vars_to_warm_start='.*',
+              var_name_to_vocab_info={'emb': vocab_info},
+              max_chunk_bytes=8))
+      self.assertEqual(2, num_warm_started)
+      # Each partition is assigned in two chunks, after the previous chunk.
+      emb_partitions = emb._get_variable_list()  # pylint: disable=protected-access
+      last_op = emb_partitions[1]._initializer_op  # pylint: disable=protected-access
+      self.assertEqual('StridedSliceAssign', last_op.type)
+      self.assertTrue(last_op.control_inputs)
+      # The vocabulary remapping is generated once per partition.
+      self.assertEqual(2, len([
+          op for op in g.get_operations()
+          if op.type == 'GenerateVocabRemapping'
+      ]))
+      with self.session(graph=g) as sess:
+        sess.run(variables.global_variables_initializer())
+        # Rows of 'd' and 'a', and zeros for 'e' and the OOV bucket.
+        self.assertAllClose(
+            [[3., 3.5], [0., 0.5], [0., 0.], [0., 0.]],
+            sess.run(emb.as_tensor()))
+        self.assertAllClose([4., 5.], sess.run(bias))
+
+  def test_invalid_max_chunk_bytes(self):
+    with self.assertRaisesRegexp(ValueError, 'must be positive'):
+      estimator_lib.WarmStartSettings(self._ckpt_dir, max_chunk_bytes=0)
+    with self.assertRaisesRegexp(ValueError, 'must be positive'):
+      estimator_lib.WarmStartSettings(
+          self._ckpt_dir, max_concurrent_variables=0)
+
+  def test_concurrent_variables(self):
+    with ops.Graph().as_default():
+      variables_with_vocab = [
+          variable_scope.get_variable(
+              name, shape=[3, 2], initializer=init_ops.ones_initializer())
+          for name in ('emb', 'emb2')
+      ]
+      vocab_info = estimator_lib.VocabInfo(
+          new_vocab=self._new_vocab,
+          new_vocab_size=3,
+          num_oov_buckets=0,
+          old_vocab=self._old_vocab)
+      warm_starting.warm_start(
+          estimator_lib.WarmStartSettings(
+              self._ckpt_dir,
+              vars_to_warm_start='emb.*',
+              var_name_to_vocab_info={
+                  'emb': vocab_info,
+                  'emb2': vocab_info
+              },
+              var_name_to_prev_var_name={'emb2': 'emb'},
+              max_concurrent_variables=2))
+      # Neither variable waits for the other.
+      for v in variables_with_vocab:
+        self.assertFalse(v._initializer_op.control_inputs)  # pylint: disable=protected-access
+
+  def test_only_vocab_variables(self):
+    with ops.Graph().as_default() as g:
+      variable_scope.get_variable(
+          'emb', shape=[3, 2], initializer=init_ops.ones_initializer())
+      bias = variable_scope.get_variable(
+          'bias', shape=[2], initializer=init_ops.ones_initializer())
+      vocab_info = estimator_lib.VocabInfo(
+          new_vocab=self._new_vocab,
+          new_vocab_size=3,
+          num_oov_buckets=0,
+          old_vocab=self._old_vocab)
+      self.assertEqual(1, warm_starting.warm_start(
+          estimator_lib.WarmStartSettings(
+              self._ckpt_dir,
+              vars_to_warm_start=None,
+              var_name_to_vocab_info={'emb': vocab_info})))
+      with self.session(graph=g) as sess:
+        sess.run(variables.global_variables_initializer())
+        self.assertAllClose([1., 1.], sess.run(bias))
+
+  def test_unused_vocab_info(self):
+    with ops.Graph().as_default():
+      variable_scope.get_variable(
+          'bias', shape=[2], initializer=init_ops.ones_initializer())
+      vocab_info = estimator_lib.VocabInfo(
+          new_vocab=self._new_vocab,
+          new_vocab_size=3,
+          num_oov_buckets=0,
+          old_vocab=self._old_vocab)
+      with self.assertRaisesRegexp(ValueError, 'were not used'):
+        warm_starting.warm_start(
+            estimator_lib.WarmStartSettings(
+                self._ckpt_dir,
+                var_name_to_vocab_info={'emb': vocab_info}))
+
+
+if __name__ == '__main__':
+  test.main()